@@ -1,9 +1,17 @@
-"""Add blood banks with city coordinates"""
+"""Add blood banks with city coordinates
+
+Addresses are geocoded first (cache, pincode gazetteer, then the maps
+client - see services.geocoding); a bank is only placed near its city
+centre when none of them knows the address.
+"""
+from flask import current_app
+
 from app import create_app, db
 from models.blood_bank import BloodBank
+from services.geocoding import BatchGeocoder, normalize_address
 import random
 
-# City coordinates (approximate centers)
+# City coordinates (approximate centers), the fallback when geocoding fails
 CITY_COORDS = {
     'Salem': (11.664325, 78.146011),
     'Hyderabad': (17.385044, 78.486671),
@@ -87,26 +95,37 @@ def add_blood_banks():
     with app.app_context():
         added = 0
         skipped = 0
+        approximate = 0
+        
+        def address(bank_data):
+            return normalize_address(bank_data['address'], bank_data['city'], bank_data['state'],
+                                     bank_data['pincode'], 'India')
+        
+        with BatchGeocoder.from_config(db.session, current_app.config) as geocoder:
+            located = geocoder.resolve([(address(b), b['pincode']) for b in blood_banks_data])
         
         for bank_data in blood_banks_data:
             city = bank_data['city']
             
-            if city not in CITY_COORDS:
-                print(f"⚠️  Skipping {bank_data['name']} - no coordinates for {city}")
+            if address(bank_data) in located:
+                latitude, longitude = located[address(bank_data)]
+            elif city in CITY_COORDS:
+                # Get base coordinates for the city
+                base_lat, base_lon = CITY_COORDS[city]
+                
+                # Add small random offset for each blood bank (within ~2km radius)
+                latitude = base_lat + random.uniform(-0.015, 0.015)
+                longitude = base_lon + random.uniform(-0.015, 0.015)
+                approximate += 1
+            else:
+                print(f"⚠️  Skipping {bank_data['name']} - could not geocode and no coordinates for {city}")
                 skipped += 1
                 continue
             
-            # Get base coordinates for the city
-            base_lat, base_lon = CITY_COORDS[city]
-            
-            # Add small random offset for each blood bank (within ~2km radius)
-            lat_offset = random.uniform(-0.015, 0.015)
-            lon_offset = random.uniform(-0.015, 0.015)
-            
             bb = BloodBank(
                 name=bank_data['name'],
-                latitude=base_lat + lat_offset,
-                longitude=base_lon + lon_offset,
+                latitude=latitude,
+                longitude=longitude,
                 street=bank_data['address'],
                 city=city,
                 state=bank_data['state'],
@@ -132,7 +151,7 @@ def add_blood_banks():
         
         db.session.commit()
         print(f"\n🎉 Import complete!")
-        print(f"   Added: {added}")
+        print(f"   Added: {added} ({approximate} placed near the city centre)")
         print(f"   Skipped: {skipped}")
 
 if __name__ == '__main__':
@@ -20,6 +20,60 @@ def create_app(config_name='development'):
     migrate.init_app(app, db)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
+    # Faster JSON encoding (orjson) when installed
+    from services.wire_format import init_wire_format
+    init_wire_format(app)
+    
+    # Latency histograms, SQL counts and Server-Timing phases (before other response hooks)
+    from services.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    
+    # Slow-query log with EXPLAIN plans, N+1 detection (strict mode fails tests), sampling profiler
+    from services.query_inspector import init_query_inspector
+    init_query_inspector(app)
+    from services.profiler import init_profiler
+    init_profiler(app)
+    
+    # Change counters (ETags, cache invalidation) and the versioned response cache
+    from services.shared_store import init_shared_store
+    from services.change_tracker import init_change_tracker
+    from services.http_cache import init_http_cache
+    init_shared_store(app)
+    init_change_tracker(app)
+    init_http_cache(app)
+    from services.geo_cache import init_geo_cache
+    init_geo_cache(app)
+    
+    # Periodic and background jobs, the inventory ledger
+    from services.scheduler import init_scheduler, start_scheduler
+    from services.background_jobs import init_background_jobs
+    from services.inventory_ledger import init_inventory_ledger
+    from services.inventory_aggregates import init_inventory_aggregates
+    from services.inventory_timeseries import init_inventory_timeseries
+    from services.demand_forecast import init_demand_forecast
+    from services.shortage_alerts import init_shortage_alerts
+    from services.request_queue import init_request_queue
+    from services.request_expiry import init_request_expiry
+    from services.notification_counters import init_notification_counters
+    from services.notification_broker import init_notification_broker
+    from services.notification_retention import init_notification_retention
+    init_scheduler(app)
+    init_background_jobs(app)
+    init_inventory_ledger(app)
+    init_inventory_aggregates(app)
+    init_inventory_timeseries(app)
+    init_demand_forecast(app)
+    init_shortage_alerts(app)
+    init_request_queue(app)
+    init_request_expiry(app)
+    init_notification_counters(app)
+    init_notification_broker(app)
+    init_notification_retention(app)
+    
+    # gzip/brotli response compression
+    from services.compression import init_compression
+    init_compression(app)
+    
     # Register blueprints
     from routes.donor_routes import donor_bp
     from routes.hospital_routes import hospital_bp
@@ -56,6 +110,7 @@ def create_app(config_name='development'):
     
     from routes.map_routes import map_bp
     from routes.seed_routes import seed_bp
+    from routes.ops_routes import ops_bp
     
     app.register_blueprint(donor_bp, url_prefix='/api/donors')
     app.register_blueprint(hospital_bp, url_prefix='/api/hospitals')
@@ -68,6 +123,7 @@ def create_app(config_name='development'):
         app.register_blueprint(chatbot_bp, url_prefix='/api/chatbot')
     app.register_blueprint(map_bp, url_prefix='/api/map')
     app.register_blueprint(seed_bp, url_prefix='/api')
+    app.register_blueprint(ops_bp, url_prefix='/api')
     
     # Root and health endpoints
     @app.route('/')
@@ -130,11 +186,22 @@ def create_app(config_name='development'):
     except Exception:
         # If google maps service fails to initialize, don't break the app
         pass
+    
+    start_scheduler(app)
 
     return app
 
-# Create app instance for gunicorn
-app = create_app(os.getenv('FLASK_ENV', 'production'))
+def __getattr__(name):
+    """``app`` for gunicorn (``app:app``) and ``flask run``, built on first access.
+
+    Importing ``create_app`` (tests, scripts, benchmarks) builds no app, so
+    it starts no scheduler against the production database.
+    """
+    if name == 'app':
+        globals()['app'] = application = create_app(os.getenv('FLASK_ENV', 'production'))
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
     env = os.getenv('FLASK_ENV', 'development')
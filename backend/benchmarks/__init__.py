@@ -0,0 +1,10 @@
+"""
+Benchmarks for the backend hot paths
+
+Usage:
+  python -m benchmarks.run --size 100k                      # build/reuse the dataset, run every case
+  python -m benchmarks.run --size 1k --cases donors.nearby,chatbot.query
+  python -m benchmarks.run --compare before.json after.json  # flag p95 regressions
+
+See benchmarks/run.py for the options and benchmarks/cases.py for what is measured.
+"""
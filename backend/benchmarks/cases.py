@@ -0,0 +1,153 @@
+"""
+Benchmark cases
+
+Each case is a setup function taking the ``Context`` and returning the
+operation to time, ``operation(i) -> False on failure``. HTTP cases go
+through the Flask test client, so routing, hooks, serialization and
+compression are included but the network is not; locations are drawn
+around the dataset's city centres, so most requests land in dense areas.
+"""
+import random
+
+from sqlalchemy import select
+
+from extensions import db
+from models.blood_bank import BloodBank
+from models.donor import Donor
+from services.ai_matching_service import BLOOD_COMPATIBILITY, matching_engine
+from services import geo_sampling as geo
+
+CHATBOT_MESSAGES = [
+    'I need O+ blood in Mumbai urgent',
+    'find B+ donors near Bengaluru',
+    'blood banks in Chennai',
+    'check inventory for A- in Delhi',
+    'how often can I donate blood?',
+    'am I eligible to donate after a tattoo',
+    'need AB+ blood in Hyderabad critical',
+    'hospitals near Pune',
+    'what is the universal donor blood type',
+    'register as a donor'
+]
+
+
+class Context:
+    def __init__(self, app, seed=42, match_candidates=2000):
+        self.app = app
+        self.client = app.test_client()
+        self.rnd = random.Random(seed)
+        self.match_candidates = match_candidates
+        self._bank_ids = None
+
+    def point(self):
+        return geo.random_point(self.rnd)
+
+    def blood_type(self):
+        return geo.blood_type(self.rnd)
+
+    def bank_ids(self):
+        if self._bank_ids is None:
+            self._bank_ids = db.session.execute(select(BloodBank.id).order_by(BloodBank.id)).scalars().all()
+        return self._bank_ids
+
+    def post(self, url, payload):
+        return self.client.post(url, json=payload).status_code < 400
+
+    def put(self, url, payload):
+        return self.client.put(url, json=payload).status_code < 400
+
+
+def find_best_matches(ctx):
+    blood_type = 'O+'
+    donors = Donor.query.filter(
+        Donor.blood_type.in_(BLOOD_COMPATIBILITY[blood_type]),
+        Donor.available_for_donation == True  # noqa: E712
+    ).limit(ctx.match_candidates).all()
+    candidates = [donor.to_dict() for donor in donors]
+    db.session.remove()
+
+    def operation(i):
+        lat, lon = ctx.point()
+        urgency = ('Normal', 'Urgent', 'Critical')[i % 3]
+        matching_engine.find_best_matches(candidates, {'latitude': lat, 'longitude': lon}, urgency, blood_type)
+    return operation
+
+
+def _nearby(url, radius, with_blood_type):
+    def setup(ctx):
+        def operation(i):
+            lat, lon = ctx.point()
+            payload = {'latitude': lat, 'longitude': lon, 'maxDistance': radius}
+            if with_blood_type:
+                payload['bloodType'] = ctx.blood_type()
+            return ctx.post(url, payload)
+        return operation
+    return setup
+
+
+def map_markers(ctx):
+    def operation(i):
+        lat, lon = ctx.point()
+        return ctx.post('/api/map/markers', {'latitude': lat, 'longitude': lon, 'maxDistance': 25, 'limit': 100})
+    return operation
+
+
+def map_heatmap(ctx):
+    def operation(i):
+        lat, lon = ctx.point()
+        return ctx.post('/api/map/heatmap', {'latitude': lat, 'longitude': lon, 'maxDistance': 100,
+                                             'bloodType': ctx.blood_type()})
+    return operation
+
+
+def map_city_counts(ctx):
+    def operation(i):
+        return ctx.post('/api/map/city-counts', {'includeTypes': ['bloodBanks', 'hospitals']})
+    return operation
+
+
+def chatbot_query(ctx):
+    routed = any(rule.rule == '/api/chatbot/query' for rule in ctx.app.url_map.iter_rules())
+    if not routed:
+        from services.chatbot_service import chatbot
+        print('⚠️  chatbot routes not loaded (USE_CHATBOT); timing the NLP service only')
+
+    def operation(i):
+        message = CHATBOT_MESSAGES[i % len(CHATBOT_MESSAGES)]
+        if routed:
+            return ctx.post('/api/chatbot/query', {'message': message, 'userId': f'bench-{i % 50}'})
+        chatbot.get_response(message)
+    return operation
+
+
+def inventory_events(ctx):
+    def operation(i):
+        # Receive then issue one unit on the same bank, so stock never runs out
+        bank_id = ctx.bank_ids()[(i // 2) % len(ctx.bank_ids())]
+        blood_type = geo.BLOOD_TYPES[(i // 2) % 4]
+        reason, delta = ('Received', 1) if i % 2 == 0 else ('Issued', -1)
+        return ctx.post(f'/api/blood-banks/{bank_id}/inventory/events',
+                        {'reason': reason, 'deltas': {blood_type: delta}, 'terminalId': 'benchmark'})
+    return operation
+
+
+def inventory_set_levels(ctx):
+    def operation(i):
+        bank_id = ctx.bank_ids()[ctx.rnd.randrange(len(ctx.bank_ids()))]
+        return ctx.put(f'/api/blood-banks/{bank_id}/inventory',
+                       {'bloodInventory': {ctx.blood_type(): ctx.rnd.randint(0, 60)}, 'terminalId': 'benchmark'})
+    return operation
+
+
+CASES = {
+    'matching.find_best_matches': find_best_matches,
+    'donors.nearby': _nearby('/api/donors/nearby', 25, True),
+    'blood_banks.nearby': _nearby('/api/blood-banks/nearby', 25, True),
+    'hospitals.nearby': _nearby('/api/hospitals/nearby', 25, False),
+    'map.markers': map_markers,
+    'map.heatmap': map_heatmap,
+    'map.city_counts': map_city_counts,
+    'chatbot.query': chatbot_query,
+    'inventory.events': inventory_events,
+    'inventory.set_levels': inventory_set_levels
+}
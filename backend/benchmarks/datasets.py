@@ -0,0 +1,37 @@
+"""
+Synthetic benchmark datasets
+
+Donors, hospitals and blood banks from the synthetic data generator
+(services.synthetic_data): spread around Indian city centres in proportion
+to the cities' populations, with a normal spatial spread of a few km so
+nearby searches see dense cores and sparse outskirts like the real data,
+and blood types following the Indian distribution. A size and seed always
+produce the same rows.
+"""
+from sqlalchemy import func, select
+
+from models.blood_bank import BloodBank
+from models.donor import Donor
+from models.hospital import Hospital
+from services import synthetic_data
+
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+
+def counts(session):
+    return {
+        'donors': session.execute(select(func.count()).select_from(Donor)).scalar(),
+        'hospitals': session.execute(select(func.count()).select_from(Hospital)).scalar(),
+        'blood_banks': session.execute(select(func.count()).select_from(BloodBank)).scalar()
+    }
+
+
+def build(session, n_donors, n_banks, n_hospitals, seed=42, chunk=synthetic_data.DEFAULT_CHUNK, progress=print):
+    """Fill empty tables with a synthetic dataset; returns the row counts"""
+    def report(stage, seconds, rows=None, total=None, **_):
+        if stage == 'done' or (rows is not None and (rows == total or rows % (chunk * 10) == 0)):
+            progress(f'{stage}: {rows or "dataset ready"}{f"/{total}" if total else ""} in {seconds:.1f}s')
+
+    synthetic_data.generate(session, seed=seed, chunk=chunk, progress=report,
+                            hospitals=n_hospitals, blood_banks=n_banks, donors=n_donors)
+    return counts(session)
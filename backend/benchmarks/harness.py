@@ -0,0 +1,140 @@
+"""
+Timing, percentiles, result files and run comparison
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def percentile(ordered, q):
+    """Linear-interpolated percentile (0-100) of a sorted list"""
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(name, timings, wall_seconds, errors=0):
+    ordered = sorted(timings)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        'name': name,
+        'iterations': len(ordered),
+        'errors': errors,
+        'p50Ms': ms(percentile(ordered, 50)),
+        'p95Ms': ms(percentile(ordered, 95)),
+        'p99Ms': ms(percentile(ordered, 99)),
+        'meanMs': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'minMs': ms(ordered[0]) if ordered else None,
+        'maxMs': ms(ordered[-1]) if ordered else None,
+        'throughputPerSec': round(len(ordered) / wall_seconds, 2) if wall_seconds else None
+    }
+
+
+def measure(name, operation, iterations=200, warmup=10, max_seconds=30.0):
+    """Run ``operation(i)`` ``warmup`` + up to ``iterations`` times (or ``max_seconds``).
+
+    ``operation`` returns False (or raises) for a failed call; failures are
+    counted but not timed. Warmup stops early after a quarter of the budget.
+    """
+    started = time.perf_counter()
+    for i in range(warmup):
+        try:
+            operation(i)
+        except Exception:
+            pass
+        if time.perf_counter() - started >= max_seconds / 4:
+            warmup = i + 1
+            break
+    timings, errors = [], 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        before = time.perf_counter()
+        try:
+            ok = operation(warmup + i) is not False
+        except Exception as e:
+            ok = False
+            if errors == 0:
+                print(f"⚠️  {name}: {e}")
+        after = time.perf_counter()
+        if ok:
+            timings.append(after - before)
+        else:
+            errors += 1
+        if after - started >= max_seconds:
+            break
+    return summarize(name, timings, time.perf_counter() - started, errors)
+
+
+def environment():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        'revision': revision,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'startedAt': datetime.utcnow().isoformat()
+    }
+
+
+def write_results(path, results, meta):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as out:
+        json.dump({'meta': meta, 'results': results}, out, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def compare(base, new, metric='p95Ms', threshold=0.10):
+    """Per case change of ``metric`` between two result files; regressions exceed ``threshold``"""
+    before = {result['name']: result for result in base['results']}
+    rows = []
+    for result in new['results']:
+        old = before.get(result['name'])
+        if old is None or not old.get(metric) or result.get(metric) is None:
+            rows.append({'name': result['name'], 'before': None, 'after': result.get(metric), 'change': None,
+                         'regression': False})
+            continue
+        change = (result[metric] - old[metric]) / old[metric]
+        rows.append({
+            'name': result['name'],
+            'before': old[metric],
+            'after': result[metric],
+            'change': round(change, 4),
+            'regression': change > threshold
+        })
+    return rows
+
+
+def print_results(results):
+    print(f"{'case':<32}{'n':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'ops/s':>11}{'errors':>8}")
+    for r in results:
+        print(f"{r['name']:<32}{r['iterations']:>7}{_fmt(r['p50Ms']):>11}{_fmt(r['p95Ms']):>11}"
+              f"{_fmt(r['p99Ms']):>11}{_fmt(r['throughputPerSec']):>11}{r['errors']:>8}")
+
+
+def print_comparison(rows, metric):
+    print(f"{'case':<32}{'before':>12}{'after':>12}{'change':>10}")
+    for row in rows:
+        change = f"{row['change'] * 100:+.1f}%" if row['change'] is not None else 'new'
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:<32}{_fmt(row['before']):>12}{_fmt(row['after']):>12}{change:>10}{flag}")
+    print(f"({metric})")
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.2f}'
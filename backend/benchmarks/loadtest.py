@@ -0,0 +1,246 @@
+"""
+Load test a running backend with a realistic traffic mix.
+
+Usage:
+  python -m benchmarks.maps_stub --port 8090 &
+  FLASK_ENV=benchmark BENCHMARK_DATABASE_URL=sqlite:////abs/path/benchmarks/data/benchmark-100k.db \\
+    GOOGLE_MAPS_API_KEY=AIzaStub GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8090 \\
+    gunicorn app:app --workers 2 --worker-class gthread --threads 16 --bind 127.0.0.1:8000
+  python -m benchmarks.loadtest --url http://127.0.0.1:8000 --levels 1,4,16,64 --duration 20
+  python -m benchmarks.loadtest --mix nearby=50,inventory=30,chatbot=20 --output run.json
+
+Closed-loop workers (threads, one keep-alive session each) send requests
+back to back; each concurrency level runs for --duration seconds. The
+report gives, per level, the throughput and error rate, and per endpoint
+p50/p95/p99. The saturation throughput is the highest throughput seen;
+the ramp stops early once more concurrency no longer adds throughput
+(under 5% gain) while p99 keeps growing, or errors pass --max-error-rate.
+
+Traffic groups (--mix weights):
+  nearby       donors/blood banks/hospitals /nearby around city centres
+  smart_match  /api/smart-match/find-donors (skipped when the route is off)
+  chatbot      /api/chatbot/query with typical questions
+  inventory    received/issued inventory events on random banks
+  directions   /api/map/directions (goes to the maps stub)
+  map          /api/map/markers
+
+The driver is a Python process; for rates beyond what one client core
+can send, run several drivers and add up their throughput.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from benchmarks.harness import environment, summarize
+from services import geo_sampling as geo
+
+DEFAULT_MIX = {'nearby': 40, 'smart_match': 10, 'chatbot': 15, 'inventory': 20, 'directions': 10, 'map': 5}
+CHATBOT_MESSAGES = [
+    'I need O+ blood in Mumbai urgent',
+    'find B+ donors near Bengaluru',
+    'blood banks in Chennai',
+    'how often can I donate blood?',
+    'need AB+ blood in Hyderabad critical',
+    'hospitals near Pune'
+]
+
+
+class Traffic:
+    """Builds the next request of each group"""
+
+    def __init__(self, rnd, bank_ids):
+        self.rnd = rnd
+        self.bank_ids = bank_ids
+
+    def nearby(self):
+        lat, lon = geo.random_point(self.rnd)
+        kind = self.rnd.choices(['donors', 'blood-banks', 'hospitals'], [45, 40, 15])[0]
+        payload = {'latitude': lat, 'longitude': lon, 'maxDistance': self.rnd.choice([10, 25, 50])}
+        if kind != 'hospitals':
+            payload['bloodType'] = geo.blood_type(self.rnd)
+        return f"{kind.replace('-', '_')}.nearby", 'POST', f'/api/{kind}/nearby', payload
+
+    def smart_match(self):
+        lat, lon = geo.random_point(self.rnd)
+        return 'smart_match.find_donors', 'POST', '/api/smart-match/find-donors', {
+            'bloodType': geo.blood_type(self.rnd),
+            'location': {'latitude': lat, 'longitude': lon},
+            'urgency': self.rnd.choices(['Normal', 'Urgent', 'Critical'], [60, 30, 10])[0]
+        }
+
+    def chatbot(self):
+        return 'chatbot.query', 'POST', '/api/chatbot/query', {
+            'message': self.rnd.choice(CHATBOT_MESSAGES), 'userId': f'load-{self.rnd.randrange(500)}'
+        }
+
+    def inventory(self):
+        bank_id = self.rnd.choice(self.bank_ids)
+        received = self.rnd.random() < 0.55
+        return 'inventory.events', 'POST', f'/api/blood-banks/{bank_id}/inventory/events', {
+            'reason': 'Received' if received else 'Issued',
+            'deltas': {geo.blood_type(self.rnd): 1 if received else -1},
+            'terminalId': 'loadtest'
+        }
+
+    def directions(self):
+        city = geo.cities_by_weight(self.rnd, 1)[0]
+        (olat, olon), (dlat, dlon) = geo.point(self.rnd, city), geo.point(self.rnd, city)
+        return 'map.directions', 'POST', '/api/map/directions', {
+            'origin': {'latitude': olat, 'longitude': olon}, 'destination': {'latitude': dlat, 'longitude': dlon}
+        }
+
+    def map(self):
+        lat, lon = geo.random_point(self.rnd)
+        return 'map.markers', 'POST', '/api/map/markers', {'latitude': lat, 'longitude': lon, 'maxDistance': 25}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = {}
+        self.errors = {}
+
+    def add(self, name, seconds, ok):
+        with self._lock:
+            if ok:
+                self.timings.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def _worker(base_url, mix, seed, deadline, recorder, bank_ids, timeout):
+    rnd = random.Random(seed)
+    traffic = Traffic(rnd, bank_ids)
+    groups, weights = list(mix), list(mix.values())
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        name, method, path, payload = getattr(traffic, rnd.choices(groups, weights)[0])()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=payload, timeout=timeout)
+            ok = response.status_code < 400 or (name == 'inventory.events' and response.status_code == 409)
+        except requests.RequestException:
+            ok = False
+        recorder.add(name, time.perf_counter() - started, ok)
+
+
+def run_level(base_url, mix, concurrency, duration, seed, bank_ids, timeout):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_worker, args=(base_url, mix, seed * 1000 + i, deadline, recorder,
+                                                      bank_ids, timeout), daemon=True)
+               for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    names = sorted(set(recorder.timings) | set(recorder.errors))
+    endpoints = [summarize(name, recorder.timings.get(name, []), wall, recorder.errors.get(name, 0)) for name in names]
+    everything = [t for timings in recorder.timings.values() for t in timings]
+    total = summarize('all', everything, wall, sum(recorder.errors.values()))
+    requests_sent = total['iterations'] + total['errors']
+    return {
+        'concurrency': concurrency,
+        'seconds': round(wall, 2),
+        'throughputPerSec': total['throughputPerSec'],
+        'errorRate': round(total['errors'] / requests_sent, 4) if requests_sent else 0.0,
+        'p50Ms': total['p50Ms'],
+        'p95Ms': total['p95Ms'],
+        'p99Ms': total['p99Ms'],
+        'endpoints': endpoints
+    }
+
+
+def discover(base_url, mix, timeout):
+    """Bank ids for inventory traffic; drops groups whose routes are not mounted"""
+    response = requests.get(f'{base_url}/api/blood-banks/', params={'limit': 500, 'fields': 'id'}, timeout=timeout)
+    bank_ids = [bank['id'] for bank in response.json().get('data', [])] or [1]
+    for group, path in (('smart_match', '/api/smart-match/find-donors'), ('chatbot', '/api/chatbot/query')):
+        if mix.get(group) and requests.post(base_url + path, json={}, timeout=timeout).status_code == 404:
+            print(f"⚠️  {path} is not mounted; dropping '{group}' from the mix")
+            mix.pop(group)
+    return bank_ids
+
+
+def load_test(base_url, mix, levels, duration, seed, timeout, max_error_rate):
+    bank_ids = discover(base_url, mix, timeout)
+    print(f"Mix: {', '.join(f'{group}={weight}' for group, weight in mix.items())}")
+    results, best = [], None
+    for concurrency in levels:
+        level = run_level(base_url, mix, concurrency, duration, seed, bank_ids, timeout)
+        results.append(level)
+        print(f"c={concurrency:<4} {level['throughputPerSec'] or 0:>9.1f} req/s  p50 {level['p50Ms'] or 0:>8.1f} ms  "
+              f"p95 {level['p95Ms'] or 0:>8.1f} ms  p99 {level['p99Ms'] or 0:>8.1f} ms  errors {level['errorRate']:.2%}")
+        if best is None or (level['throughputPerSec'] or 0) > (best['throughputPerSec'] or 0):
+            previous_best = best
+            best = level
+            if previous_best is None or best['throughputPerSec'] >= previous_best['throughputPerSec'] * 1.05:
+                continue
+        if level['errorRate'] > max_error_rate:
+            print(f"Error rate above {max_error_rate:.0%}; stopping the ramp")
+            break
+        if best is not level and (level['p99Ms'] or 0) > (best['p99Ms'] or 0):
+            print("Throughput stopped growing while p99 grows; stopping the ramp")
+            break
+    return {
+        'saturation': {'concurrency': best['concurrency'], 'throughputPerSec': best['throughputPerSec'],
+                       'p99Ms': best['p99Ms']} if best else None,
+        'levels': results
+    }
+
+
+def print_endpoints(level):
+    print(f"\nPer endpoint at c={level['concurrency']}:")
+    print(f"{'endpoint':<28}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}")
+    for r in level['endpoints']:
+        print(f"{r['name']:<28}{r['iterations']:>8}{r['p50Ms'] or 0:>10.1f}{r['p95Ms'] or 0:>10.1f}"
+              f"{r['p99Ms'] or 0:>10.1f}{r['throughputPerSec'] or 0:>10.1f}{r['errors']:>8}")
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        group, _, weight = part.partition('=')
+        if not hasattr(Traffic, group):
+            raise SystemExit(f"Unknown traffic group '{group}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[group] = float(weight or 1)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test a running backend')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Backend base URL')
+    parser.add_argument('--levels', default='1,2,4,8,16,32,64', help='Concurrency levels to ramp through')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per level')
+    parser.add_argument('--mix', help='Traffic weights, e.g. nearby=40,inventory=20 (default: all groups)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--max-error-rate', type=float, default=0.05, help='Stop the ramp above this error rate')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    mix = _parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    report = load_test(args.url.rstrip('/'), mix, [int(c) for c in args.levels.split(',')], args.duration,
+                       args.seed, args.timeout, args.max_error_rate)
+    if not report['levels']:
+        sys.exit(1)
+    saturation = report['saturation']
+    saturated = next(level for level in report['levels'] if level['concurrency'] == saturation['concurrency'])
+    print_endpoints(saturated)
+    print(f"\nSaturation: {saturation['throughputPerSec']:.1f} req/s at concurrency {saturation['concurrency']} "
+          f"(p99 {saturation['p99Ms']:.1f} ms)")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(dict(report, meta=dict(environment(), url=args.url, mix=mix, duration=args.duration,
+                                             finishedAt=datetime.utcnow().isoformat())), out, indent=2)
+        print(f"Report written to {args.output}")
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the Google Maps web services, for load tests.
+
+Usage:
+  python -m benchmarks.maps_stub --port 8090 --latency-ms 120 --jitter-ms 60
+  python -m benchmarks.maps_stub --error-rate 0.02 --over-query-limit-rate 0.01
+
+Then start the backend against it (the client only checks that the key
+starts with "AIza"):
+  GOOGLE_MAPS_API_KEY=AIzaStub GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8090 gunicorn app:app ...
+
+Serves the endpoints GoogleMapsService uses, with Google's response shapes:
+  /maps/api/geocode/json             address -> a point in the named city
+                                     (deterministic per address), or
+                                     latlng -> the nearest city
+  /maps/api/directions/json          straight-line route with an encoded polyline
+  /maps/api/distancematrix/json      great-circle distances for origins x destinations
+  /maps/api/place/nearbysearch/json  no results
+  /stats                             request counts per endpoint
+
+Every response waits latency + uniform(0, jitter) ms. --error-rate answers
+HTTP 503 (retried by the client), --over-query-limit-rate answers
+OVER_QUERY_LIMIT (retried with backoff), so retry paths see load too.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from services import geo_sampling as geo
+
+_AVERAGE_SPEED_KMH = 30
+
+
+def _location(lat, lng):
+    return {'lat': round(lat, 7), 'lng': round(lng, 7)}
+
+
+def _result(city, lat, lng, formatted=None):
+    name, state = city[0], city[1]
+    return {
+        'formatted_address': formatted or f'{name}, {state}, India',
+        'geometry': {'location': _location(lat, lng), 'location_type': 'APPROXIMATE'},
+        'address_components': [
+            {'long_name': name, 'short_name': name, 'types': ['locality', 'political']},
+            {'long_name': state, 'short_name': state, 'types': ['administrative_area_level_1', 'political']},
+            {'long_name': 'India', 'short_name': 'IN', 'types': ['country', 'political']}
+        ],
+        'types': ['street_address']
+    }
+
+
+def _parse_point(text):
+    lat, lng = text.split(',')
+    return float(lat), float(lng)
+
+
+def _point_for(text):
+    """A fixed place for a location parameter: "lat,lng" or an address"""
+    try:
+        return _parse_point(text)
+    except ValueError:
+        city = geo.city_named(text) or geo.CITIES[0]
+        return geocode_point(city, text)
+
+
+def geocode_point(city, address):
+    # Same address, same point: seed a generator from the address text
+    seed = int.from_bytes(hashlib.sha1(address.lower().encode()).digest()[:8], 'big')
+    return geo.point(random.Random(seed), city, 0.5)
+
+
+def encode_polyline(points):
+    result, previous = [], (0, 0)
+    for lat, lng in points:
+        current = (int(round(lat * 1e5)), int(round(lng * 1e5)))
+        for value in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        previous = current
+    return ''.join(result)
+
+
+def _distance_fields(km):
+    minutes = max(int(km / _AVERAGE_SPEED_KMH * 60), 1)
+    return ({'text': f'{km:.1f} km', 'value': int(km * 1000)},
+            {'text': f'{minutes} mins', 'value': minutes * 60})
+
+
+def geocode(params):
+    if 'latlng' in params:
+        lat, lng = _parse_point(params['latlng'])
+        city = geo.nearest_city(lat, lng)
+        return {'status': 'OK', 'results': [_result(city, lat, lng, f'{lat:.5f}, {lng:.5f}, {city[0]}, India')]}
+    address = params.get('address', '')
+    city = geo.city_named(address)
+    if city is None:
+        return {'status': 'ZERO_RESULTS', 'results': []}
+    lat, lng = geocode_point(city, address)
+    return {'status': 'OK', 'results': [_result(city, lat, lng, f'{address}, India')]}
+
+
+def directions(params):
+    origin, destination = _point_for(params.get('origin', '')), _point_for(params.get('destination', ''))
+    km = geo.distance_km(origin, destination)
+    steps = max(min(int(km), 20), 2)
+    path = [(origin[0] + (destination[0] - origin[0]) * i / steps, origin[1] + (destination[1] - origin[1]) * i / steps)
+            for i in range(steps + 1)]
+    distance, duration = _distance_fields(km)
+    leg = {
+        'distance': distance,
+        'duration': duration,
+        'start_address': f'{origin[0]:.5f}, {origin[1]:.5f}',
+        'end_address': f'{destination[0]:.5f}, {destination[1]:.5f}',
+        'start_location': _location(*origin),
+        'end_location': _location(*destination),
+        'steps': [{'html_instructions': f'Head towards waypoint {i + 1}',
+                   'distance': _distance_fields(km / steps)[0], 'duration': _distance_fields(km / steps)[1]}
+                  for i in range(steps)]
+    }
+    return {'status': 'OK', 'routes': [{'legs': [leg], 'overview_polyline': {'points': encode_polyline(path)},
+                                        'summary': 'Stub route'}]}
+
+
+def distance_matrix(params):
+    origins = [_point_for(p) for p in params.get('origins', '').split('|') if p]
+    destinations = [_point_for(p) for p in params.get('destinations', '').split('|') if p]
+    rows = []
+    for origin in origins:
+        elements = []
+        for destination in destinations:
+            distance, duration = _distance_fields(geo.distance_km(origin, destination))
+            elements.append({'status': 'OK', 'distance': distance, 'duration': duration})
+        rows.append({'elements': elements})
+    return {'status': 'OK', 'origin_addresses': [f'{lat:.5f}, {lng:.5f}' for lat, lng in origins],
+            'destination_addresses': [f'{lat:.5f}, {lng:.5f}' for lat, lng in destinations], 'rows': rows}
+
+
+def nearby_places(params):
+    return {'status': 'ZERO_RESULTS', 'results': [], 'html_attributions': []}
+
+
+ENDPOINTS = {
+    '/maps/api/geocode/json': geocode,
+    '/maps/api/directions/json': directions,
+    '/maps/api/distancematrix/json': distance_matrix,
+    '/maps/api/place/nearbysearch/json': nearby_places
+}
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.errors = {}
+
+    def count(self, path, error=False):
+        with self._lock:
+            target = self.errors if error else self.requests
+            target[path] = target.get(path, 0) + 1
+
+    def to_dict(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'errors': dict(self.errors)}
+
+
+def make_handler(latency, jitter, error_rate, over_query_limit_rate, stats, rnd):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                return self._send(200, stats.to_dict())
+            endpoint = ENDPOINTS.get(url.path)
+            if endpoint is None:
+                return self._send(404, {'status': 'NOT_FOUND', 'error_message': f'Unknown endpoint {url.path}'})
+            time.sleep(latency + rnd.uniform(0, jitter))
+            roll = rnd.random()
+            if roll < error_rate:
+                stats.count(url.path, error=True)
+                return self._send(503, {'status': 'UNKNOWN_ERROR'})
+            if roll < error_rate + over_query_limit_rate:
+                stats.count(url.path, error=True)
+                return self._send(200, {'status': 'OVER_QUERY_LIMIT', 'error_message': 'Stub quota exceeded'})
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                body = endpoint(params)
+            except (ValueError, IndexError) as e:
+                stats.count(url.path, error=True)
+                return self._send(200, {'status': 'INVALID_REQUEST', 'error_message': str(e)})
+            stats.count(url.path)
+            self._send(200, body)
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8090, latency_ms=100.0, jitter_ms=50.0, error_rate=0.0, over_query_limit_rate=0.0,
+          seed=None):
+    """Start the stub in a background thread; returns the server (``shutdown()`` stops it)"""
+    stats = StubStats()
+    handler = make_handler(latency_ms / 1000, jitter_ms / 1000, error_rate, over_query_limit_rate, stats,
+                           random.Random(seed))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, name='maps-stub', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Google Maps stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='Base latency of every response')
+    parser.add_argument('--jitter-ms', type=float, default=50.0, help='Extra uniform random latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of HTTP 503 responses')
+    parser.add_argument('--over-query-limit-rate', type=float, default=0.0, help='Share of OVER_QUERY_LIMIT responses')
+    parser.add_argument('--seed', type=int, help='Seed of the latency/error draws')
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.over_query_limit_rate,
+                   args.seed)
+    print(f"Maps stub on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms:g}+{args.jitter_ms:g} ms, errors {args.error_rate:.1%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats.to_dict(), indent=2))
+        server.shutdown()
@@ -0,0 +1,145 @@
+"""
+Run the backend benchmarks, or compare two runs.
+
+Usage:
+  python -m benchmarks.run --size 1k                         # 1k donors, 10k banks, every case
+  python -m benchmarks.run --size 1m --cases donors.nearby --iterations 50
+  python -m benchmarks.run --size 100k --database postgresql+psycopg2://localhost/bench
+  python -m benchmarks.run --compare base.json new.json      # exit 1 on a p95 regression
+  python -m benchmarks.run --list
+
+Datasets are built once per size (default: SQLite files under
+benchmarks/data/) and reused while their row counts match; --rebuild
+drops and regenerates them. Results are written as JSON to
+benchmarks/results/ unless --output is given. Benchmarks run with the
+``benchmark`` config: scheduler off, geo cache off (the handlers are
+measured, not the cache), chatbot routes on.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _database_url(size, database):
+    if database:
+        return database
+    os.makedirs(os.path.join(HERE, 'data'), exist_ok=True)
+    return f"sqlite:///{os.path.join(HERE, 'data', f'benchmark-{size}.db')}"
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as source:
+        return source.read()
+
+
+def _restore(path, content):
+    if content is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'wb') as out:
+        out.write(content)
+
+
+def run(size, banks, hospitals, seed, database, case_names, iterations, warmup, max_seconds, output, rebuild,
+        match_candidates):
+    # The config module reads the URL at import time
+    os.environ['BENCHMARK_DATABASE_URL'] = _database_url(size, database)
+    os.environ.setdefault('FLASK_ENV', 'benchmark')
+    from app import create_app
+    from extensions import db
+    from benchmarks import cases, datasets, harness
+
+    names = case_names or list(cases.CASES)
+    unknown = [name for name in names if name not in cases.CASES]
+    if unknown:
+        print(f"Unknown case(s): {', '.join(unknown)} (see --list)")
+        return 2
+
+    app = create_app('benchmark')
+    n_donors = datasets.SIZES[size]
+    with app.app_context():
+        if rebuild:
+            db.drop_all()
+        db.create_all()
+        existing = datasets.counts(db.session)
+        wanted = {'donors': n_donors, 'hospitals': hospitals, 'blood_banks': banks}
+        if existing != wanted:
+            if any(existing.values()):
+                print(f"Dataset has {existing}, wanted {wanted}; rebuilding")
+                db.drop_all()
+                db.create_all()
+            print(f"Building the {size} dataset (seed {seed})")
+            existing = datasets.build(db.session, n_donors, banks, hospitals, seed=seed)
+
+        context = cases.Context(app, seed=seed, match_candidates=match_candidates)
+        results = []
+        # The chatbot route appends to instance/chat_history.json; put it back afterwards
+        history_path = os.path.join(app.instance_path, 'chat_history.json')
+        history = _read(history_path)
+        try:
+            for name in names:
+                operation = cases.CASES[name](context)
+                result = harness.measure(name, operation, iterations, warmup, max_seconds)
+                db.session.remove()
+                results.append(result)
+                harness.print_results([result])
+        finally:
+            _restore(history_path, history)
+
+    meta = dict(harness.environment(), size=size, seed=seed, dataset=existing,
+                database=app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1],
+                dialect=app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+                iterations=iterations, warmup=warmup, maxSeconds=max_seconds)
+    output = output or os.path.join(HERE, 'results', f'{size}-{datetime.utcnow():%Y%m%d-%H%M%S}.json')
+    print(f"Results written to {harness.write_results(output, results, meta)}")
+    return 0
+
+
+def compare(base_path, new_path, metric, threshold):
+    from benchmarks import harness
+    rows = harness.compare(harness.load_results(base_path), harness.load_results(new_path), metric, threshold)
+    harness.print_comparison(rows, metric)
+    regressions = [row['name'] for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"No regressions above {threshold:.0%}.")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the backend hot paths')
+    parser.add_argument('--size', choices=['1k', '100k', '1m'], default='1k', help='Number of donors')
+    parser.add_argument('--banks', type=int, default=10000, help='Number of blood banks')
+    parser.add_argument('--hospitals', type=int, default=2000, help='Number of hospitals')
+    parser.add_argument('--seed', type=int, default=42, help='Dataset and request seed')
+    parser.add_argument('--database', help='SQLAlchemy URL (default: a SQLite file per size)')
+    parser.add_argument('--cases', help='Comma-separated case names (default: all)')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed calls per case')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed calls per case')
+    parser.add_argument('--max-seconds', type=float, default=30.0, help='Time budget per case')
+    parser.add_argument('--match-candidates', type=int, default=2000, help='Donors scored by find_best_matches')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<size>-<time>.json)')
+    parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='Compare two result files')
+    parser.add_argument('--metric', default='p95Ms', choices=['p50Ms', 'p95Ms', 'p99Ms', 'meanMs'],
+                        help='Metric compared by --compare')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative increase flagged as a regression')
+    parser.add_argument('--list', action='store_true', help='List the cases')
+    args = parser.parse_args()
+
+    if args.list:
+        from benchmarks.cases import CASES
+        print('\n'.join(CASES))
+        sys.exit(0)
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.metric, args.threshold))
+    sys.exit(run(args.size, args.banks, args.hospitals, args.seed, args.database,
+                 args.cases.split(',') if args.cases else None, args.iterations, args.warmup, args.max_seconds,
+                 args.output, args.rebuild, args.match_candidates))
@@ -48,6 +48,12 @@ class Config:
     
     # Google Maps API
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY') or 'YOUR_GOOGLE_MAPS_API_KEY'
+    GOOGLE_MAPS_BASE_URL = os.environ.get('GOOGLE_MAPS_BASE_URL')  # e.g. http://127.0.0.1:8090 for the maps stub
+    GOOGLE_MAPS_TIMEOUT = 10  # seconds per HTTP call
+    GOOGLE_MAPS_QUERIES_PER_SECOND = int(os.environ.get('GOOGLE_MAPS_QUERIES_PER_SECOND', 50))  # client-side limit per worker
+    GEOCODE_WORKERS = int(os.environ.get('GEOCODE_WORKERS', 8))  # concurrent maps calls during imports
+    GEOCODE_RATE_PER_SECOND = float(os.environ.get('GEOCODE_RATE_PER_SECOND', 40))  # import geocoding budget
+    GEOCODE_MAX_ATTEMPTS = 4  # per address, with exponential backoff
     
     # AI/ML Configuration
     MAX_MATCH_DISTANCE_KM = 50
@@ -65,6 +71,139 @@ class Config:
     JSON_SORT_KEYS = False
     RESTFUL_JSON = {'ensure_ascii': False}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request size
+    # Use orjson for JSON responses when installed (msgpack via Accept header)
+    USE_ORJSON = os.environ.get('USE_ORJSON', 'True').lower() == 'true'
+    
+    # Conditional GET / response caching
+    CONDITIONAL_GET_ENABLED = True
+    RESPONSE_CACHE_MAX_ENTRIES = 512
+    
+    # Nearby/map/smart-match response cache, invalidated per geohash cell
+    GEO_CACHE_ENABLED = True
+    GEO_CACHE_KEY_PRECISION = 6  # centres in one ~1.2 x 0.6 km cell share an entry
+    GEO_CACHE_RADIUS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)  # km; larger radii are not cached
+    GEO_CACHE_TAG_PRECISION = 5  # invalidation cells, ~4.9 x 4.9 km
+    GEO_CACHE_MAX_TAGS = 48
+    GEO_CACHE_MAX_ENTRIES = 2048
+    GEO_CACHE_TTL = 60  # seconds
+    # Optional shared store so change counters agree across gunicorn workers
+    REDIS_URL = os.environ.get('REDIS_URL')
+    REDIS_KEY_PREFIX = 'bas:'
+    
+    # Background jobs (one scheduler per worker process)
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'True').lower() == 'true'
+    
+    # Inventory ledger checkpoints
+    INVENTORY_SNAPSHOT_INTERVAL = 300  # seconds
+    INVENTORY_SNAPSHOT_SETTLE_SECONDS = 5  # rollups never fold events younger than this
+    INVENTORY_SNAPSHOT_GAP_SECONDS = 300  # snapshots wait this long for a missing event id to commit
+    INVENTORY_BULK_MAX_ITEMS = 5000  # banks per bulk request
+    INVENTORY_AGGREGATES_RECONCILE_INTERVAL = 3600  # seconds
+    INVENTORY_ROLLUP_INTERVAL = 900  # seconds
+    INVENTORY_ROLLUP_BACKFILL_DAYS = 90  # history rolled up on first run
+    INVENTORY_ROLLUP_HOURLY_RETENTION_DAYS = 30  # daily rollups are kept
+    
+    # Demand forecasting (Holt-Winters over daily consumption)
+    DEMAND_FORECAST_INTERVAL = 3600  # seconds
+    DEMAND_FORECAST_TTL = 3600  # seconds a cached forecast is served
+    DEMAND_FORECAST_HORIZON_DAYS = 7
+    DEMAND_FORECAST_HISTORY_DAYS = 56
+    DEMAND_FORECAST_ALPHA = 0.3  # level smoothing
+    DEMAND_FORECAST_BETA = 0.05  # trend smoothing
+    DEMAND_FORECAST_GAMMA = 0.2  # weekly season smoothing
+    DEMAND_FORECAST_PHI = 0.9  # trend damping
+    
+    # Shortage alerts (only banks whose stock changed are evaluated)
+    SHORTAGE_ALERT_INTERVAL = 60  # seconds
+    SHORTAGE_MIN_UNITS = {  # default minimum per blood type; per-bank overrides in inventory_thresholds
+        'O+': 10, 'O-': 5, 'A+': 10, 'A-': 3,
+        'B+': 8, 'B-': 2, 'AB+': 3, 'AB-': 1
+    }
+    SHORTAGE_DEPLETION_DAYS = 2  # alert when stock covers fewer days at the expected rate
+    SHORTAGE_ALERT_RADIUS_KM = 25  # hospitals notified around the bank
+    SHORTAGE_ALERT_MAX_HOSPITALS = 20
+    SHORTAGE_ALERT_COOLDOWN_HOURS = 12  # a reopened alert within this window does not notify again
+    SHORTAGE_EVAL_BATCH = 500  # banks per evaluation transaction
+    SHORTAGE_EVAL_MAX_BANKS = 20000  # dirty banks taken per run
+    
+    # Background jobs (thread pool per worker, process pool for CPU-bound stages)
+    BACKGROUND_JOB_WORKERS = int(os.environ.get('BACKGROUND_JOB_WORKERS', 4))
+    BACKGROUND_JOB_PROCESSES = int(os.environ.get('BACKGROUND_JOB_PROCESSES', 0))  # 0: one per core
+    BACKGROUND_JOB_HISTORY = 500  # finished jobs kept for status polls
+    BACKGROUND_JOB_STATUS_TTL = 3600  # seconds (shared store)
+    
+    # In-memory queue of open blood requests (urgent feed, matching dispatch order)
+    REQUEST_QUEUE_SYNC_SECONDS = 5  # catch up with other workers at most this often (without Redis)
+    REQUEST_QUEUE_RESYNC_INTERVAL = 600  # seconds between full reloads
+    
+    # Overdue open blood requests are moved to Expired by a periodic sweep
+    REQUEST_EXPIRY_INTERVAL = 60  # seconds
+    REQUEST_EXPIRY_BATCH = 500  # requests per UPDATE/commit
+    REQUEST_EXPIRY_MAX_PER_RUN = 50000
+    
+    # Donor matching on blood request creation
+    MATCHING_ON_CREATE = True
+    MATCHING_TOP_N = 20
+    MATCHING_MAX_DISTANCE_KM = 50
+    MATCHING_PARALLEL_MIN_CANDIDATES = 2000  # below this, score in the job thread
+    MATCHING_CHUNK_SIZE = 1000  # candidates per process pool task
+    
+    # Notification fan-out (one template to many recipients, background job)
+    NOTIFICATION_FANOUT_CHUNK_SIZE = 1000  # rows per INSERT and commit
+    NOTIFICATION_FANOUT_MAX_RADIUS_KM = 200
+    NOTIFICATION_COUNTERS_RECONCILE_INTERVAL = 3600  # seconds between unread counter repairs
+
+    # Web seeding (/api/seed-database, background job)
+    SEED_MAX_ROWS = 200000  # per table
+    SEED_LOCK_TTL = 600  # seconds a seeding lock outlives its holder's last progress report
+    
+    # Notification retention (archived rows move to notification_archives, compressed)
+    NOTIFICATION_RETENTION_DAYS = 30  # read notifications older than this are archived
+    NOTIFICATION_MAX_AGE_DAYS = 180  # every notification older than this is archived, read or not
+    NOTIFICATION_RETENTION_INTERVAL = 3600  # seconds
+    NOTIFICATION_RETENTION_BATCH = 5000  # rows per archive transaction
+    NOTIFICATION_RETENTION_MAX_PER_RUN = 200000
+    NOTIFICATION_PARTITION_MONTHS_AHEAD = 2  # PostgreSQL monthly partitions created in advance
+    
+    # Notification stream (Server-Sent Events; needs threaded or async workers)
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS = 15  # keep-alive comment interval
+    NOTIFICATION_STREAM_MAX_SECONDS = 300  # the client reconnects after this
+    NOTIFICATION_STREAM_QUEUE_SIZE = 100  # undelivered events kept per stream
+    NOTIFICATION_STREAM_MAX_CLIENTS = 8  # open streams per worker (each holds one of its 16 threads)
+    NOTIFICATION_STREAM_RETRY_AFTER = 30  # seconds a client refused at the cap waits
+    NOTIFICATION_STREAM_REPLAY_LIMIT = 100  # missed notifications resent on reconnect (Last-Event-ID)
+    
+    # Request instrumentation (/api/metrics, Server-Timing header)
+    INSTRUMENTATION_ENABLED = True
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds
+    
+    # Slow-query log and N+1 detector (/api/queries/report)
+    QUERY_INSPECTOR_ENABLED = True
+    QUERY_N_PLUS_ONE_THRESHOLD = 10  # executions of one statement fingerprint per request
+    QUERY_STRICT_MODE = os.environ.get('QUERY_STRICT_MODE', 'false').lower() == 'true'  # raise on N+1
+    QUERY_SLOW_MS = 250
+    QUERY_EXPLAIN_SLOW = True
+    QUERY_EXPLAIN_INTERVAL = 600  # seconds between plans of one fingerprint
+    QUERY_SLOW_LOG = 'slow_queries.log'  # JSON lines in the instance folder; None disables
+    
+    # Sampling profiler (/api/profile needs the X-Profiler-Token header; unset token disables it)
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+    PROFILER_INTERVAL_MS = 5
+    PROFILER_MAX_SECONDS = 60
+    PROFILER_CONTINUOUS = os.environ.get('PROFILER_CONTINUOUS', 'false').lower() == 'true'  # writes instance/profiles/
+    PROFILER_CONTINUOUS_INTERVAL_MS = 100
+    PROFILER_CONTINUOUS_WINDOW = 300  # seconds per profile file
+    PROFILER_CONTINUOUS_RETENTION_HOURS = 24
+    
+    # Response compression (brotli used when the package is installed)
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BR_QUALITY = 5
+    # Cached responses are compressed once, so spend more CPU on them
+    COMPRESSION_GZIP_CACHED_LEVEL = 9
+    COMPRESSION_BR_CACHED_QUALITY = 9
     
     # CORS Configuration
     CORS_ORIGINS = ['http://localhost:*', 'http://127.0.0.1:*']
@@ -87,10 +226,21 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SCHEDULER_ENABLED = False
+    QUERY_STRICT_MODE = True
+
+class BenchmarkConfig(ProductionConfig):
+    """Benchmark configuration (python -m benchmarks.run)"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URL') or \
+        f'sqlite:///{os.path.join(os.path.abspath(os.path.dirname(__file__)), "benchmarks", "data", "benchmark.db")}'
+    SCHEDULER_ENABLED = False
+    GEO_CACHE_ENABLED = False  # measure the handlers, not the cache
+    QUERY_SLOW_LOG = None
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
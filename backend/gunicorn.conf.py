@@ -0,0 +1,27 @@
+"""
+Gunicorn settings (Procfile and render.yaml start gunicorn with this file)
+
+One worker process with 16 threads by default. Notification streams hold a
+thread each, and without REDIS_URL some state is per process:
+- the change counters behind ETags and the response/geo caches;
+- notification pub/sub;
+- job statuses.
+A second worker would then answer 304s and cached bodies that miss writes
+made in the first. Raise GUNICORN_WORKERS only together with REDIS_URL;
+the server refuses to start otherwise.
+"""
+import os
+import sys
+
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+
+def on_starting(server):
+    if server.cfg.workers > 1 and not os.environ.get('REDIS_URL'):
+        server.log.error(
+            f'{server.cfg.workers} workers without REDIS_URL: change counters, caches and notification '
+            'streams would be per worker and serve stale data. Set REDIS_URL or run one worker.'
+        )
+        sys.exit(1)
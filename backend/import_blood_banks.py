@@ -9,161 +9,81 @@ Usage:
   python import_blood_banks.py --url "https://example.com/blood_banks.csv"
 
 Options:
-  --dry-run    Parse and show summary but don't insert into DB
-
-The script attempts to map common CSV column names to the `BloodBank` model fields.
+  --dry-run       Parse and validate, write the rejects report, don't touch the DB
+  --batch-size    Rows per upsert/commit (default 2000)
+  --rejects       Rejected rows report (default: <file>.rejects.csv)
+  --no-geocode    Reject rows without coordinates instead of geocoding them
+
+The file is streamed in batches (services.blood_bank_import): common CSV
+column names are mapped to the `BloodBank` model fields, rows are upserted
+by license number (or matched by name + pincode when they have none), and
+each batch is committed on its own, so a re-run updates instead of
+duplicating and a bad row only lands in the rejects report.
+
+Rows without coordinates are geocoded (services.geocoding): cached
+addresses and known pincodes first, then the Google Maps geocoder on a
+small rate-limited pool. To import against the local maps stub:
+  python -m benchmarks.maps_stub --port 8090 &
+  GOOGLE_MAPS_API_KEY=AIzaStub GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8090 \\
+    python import_blood_banks.py --file banks.csv
+A dry run only uses the cache and the pincode gazetteer.
 """
 import argparse
-import csv
+import os
 import sys
 import tempfile
 import requests
-from decimal import Decimal
-
-from app import create_app, db
-from models.blood_bank import BloodBank
-
-
-COMMON_LAT_KEYS = ('latitude', 'lat', 'lattitude', 'geo_lat')
-COMMON_LON_KEYS = ('longitude', 'lon', 'lng', 'long', 'geo_lon')
-COMMON_NAME_KEYS = ('name', 'blood_bank_name', 'hospital_name')
-COMMON_PHONE_KEYS = ('phone', 'phone_number', 'contact')
-COMMON_EMAIL_KEYS = ('email', 'email_id', 'contact_email')
-COMMON_CITY_KEYS = ('city', 'town')
-COMMON_STATE_KEYS = ('state', 'region')
-COMMON_STREET_KEYS = ('street', 'address', 'address_line')
-COMMON_PIN_KEYS = ('pincode', 'pin', 'zipcode', 'postalcode')
-
 
-def find_key(row_keys, candidates):
-    for c in candidates:
-        if c in row_keys:
-            return c
-    # try fuzzy: any key that contains candidate substring
-    for c in candidates:
-        for k in row_keys:
-            if c in k:
-                return k
-    return None
+from flask import current_app
 
+from app import create_app, db
+from services.blood_bank_import import DEFAULT_BATCH_SIZE, import_csv
+from services.geocoding import BatchGeocoder
 
-def parse_int(value):
-    try:
-        return int(float(value))
-    except Exception:
-        return 0
 
+def print_progress(stats):
+    print(f"\r  {stats.rows:>10,} rows  {stats.rows_per_second:>9,.0f} rows/s  "
+          f"inserted {stats.inserted:,}  updated {stats.updated:,}  rejected {stats.rejected:,}",
+          end='', flush=True)
 
-def parse_decimal(value):
-    try:
-        return Decimal(str(value))
-    except Exception:
-        return None
 
-
-def import_from_csv(path_or_fileobj, dry_run=False):
+def import_from_csv(path_or_fileobj, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, rejects_path=None, geocode=True):
     if hasattr(path_or_fileobj, 'read'):
         fh = path_or_fileobj
     else:
-        fh = open(path_or_fileobj, 'r', encoding='utf-8')
-
-    reader = csv.DictReader(fh)
-    keys = [k.strip().lower() for k in reader.fieldnames]
-
-    # column discovery
-    name_k = find_key(keys, COMMON_NAME_KEYS)
-    lat_k = find_key(keys, COMMON_LAT_KEYS)
-    lon_k = find_key(keys, COMMON_LON_KEYS)
-    phone_k = find_key(keys, COMMON_PHONE_KEYS)
-    email_k = find_key(keys, COMMON_EMAIL_KEYS)
-    city_k = find_key(keys, COMMON_CITY_KEYS)
-    state_k = find_key(keys, COMMON_STATE_KEYS)
-    street_k = find_key(keys, COMMON_STREET_KEYS)
-    pin_k = find_key(keys, COMMON_PIN_KEYS)
-
-    inventory_map = {
-        'inventory_a_positive': ('a_pos', 'a_positive', 'a+', 'a_positive_inventory'),
-        'inventory_a_negative': ('a_neg', 'a_negative', 'a-'),
-        'inventory_b_positive': ('b_pos', 'b_positive', 'b+'),
-        'inventory_b_negative': ('b_neg', 'b_negative', 'b-'),
-        'inventory_ab_positive': ('ab_pos', 'ab_positive', 'ab+'),
-        'inventory_ab_negative': ('ab_neg', 'ab_negative', 'ab-'),
-        'inventory_o_positive': ('o_pos', 'o_positive', 'o+'),
-        'inventory_o_negative': ('o_neg', 'o_negative', 'o-')
-    }
-
-    # map discovered inventory keys
-    inv_keys = {}
-    for model_field, candidates in inventory_map.items():
-        found = find_key(keys, candidates)
-        inv_keys[model_field] = found
-
-    created = 0
-    skipped = 0
+        fh = open(path_or_fileobj, 'r', encoding='utf-8-sig', newline='')
+        rejects_path = rejects_path or f'{os.path.splitext(path_or_fileobj)[0]}.rejects.csv'
 
     app = create_app()
-    with app.app_context():
-        for row in reader:
-            # normalize row keys to lowercase
-            row_l = {k.strip().lower(): (v.strip() if v is not None else '') for k, v in row.items()}
-
-            name = row_l.get(name_k, '') if name_k else (row_l.get('name') or '')
-            phone = row_l.get(phone_k, '') if phone_k else ''
-            email = row_l.get(email_k, '') if email_k else ''
-            city = row_l.get(city_k, '') if city_k else ''
-            state = row_l.get(state_k, '') if state_k else ''
-            street = row_l.get(street_k, '') if street_k else ''
-            pincode = row_l.get(pin_k, '') if pin_k else ''
-
-            lat = parse_decimal(row_l.get(lat_k, '')) if lat_k else None
-            lon = parse_decimal(row_l.get(lon_k, '')) if lon_k else None
-
-            if not name:
-                skipped += 1
-                continue
-
-            bb = BloodBank(
-                name=name,
-                phone=phone or 'N/A',
-                email=email or None,
-                city=city or None,
-                state=state or None,
-                street=street or None,
-                pincode=pincode or None,
-                country='India'
-            )
-
-            if lat is not None:
-                try:
-                    bb.latitude = float(lat)
-                except Exception:
-                    bb.latitude = None
-            if lon is not None:
-                try:
-                    bb.longitude = float(lon)
-                except Exception:
-                    bb.longitude = None
-
-            # inventory
-            for model_field, csv_key in inv_keys.items():
-                if csv_key:
-                    setattr(bb, model_field, parse_int(row_l.get(csv_key, 0)))
-
-            if dry_run:
-                print('DRY:', bb.to_dict())
-            else:
-                db.session.add(bb)
-                created += 1
-
-        if not dry_run:
-            db.session.commit()
-
-    if not hasattr(path_or_fileobj, 'read'):
-        fh.close()
-
-    print('\nImport complete:')
-    print(f'  created: {created}')
-    print(f'  skipped (missing name): {skipped}')
+    try:
+        with app.app_context():
+            geocoder = None
+            if geocode:
+                geocoder = (BatchGeocoder(db.session) if dry_run
+                            else BatchGeocoder.from_config(db.session, current_app.config))
+            try:
+                stats = import_csv(db.session, fh, batch_size=batch_size, dry_run=dry_run,
+                                   rejects_path=rejects_path, progress=print_progress, geocoder=geocoder)
+            finally:
+                if geocoder is not None:
+                    geocoder.close()
+    finally:
+        if not hasattr(path_or_fileobj, 'read'):
+            fh.close()
+
+    print('\n\nImport complete:' if not dry_run else '\n\nDry run complete (nothing written):')
+    print(f'  rows read: {stats.rows}')
+    print(f'  {"created" if not dry_run else "valid"}: {stats.inserted}')
+    print(f'  updated: {stats.updated}')
+    print(f'  duplicates in file (last row wins): {stats.duplicates}')
+    if geocoder is not None:
+        g = geocoder.stats
+        print(f'  geocoded: {stats.geocoded} rows from {g.addresses} addresses '
+              f'(cache {g.cache_hits}, pincode {g.gazetteer_hits}, maps {g.geocoded}, '
+              f'not found {g.not_found}, failed {g.failed}; {g.calls} calls, {g.retries} retries)')
+    print(f'  rejected: {stats.rejected}' + (f' (see {rejects_path})' if stats.rejected and rejects_path else ''))
+    print(f'  {stats.seconds:.1f}s, {stats.rows_per_second:,.0f} rows/s')
+    return stats
 
 
 def download_to_temp(url):
@@ -185,16 +105,17 @@ def main():
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('--file', help='Local CSV file path')
     group.add_argument('--url', help='Remote CSV URL to download')
-    parser.add_argument('--dry-run', action='store_true', help='Parse and show without inserting')
+    parser.add_argument('--dry-run', action='store_true', help='Parse and validate without inserting')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per upsert and commit')
+    parser.add_argument('--rejects', help='Rejected rows report (default: <file>.rejects.csv)')
+    parser.add_argument('--no-geocode', action='store_true', help='Reject rows without coordinates')
 
     args = parser.parse_args()
 
     try:
-        if args.url:
-            path = download_to_temp(args.url)
-            import_from_csv(path, dry_run=args.dry_run)
-        else:
-            import_from_csv(args.file, dry_run=args.dry_run)
+        path = download_to_temp(args.url) if args.url else args.file
+        import_from_csv(path, dry_run=args.dry_run, batch_size=args.batch_size, rejects_path=args.rejects,
+                        geocode=not args.no_geocode)
     except Exception as e:
         print('Error during import:', e)
         sys.exit(1)
@@ -0,0 +1,36 @@
+"""Geocode cache for import geocoding
+
+Revision ID: 9c4f2e7a1d36
+Revises: f3a8d1c6b592
+Create Date: 2026-10-19 22:04:51.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4f2e7a1d36'
+down_revision = 'f3a8d1c6b592'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('geocode_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('address_key', sa.String(length=40), nullable=False),
+    sa.Column('address', sa.String(length=300), nullable=False),
+    sa.Column('status', sa.Enum('ok', 'not_found'), nullable=False),
+    sa.Column('latitude', mysql.DECIMAL(precision=10, scale=8), nullable=True),
+    sa.Column('longitude', mysql.DECIMAL(precision=11, scale=8), nullable=True),
+    sa.Column('formatted_address', sa.String(length=300), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('address_key')
+    )
+
+
+def downgrade():
+    op.drop_table('geocode_cache')
@@ -0,0 +1,24 @@
+"""Unique donor per blood request match
+
+Revision ID: a3d6e8f14b52
+Revises: f5c81d3e9a24
+Create Date: 2026-10-19 17:41:36.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d6e8f14b52'
+down_revision = 'f5c81d3e9a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('uq_blood_request_matches_request_donor', 'blood_request_matches', ['blood_request_id', 'donor_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_blood_request_matches_request_donor', table_name='blood_request_matches')
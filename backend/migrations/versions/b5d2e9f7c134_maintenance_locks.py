@@ -0,0 +1,31 @@
+"""Maintenance locks (one seeding or clearing run across workers)
+
+Revision ID: b5d2e9f7c134
+Revises: 9c4f2e7a1d36
+Create Date: 2026-10-20 09:12:44.581203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2e9f7c134'
+down_revision = '9c4f2e7a1d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('maintenance_locks',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('holder', sa.String(length=32), nullable=False),
+    sa.Column('job_id', sa.String(length=32), nullable=True),
+    sa.Column('acquired_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('maintenance_locks')
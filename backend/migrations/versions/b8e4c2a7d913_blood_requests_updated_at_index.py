@@ -0,0 +1,24 @@
+"""Index blood_requests.updated_at
+
+Revision ID: b8e4c2a7d913
+Revises: a3d6e8f14b52
+Create Date: 2026-10-19 18:02:27.731580
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4c2a7d913'
+down_revision = 'a3d6e8f14b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_blood_requests_updated_at', 'blood_requests', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_blood_requests_updated_at', table_name='blood_requests')
@@ -0,0 +1,69 @@
+"""Inventory ledger and snapshots
+
+Revision ID: c4e2a7d91b3f
+Revises: b1f9a8196f28
+Create Date: 2026-10-19 10:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e2a7d91b3f'
+down_revision = 'b1f9a8196f28'
+branch_labels = None
+depends_on = None
+
+BLOOD_TYPES = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+INVENTORY_COLUMNS = {
+    'A+': 'inventory_a_positive',
+    'A-': 'inventory_a_negative',
+    'B+': 'inventory_b_positive',
+    'B-': 'inventory_b_negative',
+    'AB+': 'inventory_ab_positive',
+    'AB-': 'inventory_ab_negative',
+    'O+': 'inventory_o_positive',
+    'O-': 'inventory_o_negative'
+}
+
+
+def upgrade():
+    op.create_table('inventory_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('blood_bank_id', sa.Integer(), nullable=False),
+    sa.Column('blood_type', sa.Enum(*BLOOD_TYPES), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.Enum('Opening', 'Received', 'Issued', 'Adjusted', 'Expired', 'Discarded', 'Transfer'), nullable=False),
+    sa.Column('terminal_id', sa.String(length=64), nullable=True),
+    sa.Column('reference', sa.String(length=64), nullable=True),
+    sa.Column('note', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['blood_bank_id'], ['blood_banks.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('blood_bank_id', 'reference', name='uq_inventory_events_reference')
+    )
+    op.create_index('ix_inventory_events_bank_id', 'inventory_events', ['blood_bank_id', 'id'], unique=False)
+    op.create_table('inventory_snapshots',
+    sa.Column('blood_bank_id', sa.Integer(), nullable=False),
+    sa.Column('blood_type', sa.Enum(*BLOOD_TYPES), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('last_event_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['blood_bank_id'], ['blood_banks.id'], ),
+    sa.PrimaryKeyConstraint('blood_bank_id', 'blood_type')
+    )
+
+    # Existing stock becomes the opening balance of each bank
+    for blood_type, column in INVENTORY_COLUMNS.items():
+        op.execute(
+            "INSERT INTO inventory_events (blood_bank_id, blood_type, delta, reason, note, created_at) "
+            f"SELECT id, '{blood_type}', {column}, 'Opening', 'Stock before the ledger', CURRENT_TIMESTAMP "
+            f"FROM blood_banks WHERE {column} IS NOT NULL AND {column} <> 0"
+        )
+
+
+def downgrade():
+    op.drop_table('inventory_snapshots')
+    op.drop_index('ix_inventory_events_bank_id', table_name='inventory_events')
+    op.drop_table('inventory_events')
@@ -0,0 +1,24 @@
+"""Index blood_requests (status, required_by) for the expiry sweep
+
+Revision ID: c9f1d4b6e027
+Revises: b8e4c2a7d913
+Create Date: 2026-10-19 18:41:09.214736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f1d4b6e027'
+down_revision = 'b8e4c2a7d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_blood_requests_status_required_by', 'blood_requests', ['status', 'required_by'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_blood_requests_status_required_by', table_name='blood_requests')
@@ -0,0 +1,40 @@
+"""Per-recipient unread notification counters
+
+Revision ID: d2a7c5e81f49
+Revises: c9f1d4b6e027
+Create Date: 2026-10-19 19:12:44.508193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c5e81f49'
+down_revision = 'c9f1d4b6e027'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_unread_counts',
+    sa.Column('recipient_type', sa.Enum('Donor', 'Hospital', 'User'), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('unread', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('recipient_type', 'recipient_id')
+    )
+    # Existing unread notifications (Core, so the reserved word "read" is quoted per dialect)
+    notifications = sa.table('notifications', sa.column('recipient_type'), sa.column('recipient_id'), sa.column('read', sa.Boolean))
+    counts = sa.table('notification_unread_counts', sa.column('recipient_type'), sa.column('recipient_id'),
+                      sa.column('unread'), sa.column('updated_at'))
+    op.execute(counts.insert().from_select(
+        ['recipient_type', 'recipient_id', 'unread', 'updated_at'],
+        sa.select(notifications.c.recipient_type, notifications.c.recipient_id, sa.func.count(), sa.func.current_timestamp())
+        .where(notifications.c.read == sa.false())
+        .group_by(notifications.c.recipient_type, notifications.c.recipient_id)
+    ))
+
+
+def downgrade():
+    op.drop_table('notification_unread_counts')
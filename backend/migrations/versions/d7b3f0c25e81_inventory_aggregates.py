@@ -0,0 +1,59 @@
+"""Inventory aggregates
+
+Revision ID: d7b3f0c25e81
+Revises: c4e2a7d91b3f
+Create Date: 2026-10-19 14:37:02.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7b3f0c25e81'
+down_revision = 'c4e2a7d91b3f'
+branch_labels = None
+depends_on = None
+
+INVENTORY_COLUMNS = {
+    'A+': 'inventory_a_positive',
+    'A-': 'inventory_a_negative',
+    'B+': 'inventory_b_positive',
+    'B-': 'inventory_b_negative',
+    'AB+': 'inventory_ab_positive',
+    'AB-': 'inventory_ab_negative',
+    'O+': 'inventory_o_positive',
+    'O-': 'inventory_o_negative'
+}
+
+
+def upgrade():
+    op.create_table('inventory_aggregates',
+    sa.Column('scope', sa.Enum('global', 'state', 'city'), nullable=False),
+    sa.Column('region_key', sa.String(length=100), nullable=False),
+    sa.Column('blood_type', sa.Enum('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'), nullable=False),
+    sa.Column('region_name', sa.String(length=100), nullable=True),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('banks_with_stock', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('scope', 'region_key', 'blood_type')
+    )
+
+    # Seed the totals from the current stock
+    for blood_type, column in INVENTORY_COLUMNS.items():
+        units = f"SUM(COALESCE({column}, 0))"
+        stocked = f"SUM(CASE WHEN {column} > 0 THEN 1 ELSE 0 END)"
+        op.execute(
+            "INSERT INTO inventory_aggregates (scope, region_key, blood_type, region_name, units, banks_with_stock, updated_at) "
+            f"SELECT 'global', '', '{blood_type}', NULL, {units}, {stocked}, CURRENT_TIMESTAMP FROM blood_banks HAVING COUNT(*) > 0"
+        )
+        for scope in ('city', 'state'):
+            op.execute(
+                "INSERT INTO inventory_aggregates (scope, region_key, blood_type, region_name, units, banks_with_stock, updated_at) "
+                f"SELECT '{scope}', LOWER(TRIM({scope})), '{blood_type}', MIN(TRIM({scope})), {units}, {stocked}, CURRENT_TIMESTAMP "
+                f"FROM blood_banks WHERE {scope} IS NOT NULL AND TRIM({scope}) <> '' GROUP BY LOWER(TRIM({scope}))"
+            )
+
+
+def downgrade():
+    op.drop_table('inventory_aggregates')
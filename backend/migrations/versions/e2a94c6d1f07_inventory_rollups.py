@@ -0,0 +1,42 @@
+"""Inventory rollups
+
+Revision ID: e2a94c6d1f07
+Revises: d7b3f0c25e81
+Create Date: 2026-10-19 16:05:48.204113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a94c6d1f07'
+down_revision = 'd7b3f0c25e81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_rollups',
+    sa.Column('blood_bank_id', sa.Integer(), nullable=False),
+    sa.Column('blood_type', sa.Enum('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'), nullable=False),
+    sa.Column('resolution', sa.Enum('hour', 'day'), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('closing_units', sa.Integer(), nullable=False),
+    sa.Column('min_units', sa.Integer(), nullable=False),
+    sa.Column('max_units', sa.Integer(), nullable=False),
+    sa.Column('received', sa.Integer(), nullable=False),
+    sa.Column('consumed', sa.Integer(), nullable=False),
+    sa.Column('wasted', sa.Integer(), nullable=False),
+    sa.Column('events', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['blood_bank_id'], ['blood_banks.id'], ),
+    sa.PrimaryKeyConstraint('blood_bank_id', 'blood_type', 'resolution', 'bucket_start')
+    )
+    op.create_index('ix_inventory_rollups_resolution_bucket', 'inventory_rollups', ['resolution', 'bucket_start'], unique=False)
+    op.create_index('ix_inventory_events_created_at', 'inventory_events', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_inventory_events_created_at', table_name='inventory_events')
+    op.drop_index('ix_inventory_rollups_resolution_bucket', table_name='inventory_rollups')
+    op.drop_table('inventory_rollups')
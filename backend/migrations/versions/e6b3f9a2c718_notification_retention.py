@@ -0,0 +1,41 @@
+"""Notification archives and recipient/created_at indexes
+
+Revision ID: e6b3f9a2c718
+Revises: d2a7c5e81f49
+Create Date: 2026-10-19 19:48:31.662904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3f9a2c718'
+down_revision = 'd2a7c5e81f49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient_type', sa.Enum('Donor', 'Hospital', 'User'), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(length=16777216), nullable=False),
+    sa.Column('first_created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_archives_recipient_month', 'notification_archives', ['recipient_type', 'recipient_id', 'month'], unique=False)
+    op.create_index('ix_notifications_recipient_created', 'notifications', ['recipient_id', 'created_at'], unique=False)
+    op.create_index('ix_notifications_created_at', 'notifications', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_created_at', table_name='notifications')
+    op.drop_index('ix_notifications_recipient_created', table_name='notifications')
+    op.drop_index('ix_notification_archives_recipient_month', table_name='notification_archives')
+    op.drop_table('notification_archives')
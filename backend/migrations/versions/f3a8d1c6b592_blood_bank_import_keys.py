@@ -0,0 +1,44 @@
+"""Unique blood bank license number, name+pincode lookup index (bulk import keys)
+
+Revision ID: f3a8d1c6b592
+Revises: e6b3f9a2c718
+Create Date: 2026-10-19 21:12:07.418530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d1c6b592'
+down_revision = 'e6b3f9a2c718'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A blank license number means "none"; blanks must not collide with each other
+    op.execute("UPDATE blood_banks SET license_number = NULL WHERE TRIM(license_number) = ''")
+
+    # Duplicates are real data problems: list them and stop rather than guess which row is right
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT license_number, id, name, city, pincode FROM blood_banks WHERE license_number IN ("
+        "SELECT license_number FROM blood_banks WHERE license_number IS NOT NULL "
+        "GROUP BY license_number HAVING COUNT(*) > 1) "
+        "ORDER BY license_number, id"
+    )).fetchall()
+    if duplicates:
+        rows = '\n'.join(f'  {row.license_number}: blood bank {row.id} ({row.name}, {row.city}, {row.pincode})'
+                         for row in duplicates)
+        raise RuntimeError(
+            f'{len(duplicates)} blood banks share a license number. Correct the numbers (or merge the '
+            f'banks) and run the upgrade again:\n{rows}'
+        )
+
+    op.create_index('uq_blood_banks_license_number', 'blood_banks', ['license_number'], unique=True)
+    op.create_index('ix_blood_banks_pincode_name', 'blood_banks', ['pincode', 'name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_blood_banks_pincode_name', table_name='blood_banks')
+    op.drop_index('uq_blood_banks_license_number', table_name='blood_banks')
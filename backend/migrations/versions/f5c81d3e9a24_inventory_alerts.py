@@ -0,0 +1,47 @@
+"""Inventory thresholds and shortage alerts
+
+Revision ID: f5c81d3e9a24
+Revises: e2a94c6d1f07
+Create Date: 2026-10-19 17:20:11.418307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c81d3e9a24'
+down_revision = 'e2a94c6d1f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_thresholds',
+    sa.Column('blood_bank_id', sa.Integer(), nullable=False),
+    sa.Column('blood_type', sa.Enum('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'), nullable=False),
+    sa.Column('min_units', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['blood_bank_id'], ['blood_banks.id'], ),
+    sa.PrimaryKeyConstraint('blood_bank_id', 'blood_type')
+    )
+    op.create_table('inventory_alerts',
+    sa.Column('blood_bank_id', sa.Integer(), nullable=False),
+    sa.Column('blood_type', sa.Enum('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'), nullable=False),
+    sa.Column('level', sa.Enum('Depleting', 'Low', 'Out'), nullable=True),
+    sa.Column('notified_level', sa.Enum('Depleting', 'Low', 'Out'), nullable=True),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('min_units', sa.Integer(), nullable=False),
+    sa.Column('days_of_cover', sa.Float(), nullable=True),
+    sa.Column('notifications', sa.Integer(), nullable=False),
+    sa.Column('raised_at', sa.DateTime(), nullable=False),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['blood_bank_id'], ['blood_banks.id'], ),
+    sa.PrimaryKeyConstraint('blood_bank_id', 'blood_type')
+    )
+
+
+def downgrade():
+    op.drop_table('inventory_alerts')
+    op.drop_table('inventory_thresholds')
@@ -2,6 +2,9 @@
 from models.donor import Donor
 from models.hospital import Hospital
 from models.blood_bank import BloodBank
-from models.blood_request import BloodRequest, BloodRequestMatch, Notification
+from models.blood_request import BloodRequest, BloodRequestMatch, Notification, NotificationUnreadCount, NotificationArchive
+from models.inventory import InventoryEvent, InventorySnapshot, InventoryAggregate, InventoryRollup, InventoryThreshold, InventoryAlert
+from models.geocode import GeocodeCache
+from models.maintenance import MaintenanceLock
 
-__all__ = ['Donor', 'Hospital', 'BloodBank', 'BloodRequest', 'BloodRequestMatch', 'Notification']
+__all__ = ['Donor', 'Hospital', 'BloodBank', 'BloodRequest', 'BloodRequestMatch', 'Notification', 'NotificationUnreadCount', 'NotificationArchive', 'InventoryEvent', 'InventorySnapshot', 'InventoryAggregate', 'InventoryRollup', 'InventoryThreshold', 'InventoryAlert', 'GeocodeCache', 'MaintenanceLock']
@@ -1,10 +1,30 @@
 from extensions import db
 from datetime import datetime
 from sqlalchemy.dialects.mysql import DECIMAL
+from operator import attrgetter
+from models.serializer import SerializerMixin, to_float, to_iso
 
-class BloodBank(db.Model):
+# Blood type -> inventory column
+INVENTORY_COLUMNS = {
+    'A+': 'inventory_a_positive',
+    'A-': 'inventory_a_negative',
+    'B+': 'inventory_b_positive',
+    'B-': 'inventory_b_negative',
+    'AB+': 'inventory_ab_positive',
+    'AB-': 'inventory_ab_negative',
+    'O+': 'inventory_o_positive',
+    'O-': 'inventory_o_negative'
+}
+
+class BloodBank(SerializerMixin, db.Model):
     __tablename__ = 'blood_banks'
-    
+    __table_args__ = (
+        # Bulk imports upsert on the license number; rows without one are looked up by
+        # name + pincode, which is not unique (distinct banks can share a name)
+        db.Index('uq_blood_banks_license_number', 'license_number', unique=True),
+        db.Index('ix_blood_banks_pincode_name', 'pincode', 'name'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     
@@ -62,44 +82,43 @@ class BloodBank(db.Model):
             'O-': self.inventory_o_negative
         }
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'location': {
-                'latitude': float(self.latitude) if self.latitude else None,
-                'longitude': float(self.longitude) if self.longitude else None
-            },
-            'latitude': float(self.latitude) if self.latitude else None,
-            'longitude': float(self.longitude) if self.longitude else None,
-            'address': {
-                'street': self.street,
-                'city': self.city,
-                'state': self.state,
-                'pincode': self.pincode,
-                'country': self.country
-            },
-            'city': self.city,
-            'state': self.state,
-            'phone': self.phone,
-            'email': self.email,
-            'hospitalId': self.hospital_id,
-            'bloodInventory': self.get_inventory(),
-            # Add direct blood group keys for frontend compatibility
-            'a_positive': self.inventory_a_positive,
-            'a_negative': self.inventory_a_negative,
-            'b_positive': self.inventory_b_positive,
-            'b_negative': self.inventory_b_negative,
-            'ab_positive': self.inventory_ab_positive,
-            'ab_negative': self.inventory_ab_negative,
-            'o_positive': self.inventory_o_positive,
-            'o_negative': self.inventory_o_negative,
-            'is_24x7': True,  # Default for now
-            'operatingHours': {
-                'weekdays': self.operating_hours_weekdays,
-                'weekends': self.operating_hours_weekends
-            },
-            'licenseNumber': self.license_number,
-            'verified': self.verified,
-            'lastInventoryUpdate': self.last_inventory_update.isoformat() if self.last_inventory_update else None
-        }
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'name': attrgetter('name'),
+        'location': {
+            'latitude': lambda b: to_float(b.latitude),
+            'longitude': lambda b: to_float(b.longitude)
+        },
+        'latitude': lambda b: to_float(b.latitude),
+        'longitude': lambda b: to_float(b.longitude),
+        'address': {
+            'street': attrgetter('street'),
+            'city': attrgetter('city'),
+            'state': attrgetter('state'),
+            'pincode': attrgetter('pincode'),
+            'country': attrgetter('country')
+        },
+        'city': attrgetter('city'),
+        'state': attrgetter('state'),
+        'phone': attrgetter('phone'),
+        'email': attrgetter('email'),
+        'hospitalId': attrgetter('hospital_id'),
+        'bloodInventory': lambda b: b.get_inventory(),
+        # Add direct blood group keys for frontend compatibility
+        'a_positive': attrgetter('inventory_a_positive'),
+        'a_negative': attrgetter('inventory_a_negative'),
+        'b_positive': attrgetter('inventory_b_positive'),
+        'b_negative': attrgetter('inventory_b_negative'),
+        'ab_positive': attrgetter('inventory_ab_positive'),
+        'ab_negative': attrgetter('inventory_ab_negative'),
+        'o_positive': attrgetter('inventory_o_positive'),
+        'o_negative': attrgetter('inventory_o_negative'),
+        'is_24x7': lambda b: True,  # Default for now
+        'operatingHours': {
+            'weekdays': attrgetter('operating_hours_weekdays'),
+            'weekends': attrgetter('operating_hours_weekends')
+        },
+        'licenseNumber': attrgetter('license_number'),
+        'verified': attrgetter('verified'),
+        'lastInventoryUpdate': lambda b: to_iso(b.last_inventory_update)
+    }
@@ -1,9 +1,17 @@
 from extensions import db
 from datetime import datetime
 from sqlalchemy.dialects.mysql import DECIMAL
+from operator import attrgetter
+from models.serializer import SerializerMixin, to_float, to_iso
 
-class BloodRequest(db.Model):
+class BloodRequest(SerializerMixin, db.Model):
     __tablename__ = 'blood_requests'
+    __table_args__ = (
+        # Request queue catch-up reads rows changed since its last sync
+        db.Index('ix_blood_requests_updated_at', 'updated_at'),
+        # Expiry sweep: open requests past their deadline
+        db.Index('ix_blood_requests_status_required_by', 'status', 'required_by'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_name = db.Column(db.String(100), nullable=False)
@@ -39,35 +47,38 @@ class BloodRequest(db.Model):
     hospital = db.relationship('Hospital', back_populates='blood_requests')
     matched_donors = db.relationship('BloodRequestMatch', back_populates='blood_request', lazy='dynamic')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'patientName': self.patient_name,
-            'bloodType': self.blood_type,
-            'unitsRequired': self.units_required,
-            'urgency': self.urgency,
-            'hospitalId': self.hospital_id,
-            'requesterContact': {
-                'name': self.requester_name,
-                'phone': self.requester_phone,
-                'email': self.requester_email,
-                'relation': self.requester_relation
-            },
-            'location': {
-                'latitude': float(self.latitude) if self.latitude else None,
-                'longitude': float(self.longitude) if self.longitude else None
-            },
-            'reason': self.reason,
-            'status': self.status,
-            'requiredBy': self.required_by.isoformat() if self.required_by else None,
-            'fulfilledAt': self.fulfilled_at.isoformat() if self.fulfilled_at else None,
-            'notes': self.notes,
-            'createdAt': self.created_at.isoformat() if self.created_at else None
-        }
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'patientName': attrgetter('patient_name'),
+        'bloodType': attrgetter('blood_type'),
+        'unitsRequired': attrgetter('units_required'),
+        'urgency': attrgetter('urgency'),
+        'hospitalId': attrgetter('hospital_id'),
+        'requesterContact': {
+            'name': attrgetter('requester_name'),
+            'phone': attrgetter('requester_phone'),
+            'email': attrgetter('requester_email'),
+            'relation': attrgetter('requester_relation')
+        },
+        'location': {
+            'latitude': lambda r: to_float(r.latitude),
+            'longitude': lambda r: to_float(r.longitude)
+        },
+        'reason': attrgetter('reason'),
+        'status': attrgetter('status'),
+        'requiredBy': lambda r: to_iso(r.required_by),
+        'fulfilledAt': lambda r: to_iso(r.fulfilled_at),
+        'notes': attrgetter('notes'),
+        'createdAt': lambda r: to_iso(r.created_at)
+    }
 
 
-class BloodRequestMatch(db.Model):
+class BloodRequestMatch(SerializerMixin, db.Model):
     __tablename__ = 'blood_request_matches'
+    __table_args__ = (
+        # A donor is matched (and notified) once per request
+        db.Index('uq_blood_request_matches_request_donor', 'blood_request_id', 'donor_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     blood_request_id = db.Column(db.Integer, db.ForeignKey('blood_requests.id'), nullable=False)
@@ -84,10 +95,33 @@ class BloodRequestMatch(db.Model):
     # Relationships
     blood_request = db.relationship('BloodRequest', back_populates='matched_donors')
     donor = db.relationship('Donor', back_populates='blood_requests')
+    
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'bloodRequestId': attrgetter('blood_request_id'),
+        'donor': {
+            'id': attrgetter('donor_id'),
+            'name': lambda m: m.donor.name,
+            'bloodType': lambda m: m.donor.blood_type,
+            'phone': lambda m: m.donor.phone
+        },
+        'matchScore': lambda m: to_float(m.match_score),
+        'distanceKm': lambda m: to_float(m.distance_km),
+        'notified': attrgetter('notified'),
+        'responded': attrgetter('responded'),
+        'responseTime': lambda m: to_iso(m.response_time),
+        'createdAt': lambda m: to_iso(m.created_at)
+    }
 
 
-class Notification(db.Model):
+class Notification(SerializerMixin, db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Recipient lists, newest first, within the live window
+        db.Index('ix_notifications_recipient_created', 'recipient_id', 'created_at'),
+        # Retention: rows past the read/max age cutoffs
+        db.Index('ix_notifications_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     recipient_id = db.Column(db.Integer, nullable=False)
@@ -104,16 +138,43 @@ class Notification(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'recipientId': self.recipient_id,
-            'recipientType': self.recipient_type,
-            'title': self.title,
-            'message': self.message,
-            'type': self.notification_type,
-            'priority': self.priority,
-            'read': self.read,
-            'readAt': self.read_at.isoformat() if self.read_at else None,
-            'createdAt': self.created_at.isoformat() if self.created_at else None
-        }
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'recipientId': attrgetter('recipient_id'),
+        'recipientType': attrgetter('recipient_type'),
+        'title': attrgetter('title'),
+        'message': attrgetter('message'),
+        'type': attrgetter('notification_type'),
+        'priority': attrgetter('priority'),
+        'read': attrgetter('read'),
+        'readAt': lambda n: to_iso(n.read_at),
+        'createdAt': lambda n: to_iso(n.created_at)
+    }
+
+
+class NotificationUnreadCount(db.Model):
+    """Unread notifications per recipient, maintained with every notification write"""
+    __tablename__ = 'notification_unread_counts'
+    
+    recipient_type = db.Column(db.Enum('Donor', 'Hospital', 'User'), primary_key=True)
+    recipient_id = db.Column(db.Integer, primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class NotificationArchive(db.Model):
+    """Archived notifications of one recipient and month, as compressed JSON"""
+    __tablename__ = 'notification_archives'
+    __table_args__ = (
+        db.Index('ix_notification_archives_recipient_month', 'recipient_type', 'recipient_id', 'month'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_type = db.Column(db.Enum('Donor', 'Hospital', 'User'), nullable=False)
+    recipient_id = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM of created_at
+    count = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary(length=2 ** 24), nullable=False)  # zlib(JSON list)
+    first_created_at = db.Column(db.DateTime)
+    last_created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,8 +1,10 @@
 from extensions import db
 from datetime import datetime
 from sqlalchemy.dialects.mysql import DECIMAL
+from operator import attrgetter
+from models.serializer import SerializerMixin, to_float, to_iso
 
-class Donor(db.Model):
+class Donor(SerializerMixin, db.Model):
     __tablename__ = 'donors'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -50,31 +52,30 @@ class Donor(db.Model):
     # Relationships
     blood_requests = db.relationship('BloodRequestMatch', back_populates='donor', lazy='dynamic')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'bloodType': self.blood_type,
-            'phone': self.phone,
-            'email': self.email,
-            'age': self.age,
-            'gender': self.gender,
-            'location': {
-                'latitude': float(self.latitude) if self.latitude else None,
-                'longitude': float(self.longitude) if self.longitude else None
-            },
-            'address': {
-                'street': self.street,
-                'city': self.city,
-                'state': self.state,
-                'pincode': self.pincode,
-                'country': self.country
-            },
-            'lastDonationDate': self.last_donation_date.isoformat() if self.last_donation_date else None,
-            'availableForDonation': self.available_for_donation,
-            'totalDonations': self.total_donations,
-            'verified': self.verified,
-            'rating': float(self.rating) if self.rating else 5.0,
-            'responseTime': self.response_time_minutes,
-            'createdAt': self.created_at.isoformat() if self.created_at else None
-        }
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'name': attrgetter('name'),
+        'bloodType': attrgetter('blood_type'),
+        'phone': attrgetter('phone'),
+        'email': attrgetter('email'),
+        'age': attrgetter('age'),
+        'gender': attrgetter('gender'),
+        'location': {
+            'latitude': lambda d: to_float(d.latitude),
+            'longitude': lambda d: to_float(d.longitude)
+        },
+        'address': {
+            'street': attrgetter('street'),
+            'city': attrgetter('city'),
+            'state': attrgetter('state'),
+            'pincode': attrgetter('pincode'),
+            'country': attrgetter('country')
+        },
+        'lastDonationDate': lambda d: to_iso(d.last_donation_date),
+        'availableForDonation': attrgetter('available_for_donation'),
+        'totalDonations': attrgetter('total_donations'),
+        'verified': attrgetter('verified'),
+        'rating': lambda d: to_float(d.rating, 5.0),
+        'responseTime': attrgetter('response_time_minutes'),
+        'createdAt': lambda d: to_iso(d.created_at)
+    }
@@ -0,0 +1,20 @@
+from extensions import db
+from datetime import datetime
+from sqlalchemy.dialects.mysql import DECIMAL
+
+
+class GeocodeCache(db.Model):
+    """Maps geocoder answers per normalized address, so imports never ask twice"""
+    __tablename__ = 'geocode_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    address_key = db.Column(db.String(40), nullable=False, unique=True)  # sha1 of the normalized address
+    address = db.Column(db.String(300), nullable=False)
+    status = db.Column(db.Enum('ok', 'not_found'), nullable=False)
+
+    # Null when the geocoder found nothing
+    latitude = db.Column(DECIMAL(10, 8))
+    longitude = db.Column(DECIMAL(11, 8))
+    formatted_address = db.Column(db.String(300))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,8 +1,10 @@
 from extensions import db
 from datetime import datetime
 from sqlalchemy.dialects.mysql import DECIMAL
+from operator import attrgetter
+from models.serializer import SerializerMixin, to_float
 
-class Hospital(db.Model):
+class Hospital(SerializerMixin, db.Model):
     __tablename__ = 'hospitals'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -50,33 +52,32 @@ class Hospital(db.Model):
     blood_banks = db.relationship('BloodBank', back_populates='hospital', lazy='dynamic')
     blood_requests = db.relationship('BloodRequest', back_populates='hospital', lazy='dynamic')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'hospitalType': self.hospital_type,
-            'location': {
-                'latitude': float(self.latitude) if self.latitude else None,
-                'longitude': float(self.longitude) if self.longitude else None
-            },
-            'address': {
-                'street': self.street,
-                'city': self.city,
-                'state': self.state,
-                'pincode': self.pincode,
-                'country': self.country
-            },
-            'phone': self.phone,
-            'email': self.email,
-            'website': self.website,
-            'emergencyContact': self.emergency_contact,
-            'hasBloodBank': self.has_blood_bank,
-            'capacity': {
-                'totalBeds': self.total_beds,
-                'icuBeds': self.icu_beds,
-                'emergencyBeds': self.emergency_beds
-            },
-            'rating': float(self.rating) if self.rating else 4.0,
-            'verified': self.verified,
-            'operatingHours': self.operating_hours
-        }
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'name': attrgetter('name'),
+        'hospitalType': attrgetter('hospital_type'),
+        'location': {
+            'latitude': lambda h: to_float(h.latitude),
+            'longitude': lambda h: to_float(h.longitude)
+        },
+        'address': {
+            'street': attrgetter('street'),
+            'city': attrgetter('city'),
+            'state': attrgetter('state'),
+            'pincode': attrgetter('pincode'),
+            'country': attrgetter('country')
+        },
+        'phone': attrgetter('phone'),
+        'email': attrgetter('email'),
+        'website': attrgetter('website'),
+        'emergencyContact': attrgetter('emergency_contact'),
+        'hasBloodBank': attrgetter('has_blood_bank'),
+        'capacity': {
+            'totalBeds': attrgetter('total_beds'),
+            'icuBeds': attrgetter('icu_beds'),
+            'emergencyBeds': attrgetter('emergency_beds')
+        },
+        'rating': lambda h: to_float(h.rating, 4.0),
+        'verified': attrgetter('verified'),
+        'operatingHours': attrgetter('operating_hours')
+    }
@@ -0,0 +1,131 @@
+from extensions import db
+from datetime import datetime
+from operator import attrgetter
+from models.serializer import SerializerMixin, to_iso
+
+BLOOD_TYPES = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+
+
+class InventoryEvent(SerializerMixin, db.Model):
+    """Append-only ledger of stock movements; blood_banks.inventory_* is its running total"""
+    __tablename__ = 'inventory_events'
+    __table_args__ = (
+        db.Index('ix_inventory_events_bank_id', 'blood_bank_id', 'id'),
+        db.Index('ix_inventory_events_created_at', 'created_at'),
+        # Terminals resend an event with the same reference after a timeout
+        db.UniqueConstraint('blood_bank_id', 'reference', name='uq_inventory_events_reference'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_banks.id'), nullable=False)
+    blood_type = db.Column(db.Enum(*BLOOD_TYPES), nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.Enum('Opening', 'Received', 'Issued', 'Adjusted', 'Expired', 'Discarded', 'Transfer'), nullable=False)
+    
+    # Origin of the event
+    terminal_id = db.Column(db.String(64))
+    reference = db.Column(db.String(64))
+    note = db.Column(db.String(200))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    _serializer_fields = {
+        'id': attrgetter('id'),
+        'bloodBankId': attrgetter('blood_bank_id'),
+        'bloodType': attrgetter('blood_type'),
+        'delta': attrgetter('delta'),
+        'reason': attrgetter('reason'),
+        'terminalId': attrgetter('terminal_id'),
+        'reference': attrgetter('reference'),
+        'note': attrgetter('note'),
+        'createdAt': lambda e: to_iso(e.created_at)
+    }
+
+
+class InventorySnapshot(db.Model):
+    """Checkpoint of a bank's stock per blood type, folded from the ledger up to last_event_id"""
+    __tablename__ = 'inventory_snapshots'
+    
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_banks.id'), primary_key=True)
+    blood_type = db.Column(db.Enum(*BLOOD_TYPES), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class InventoryAggregate(db.Model):
+    """Running totals of stock per blood type, globally and per city/state"""
+    __tablename__ = 'inventory_aggregates'
+    
+    scope = db.Column(db.Enum('global', 'state', 'city'), primary_key=True)
+    region_key = db.Column(db.String(100), primary_key=True)  # lower-cased name, '' for global
+    blood_type = db.Column(db.Enum(*BLOOD_TYPES), primary_key=True)
+    region_name = db.Column(db.String(100))
+    units = db.Column(db.Integer, nullable=False, default=0)
+    banks_with_stock = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class InventoryRollup(db.Model):
+    """Downsampled stock level and movements of one bank/blood type per hour or day.
+
+    Rows exist only for buckets with movements; a missing bucket means no
+    movement and the previous closing level.
+    """
+    __tablename__ = 'inventory_rollups'
+    __table_args__ = (
+        db.Index('ix_inventory_rollups_resolution_bucket', 'resolution', 'bucket_start'),
+    )
+    
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_banks.id'), primary_key=True)
+    blood_type = db.Column(db.Enum(*BLOOD_TYPES), primary_key=True)
+    resolution = db.Column(db.Enum('hour', 'day'), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    
+    closing_units = db.Column(db.Integer, nullable=False)
+    min_units = db.Column(db.Integer, nullable=False)
+    max_units = db.Column(db.Integer, nullable=False)
+    received = db.Column(db.Integer, nullable=False, default=0)
+    consumed = db.Column(db.Integer, nullable=False, default=0)  # Issued
+    wasted = db.Column(db.Integer, nullable=False, default=0)  # Expired + Discarded
+    events = db.Column(db.Integer, nullable=False, default=0)
+
+
+class InventoryThreshold(db.Model):
+    """Per-bank minimum stock of a blood type (overrides SHORTAGE_MIN_UNITS)"""
+    __tablename__ = 'inventory_thresholds'
+    
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_banks.id'), primary_key=True)
+    blood_type = db.Column(db.Enum(*BLOOD_TYPES), primary_key=True)
+    min_units = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class InventoryAlert(SerializerMixin, db.Model):
+    """Shortage state of one bank/blood type; hospitals are notified when it opens or escalates"""
+    __tablename__ = 'inventory_alerts'
+    
+    blood_bank_id = db.Column(db.Integer, db.ForeignKey('blood_banks.id'), primary_key=True)
+    blood_type = db.Column(db.Enum(*BLOOD_TYPES), primary_key=True)
+    level = db.Column(db.Enum('Depleting', 'Low', 'Out'))  # NULL once resolved
+    notified_level = db.Column(db.Enum('Depleting', 'Low', 'Out'))  # highest level notified this episode
+    units = db.Column(db.Integer, nullable=False)
+    min_units = db.Column(db.Integer, nullable=False)
+    days_of_cover = db.Column(db.Float)
+    notifications = db.Column(db.Integer, nullable=False, default=0)
+    raised_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    resolved_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    _serializer_fields = {
+        'bloodBankId': attrgetter('blood_bank_id'),
+        'bloodType': attrgetter('blood_type'),
+        'level': attrgetter('level'),
+        'units': attrgetter('units'),
+        'minUnits': attrgetter('min_units'),
+        'daysOfCover': attrgetter('days_of_cover'),
+        'notifications': attrgetter('notifications'),
+        'raisedAt': lambda a: to_iso(a.raised_at),
+        'resolvedAt': lambda a: to_iso(a.resolved_at),
+        'updatedAt': lambda a: to_iso(a.updated_at)
+    }
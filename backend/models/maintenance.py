@@ -0,0 +1,13 @@
+from extensions import db
+from datetime import datetime
+
+
+class MaintenanceLock(db.Model):
+    """Cross-worker lock for maintenance work (seeding, clearing); a row is a held lock until it expires"""
+    __tablename__ = 'maintenance_locks'
+
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(32), nullable=False)  # token of the holder
+    job_id = db.Column(db.String(32))  # background job doing the work, once queued
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)  # a dead holder's lock can be taken after this
@@ -1,17 +1,26 @@
-from flask import Blueprint, request, jsonify
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Blueprint, current_app, request, jsonify
 from extensions import db
-from models.blood_bank import BloodBank
-from services.google_maps_service import maps_service
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.inventory import InventoryAlert, InventoryEvent, InventoryThreshold
+from services.wire_format import respond, requested_fields
+from models.serializer import parse_fields
+from services.http_cache import conditional
+from services.geo_cache import geo_cache, in_box
+from services import inventory_aggregates, inventory_ledger, inventory_timeseries, shortage_alerts
+from services.demand_forecast import forecaster
+from services.inventory_ledger import InventoryError
 
 blood_bank_bp = Blueprint('blood_banks', __name__)
 
 @blood_bank_bp.route('/', methods=['GET'])
+@conditional('blood_banks', 'donors')
 def get_blood_banks():
     """Get all blood banks"""
     try:
-        from models.donor import Donor
-        from sqlalchemy import or_
-        
         city = request.args.get('city')
         state = request.args.get('state')
         limit = int(request.args.get('limit', 50))
@@ -37,33 +46,26 @@ def get_blood_banks():
             'calcutta': ['kolkata', 'calcutta'],
         }
         
-        # Enrich with donor names from the same city
+        fields = parse_fields(requested_fields())
+        serialize = BloodBank.serializer(fields)
+        # Donor enrichment costs a query; skip it when not requested
+        enrich = fields is None or 'donor_names' in fields or 'donor_count' in fields
+        
+        # Available donors of every city on the page, in one query per 100 cities
+        donor_names = _available_donor_names(
+            {bb.city.lower() for bb in blood_banks if bb.city}, city_variations
+        ) if enrich else {}
+        
         result_data = []
         for bb in blood_banks:
-            bb_dict = bb.to_dict()
-            
-            # Find available donors in the same city (handle city name variations)
-            if bb.city:
-                city_lower = bb.city.lower()
-                search_cities = city_variations.get(city_lower, [city_lower])
-                
-                # Build OR condition for city variations
-                city_conditions = [Donor.city.ilike(f'%{c}%') for c in search_cities]
-                
-                donors = Donor.query.filter(
-                    or_(*city_conditions),
-                    Donor.available_for_donation == True
-                ).limit(10).all()
-                
-                bb_dict['donor_names'] = [d.name for d in donors]
-                bb_dict['donor_count'] = len(donors)
-            else:
-                bb_dict['donor_names'] = []
-                bb_dict['donor_count'] = 0
-            
+            bb_dict = serialize(bb)
+            if enrich:
+                names = donor_names.get(bb.city.lower(), []) if bb.city else []
+                bb_dict['donor_names'] = names
+                bb_dict['donor_count'] = len(names)
             result_data.append(bb_dict)
         
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(result_data),
             'data': result_data
@@ -72,6 +74,28 @@ def get_blood_banks():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+def _available_donor_names(cities, city_variations, per_city=10, cities_per_query=100):
+    """Names of up to ``per_city`` available donors per city (matching its name variations)"""
+    from models.donor import Donor
+    from sqlalchemy import literal, or_, select, union_all
+    
+    names = {}
+    cities = sorted(cities)
+    for start in range(0, len(cities), cities_per_query):
+        branches = []
+        for city in cities[start:start + cities_per_query]:
+            search_cities = city_variations.get(city, [city])
+            limited = select(literal(city).label('city_key'), Donor.name).where(
+                or_(*[Donor.city.ilike(f'%{c}%') for c in search_cities]),
+                Donor.available_for_donation == True
+            ).limit(per_city).subquery()
+            branches.append(select(limited.c.city_key, limited.c.name))
+        query = union_all(*branches) if len(branches) > 1 else branches[0]
+        for city, name in db.session.execute(query):
+            names.setdefault(city, []).append(name)
+    return names
+
+
 @blood_bank_bp.route('/<int:blood_bank_id>', methods=['GET'])
 def get_blood_bank(blood_bank_id):
     """Get blood bank by ID"""
@@ -80,7 +104,7 @@ def get_blood_bank(blood_bank_id):
         if not blood_bank:
             return jsonify({'success': False, 'message': 'Blood bank not found'}), 404
         
-        return jsonify({'success': True, 'data': blood_bank.to_dict()})
+        return respond({'success': True, 'data': blood_bank.to_dict(requested_fields())})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -111,11 +135,12 @@ def find_by_blood_type(blood_type):
         blood_banks = BloodBank.query.filter(
             getattr(BloodBank, column_name) >= min_units
         ).limit(limit).all()
+        serialize = BloodBank.serializer(requested_fields())
         
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(blood_banks),
-            'data': [bb.to_dict() for bb in blood_banks]
+            'data': [serialize(bb) for bb in blood_banks]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -136,50 +161,31 @@ def find_nearby_blood_banks():
         if not latitude or not longitude:
             return jsonify({'success': False, 'message': 'Latitude and longitude required'}), 400
         
-        query = BloodBank.query
-        
         # Filter by blood type if specified
-        if blood_type:
-            column_map = {
-                'A+': 'inventory_a_positive',
-                'A-': 'inventory_a_negative',
-                'B+': 'inventory_b_positive',
-                'B-': 'inventory_b_negative',
-                'AB+': 'inventory_ab_positive',
-                'AB-': 'inventory_ab_negative',
-                'O+': 'inventory_o_positive',
-                'O-': 'inventory_o_negative'
-            }
-            column_name = column_map.get(blood_type)
+        column_name = INVENTORY_COLUMNS.get(blood_type) if blood_type else None
+        fields = requested_fields()
+        
+        def load(box):
+            query = BloodBank.query.filter(*in_box(BloodBank, box))
             if column_name:
                 query = query.filter(getattr(BloodBank, column_name) >= min_units)
+            serialize = BloodBank.serializer(fields)
+            candidates = []
+            for bank in query.order_by(BloodBank.id):
+                bank_dict = serialize(bank)
+                if blood_type:
+                    bank_dict['availableUnits'] = bank.get_inventory().get(blood_type, 0)
+                candidates.append((bank.latitude, bank.longitude, bank_dict))
+            return candidates
         
-        blood_banks = query.all()
-        
-        # Calculate distances
-        nearby_banks = []
-        for bank in blood_banks:
-            try:
-                distance = maps_service.calculate_distance(
-                    (latitude, longitude),
-                    (float(bank.latitude), float(bank.longitude))
-                )
-                if distance <= max_distance:
-                    bank_dict = bank.to_dict()
-                    bank_dict['distance'] = distance
-                    if blood_type:
-                        bank_dict['availableUnits'] = bank.get_inventory().get(blood_type, 0)
-                    nearby_banks.append(bank_dict)
-            except:
-                continue
+        nearby = geo_cache.nearby('blood_banks.nearby', ('blood_banks',), latitude, longitude, max_distance, load,
+                                  {'bloodType': blood_type, 'minUnits': min_units, 'fields': fields})
+        nearby_banks = [dict(bank_dict, distance=distance) for distance, bank_dict in nearby[:limit]]
         
-        # Sort by distance
-        nearby_banks.sort(key=lambda x: x['distance'])
-        
-        return jsonify({
+        return respond({
             'success': True,
-            'count': len(nearby_banks[:limit]),
-            'data': nearby_banks[:limit]
+            'count': len(nearby_banks),
+            'data': nearby_banks
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -187,65 +193,338 @@ def find_nearby_blood_banks():
 
 @blood_bank_bp.route('/<int:blood_bank_id>/inventory', methods=['PUT'])
 def update_inventory(blood_bank_id):
-    """Update blood bank inventory"""
+    """Set absolute inventory levels (stock count); differences go to the ledger"""
     try:
-        blood_bank = BloodBank.query.get(blood_bank_id)
-        if not blood_bank:
-            return jsonify({'success': False, 'message': 'Blood bank not found'}), 404
-        
         data = request.json.get('bloodInventory', {})
-        
-        blood_bank.inventory_a_positive = data.get('A+', blood_bank.inventory_a_positive)
-        blood_bank.inventory_a_negative = data.get('A-', blood_bank.inventory_a_negative)
-        blood_bank.inventory_b_positive = data.get('B+', blood_bank.inventory_b_positive)
-        blood_bank.inventory_b_negative = data.get('B-', blood_bank.inventory_b_negative)
-        blood_bank.inventory_ab_positive = data.get('AB+', blood_bank.inventory_ab_positive)
-        blood_bank.inventory_ab_negative = data.get('AB-', blood_bank.inventory_ab_negative)
-        blood_bank.inventory_o_positive = data.get('O+', blood_bank.inventory_o_positive)
-        blood_bank.inventory_o_negative = data.get('O-', blood_bank.inventory_o_negative)
-        
-        from datetime import datetime
-        blood_bank.last_inventory_update = datetime.utcnow()
-        
-        db.session.commit()
+        blood_bank, events = inventory_ledger.set_levels(
+            blood_bank_id,
+            data,
+            terminal_id=request.json.get('terminalId'),
+            note=request.json.get('note')
+        )
         
         return jsonify({
             'success': True,
             'message': 'Inventory updated successfully',
-            'data': blood_bank.to_dict()
+            'data': blood_bank.to_dict(),
+            'eventIds': [e.id for e in events]
         })
+    except InventoryError as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@blood_bank_bp.route('/<int:blood_bank_id>/inventory/events', methods=['POST'])
+def record_inventory_events(blood_bank_id):
+    """Apply signed stock movements atomically, e.g. {"reason": "Issued", "deltas": {"O+": -2}}"""
+    try:
+        data = request.json or {}
+        events, duplicate = inventory_ledger.apply_events(
+            blood_bank_id,
+            data.get('deltas'),
+            data.get('reason'),
+            terminal_id=data.get('terminalId'),
+            reference=data.get('reference'),
+            note=data.get('note')
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Duplicate reference, already applied' if duplicate else 'Inventory events recorded',
+            'duplicate': duplicate,
+            'data': {
+                'events': [e.to_dict() for e in events],
+                'bloodInventory': inventory_ledger.current_stock(db.session, blood_bank_id)
+            }
+        }), 200 if duplicate else 201
+    except InventoryError as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
+def _bulk_items():
+    """Items from a JSON body (``{"items": [...]}`` or a bare list) or NDJSON lines"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = []
+        for line_number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise InventoryError(f'Invalid JSON on line {line_number}')
+        return items, {}
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        return data, {}
+    if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+        raise InventoryError('Expected {"items": [...]}, a JSON array or NDJSON')
+    return data['items'], data
+
+
+@blood_bank_bp.route('/inventory/bulk', methods=['POST'])
+def bulk_update_inventory():
+    """Apply many banks' inventories in one transaction (JSON or NDJSON)"""
+    try:
+        items, options = _bulk_items()
+        max_items = current_app.config.get('INVENTORY_BULK_MAX_ITEMS', 5000)
+        if len(items) > max_items:
+            return jsonify({'success': False, 'message': f'At most {max_items} items per batch'}), 413
+        
+        def option(name, default=None):
+            return options.get(name, request.args.get(name, default))
+        
+        partial = option('partial', False)
+        result = inventory_ledger.apply_bulk(
+            items,
+            mode=option('mode', 'set'),
+            reason=option('reason'),
+            terminal_id=option('terminalId'),
+            reference=option('reference'),
+            partial=partial is True or str(partial).lower() == 'true'
+        )
+        status = 400 if result['rejected'] and not result['applied'] else 200
+        return jsonify({
+            'success': status == 200,
+            'message': f"Applied inventory for {result['applied']} blood bank(s)" if status == 200 else 'Batch rejected',
+            'data': result
+        }), status
+    except InventoryError as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@blood_bank_bp.route('/<int:blood_bank_id>/inventory/events', methods=['GET'])
+def get_inventory_events(blood_bank_id):
+    """Ledger history of a blood bank (newest first, paginate with ?before=<event id>)"""
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        events = inventory_ledger.bank_events(
+            blood_bank_id,
+            limit=limit,
+            before_id=request.args.get('before', type=int),
+            blood_type=request.args.get('bloodType')
+        )
+        serialize = InventoryEvent.serializer(requested_fields())
+        
+        return respond({
+            'success': True,
+            'count': len(events),
+            'data': [serialize(e) for e in events]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @blood_bank_bp.route('/stats/inventory', methods=['GET'])
+@conditional('blood_banks')
 def get_inventory_stats():
-    """Get total inventory across all blood banks"""
+    """Get total inventory across all blood banks (or one ?city= / ?state=)"""
     try:
-        result = db.session.query(
-            db.func.sum(BloodBank.inventory_a_positive).label('A+'),
-            db.func.sum(BloodBank.inventory_a_negative).label('A-'),
-            db.func.sum(BloodBank.inventory_b_positive).label('B+'),
-            db.func.sum(BloodBank.inventory_b_negative).label('B-'),
-            db.func.sum(BloodBank.inventory_ab_positive).label('AB+'),
-            db.func.sum(BloodBank.inventory_ab_negative).label('AB-'),
-            db.func.sum(BloodBank.inventory_o_positive).label('O+'),
-            db.func.sum(BloodBank.inventory_o_negative).label('O-')
-        ).first()
+        if request.args.get('city'):
+            data = inventory_aggregates.totals(db.session, 'city', request.args['city'])
+        elif request.args.get('state'):
+            data = inventory_aggregates.totals(db.session, 'state', request.args['state'])
+        else:
+            data = inventory_aggregates.totals(db.session)
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@blood_bank_bp.route('/stats/inventory/regions', methods=['GET'])
+@conditional('blood_banks')
+def get_inventory_by_region():
+    """Per-city or per-state inventory breakdown (?scope=city|state&bloodType=O%2B)"""
+    try:
+        scope = request.args.get('scope', 'city')
+        if scope not in ('city', 'state'):
+            return jsonify({'success': False, 'message': 'scope must be city or state'}), 400
+        blood_type = request.args.get('bloodType')
+        if blood_type and blood_type not in INVENTORY_COLUMNS:
+            return jsonify({'success': False, 'message': 'Invalid blood type'}), 400
+        
+        regions = inventory_aggregates.breakdown(
+            db.session,
+            scope,
+            blood_type=blood_type,
+            region=request.args.get('region'),
+            limit=request.args.get('limit', type=int)
+        )
+        
+        return respond({
+            'success': True,
+            'scope': scope,
+            'count': len(regions),
+            'data': regions
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@blood_bank_bp.route('/forecast', methods=['GET'])
+def get_demand_forecast():
+    """Demand forecast per bank and blood type (?bloodBankId=&bloodType=&city=&state=&shortfallOnly=true&limit=)"""
+    try:
+        blood_type = request.args.get('bloodType')
+        if blood_type and blood_type not in INVENTORY_COLUMNS:
+            return jsonify({'success': False, 'message': 'Invalid blood type'}), 400
+        
+        result = forecaster.get()
+        positions = range(len(result.bank_ids))
+        bank_id = request.args.get('bloodBankId', type=int)
+        if bank_id is not None:
+            position = result.position(bank_id)
+            if position is None:
+                return jsonify({'success': False, 'message': 'Blood bank not found'}), 404
+            positions = [position]
+        city = inventory_aggregates.region_key(request.args.get('city'))
+        state = inventory_aggregates.region_key(request.args.get('state'))
+        if city:
+            positions = [i for i in positions if inventory_aggregates.region_key(result.cities[i]) == city]
+        if state:
+            positions = [i for i in positions if inventory_aggregates.region_key(result.states[i]) == state]
+        positions = list(positions)
+        
+        types = [list(INVENTORY_COLUMNS).index(blood_type)] if blood_type else range(len(INVENTORY_COLUMNS))
+        items = [result.item(i, t) for i in positions for t in types]
+        if request.args.get('shortfallOnly', 'false').lower() == 'true':
+            items = [item for item in items if item['shortfall'] > 0]
+        items.sort(key=lambda item: (-item['shortfall'], item['bloodBankId'], item['bloodType']))
+        limit = request.args.get('limit', type=int)
+        
+        mask = np.zeros(len(result.bank_ids), dtype=bool)
+        mask[positions] = True
+        summary = result.summary(mask)
+        
+        return respond({
+            'success': True,
+            'generatedAt': result.generated_at.isoformat(),
+            'horizonDays': result.horizon,
+            'summary': {blood_type: summary[blood_type]} if blood_type else summary,
+            'count': len(items),
+            'data': items[:limit] if limit else items
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@blood_bank_bp.route('/<int:blood_bank_id>/inventory/history', methods=['GET'])
+def get_inventory_history(blood_bank_id):
+    """Hourly or daily inventory rollups (?resolution=hour|day&bloodType=&days=30)"""
+    try:
+        resolution = request.args.get('resolution', 'day')
+        if resolution not in ('hour', 'day'):
+            return jsonify({'success': False, 'message': 'resolution must be hour or day'}), 400
+        blood_type = request.args.get('bloodType')
+        if blood_type and blood_type not in INVENTORY_COLUMNS:
+            return jsonify({'success': False, 'message': 'Invalid blood type'}), 400
+        if db.session.get(BloodBank, blood_bank_id) is None:
+            return jsonify({'success': False, 'message': 'Blood bank not found'}), 404
+        
+        days = min(request.args.get('days', 30, type=int), 366)
+        rows = inventory_timeseries.history(
+            db.session,
+            bank_ids=[blood_bank_id],
+            blood_types=[blood_type] if blood_type else None,
+            resolution=resolution,
+            since=datetime.utcnow() - timedelta(days=days)
+        )
+        
+        return respond({
+            'success': True,
+            'resolution': resolution,
+            'count': len(rows),
+            'data': rows
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@blood_bank_bp.route('/alerts', methods=['GET'])
+def get_shortage_alerts():
+    """Open shortage alerts, most severe first (?level=Out|Low|Depleting&bloodType=&city=&limit=)"""
+    try:
+        level = request.args.get('level')
+        if level and level not in shortage_alerts.LEVELS:
+            return jsonify({'success': False, 'message': 'level must be Out, Low or Depleting'}), 400
+        blood_type = request.args.get('bloodType')
+        if blood_type and blood_type not in INVENTORY_COLUMNS:
+            return jsonify({'success': False, 'message': 'Invalid blood type'}), 400
+        
+        alerts = shortage_alerts.open_alerts(
+            db.session,
+            level=level,
+            blood_type=blood_type,
+            city=request.args.get('city'),
+            limit=request.args.get('limit', type=int)
+        )
+        serialize = InventoryAlert.serializer(requested_fields())
+        
+        return respond({
+            'success': True,
+            'count': len(alerts),
+            'data': [serialize(alert) for alert in alerts]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@blood_bank_bp.route('/<int:blood_bank_id>/inventory/thresholds', methods=['GET', 'PUT'])
+def inventory_thresholds(blood_bank_id):
+    """Minimum stock per blood type; PUT {"O-": 8, "AB-": null} sets or clears overrides"""
+    try:
+        if db.session.get(BloodBank, blood_bank_id) is None:
+            return jsonify({'success': False, 'message': 'Blood bank not found'}), 404
+        
+        if request.method == 'PUT':
+            data = request.json or {}
+            unknown = [t for t in data if t not in INVENTORY_COLUMNS]
+            if unknown:
+                return jsonify({'success': False, 'message': f"Invalid blood type: {', '.join(unknown)}"}), 400
+            for blood_type, min_units in data.items():
+                threshold = db.session.get(InventoryThreshold, (blood_bank_id, blood_type))
+                if min_units is None:
+                    if threshold is not None:
+                        db.session.delete(threshold)
+                    continue
+                if not isinstance(min_units, int) or min_units < 0:
+                    db.session.rollback()
+                    return jsonify({'success': False, 'message': f'{blood_type}: minimum must be a non-negative integer'}), 400
+                if threshold is None:
+                    db.session.add(InventoryThreshold(blood_bank_id=blood_bank_id, blood_type=blood_type, min_units=min_units))
+                else:
+                    threshold.min_units = min_units
+            db.session.commit()
+            shortage_alerts.dirty_banks.add([blood_bank_id])
+        
+        overrides = {
+            t.blood_type: t.min_units
+            for t in InventoryThreshold.query.filter_by(blood_bank_id=blood_bank_id)
+        }
+        defaults = current_app.config.get('SHORTAGE_MIN_UNITS', {})
         
         return jsonify({
             'success': True,
             'data': {
-                'A+': result[0] or 0,
-                'A-': result[1] or 0,
-                'B+': result[2] or 0,
-                'B-': result[3] or 0,
-                'AB+': result[4] or 0,
-                'AB-': result[5] or 0,
-                'O+': result[6] or 0,
-                'O-': result[7] or 0
+                blood_type: {
+                    'minUnits': overrides.get(blood_type, defaults.get(blood_type, 0)),
+                    'custom': blood_type in overrides
+                }
+                for blood_type in INVENTORY_COLUMNS
             }
         })
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
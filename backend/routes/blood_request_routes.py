@@ -1,10 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy.orm import joinedload
 from extensions import db
-from models.blood_request import BloodRequest
+from models.blood_request import BloodRequest, BloodRequestMatch
+from services.request_queue import request_queue
+from services.wire_format import respond, requested_fields
 from datetime import datetime
 
 blood_request_bp = Blueprint('blood_requests', __name__)
 
+
+def _enqueue_matching(request_id):
+    """Queue donor matching; None when disabled or the ML stack is not installed"""
+    try:
+        # The matching engine pulls in scikit-learn, like smart_match_routes
+        from services.matching_pipeline import enqueue_matching
+    except Exception as e:
+        print(f"⚠️  Matching pipeline unavailable: {e}")
+        return None
+    return enqueue_matching(request_id)
+
+
+def _job_link(job):
+    return {'id': job.id, 'state': job.state, 'statusUrl': f'/api/jobs/{job.id}'} if job else None
+
 @blood_request_bp.route('/', methods=['GET'])
 def get_blood_requests():
     """Get all blood requests with filters"""
@@ -24,11 +42,12 @@ def get_blood_requests():
             query = query.filter(BloodRequest.blood_type == blood_type)
         
         requests = query.order_by(BloodRequest.created_at.desc()).limit(limit).all()
+        serialize = BloodRequest.serializer(requested_fields())
         
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(requests),
-            'data': [req.to_dict() for req in requests]
+            'data': [serialize(req) for req in requests]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -42,7 +61,7 @@ def get_blood_request(request_id):
         if not blood_request:
             return jsonify({'success': False, 'message': 'Blood request not found'}), 404
         
-        return jsonify({'success': True, 'data': blood_request.to_dict()})
+        return respond({'success': True, 'data': blood_request.to_dict(requested_fields())})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -73,16 +92,57 @@ def create_blood_request():
         db.session.add(blood_request)
         db.session.commit()
         
+        job = _enqueue_matching(blood_request.id) if current_app.config.get('MATCHING_ON_CREATE', True) else None
+        
         return jsonify({
             'success': True,
             'message': 'Blood request created successfully',
-            'data': blood_request.to_dict()
+            'data': blood_request.to_dict(),
+            'matchingJob': _job_link(job)
         }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
+@blood_request_bp.route('/<int:request_id>/match', methods=['POST'])
+def match_blood_request(request_id):
+    """Run donor matching again (only donors not matched before are added and notified)"""
+    try:
+        if db.session.get(BloodRequest, request_id) is None:
+            return jsonify({'success': False, 'message': 'Blood request not found'}), 404
+        
+        job = _enqueue_matching(request_id)
+        if job is None:
+            return jsonify({'success': False, 'message': 'Matching is not available'}), 503
+        
+        return jsonify({'success': True, 'matchingJob': _job_link(job)}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@blood_request_bp.route('/<int:request_id>/matches', methods=['GET'])
+def get_blood_request_matches(request_id):
+    """Matched donors of a request, best first"""
+    try:
+        if db.session.get(BloodRequest, request_id) is None:
+            return jsonify({'success': False, 'message': 'Blood request not found'}), 404
+        
+        matches = BloodRequestMatch.query.options(joinedload(BloodRequestMatch.donor)).filter_by(blood_request_id=request_id).order_by(
+            BloodRequestMatch.match_score.desc(),
+            BloodRequestMatch.distance_km.asc()
+        ).all()
+        serialize = BloodRequestMatch.serializer(requested_fields())
+        
+        return respond({
+            'success': True,
+            'count': len(matches),
+            'data': [serialize(match) for match in matches]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @blood_request_bp.route('/<int:request_id>/status', methods=['PUT'])
 def update_status(request_id):
     """Update blood request status"""
@@ -158,21 +218,16 @@ def delete_blood_request(request_id):
 
 @blood_request_bp.route('/urgent', methods=['GET'])
 def get_urgent_requests():
-    """Get urgent and critical blood requests"""
+    """Get urgent and critical blood requests, most urgent first (Critical, then earliest deadline)"""
     try:
-        requests = BloodRequest.query.filter(
-            BloodRequest.status.in_(['Pending', 'Matched']),
-            BloodRequest.urgency.in_(['Critical', 'Urgent']),
-            BloodRequest.required_by >= datetime.utcnow()
-        ).order_by(
-            BloodRequest.urgency.desc(),
-            BloodRequest.required_by.asc()
-        ).limit(20).all()
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        requests = request_queue.top(limit, urgencies=('Critical', 'Urgent'))
+        serialize = BloodRequest.serializer(requested_fields())
         
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(requests),
-            'data': [req.to_dict() for req in requests]
+            'data': [serialize(req) for req in requests]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -9,9 +9,11 @@ import re
 # For live data queries
 from services.ai_matching_service import matching_engine, BLOOD_COMPATIBILITY
 from models.donor import Donor
-from models.blood_bank import BloodBank
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
 from models.hospital import Hospital
 from services.google_maps_service import maps_service
+from services import inventory_aggregates
+from extensions import db
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
@@ -422,18 +424,22 @@ def handle_query():
                         'inventory': []
                     }
                 else:
-                    location = geocode_city(city_text or 'Delhi')
-                    # Map blood type to BloodBank columns
-                    colmap = {
-                        'A+': 'inventory_a_positive','A-': 'inventory_a_negative',
-                        'B+': 'inventory_b_positive','B-': 'inventory_b_negative',
-                        'AB+': 'inventory_ab_positive','AB-': 'inventory_ab_negative',
-                        'O+': 'inventory_o_positive','O-': 'inventory_o_negative'
-                    }
-                    column = colmap.get(blood_type)
+                    # Regional totals first: only scan banks where the city has stock
+                    column = INVENTORY_COLUMNS.get(blood_type)
+                    stocked = inventory_aggregates.breakdown(db.session, 'city', blood_type=blood_type) if column else []
+                    city_key = inventory_aggregates.region_key(city_text)
+                    region = None
+                    if city_key:
+                        region = next((r for r in stocked if r['regionKey'] == city_key), None) or \
+                            next((r for r in stocked if r['regionKey'] in city_key.split() or city_key in r['regionKey']), None)
                     banks = []
-                    if column:
-                        q = BloodBank.query.filter(getattr(BloodBank, column) > 0).all()
+                    if region:
+                        city_units = region['bloodInventory'][blood_type]
+                        location = geocode_city(region['region'])
+                        q = BloodBank.query.filter(
+                            db.func.lower(db.func.trim(BloodBank.city)) == region['regionKey'],
+                            getattr(BloodBank, column) > 0
+                        ).all()
                         for b in q:
                             try:
                                 dist = maps_service.calculate_distance(
@@ -450,15 +456,23 @@ def handle_query():
                                 'available_units': getattr(b, column)
                             })
                         banks.sort(key=lambda x: (x['distance_km'] if x['distance_km'] is not None else 9999))
+                    regions = []
                     if banks:
                         top = banks[:3]
                         lines = [f"• {t['name']} ({t['city']}) - {t['available_units']} units" for t in top]
-                        msg = "Nearby blood bank inventory:\n" + "\n".join(lines)
+                        msg = f"{blood_type} inventory in {region['region']}: {city_units} units\n" + "\n".join(lines)
                     else:
-                        msg = "I couldn't find available units nearby. Try another city or check donors."
+                        regions = stocked[:5]
+                        if regions:
+                            lines = [f"• {r['region']} - {r['bloodInventory'][blood_type]} units in {r['banksWithStock'][blood_type]} bank(s)" for r in regions]
+                            where = f" in {city_text}" if city_text else ''
+                            msg = f"No {blood_type} units{where}. Cities with {blood_type} in stock:\n" + "\n".join(lines)
+                        else:
+                            msg = "I couldn't find available units nearby. Try another city or check donors."
                     enhanced = {
                         'botResponse': msg,
-                        'inventory': banks
+                        'inventory': banks,
+                        'regions': regions
                     }
 
             # Hospital lookup
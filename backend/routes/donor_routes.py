@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.donor import Donor
-from services.google_maps_service import maps_service
+from services.wire_format import respond, requested_fields
+from services.http_cache import conditional
+from services.geo_cache import geo_cache, in_box
 from sqlalchemy import or_
 
 donor_bp = Blueprint('donors', __name__)
@@ -25,11 +27,12 @@ def get_donors():
             query = query.filter(Donor.available_for_donation == (available.lower() == 'true'))
         
         donors = query.limit(limit).all()
+        serialize = Donor.serializer(requested_fields())
         
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(donors),
-            'data': [donor.to_dict() for donor in donors]
+            'data': [serialize(donor) for donor in donors]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -43,7 +46,7 @@ def get_donor(donor_id):
         if not donor:
             return jsonify({'success': False, 'message': 'Donor not found'}), 404
         
-        return jsonify({'success': True, 'data': donor.to_dict()})
+        return respond({'success': True, 'data': donor.to_dict(requested_fields())})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -62,35 +65,24 @@ def find_nearby_donors():
         if not latitude or not longitude:
             return jsonify({'success': False, 'message': 'Latitude and longitude required'}), 400
         
-        # Get all donors (with optional blood type filter)
-        query = Donor.query.filter(Donor.available_for_donation == True)
-        if blood_type:
-            query = query.filter(Donor.blood_type == blood_type)
+        fields = requested_fields()
         
-        donors = query.all()
-        
-        # Calculate distances
-        nearby_donors = []
-        for donor in donors:
-            try:
-                distance = maps_service.calculate_distance(
-                    (latitude, longitude),
-                    (float(donor.latitude), float(donor.longitude))
-                )
-                if distance <= max_distance:
-                    donor_dict = donor.to_dict()
-                    donor_dict['distance'] = distance
-                    nearby_donors.append(donor_dict)
-            except:
-                continue
-        
-        # Sort by distance
-        nearby_donors.sort(key=lambda x: x['distance'])
+        def load(box):
+            # Available donors (with optional blood type filter) around the search
+            query = Donor.query.filter(Donor.available_for_donation == True, *in_box(Donor, box))
+            if blood_type:
+                query = query.filter(Donor.blood_type == blood_type)
+            serialize = Donor.serializer(fields)
+            return [(donor.latitude, donor.longitude, serialize(donor)) for donor in query.order_by(Donor.id)]
         
-        return jsonify({
+        nearby = geo_cache.nearby('donors.nearby', ('donors',), latitude, longitude, max_distance, load,
+                                  {'bloodType': blood_type, 'fields': fields})
+        nearby_donors = [dict(donor_dict, distance=distance) for distance, donor_dict in nearby[:limit]]
+        
+        return respond({
             'success': True,
-            'count': len(nearby_donors[:limit]),
-            'data': nearby_donors[:limit]
+            'count': len(nearby_donors),
+            'data': nearby_donors
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -124,11 +116,12 @@ def search_donors():
             query = query.filter(Donor.available_for_donation == available_bool)
 
         donors = query.limit(limit).all()
+        serialize = Donor.serializer(data.get('fields'))
 
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(donors),
-            'data': [donor.to_dict() for donor in donors]
+            'data': [serialize(donor) for donor in donors]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -223,6 +216,7 @@ def delete_donor(donor_id):
 
 
 @donor_bp.route('/stats/summary', methods=['GET'])
+@conditional('donors')
 def get_donor_stats():
     """Get donor statistics"""
     try:
@@ -1,11 +1,14 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.hospital import Hospital
-from services.google_maps_service import maps_service
+from services.wire_format import respond, requested_fields
+from services.http_cache import conditional
+from services.geo_cache import geo_cache, in_box
 
 hospital_bp = Blueprint('hospitals', __name__)
 
 @hospital_bp.route('/', methods=['GET'])
+@conditional('hospitals')
 def get_hospitals():
     """Get all hospitals with optional filters"""
     try:
@@ -27,11 +30,12 @@ def get_hospitals():
             query = query.filter(Hospital.has_blood_bank == (has_blood_bank.lower() == 'true'))
         
         hospitals = query.limit(limit).all()
+        serialize = Hospital.serializer(requested_fields())
         
-        return jsonify({
+        return respond({
             'success': True,
             'count': len(hospitals),
-            'data': [hospital.to_dict() for hospital in hospitals]
+            'data': [serialize(hospital) for hospital in hospitals]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -45,7 +49,7 @@ def get_hospital(hospital_id):
         if not hospital:
             return jsonify({'success': False, 'message': 'Hospital not found'}), 404
         
-        return jsonify({'success': True, 'data': hospital.to_dict()})
+        return respond({'success': True, 'data': hospital.to_dict(requested_fields())})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -63,30 +67,21 @@ def find_nearby_hospitals():
         if not latitude or not longitude:
             return jsonify({'success': False, 'message': 'Latitude and longitude required'}), 400
         
-        hospitals = Hospital.query.all()
-        
-        # Calculate distances
-        nearby_hospitals = []
-        for hospital in hospitals:
-            try:
-                distance = maps_service.calculate_distance(
-                    (latitude, longitude),
-                    (float(hospital.latitude), float(hospital.longitude))
-                )
-                if distance <= max_distance:
-                    hospital_dict = hospital.to_dict()
-                    hospital_dict['distance'] = distance
-                    nearby_hospitals.append(hospital_dict)
-            except:
-                continue
-        
-        # Sort by distance
-        nearby_hospitals.sort(key=lambda x: x['distance'])
+        fields = requested_fields()
         
-        return jsonify({
+        def load(box):
+            serialize = Hospital.serializer(fields)
+            query = Hospital.query.filter(*in_box(Hospital, box)).order_by(Hospital.id)
+            return [(hospital.latitude, hospital.longitude, serialize(hospital)) for hospital in query]
+        
+        nearby = geo_cache.nearby('hospitals.nearby', ('hospitals',), latitude, longitude, max_distance, load,
+                                  {'fields': fields})
+        nearby_hospitals = [dict(hospital_dict, distance=distance) for distance, hospital_dict in nearby[:limit]]
+        
+        return respond({
             'success': True,
-            'count': len(nearby_hospitals[:limit]),
-            'data': nearby_hospitals[:limit]
+            'count': len(nearby_hospitals),
+            'data': nearby_hospitals
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -2,8 +2,9 @@ from flask import Blueprint, request, jsonify
 from extensions import db
 from models.donor import Donor
 from models.hospital import Hospital
-from models.blood_bank import BloodBank
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
 import services.google_maps_service as gmaps
+from services.geo_cache import geo_cache, in_box
 
 map_bp = Blueprint('map', __name__)
 
@@ -23,9 +24,54 @@ def _calc_distance(origin, destination):
     except Exception:
         return 0
 
+def _donor_marker(donor):
+    return {
+        'id': donor.id,
+        'type': 'donor',
+        'name': donor.name,
+        'bloodType': donor.blood_type,
+        'coordinates': {
+            'latitude': float(donor.latitude),
+            'longitude': float(donor.longitude)
+        },
+        'phone': donor.phone,
+        'rating': float(donor.rating) if donor.rating else 5.0
+    }
+
+
+def _hospital_marker(hospital):
+    return {
+        'id': hospital.id,
+        'type': 'hospital',
+        'name': hospital.name,
+        'hospitalType': hospital.hospital_type,
+        'coordinates': {
+            'latitude': float(hospital.latitude),
+            'longitude': float(hospital.longitude)
+        },
+        'phone': hospital.phone,
+        'emergencyContact': hospital.emergency_contact,
+        'hasBloodBank': hospital.has_blood_bank
+    }
+
+
+def _bank_marker(bank):
+    return {
+        'id': bank.id,
+        'type': 'bloodBank',
+        'name': bank.name,
+        'coordinates': {
+            'latitude': float(bank.latitude),
+            'longitude': float(bank.longitude)
+        },
+        'phone': bank.phone,
+        'inventory': bank.get_inventory()
+    }
+
+
 @map_bp.route('/markers', methods=['POST'])
 def get_markers():
-    """Get all map markers (donors, hospitals, blood banks)"""
+    """Get map markers (donors, hospitals, blood banks): the ``limit`` nearest of each type"""
     try:
         data = request.json
         latitude = data.get('latitude')
@@ -41,96 +87,30 @@ def get_markers():
                 'message': 'Latitude and longitude required'
             }), 400
         
-        results = {
-            'donors': [],
-            'hospitals': [],
-            'bloodBanks': []
-        }
-        
-        # Get donors
-        if 'donors' in include_types:
-            query = Donor.query.filter(Donor.available_for_donation == True)
+        def load_donors(box):
+            query = Donor.query.filter(Donor.available_for_donation == True, *in_box(Donor, box))
             if blood_type:
                 query = query.filter(Donor.blood_type == blood_type)
-            
-            donors = query.limit(limit).all()
-            
-            for donor in donors:
-                try:
-                    distance = _calc_distance(
-                        (latitude, longitude),
-                        (float(donor.latitude), float(donor.longitude))
-                    )
-                    if distance <= max_distance:
-                        results['donors'].append({
-                            'id': donor.id,
-                            'type': 'donor',
-                            'name': donor.name,
-                            'bloodType': donor.blood_type,
-                            'coordinates': {
-                                'latitude': float(donor.latitude),
-                                'longitude': float(donor.longitude)
-                            },
-                            'phone': donor.phone,
-                            'rating': float(donor.rating) if donor.rating else 5.0,
-                            'distance': distance
-                        })
-                except:
-                    continue
+            return [(d.latitude, d.longitude, _donor_marker(d)) for d in query.order_by(Donor.id)]
+        
+        def load_hospitals(box):
+            query = Hospital.query.filter(*in_box(Hospital, box)).order_by(Hospital.id)
+            return [(h.latitude, h.longitude, _hospital_marker(h)) for h in query]
         
-        # Get hospitals
-        if 'hospitals' in include_types:
-            hospitals = Hospital.query.limit(limit).all()
-            
-            for hospital in hospitals:
-                try:
-                    distance = _calc_distance(
-                        (latitude, longitude),
-                        (float(hospital.latitude), float(hospital.longitude))
-                    )
-                    if distance <= max_distance:
-                        results['hospitals'].append({
-                            'id': hospital.id,
-                            'type': 'hospital',
-                            'name': hospital.name,
-                            'hospitalType': hospital.hospital_type,
-                            'coordinates': {
-                                'latitude': float(hospital.latitude),
-                                'longitude': float(hospital.longitude)
-                            },
-                            'phone': hospital.phone,
-                            'emergencyContact': hospital.emergency_contact,
-                            'hasBloodBank': hospital.has_blood_bank,
-                            'distance': distance
-                        })
-                except:
-                    continue
+        def load_banks(box):
+            query = BloodBank.query.filter(*in_box(BloodBank, box)).order_by(BloodBank.id)
+            return [(b.latitude, b.longitude, _bank_marker(b)) for b in query]
         
-        # Get blood banks
-        if 'bloodBanks' in include_types:
-            blood_banks = BloodBank.query.limit(limit).all()
-            
-            for bank in blood_banks:
-                try:
-                    distance = _calc_distance(
-                        (latitude, longitude),
-                        (float(bank.latitude), float(bank.longitude))
-                    )
-                    if distance <= max_distance:
-                        results['bloodBanks'].append({
-                            'id': bank.id,
-                            'type': 'bloodBank',
-                            'name': bank.name,
-                            'coordinates': {
-                                'latitude': float(bank.latitude),
-                                'longitude': float(bank.longitude)
-                            },
-                            'phone': bank.phone,
-                            'inventory': bank.get_inventory(),
-                            'distance': distance
-                        })
-                except:
-                    continue
+        searches = {
+            'donors': ('map.markers.donors', 'donors', load_donors, {'bloodType': blood_type}),
+            'hospitals': ('map.markers.hospitals', 'hospitals', load_hospitals, None),
+            'bloodBanks': ('map.markers.blood_banks', 'blood_banks', load_banks, None)
+        }
+        results = {'donors': [], 'hospitals': [], 'bloodBanks': []}
+        for marker_type, (name, table, load, filters) in searches.items():
+            if marker_type in include_types:
+                nearby = geo_cache.nearby(name, (table,), latitude, longitude, max_distance, load, filters)
+                results[marker_type] = [dict(marker, distance=distance) for distance, marker in nearby[:limit]]
         
         total_markers = len(results['donors']) + len(results['hospitals']) + len(results['bloodBanks'])
         
@@ -260,59 +240,40 @@ def get_heatmap():
                 'message': 'Latitude, longitude, and blood type are required'
             }), 400
         
-        heatmap_data = []
-        
-        # Add donors
-        donors = Donor.query.filter(
-            Donor.blood_type == blood_type,
-            Donor.available_for_donation == True
-        ).all()
+        def load_donors(box):
+            donors = Donor.query.filter(
+                Donor.blood_type == blood_type,
+                Donor.available_for_donation == True,
+                *in_box(Donor, box)
+            ).order_by(Donor.id)
+            return [(donor.latitude, donor.longitude, {
+                'latitude': float(donor.latitude),
+                'longitude': float(donor.longitude),
+                'weight': 1.0
+            }) for donor in donors]
         
-        for donor in donors:
-            try:
-                distance = maps_service.calculate_distance(
-                    (latitude, longitude),
-                    (float(donor.latitude), float(donor.longitude))
-                )
-                if distance <= max_distance:
-                    heatmap_data.append({
-                        'latitude': float(donor.latitude),
-                        'longitude': float(donor.longitude),
-                        'weight': 1.0
-                    })
-            except:
-                continue
+        # Blood banks with weighted intensity
+        column_name = INVENTORY_COLUMNS.get(blood_type)
         
-        # Add blood banks with weighted intensity
-        column_map = {
-            'A+': 'inventory_a_positive', 'A-': 'inventory_a_negative',
-            'B+': 'inventory_b_positive', 'B-': 'inventory_b_negative',
-            'AB+': 'inventory_ab_positive', 'AB-': 'inventory_ab_negative',
-            'O+': 'inventory_o_positive', 'O-': 'inventory_o_negative'
-        }
+        def load_banks(box):
+            blood_banks = BloodBank.query.filter(
+                getattr(BloodBank, column_name) >= 1,
+                *in_box(BloodBank, box)
+            ).order_by(BloodBank.id)
+            return [(bank.latitude, bank.longitude, {
+                'latitude': float(bank.latitude),
+                'longitude': float(bank.longitude),
+                'weight': min(getattr(bank, column_name) / 10.0, 5.0)  # Scale weight
+            }) for bank in blood_banks]
         
-        column_name = column_map.get(blood_type)
+        heatmap_data = [point for _, point in geo_cache.nearby(
+            'map.heatmap.donors', ('donors',), latitude, longitude, max_distance, load_donors,
+            {'bloodType': blood_type})]
         if column_name:
-            blood_banks = BloodBank.query.filter(
-                getattr(BloodBank, column_name) >= 1
-            ).all()
-            
-            for bank in blood_banks:
-                try:
-                    distance = maps_service.calculate_distance(
-                        (latitude, longitude),
-                        (float(bank.latitude), float(bank.longitude))
-                    )
-                    if distance <= max_distance:
-                        inventory = getattr(bank, column_name)
-                        weight = min(inventory / 10.0, 5.0)  # Scale weight
-                        heatmap_data.append({
-                            'latitude': float(bank.latitude),
-                            'longitude': float(bank.longitude),
-                            'weight': weight
-                        })
-                except:
-                    continue
+            # Donors first, then banks, as before; each list is sorted by distance
+            heatmap_data += [point for _, point in geo_cache.nearby(
+                'map.heatmap.blood_banks', ('blood_banks',), latitude, longitude, max_distance, load_banks,
+                {'bloodType': blood_type})]
         
         return jsonify({
             'success': True,
@@ -341,7 +302,7 @@ def get_directions():
         dest_tuple = (destination.get('latitude'), destination.get('longitude'))
 
         # Use maps_service to get directions (may include polyline)
-        directions = maps_service.get_directions(origin_tuple, dest_tuple)
+        directions = gmaps.maps_service.get_directions(origin_tuple, dest_tuple)
 
         # Ensure a route structure: list of {latitude, longitude}
         route = directions.get('polyline') if isinstance(directions, dict) else None
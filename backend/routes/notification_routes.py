@@ -1,6 +1,13 @@
-from flask import Blueprint, request, jsonify
+import json
+import time
+
+from flask import Blueprint, Response, current_app, request, jsonify
 from extensions import db
 from models.blood_request import Notification
+from services import notification_counters, notification_retention
+from services.notification_broker import event_payload, notification_broker
+from services.notification_fanout import Template, enqueue_fanout
+from services.wire_format import respond, requested_fields
 from datetime import datetime
 
 notification_bp = Blueprint('notifications', __name__)
@@ -20,7 +27,11 @@ def get_notifications():
                 'message': 'recipientId is required'
             }), 400
         
-        query = Notification.query.filter_by(recipient_id=int(recipient_id))
+        # Older rows are archived; the bound keeps the scan on recent index entries (and partitions)
+        query = Notification.query.filter(
+            Notification.recipient_id == int(recipient_id),
+            Notification.created_at >= notification_retention.live_since()
+        )
         
         if recipient_type:
             query = query.filter_by(recipient_type=recipient_type)
@@ -29,16 +40,106 @@ def get_notifications():
         
         notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
         
-        unread_count = Notification.query.filter_by(
-            recipient_id=int(recipient_id),
-            read=False
-        ).count()
+        unread_count = notification_counters.unread(db.session, int(recipient_id), recipient_type)
         
-        return jsonify({
+        serialize = Notification.serializer(requested_fields())
+        
+        return respond({
             'success': True,
             'count': len(notifications),
             'unreadCount': unread_count,
-            'data': [notif.to_dict() for notif in notifications]
+            'data': [serialize(notif) for notif in notifications]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@notification_bp.route('/stream', methods=['GET'])
+def stream_notifications():
+    """Server-Sent Events: new notifications of a recipient as they are committed"""
+    subscription = None
+    try:
+        recipient_id = request.args.get('recipientId', type=int)
+        recipient_type = request.args.get('recipientType', 'Donor')
+        if recipient_id is None:
+            return jsonify({'success': False, 'message': 'recipientId is required'}), 400
+        if recipient_type not in Notification.__table__.c.recipient_type.type.enums:
+            return jsonify({'success': False, 'message': 'Invalid recipientType'}), 400
+        last_event_id = request.headers.get('Last-Event-ID', request.args.get('lastEventId'))
+        last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        
+        # Each stream holds a request thread; past the cap, leave the threads to the other routes
+        subscription = notification_broker.subscribe(recipient_type, recipient_id)
+        if subscription is None:
+            retry_after = current_app.config.get('NOTIFICATION_STREAM_RETRY_AFTER', 30)
+            response = jsonify({'success': False, 'message': 'Too many open notification streams; retry later'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 503
+        
+        unread_count = notification_counters.unread(db.session, recipient_id, recipient_type)
+        # Subscribed first, so nothing committed between this read and the live events is lost
+        missed = []
+        if last_event_id is not None:
+            missed = [event_payload(n) for n in Notification.query.filter(
+                Notification.recipient_id == recipient_id,
+                Notification.recipient_type == recipient_type,
+                Notification.id > last_event_id
+            ).order_by(Notification.id).limit(current_app.config.get('NOTIFICATION_STREAM_REPLAY_LIMIT', 100))]
+        # The stream holds no connection: release it before the response starts
+        db.session.close()
+        heartbeat = current_app.config.get('NOTIFICATION_STREAM_HEARTBEAT_SECONDS', 15)
+        max_seconds = current_app.config.get('NOTIFICATION_STREAM_MAX_SECONDS', 300)
+    except Exception as e:
+        if subscription is not None:
+            subscription.close()
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    def message(payload):
+        event_id = f"id: {payload['id']}\n" if payload.get('id') else ''
+        return f"{event_id}event: notification\ndata: {json.dumps(payload)}\n\n"
+    
+    def events():
+        try:
+            yield f"retry: 3000\nevent: unread\ndata: {json.dumps({'unreadCount': unread_count})}\n\n"
+            replayed = 0
+            for payload in missed:
+                replayed = payload['id']
+                yield message(payload)
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                payload = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if payload is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                if payload.get('id') and payload['id'] <= replayed:
+                    continue  # already sent by the replay
+                yield message(payload)
+        finally:
+            subscription.close()
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx: do not buffer the stream
+    })
+
+
+@notification_bp.route('/archive', methods=['GET'])
+def get_archived_notifications():
+    """Archived (older) notifications of a recipient, newest first (?month=YYYY-MM)"""
+    try:
+        recipient_id = request.args.get('recipientId', type=int)
+        if recipient_id is None:
+            return jsonify({'success': False, 'message': 'recipientId is required'}), 400
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        
+        notifications = notification_retention.archived(
+            db.session, recipient_id, request.args.get('recipientType'), request.args.get('month'), limit
+        )
+        
+        return respond({
+            'success': True,
+            'count': len(notifications),
+            'data': notifications
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -52,7 +153,7 @@ def get_notification(notification_id):
         if not notification:
             return jsonify({'success': False, 'message': 'Notification not found'}), 404
         
-        return jsonify({'success': True, 'data': notification.to_dict()})
+        return respond({'success': True, 'data': notification.to_dict(requested_fields())})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -86,6 +187,25 @@ def create_notification():
         return jsonify({'success': False, 'message': str(e)}), 400
 
 
+@notification_bp.route('/fanout', methods=['POST'])
+def fanout_notification():
+    """Send one notification to many recipients in the background (bulk inserts)"""
+    try:
+        data = request.json or {}
+        template = Template.from_dict(data)
+        job = enqueue_fanout(template, data.get('audience'), data.get('chunkSize'))
+        
+        return jsonify({
+            'success': True,
+            'message': 'Notification fan-out queued',
+            'job': {'id': job.id, 'state': job.state, 'statusUrl': f'/api/jobs/{job.id}'}
+        }), 202
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @notification_bp.route('/<int:notification_id>/read', methods=['PUT'])
 def mark_as_read(notification_id):
     """Mark notification as read"""
@@ -120,6 +240,7 @@ def mark_all_as_read(recipient_id):
             'read': True,
             'read_at': datetime.utcnow()
         })
+        notification_counters.reset(db.session, recipient_id)
         
         db.session.commit()
         
@@ -152,12 +273,9 @@ def delete_notification(notification_id):
 
 @notification_bp.route('/count/unread/<int:recipient_id>', methods=['GET'])
 def get_unread_count(recipient_id):
-    """Get unread notification count"""
+    """Get unread notification count (counter lookup, ?recipientType= to narrow)"""
     try:
-        count = Notification.query.filter_by(
-            recipient_id=recipient_id,
-            read=False
-        ).count()
+        count = notification_counters.unread(db.session, recipient_id, request.args.get('recipientType'))
         
         return jsonify({
             'success': True,
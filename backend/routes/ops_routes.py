@@ -0,0 +1,165 @@
+"""
+Ops Routes - cache statistics, background jobs and other operational endpoints
+"""
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from services.background_jobs import job_runner
+from services.geo_cache import geo_cache
+from services.http_cache import response_cache
+from services.instrumentation import registry as metrics_registry
+from services.notification_broker import notification_broker
+from services.profiler import authorized as profiler_authorized, profiler
+from services.query_inspector import query_inspector
+from services.request_expiry import sweep_metrics
+from services.request_queue import request_queue
+from services.scheduler import scheduler
+
+ops_bp = Blueprint('ops', __name__)
+
+
+def _forbidden(action):
+    """403 response unless the request carries the ops token (PROFILER_TOKEN), else None"""
+    if not profiler_authorized(current_app.config, request.headers.get('X-Profiler-Token')):
+        return jsonify({'success': False, 'message': f'{action} needs a valid X-Profiler-Token'}), 403
+    return None
+
+
+@ops_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss/eviction counters for the response caches"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                'conditional': response_cache.stats(),
+                'geo': geo_cache.stats()
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/scheduler/jobs', methods=['GET'])
+def scheduler_jobs():
+    """Periodic jobs of this worker with their last run"""
+    try:
+        return jsonify({'success': True, 'data': scheduler.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/scheduler/jobs/<string:name>/run', methods=['POST'])
+def run_scheduler_job(name):
+    """Run a periodic job now, in this request"""
+    forbidden = _forbidden('Running jobs')
+    if forbidden:
+        return forbidden
+    try:
+        if name not in scheduler.jobs:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        result = scheduler.run_now(name)
+        job = scheduler.jobs[name]
+        if job.last_error:
+            return jsonify({'success': False, 'message': job.last_error}), 500
+        return jsonify({'success': True, 'data': job.to_dict(), 'result': result})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/jobs', methods=['GET'])
+def background_jobs():
+    """Recent background jobs of this worker (?kind=match_request&limit=50)"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': job_runner.stats(request.args.get('kind'), request.args.get('limit', 50, type=int))
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def background_job(job_id):
+    """Status, progress and result of a background job"""
+    try:
+        job = job_runner.get(job_id)
+        if job is None:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': job})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/request-queue/stats', methods=['GET'])
+def request_queue_stats():
+    """Size and sync state of this worker's open blood request queue"""
+    try:
+        return jsonify({'success': True, 'data': request_queue.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/request-expiry/stats', methods=['GET'])
+def request_expiry_stats():
+    """Expired/notified counts and sweep durations of this worker"""
+    try:
+        return jsonify({'success': True, 'data': sweep_metrics.to_dict()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/notifications/streams', methods=['GET'])
+def notification_streams():
+    """Open notification streams of this worker and published/delivered/dropped events"""
+    try:
+        return jsonify({'success': True, 'data': notification_broker.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/queries/report', methods=['GET'])
+def query_report():
+    """N+1 patterns and slow queries (with plans and parameters) seen by this worker"""
+    forbidden = _forbidden('The query report')
+    if forbidden:
+        return forbidden
+    try:
+        return jsonify({'success': True, 'data': query_inspector.report()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/profile', methods=['GET'])
+def profile():
+    """Sample this worker (or the threads serving ``route``) for ``seconds``; collapsed stacks or speedscope JSON"""
+    forbidden = _forbidden('Profiling')
+    if forbidden:
+        return forbidden
+    config = current_app.config
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), config.get('PROFILER_MAX_SECONDS', 60))
+        interval = max(float(request.args.get('interval_ms', config.get('PROFILER_INTERVAL_MS', 5))), 1.0) / 1000
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seconds and interval_ms must be numbers'}), 400
+    output = request.args.get('format', 'collapsed')
+    if output not in ('collapsed', 'speedscope'):
+        return jsonify({'success': False, 'message': 'format must be collapsed or speedscope'}), 400
+    if seconds <= 0:
+        return jsonify({'success': False, 'message': 'seconds must be positive'}), 400
+    try:
+        result = profiler.run(seconds, interval, route=request.args.get('route') or None,
+                              include_idle=request.args.get('idle', 'false').lower() == 'true')
+        if result is None:
+            return jsonify({'success': False, 'message': 'A profile is already running on this worker'}), 409
+        headers = {'X-Profile-Samples': str(result.samples), 'X-Profile-Seconds': f'{result.duration:.3f}'}
+        if output == 'speedscope':
+            return jsonify(result.speedscope()), 200, headers
+        return Response(result.collapsed(), mimetype='text/plain', headers=headers)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@ops_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics of this worker: route latency histograms, SQL counts/time, phases"""
+    return Response(metrics_registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -1,72 +1,73 @@
 """
 Seed Routes - Web-accessible database seeding endpoint
 """
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, request
 from extensions import db
-from models.donor import Donor
-from models.blood_bank import BloodBank
-from models.hospital import Hospital
-from models.blood_request import BloodRequest
-from models.notification import Notification
+from services import database_seeding
+from services.background_jobs import job_runner
 
 seed_bp = Blueprint('seed', __name__)
 
-@seed_bp.route('/seed-database', methods=['GET'])
+
+def _job_link(job_id):
+    # The job may live in another worker; its status is there (or in the shared store)
+    status = job_runner.get(job_id) if job_id else None
+    return {
+        'id': job_id,
+        'state': status['state'] if status else 'running',
+        'statusUrl': f'/api/jobs/{job_id}' if job_id else None
+    }
+
+
+@seed_bp.route('/seed-database', methods=['GET', 'POST'])
 def seed_database_endpoint():
     """
     Web-accessible endpoint to seed the database with initial data.
     Visit: https://your-backend.onrender.com/api/seed-database
+
+    Seeding runs as a background job; poll the returned statusUrl for
+    progress. It writes the curated demo dataset; ?synthetic=true writes a
+    generated one instead, sized with ?donors=&hospitals=&blood_banks=
+    &blood_requests=&notifications= (up to SEED_MAX_ROWS each). ?seed= fixes
+    the random choices.
     """
     try:
+        seed_counts = None
+        if request.args.get('synthetic', '').lower() in ('1', 'true', 'yes'):
+            limit = current_app.config.get('SEED_MAX_ROWS', 200000)
+            seed_counts = {}
+            for table, default in database_seeding.SEED_COUNTS.items():
+                value = request.args.get(table, default, type=int)
+                if value < 0 or value > limit:
+                    return jsonify({'status': 'error', 'message': f'{table} must be between 0 and {limit}'}), 400
+                seed_counts[table] = value
+
+        running = database_seeding.current_lock(db.session)
+        if running is not None:
+            return jsonify({
+                'status': 'in_progress',
+                'message': 'Database seeding is already running.',
+                'job': _job_link(running.job_id)
+            }), 202
+
         # Check if already seeded
-        donor_count = Donor.query.count()
-        if donor_count > 0:
+        current_counts = database_seeding.counts(db.session)
+        if current_counts['donors'] > 0:
             return jsonify({
                 'status': 'already_seeded',
                 'message': 'Database already contains data. Clear it first if you want to re-seed.',
-                'current_counts': {
-                    'donors': donor_count,
-                    'blood_banks': BloodBank.query.count(),
-                    'hospitals': Hospital.query.count(),
-                    'blood_requests': BloodRequest.query.count(),
-                    'notifications': Notification.query.count()
-                }
+                'current_counts': current_counts
             }), 200
 
-        # Use subprocess to run seed script to avoid import issues
-        import subprocess
-        import os
-        backend_dir = os.path.dirname(os.path.dirname(__file__))
-        seed_script = os.path.join(backend_dir, 'seed_database.py')
-        
-        result = subprocess.run(
-            ['python', seed_script],
-            cwd=backend_dir,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        
-        if result.returncode == 0:
-            return jsonify({
-                'status': 'success',
-                'message': 'Database seeded successfully!',
-                'output': result.stdout,
-                'counts': {
-                    'donors': Donor.query.count(),
-                    'blood_banks': BloodBank.query.count(),
-                    'hospitals': Hospital.query.count(),
-                    'blood_requests': BloodRequest.query.count(),
-                    'notifications': Notification.query.count()
-                }
-            }), 200
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'Failed to seed database',
-                'error': result.stderr
-            }), 500
-        
+        job_id, created = database_seeding.enqueue_seeding(db.session, seed_counts, seed=request.args.get('seed', type=int))
+        return jsonify({
+            'status': 'accepted' if created else 'in_progress',
+            'message': 'Database seeding started.' if created else 'Database seeding is already running.',
+            'dataset': 'synthetic' if seed_counts is not None else 'demo',
+            'counts': seed_counts,
+            'job': _job_link(job_id)
+        }), 202
+
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -74,27 +75,27 @@ def seed_database_endpoint():
         }), 500
 
 
-@seed_bp.route('/clear-database', methods=['GET'])
+@seed_bp.route('/clear-database', methods=['GET', 'POST'])
 def clear_database():
     """
     Clear all data from the database.
     Visit: https://your-backend.onrender.com/api/clear-database
     """
     try:
-        # Delete all records
-        Notification.query.delete()
-        BloodRequest.query.delete()
-        BloodBank.query.delete()
-        Hospital.query.delete()
-        Donor.query.delete()
-        
-        db.session.commit()
-        
+        tables = database_seeding.clear(db.session)
+
         return jsonify({
             'status': 'success',
-            'message': 'Database cleared successfully!'
+            'message': 'Database cleared successfully!',
+            'tables': tables
         }), 200
-        
+
+    except database_seeding.SeedingInProgress as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'job': _job_link(e.job_id)
+        }), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -1,11 +1,28 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.donor import Donor
-from models.blood_bank import BloodBank
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
 from services.ai_matching_service import matching_engine, BLOOD_COMPATIBILITY
+from services.wire_format import respond
+from services.geo_cache import geo_cache, in_box
 
 smart_match_bp = Blueprint('smart_match', __name__)
 
+
+def _nearby_donor_dicts(compatible_types, location, max_distance):
+    """``to_dict()`` of the available compatible donors within ``max_distance`` km"""
+    def load(box):
+        donors = Donor.query.filter(
+            Donor.blood_type.in_(compatible_types),
+            Donor.available_for_donation == True,
+            *in_box(Donor, box)
+        ).order_by(Donor.id)
+        return [(donor.latitude, donor.longitude, donor.to_dict()) for donor in donors]
+    
+    nearby = geo_cache.nearby('smart_match.donors', ('donors',), location['latitude'], location['longitude'],
+                              max_distance, load, {'bloodTypes': sorted(compatible_types)})
+    return [donor_dict for _, donor_dict in nearby]
+
 @smart_match_bp.route('/find-donors', methods=['POST'])
 def find_donors():
     """AI-powered donor matching using IBDMA algorithm"""
@@ -38,14 +55,8 @@ def find_donors():
                 'longitude': float(location['longitude'])
             }
         
-        # Query donors
-        donors = Donor.query.filter(
-            Donor.blood_type.in_(compatible_types),
-            Donor.available_for_donation == True
-        ).all()
-        
-        # Convert to dict for matching engine
-        donor_dicts = [donor.to_dict() for donor in donors]
+        # Donors within range, as dicts for the matching engine
+        donor_dicts = _nearby_donor_dicts(compatible_types, request_location, float(max_distance))
         
         # Use AI matching engine
         matches = matching_engine.find_best_matches(
@@ -55,11 +66,6 @@ def find_donors():
             blood_type,
             limit
         )
-        # Filter by max distance if provided
-        try:
-            matches = [m for m in matches if float(m.get('distance', 9999)) <= float(max_distance)]
-        except Exception:
-            pass
 
         # Transform to frontend-friendly schema
         transformed = []
@@ -126,49 +132,34 @@ def find_blood_banks():
                 'longitude': float(location['longitude'])
             }
         
-        # Map blood type to column
-        column_map = {
-            'A+': 'inventory_a_positive',
-            'A-': 'inventory_a_negative',
-            'B+': 'inventory_b_positive',
-            'B-': 'inventory_b_negative',
-            'AB+': 'inventory_ab_positive',
-            'AB-': 'inventory_ab_negative',
-            'O+': 'inventory_o_positive',
-            'O-': 'inventory_o_negative'
-        }
-        
-        column_name = column_map.get(blood_type)
+        column_name = INVENTORY_COLUMNS.get(blood_type)
         if not column_name:
             return jsonify({'success': False, 'message': 'Invalid blood type'}), 400
         
-        blood_banks = BloodBank.query.filter(
-            getattr(BloodBank, column_name) >= min_units
-        ).all()
-        
-        # Calculate distances and sort
-        from services.google_maps_service import maps_service
-        results = []
-        for bank in blood_banks:
-            try:
-                distance = maps_service.calculate_distance(
-                    (norm_location['latitude'], norm_location['longitude']),
-                    (float(bank.latitude), float(bank.longitude))
-                )
-                if distance <= max_distance:
-                    bank_dict = bank.to_dict()
-                    bank_dict['distance'] = distance
-                    bank_dict['availableUnits'] = getattr(bank, column_name)
-                    results.append(bank_dict)
-            except:
-                continue
-        
-        results.sort(key=lambda x: x['distance'])
-        
-        return jsonify({
+        fields = data.get('fields')
+        serialize = BloodBank.serializer(fields)
+        
+        def load(box):
+            blood_banks = BloodBank.query.filter(
+                getattr(BloodBank, column_name) >= min_units,
+                *in_box(BloodBank, box)
+            ).order_by(BloodBank.id)
+            candidates = []
+            for bank in blood_banks:
+                bank_dict = serialize(bank)
+                bank_dict['availableUnits'] = getattr(bank, column_name)
+                candidates.append((bank.latitude, bank.longitude, bank_dict))
+            return candidates
+        
+        nearby = geo_cache.nearby('smart_match.find_blood_banks', ('blood_banks',), norm_location['latitude'],
+                                  norm_location['longitude'], max_distance, load,
+                                  {'bloodType': blood_type, 'minUnits': min_units, 'fields': fields})
+        results = [dict(bank_dict, distance=distance) for distance, bank_dict in nearby[:limit]]
+        
+        return respond({
             'success': True,
-            'count': len(results[:limit]),
-            'data': results[:limit]
+            'count': len(results),
+            'data': results
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -205,46 +196,30 @@ def comprehensive_search():
         
         # Find donors
         compatible_types = BLOOD_COMPATIBILITY.get(blood_type, [blood_type])
-        donors = Donor.query.filter(
-            Donor.blood_type.in_(compatible_types),
-            Donor.available_for_donation == True
-        ).all()
-        
-        donor_dicts = [donor.to_dict() for donor in donors]
+        donor_dicts = _nearby_donor_dicts(compatible_types, norm_location, max_distance)
         donor_matches = matching_engine.find_best_matches(
             donor_dicts, norm_location, urgency, blood_type, 10
         )
         
         # Find blood banks
-        column_map = {
-            'A+': 'inventory_a_positive', 'A-': 'inventory_a_negative',
-            'B+': 'inventory_b_positive', 'B-': 'inventory_b_negative',
-            'AB+': 'inventory_ab_positive', 'AB-': 'inventory_ab_negative',
-            'O+': 'inventory_o_positive', 'O-': 'inventory_o_negative'
-        }
-        
-        column_name = column_map.get(blood_type)
-        blood_banks = BloodBank.query.filter(
-            getattr(BloodBank, column_name) >= units_required
-        ).all() if column_name else []
-        
-        from services.google_maps_service import maps_service
-        bank_results = []
-        for bank in blood_banks:
-            try:
-                distance = maps_service.calculate_distance(
-                    (norm_location['latitude'], norm_location['longitude']),
-                    (float(bank.latitude), float(bank.longitude))
-                )
-                if distance <= max_distance:
-                    bank_dict = bank.to_dict()
-                    bank_dict['distance'] = distance
-                    bank_dict['availableUnits'] = getattr(bank, column_name)
-                    bank_results.append(bank_dict)
-            except:
-                continue
-        
-        bank_results.sort(key=lambda x: x['distance'])
+        column_name = INVENTORY_COLUMNS.get(blood_type)
+        
+        def load_banks(box):
+            blood_banks = BloodBank.query.filter(
+                getattr(BloodBank, column_name) >= units_required,
+                *in_box(BloodBank, box)
+            ).order_by(BloodBank.id)
+            candidates = []
+            for bank in blood_banks:
+                bank_dict = bank.to_dict()
+                bank_dict['availableUnits'] = getattr(bank, column_name)
+                candidates.append((bank.latitude, bank.longitude, bank_dict))
+            return candidates
+        
+        bank_results = [dict(bank_dict, distance=distance) for distance, bank_dict in geo_cache.nearby(
+            'smart_match.comprehensive_search.blood_banks', ('blood_banks',), norm_location['latitude'],
+            norm_location['longitude'], max_distance, load_banks,
+            {'bloodType': blood_type, 'unitsRequired': units_required})] if column_name else []
         
         return jsonify({
             'success': True,
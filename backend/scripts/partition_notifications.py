@@ -0,0 +1,50 @@
+"""
+Partition the notifications table by month (PostgreSQL).
+
+Usage:
+  python -m scripts.partition_notifications            # convert, then archive old rows
+  python -m scripts.partition_notifications --status   # list the partitions
+
+Renames the table, creates a RANGE (created_at) partitioned table with one
+partition per month since the oldest row (plus NOTIFICATION_PARTITION_MONTHS_AHEAD
+months and a default partition), copies every row and drops the old table, in
+one transaction. Stop notification traffic while it runs. Afterwards the
+notification_retention job keeps partitions ahead and drops empty old ones.
+On SQLite and MySQL the table is bounded by archival alone.
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app import create_app
+from extensions import db
+from services import notification_retention
+
+
+def run(status=False):
+    app = create_app()
+    with app.app_context():
+        if not status:
+            created = notification_retention.partition_postgres(
+                db.session, months_ahead=app.config.get('NOTIFICATION_PARTITION_MONTHS_AHEAD', 2)
+            )
+            print(f"Created {created} partition(s)." if created else "notifications is already partitioned.")
+            result = notification_retention.run(db.session)
+            print(f"Archived {result['archived']} notification(s) into {result['archives']} archive row(s).")
+        if not notification_retention.is_partitioned(db.session):
+            print("notifications is not partitioned.")
+            return
+        rows = db.session.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'notifications' ORDER BY c.relname"
+        )).all()
+        for name, bound, estimate in rows:
+            print(f"{name}: {bound} (~{max(estimate, 0)} rows)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Partition the notifications table by month (PostgreSQL)')
+    parser.add_argument('--status', action='store_true', help='Only list the partitions')
+    args = parser.parse_args()
+    run(args.status)
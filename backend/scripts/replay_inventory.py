@@ -0,0 +1,60 @@
+"""
+Rebuild blood bank inventory from the ledger (inventory_events).
+
+Usage:
+  python -m scripts.replay_inventory                # report drift
+  python -m scripts.replay_inventory --full         # ignore snapshots, fold every event
+  python -m scripts.replay_inventory --bank 12 --apply
+  python -m scripts.replay_inventory --opening      # record opening balances first
+  python -m scripts.replay_inventory --snapshot     # fold committed events into snapshots
+  python -m scripts.replay_inventory --aggregates   # rebuild the global/city/state totals
+
+Drift means the inventory columns on blood_banks disagree with the ledger,
+e.g. after a write that bypassed it. --apply overwrites the columns with the
+replayed values; pause inventory traffic while it runs.
+"""
+import argparse
+
+from app import create_app
+from extensions import db
+from services import inventory_aggregates, inventory_ledger
+
+
+def run(bank_ids=None, full=False, apply=False, opening=False, snapshot=False, aggregates=False):
+    app = create_app()
+    with app.app_context():
+        if opening:
+            count = inventory_ledger.record_opening_balances(db.session)
+            db.session.commit()
+            print(f"Recorded {count} opening balance event(s).")
+        if snapshot:
+            result = inventory_ledger.take_snapshots(db.session)
+            print(f"Updated {result['snapshots']} snapshot(s) up to event {result['uptoEventId']}.")
+        if aggregates:
+            rows = inventory_aggregates.rebuild(db.session)
+            db.session.commit()
+            print(f"Rebuilt {rows} inventory aggregate row(s).")
+
+        drift = inventory_ledger.verify(db.session, bank_ids, use_snapshots=not full)
+        if not drift:
+            print("Inventory matches the ledger.")
+            return
+        for bank_id, diff in sorted(drift.items()):
+            changes = ', '.join(f"{t}: {stored} -> {replayed}" for t, (stored, replayed) in diff.items())
+            print(f"Bank {bank_id}: {changes}")
+        print(f"{len(drift)} bank(s) drifted from the ledger.")
+        if apply:
+            repaired = inventory_ledger.repair(db.session, drift)
+            print(f"Repaired {repaired} bank(s).")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay the inventory ledger')
+    parser.add_argument('--bank', type=int, action='append', help='Blood bank id (repeatable)')
+    parser.add_argument('--full', action='store_true', help='Replay from the first event, ignoring snapshots')
+    parser.add_argument('--apply', action='store_true', help='Overwrite drifted inventory columns')
+    parser.add_argument('--opening', action='store_true', help='Record opening balances for banks without events')
+    parser.add_argument('--snapshot', action='store_true', help='Take snapshots before replaying')
+    parser.add_argument('--aggregates', action='store_true', help='Rebuild the inventory totals from the banks')
+    args = parser.parse_args()
+    run(args.bank, args.full, args.apply, args.opening, args.snapshot, args.aggregates)
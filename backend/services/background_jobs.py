@@ -0,0 +1,208 @@
+"""
+Background jobs with a status registry
+
+``job_runner.submit(kind, func, *args)`` queues ``func(job, *args)`` for
+a pool of BACKGROUND_JOB_WORKERS threads, which run it inside an
+application context, and returns at once; the caller hands ``job.id`` to
+the client, which polls /api/jobs/<id>. Jobs report progress with
+``job.update(...)``. Queued jobs are dispatched by ``priority`` (lowest
+first, then submission order), e.g. matching jobs in blood request
+urgency order (services.request_queue).
+
+Statuses are kept per process (the last BACKGROUND_JOB_HISTORY finished
+jobs) and mirrored to Redis when REDIS_URL is configured, so any worker
+can answer a status poll. CPU-bound stages fan out to ``process_pool()``,
+a process pool sized to the machine's cores (BACKGROUND_JOB_PROCESSES).
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, has_app_context
+
+from services import shared_store
+
+STATES = ('queued', 'running', 'succeeded', 'failed')
+DEFAULT_PRIORITY = (5,)
+
+
+class Job:
+    """Status of one submitted job"""
+
+    def __init__(self, kind, runner, priority=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.priority = tuple(priority) if priority is not None else DEFAULT_PRIORITY
+        self.state = 'queued'
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._runner = runner
+
+    def update(self, **progress):
+        """Merge progress counters (e.g. ``stage='scoring', scored=500``)"""
+        self.progress.update(progress)
+        self._runner._publish(self)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'priority': list(self.priority),
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'durationMs': round((self.finished_at - self.started_at) * 1000, 2)
+            if self.finished_at and self.started_at else None
+        }
+
+
+class JobRunner:
+    def __init__(self):
+        self.app = None
+        self.workers = 4
+        self.processes = None
+        self.history = 500
+        self.status_ttl = 3600
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._threads = []
+        self._process_pool = None
+        self.counts = {'submitted': 0, 'succeeded': 0, 'failed': 0}
+
+    def _ensure_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'job-{len(self._threads)}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def _work(self):
+        while True:
+            _, _, app, job, func, args, kwargs = self._queue.get()
+            try:
+                self._run(app, job, func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def process_pool(self):
+        """Shared process pool for CPU-bound work (created on first use)"""
+        with self._lock:
+            if self._process_pool is None:
+                # spawn: children must not inherit the scheduler's threads or DB connections
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes or os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._process_pool
+
+    def submit(self, kind, func, *args, priority=None, **kwargs):
+        """Queue ``func(job, *args, **kwargs)``; returns the Job"""
+        job = Job(kind, self, priority)
+        with self._lock:
+            self._jobs[job.id] = job
+            self.counts['submitted'] += 1
+        self._publish(job)
+        app = current_app._get_current_object() if has_app_context() else self.app
+        self._ensure_workers()
+        self._queue.put((job.priority, next(self._sequence), app, job, func, args, kwargs))
+        return job
+
+    def _run(self, app, job, func, args, kwargs):
+        job.state = 'running'
+        job.started_at = time.time()
+        self._publish(job)
+        try:
+            with app.app_context():
+                job.result = func(job, *args, **kwargs)
+            job.state = 'succeeded'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            print(f"⚠️  Background job {job.kind} {job.id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self.counts[job.state] += 1
+                self._trim()
+            self._publish(job)
+
+    def _trim(self):
+        finished = [j for j in self._jobs.values() if j.finished_at]
+        for job in finished[:max(len(finished) - self.history, 0)]:
+            self._jobs.pop(job.id, None)
+
+    def _publish(self, job):
+        client = shared_store.get_client()
+        if client is None:
+            return
+        try:
+            client.setex(shared_store.key('job', job.id), self.status_ttl, json.dumps(job.to_dict(), default=str))
+        except Exception as e:
+            print(f"⚠️  Shared job status update failed: {e}")
+
+    def get(self, job_id):
+        """Status dict of a job from this process or, failing that, the shared store"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                payload = client.get(shared_store.key('job', job_id))
+                return json.loads(payload) if payload else None
+            except Exception:
+                pass
+        return None
+
+    def wait(self, job_id, timeout=None):
+        """Block until a local job finishes (scripts and tests); returns its status"""
+        deadline = time.time() + timeout if timeout else None
+        job = self._jobs.get(job_id)
+        while job is not None and not job.finished_at:
+            if deadline and time.time() > deadline:
+                break
+            time.sleep(0.01)
+        return self.get(job_id)
+
+    def stats(self, kind=None, limit=50):
+        with self._lock:
+            jobs = [j for j in reversed(self._jobs.values()) if kind is None or j.kind == kind]
+            active = sum(1 for j in self._jobs.values() if not j.finished_at)
+        return {
+            'workers': self.workers,
+            'processes': self.processes or os.cpu_count(),
+            'active': active,
+            'queued': self._queue.qsize(),
+            'counts': dict(self.counts),
+            'jobs': [j.to_dict() for j in jobs[:limit]]
+        }
+
+
+job_runner = JobRunner()
+
+
+def init_background_jobs(app):
+    """Bind the runner to the app and size its pools"""
+    job_runner.app = app
+    job_runner.workers = app.config.get('BACKGROUND_JOB_WORKERS', 4)
+    job_runner.processes = app.config.get('BACKGROUND_JOB_PROCESSES') or None
+    job_runner.history = app.config.get('BACKGROUND_JOB_HISTORY', 500)
+    job_runner.status_ttl = app.config.get('BACKGROUND_JOB_STATUS_TTL', 3600)
+    return job_runner
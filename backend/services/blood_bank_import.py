@@ -0,0 +1,455 @@
+"""
+Streaming blood bank CSV import
+
+The file is read in chunks of ``batch_size`` rows with the csv module; each
+chunk is parsed column by column (one pass per field over the whole chunk),
+validated, and upserted with a single executemany
+``INSERT ... ON CONFLICT DO UPDATE`` per key, then committed. Memory stays
+flat whatever the file size, and a bad row is rejected on its own instead
+of aborting the import.
+
+Rows are matched to existing banks by license number when they have one
+(upserted on ``uq_blood_banks_license_number``). Rows without a license are
+looked up by name + pincode: one match is updated, none is inserted, and a
+name shared by several banks in the pincode is rejected as ambiguous (name +
+pincode is not unique, so there is no conflict target for it). An update refreshes the directory fields
+(contact, address, position, hours) but never the stock: once a bank
+exists its inventory belongs to the ledger. New banks get their opening
+ledger events and the inventory aggregates are rebuilt when the import
+finishes, since the Core inserts bypass the mapper hooks.
+
+Rows without coordinates go through the ``geocoder`` (services.geocoding)
+batch by batch when one is given, and are rejected otherwise.
+
+Rejected rows are written, with their line number and reason, to a CSV
+report next to the input.
+"""
+import csv
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from services import inventory_aggregates, inventory_ledger
+from services.change_tracker import mark_changed
+from services.geocoding import normalize_address
+
+DEFAULT_BATCH_SIZE = 2000
+
+# Model field -> CSV header candidates, exact matches first, then substrings
+COLUMN_ALIASES = {
+    'name': ('name', 'blood_bank_name', 'hospital_name'),
+    'latitude': ('latitude', 'lat', 'lattitude', 'geo_lat'),
+    'longitude': ('longitude', 'lon', 'lng', 'long', 'geo_lon'),
+    'phone': ('phone', 'phone_number', 'contact', 'mobile'),
+    'email': ('email', 'email_id', 'contact_email'),
+    'city': ('city', 'town', 'district'),
+    'state': ('state', 'region'),
+    'street': ('street', 'address', 'address_line'),
+    'pincode': ('pincode', 'pin', 'zipcode', 'postalcode'),
+    'license_number': ('license_number', 'licence_number', 'license_no', 'licence_no', 'license', 'licence'),
+    'operating_hours_weekdays': ('operating_hours_weekdays', 'weekday_hours'),
+    'operating_hours_weekends': ('operating_hours_weekends', 'weekend_hours'),
+    'inventory_a_positive': ('a_pos', 'a_positive', 'a+', 'a_positive_inventory'),
+    'inventory_a_negative': ('a_neg', 'a_negative', 'a-'),
+    'inventory_b_positive': ('b_pos', 'b_positive', 'b+'),
+    'inventory_b_negative': ('b_neg', 'b_negative', 'b-'),
+    'inventory_ab_positive': ('ab_pos', 'ab_positive', 'ab+'),
+    'inventory_ab_negative': ('ab_neg', 'ab_negative', 'ab-'),
+    'inventory_o_positive': ('o_pos', 'o_positive', 'o+'),
+    'inventory_o_negative': ('o_neg', 'o_negative', 'o-')
+}
+
+# Refreshed when an existing bank is imported again (stock is not)
+UPDATE_FIELDS = ('latitude', 'longitude', 'street', 'city', 'state', 'phone', 'email',
+                 'operating_hours_weekdays', 'operating_hours_weekends')
+
+_PINCODE = re.compile(r'^[1-9][0-9]{5}$')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_SPACES = re.compile(r'\s+')
+
+
+def resolve_columns(header):
+    """Model field -> column index for a CSV header row"""
+    keys = [k.strip().lower() for k in header]
+    columns = {}
+    for field, candidates in COLUMN_ALIASES.items():
+        taken = set(columns.values())
+        found = next((keys.index(c) for c in candidates if c in keys and keys.index(c) not in taken), None)
+        if found is None:
+            found = next((i for c in candidates for i, k in enumerate(keys) if c in k and i not in taken), None)
+        if found is not None:
+            columns[field] = found
+    return columns
+
+
+def read_chunks(fh, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield ``(header, [(line, row), ...])`` chunks of a CSV file object"""
+    reader = csv.reader(fh)
+    header = next(reader, None)
+    if header is None:
+        return
+    chunk = []
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= batch_size:
+            yield header, chunk
+            chunk = []
+    if chunk:
+        yield header, chunk
+
+
+def _column(rows, index):
+    if index is None:
+        return [''] * len(rows)
+    return [row[index].strip() if index < len(row) else '' for row in rows]
+
+
+def _float(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return False
+
+
+def _count(value):
+    if not value:
+        return 0
+    try:
+        return int(float(value))
+    except ValueError:
+        return False
+
+
+def parse_chunk(chunk, columns, now=None):
+    """Validate one chunk; returns ``(records, rejects)``.
+
+    Each field is extracted and checked for the whole chunk at once; a row
+    collects every problem before it is rejected. Records missing their
+    coordinates carry ``latitude``/``longitude`` None; ``locate()`` decides
+    what happens to them.
+    """
+    now = now or datetime.utcnow()
+    lines = [line for line, _ in chunk]
+    rows = [row for _, row in chunk]
+    values = {field: _column(rows, columns.get(field)) for field in COLUMN_ALIASES}
+    problems = [[] for _ in rows]
+
+    names = [_SPACES.sub(' ', name) for name in values['name']]
+    for i, name in enumerate(names):
+        if not name:
+            problems[i].append('missing name')
+        elif len(name) > 200:
+            problems[i].append('name longer than 200 characters')
+
+    latitudes = list(map(_float, values['latitude']))
+    longitudes = list(map(_float, values['longitude']))
+    for i, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        if lat is False or lon is False:
+            problems[i].append('unparseable coordinates')
+        elif lat is not None and not -90 <= lat <= 90 or lon is not None and not -180 <= lon <= 180:
+            problems[i].append('coordinates out of range')
+        elif lat == 0 and lon == 0:
+            latitudes[i] = longitudes[i] = None
+
+    pincodes = [p.replace(' ', '') for p in values['pincode']]
+    for i, pincode in enumerate(pincodes):
+        if pincode and not _PINCODE.match(pincode):
+            problems[i].append(f'invalid pincode {pincode!r}')
+
+    licenses = [_SPACES.sub(' ', value).upper() for value in values['license_number']]
+    for i, license_number in enumerate(licenses):
+        if not license_number and not pincodes[i]:
+            problems[i].append('no license number or pincode to match on')
+        elif len(license_number) > 50:
+            problems[i].append('license number longer than 50 characters')
+
+    emails = values['email']
+    for i, email in enumerate(emails):
+        if email and not _EMAIL.match(email):
+            emails[i] = ''
+
+    stock = {field: list(map(_count, values[field])) for field in INVENTORY_COLUMNS.values()}
+    for field, counts in stock.items():
+        for i, count in enumerate(counts):
+            if count is False or count < 0:
+                problems[i].append(f'invalid {field}')
+
+    records, rejects = [], []
+    for i, row in enumerate(rows):
+        if problems[i]:
+            rejects.append((lines[i], row, '; '.join(problems[i])))
+            continue
+        record = {
+            'name': names[i],
+            'latitude': latitudes[i],
+            'longitude': longitudes[i],
+            'street': values['street'][i][:200] or None,
+            'city': values['city'][i][:100] or None,
+            'state': values['state'][i][:100] or None,
+            'pincode': pincodes[i] or None,
+            'country': 'India',
+            'phone': values['phone'][i][:20] or 'N/A',
+            'email': emails[i][:100] or None,
+            'license_number': licenses[i] or None,
+            'verified': True,
+            'last_inventory_update': now,
+            'created_at': now,
+            'updated_at': now,
+            '_line': lines[i],
+            '_row': row
+        }
+        for hours in ('operating_hours_weekdays', 'operating_hours_weekends'):
+            if hours in columns:
+                record[hours] = values[hours][i][:50] or BloodBank.__table__.c[hours].default.arg
+        for field, counts in stock.items():
+            record[field] = counts[i]
+        records.append(record)
+    return records, rejects
+
+
+def _key(record):
+    if record['license_number']:
+        return ('license', record['license_number'])
+    return ('name_pincode', record['name'], record['pincode'])
+
+
+def _upsert_statement(dialect, key_columns, fields):
+    table = BloodBank.__table__
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite_insert if dialect == 'sqlite' else pg_insert)(table)
+        set_ = {field: insert.excluded[field] for field in fields}
+        set_['updated_at'] = insert.excluded.updated_at
+        return insert.on_conflict_do_update(index_elements=list(key_columns), set_=set_)
+    if dialect == 'mysql':
+        insert = mysql_insert(table)
+        set_ = {field: insert.inserted[field] for field in fields}
+        set_['updated_at'] = insert.inserted.updated_at
+        return insert.on_duplicate_key_update(**set_)
+    raise ValueError(f'Bulk upserts are not supported on {dialect}')
+
+
+def _name_pincode_matches(session, records):
+    """(name, pincode) -> ids of the existing banks, for records without a license number"""
+    unlicensed = [r for r in records if not r['license_number']]
+    matches = {}
+    if unlicensed:
+        found = session.execute(select(BloodBank.id, BloodBank.name, BloodBank.pincode)
+                                .where(BloodBank.pincode.in_({r['pincode'] for r in unlicensed}),
+                                       BloodBank.name.in_({r['name'] for r in unlicensed}))
+                                .order_by(BloodBank.id))
+        for bank_id, name, pincode in found:
+            matches.setdefault((name, pincode), []).append(bank_id)
+    return matches
+
+
+def _existing_keys(session, records, matches):
+    """Keys of ``records`` that already exist (they will be updates)"""
+    licenses = [r['license_number'] for r in records if r['license_number']]
+    existing = set()
+    if licenses:
+        found = session.execute(select(BloodBank.license_number).where(BloodBank.license_number.in_(licenses)))
+        existing.update(('license', value) for value in found.scalars())
+    existing.update(('name_pincode',) + key for key, ids in matches.items() if len(ids) == 1)
+    return existing
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.geocoded = 0
+        self.batches = 0
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {'rows': self.rows, 'inserted': self.inserted, 'updated': self.updated, 'rejected': self.rejected,
+                'duplicates': self.duplicates, 'geocoded': self.geocoded, 'batches': self.batches, 'seconds': round(self.seconds, 2),
+                'rowsPerSecond': round(self.rows_per_second, 1)}
+
+
+class BloodBankImporter:
+    """Chunked CSV -> ``blood_banks`` upserts with per-batch commits"""
+
+    def __init__(self, session, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, rejects_path=None, progress=None,
+                 geocoder=None):
+        self.session = session
+        self.geocoder = geocoder
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.rejects_path = rejects_path
+        self.progress = progress
+        self.stats = ImportStats()
+        self._rejects_file = None
+        self._rejects_writer = None
+        self._header = None
+
+    def run(self, fh):
+        try:
+            for header, chunk in read_chunks(fh, self.batch_size):
+                if self._header is None:
+                    self._header = header
+                    self.columns = resolve_columns(header)
+                    missing = [f for f in ('name', 'latitude', 'longitude') if f not in self.columns]
+                    if 'name' in missing:
+                        raise ValueError('No name column found in the CSV header')
+                    if missing:
+                        print(f"⚠️  No {' / '.join(missing)} column; rows need coordinates resolved")
+                self.import_chunk(chunk)
+            if not self.dry_run and (self.stats.inserted or self.stats.updated):
+                self.finish()
+        finally:
+            if self._rejects_file is not None:
+                self._rejects_file.close()
+        return self.stats
+
+    def import_chunk(self, chunk):
+        records, rejects = parse_chunk(chunk, self.columns)
+        records, unlocated = self.locate(records)
+        rejects += unlocated
+        self.stats.rows += len(chunk)
+        self.stats.batches += 1
+        if records and not self.dry_run:
+            rejects += self.upsert(records)
+        elif records:
+            self.stats.inserted += len(records)
+        self.reject(rejects)
+        if self.progress:
+            self.progress(self.stats)
+
+    def locate(self, records):
+        """Geocode records without coordinates; rejects those still unplaced (the column is NOT NULL)"""
+        missing = [r for r in records if r['latitude'] is None or r['longitude'] is None]
+        if missing and self.geocoder is not None:
+            for record in missing:
+                record['_address'] = normalize_address(record['street'], record['city'], record['state'],
+                                                       record['pincode'], 'India')
+            found = self.geocoder.resolve([(r['_address'], r['pincode']) for r in missing])
+            for record in missing:
+                if record['_address'] in found:
+                    record['latitude'], record['longitude'] = found[record['_address']]
+                    self.stats.geocoded += 1
+        located, rejects = [], []
+        for record in records:
+            if record['latitude'] is None or record['longitude'] is None:
+                reason = 'could not geocode the address' if self.geocoder is not None else 'missing coordinates'
+                rejects.append((record['_line'], record['_row'], reason))
+            else:
+                located.append(record)
+        return located, rejects
+
+    def upsert(self, records):
+        """Upsert one batch and commit it; returns the rows rejected by the database"""
+        # Later duplicates within the batch win: one statement cannot touch a row twice
+        unique = {}
+        for record in records:
+            unique[_key(record)] = record
+        self.stats.duplicates += len(records) - len(unique)
+        records = list(unique.values())
+        try:
+            matches = _name_pincode_matches(self.session, records)
+            existing = _existing_keys(self.session, records, matches)
+            rejects = self._execute(records, matches)
+            self.session.commit()
+        except IntegrityError:
+            # A row clashes with another bank: retry one by one and reject the offenders
+            self.session.rollback()
+            existing, rejects = self._upsert_one_by_one(records)
+        written = len(records) - len(rejects)
+        self.stats.updated += min(len(existing), written)
+        self.stats.inserted += written - min(len(existing), written)
+        return rejects
+
+    def _execute(self, records, matches):
+        """Write one batch (uncommitted); returns the rows rejected as ambiguous"""
+        table = BloodBank.__table__
+        present = set(self.columns) | {'latitude', 'longitude'}
+        licensed, inserts, updates, rejects = [], [], [], []
+        for record in records:
+            row = {k: v for k, v in record.items() if not k.startswith('_')}
+            ids = [] if record['license_number'] else matches.get((record['name'], record['pincode']), [])
+            if record['license_number']:
+                licensed.append(row)
+            elif len(ids) > 1:
+                rejects.append((record['_line'], record['_row'],
+                                f'{len(ids)} banks share this name and pincode; add a license number'))
+            elif ids:
+                updates.append(row | {'bank_id': ids[0]})
+            else:
+                inserts.append(row)
+
+        # Only fields the file has; the rest keep their current values
+        if licensed:
+            fields = (set(UPDATE_FIELDS) | {'name', 'pincode'}) & present
+            stmt = _upsert_statement(self.session.get_bind().dialect.name, ('license_number',), sorted(fields))
+            self.session.execute(stmt.execution_options(track_changes=False), licensed)
+        if inserts:
+            self.session.execute(table.insert().execution_options(track_changes=False), inserts)
+        if updates:
+            fields = sorted(set(UPDATE_FIELDS) & present) + ['updated_at']
+            stmt = (table.update().where(table.c.id == bindparam('bank_id'))
+                    .values({field: bindparam(f'new_{field}') for field in fields}))
+            self.session.execute(stmt.execution_options(track_changes=False),
+                                 [{'bank_id': row['bank_id'], **{f'new_{f}': row[f] for f in fields}} for row in updates])
+
+        positions = [('blood_banks', row['latitude'], row['longitude']) for row in licensed + inserts + updates]
+        # Old positions of updated banks are unknown, so geo caches drop the whole table
+        mark_changed(self.session, 'blood_banks', points=positions, unlocated_tables=['blood_banks'])
+        return rejects
+
+    def _upsert_one_by_one(self, records):
+        existing, rejects = set(), []
+        for record in records:
+            try:
+                matches = _name_pincode_matches(self.session, [record])
+                found = _existing_keys(self.session, [record], matches)
+                ambiguous = self._execute([record], matches)
+                self.session.commit()
+                existing |= found
+                rejects += ambiguous
+            except IntegrityError as e:
+                self.session.rollback()
+                rejects.append((record['_line'], record['_row'], f'conflicts with another bank: {e.orig}'))
+        return existing, rejects
+
+    def finish(self):
+        """Ledger opening balances for the new banks, then fresh aggregates"""
+        inventory_ledger.record_opening_balances(self.session)
+        inventory_aggregates.rebuild(self.session)
+        mark_changed(self.session, 'inventory_events', 'inventory_aggregates')
+        self.session.commit()
+
+    def reject(self, rejects):
+        self.stats.rejected += len(rejects)
+        if not rejects or not self.rejects_path:
+            return
+        if self._rejects_writer is None:
+            self._rejects_file = open(self.rejects_path, 'w', newline='', encoding='utf-8')
+            self._rejects_writer = csv.writer(self._rejects_file)
+            self._rejects_writer.writerow(['line', 'reason'] + list(self._header or []))
+        for line, row, reason in sorted(rejects, key=lambda reject: reject[0]):
+            self._rejects_writer.writerow([line, reason] + list(row))
+
+
+def import_csv(session, fh, **options):
+    """Import an open CSV file; returns the ``ImportStats``"""
+    return BloodBankImporter(session, **options).run(fh)
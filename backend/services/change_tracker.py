@@ -0,0 +1,186 @@
+"""
+Per-table change counters
+
+Every committed write bumps a counter for the tables it touched. Read paths
+use the counters to build ETags and cache keys, so "has anything changed?"
+is answered without a database query.
+
+Writes are picked up from SQLAlchemy session events: flushed ORM objects
+and ORM-enabled bulk UPDATE/DELETE/INSERT statements. Code that writes
+through a raw connection, or executes with ``track_changes=False``, calls
+``mark_changed()`` itself. Counters are
+per-process unless REDIS_URL is configured, which is why gunicorn.conf.py
+runs a single worker and refuses more without it.
+
+Listeners also receive ``points`` - (table, lat, lon) of the old and new
+positions of changed located rows - and ``unlocated_tables`` for bulk
+writes whose rows are unknown, so geographic caches can invalidate only
+the affected cells.
+"""
+import threading
+import time
+import uuid
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from services import shared_store
+
+_PENDING_KEY = 'changed_tables'
+
+
+class ChangeTracker:
+    """Monotonic per-table version counters with change listeners"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._modified = {}
+        self._listeners = []
+        # Distinguishes counters of different processes / restarts
+        self.epoch = uuid.uuid4().hex[:8]
+        self.started_at = time.time()
+
+    def bump(self, *tables, details=None):
+        """Record a committed change to ``tables`` and notify listeners"""
+        tables = tuple(sorted(set(tables)))
+        if not tables:
+            return
+        now = time.time()
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for table in tables:
+                    pipe.incr(shared_store.key('ver', table))
+                    pipe.set(shared_store.key('mtime', table), now)
+                pipe.execute()
+            except Exception as e:
+                print(f"⚠️  Shared change counter update failed: {e}")
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modified[table] = now
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(tables, details or {})
+            except Exception as e:
+                print(f"⚠️  Change listener failed: {e}")
+
+    def versions(self, tables):
+        """Tuple of current versions for ``tables`` (in the given order)"""
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                values = client.mget([shared_store.key('ver', t) for t in tables])
+                return ('shared',) + tuple(int(v or 0) for v in values)
+            except Exception:
+                pass
+        with self._lock:
+            return (self.epoch,) + tuple(self._versions.get(t, 0) for t in tables)
+
+    def last_modified(self, tables):
+        """Unix time of the most recent change to any of ``tables``"""
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                values = client.mget([shared_store.key('mtime', t) for t in tables])
+                return max([float(v) for v in values if v] or [self.started_at])
+            except Exception:
+                pass
+        with self._lock:
+            return max([self._modified.get(t, self.started_at) for t in tables])
+
+    def subscribe(self, listener):
+        """Call ``listener(tables, details)`` after every committed change"""
+        with self._lock:
+            self._listeners.append(listener)
+        return listener
+
+
+change_tracker = ChangeTracker()
+
+
+def mark_changed(session, *tables, **details):
+    """Register writes made outside the ORM; they are bumped on commit.
+
+    ``details`` are merged per key (lists are extended) and handed to the
+    change listeners, e.g. ``mark_changed(db.session, 'blood_banks',
+    blood_bank_ids=[1, 2])``.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, {'tables': set(), 'details': {}})
+    pending['tables'].update(tables)
+    for name, value in details.items():
+        if isinstance(value, (list, tuple, set)):
+            pending['details'].setdefault(name, []).extend(value)
+        else:
+            pending['details'][name] = value
+
+
+def _positions(obj):
+    """Current and previous (lat, lon) of a located row"""
+    state = inspect(obj)
+    lat_history = state.attrs.latitude.history
+    lon_history = state.attrs.longitude.history
+    positions = [(obj.latitude, obj.longitude)]
+    if lat_history.deleted or lon_history.deleted:
+        old_lat = lat_history.deleted[0] if lat_history.deleted else obj.latitude
+        old_lon = lon_history.deleted[0] if lon_history.deleted else obj.longitude
+        positions.append((old_lat, old_lon))
+    return positions
+
+
+def _after_flush(session, flush_context):
+    changed = list(session.new) + list(session.deleted)
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    tables, points, unlocated = set(), [], set()
+    for obj in changed:
+        table = getattr(obj, '__tablename__', None)
+        if not table:
+            continue
+        tables.add(table)
+        if hasattr(obj, 'latitude') and hasattr(obj, 'longitude'):
+            for latitude, longitude in _positions(obj):
+                if latitude is None or longitude is None:
+                    unlocated.add(table)
+                else:
+                    points.append((table, float(latitude), float(longitude)))
+    if tables:
+        mark_changed(session, *tables, points=points, unlocated_tables=list(unlocated))
+
+
+def _do_orm_execute(orm_execute_state):
+    # Callers that report their own changes (with positions) opt out
+    if orm_execute_state.execution_options.get('track_changes') is False:
+        return
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        name = getattr(table, 'name', None)
+        if name:
+            mark_changed(orm_execute_state.session, name, unlocated_tables=[name])
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and pending['tables']:
+        change_tracker.bump(*pending['tables'], details=pending['details'])
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+_installed = False
+
+
+def init_change_tracker(app):
+    """Hook the session events once per process"""
+    global _installed
+    if not _installed:
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+        _installed = True
+    return change_tracker
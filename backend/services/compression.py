@@ -0,0 +1,125 @@
+"""
+Response compression (gzip, and brotli when installed)
+
+Runs as an ``after_request`` hook. Bodies below COMPRESSION_MIN_SIZE and
+non-compressible types are left alone; streamed responses are compressed
+chunk by chunk with a sync flush so clients still see data as it is
+produced. Responses replayed from a response cache carry their cache
+entry, and the compressed bytes are stored on it per encoding, so a hot
+response is compressed once rather than on every hit.
+"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/msgpack',
+    'application/x-msgpack',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/html',
+    'text/plain',
+    'text/csv',
+    'text/css',
+}
+
+# Strong ETags must differ per content-coding
+ETAG_SUFFIXES = {'gzip': '-gz', 'br': '-br'}
+
+
+def choose_encoding():
+    """Best supported encoding from Accept-Encoding, or None"""
+    accepted = request.accept_encodings
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(iterable, encoding, level):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def _level(encoding, cached):
+    config = current_app.config
+    if encoding == 'br':
+        return config.get('COMPRESSION_BR_CACHED_QUALITY' if cached else 'COMPRESSION_BR_QUALITY', 5)
+    return config.get('COMPRESSION_GZIP_CACHED_LEVEL' if cached else 'COMPRESSION_GZIP_LEVEL', 6)
+
+
+def compress_response(response):
+    """``after_request`` hook"""
+    config = current_app.config
+    if not config.get('COMPRESSION_ENABLED', True):
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, _level(encoding, False))
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config.get('COMPRESSION_MIN_SIZE', 1024):
+            return response
+        entry = getattr(response, 'cache_entry', None)
+        compressed = entry.variants.get(encoding) if entry is not None else None
+        if compressed is None:
+            compressed = compress(body, encoding, _level(encoding, entry is not None))
+            if entry is not None:
+                entry.variants[encoding] = compressed
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + ETAG_SUFFIXES[encoding], weak)
+    return response
+
+
+def init_compression(app):
+    """Register the compression hook"""
+    app.after_request(compress_response)
+    return app
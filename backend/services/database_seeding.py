@@ -0,0 +1,218 @@
+"""
+Database seeding and clearing (/api/seed-database, /api/clear-database)
+
+Seeding runs in-process as a ``seed_database`` background job
+(services.background_jobs) instead of a ``seed_database.py`` subprocess:
+the request returns a job link at once and the job writes the curated demo
+dataset (services.demo_data) or, when asked for, a synthetic dataset of the
+requested size with the bulk generator (services.synthetic_data), which
+reports rows written per table as progress.
+
+Seeding and clearing hold a row lock in ``maintenance_locks`` (inserted
+into its primary key), so only one of them runs at a time across all
+workers and hosts; a second request gets the running job instead. The lock
+expires SEED_LOCK_TTL after the holder's last progress report, so a worker
+that dies mid-seed does not block seeding for good.
+
+Clearing empties the data tables with a single ``TRUNCATE`` on
+PostgreSQL, ``TRUNCATE`` per table with foreign key checks off on MySQL
+and ``DELETE`` (children first) elsewhere. The geocode cache is kept.
+
+Both write outside the ORM hooks, so they register their changes with
+the change tracker and reload the in-memory request queue.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, literal, select, text, union_all, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.blood_bank import BloodBank
+from models.blood_request import BloodRequest, Notification
+from models.donor import Donor
+from models.hospital import Hospital
+from models.maintenance import MaintenanceLock
+from services import demo_data, synthetic_data
+from services.background_jobs import job_runner
+from services.change_tracker import mark_changed
+from services.request_queue import request_queue
+
+# Default synthetic dataset size (seed_database.py --synthetic, /api/seed-database?synthetic=true)
+SEED_COUNTS = {'hospitals': 50, 'blood_banks': 30, 'donors': 150, 'blood_requests': 30, 'notifications': 20}
+COUNTED_MODELS = {'donors': Donor, 'blood_banks': BloodBank, 'hospitals': Hospital,
+                  'blood_requests': BloodRequest, 'notifications': Notification}
+# External API answers and the lock itself, not seeded data
+KEPT_TABLES = {'geocode_cache', 'maintenance_locks'}
+LOCK_NAME = 'database_seeding'
+
+
+class SeedingInProgress(Exception):
+    """Another seeding or clearing run holds the lock; ``job_id`` is its job, when it has one"""
+
+    def __init__(self, job_id=None):
+        super().__init__('Database seeding is running; wait for it to finish.')
+        self.job_id = job_id
+
+
+def counts(session):
+    """Rows per seeded table, in one query"""
+    query = union_all(*(
+        select(literal(name).label('name'), func.count().label('rows')).select_from(model)
+        for name, model in COUNTED_MODELS.items()
+    ))
+    found = dict(session.execute(query).all())
+    return {name: found.get(name, 0) for name in COUNTED_MODELS}
+
+
+def _lock_ttl():
+    return current_app.config.get('SEED_LOCK_TTL', 600)
+
+
+def acquire_lock(session):
+    """Take the seeding lock; returns the holder token, or None while someone else holds it"""
+    table = MaintenanceLock.__table__
+    token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    expires = now + timedelta(seconds=_lock_ttl())
+    try:
+        session.execute(table.insert().values(name=LOCK_NAME, holder=token, acquired_at=now, expires_at=expires)
+                        .execution_options(track_changes=False))
+        session.commit()
+        return token
+    except IntegrityError:
+        session.rollback()
+    # A holder that died leaves its row behind until it expires
+    taken = session.execute(
+        update(table).where(table.c.name == LOCK_NAME, table.c.expires_at < now)
+        .values(holder=token, job_id=None, acquired_at=now, expires_at=expires)
+        .execution_options(track_changes=False)
+    )
+    session.commit()
+    return token if taken.rowcount == 1 else None
+
+
+def _update_lock(session, token, **values):
+    table = MaintenanceLock.__table__
+    session.execute(update(table).where(table.c.name == LOCK_NAME, table.c.holder == token).values(**values)
+                    .execution_options(track_changes=False))
+    session.commit()
+
+
+def release_lock(session, token):
+    table = MaintenanceLock.__table__
+    session.execute(delete(table).where(table.c.name == LOCK_NAME, table.c.holder == token)
+                    .execution_options(track_changes=False))
+    session.commit()
+
+
+def current_lock(session):
+    """The unexpired seeding lock row (``holder``, ``job_id``), or None"""
+    return session.execute(
+        select(MaintenanceLock.holder, MaintenanceLock.job_id)
+        .where(MaintenanceLock.name == LOCK_NAME, MaintenanceLock.expires_at >= datetime.utcnow())
+    ).first()
+
+
+def _progress(job, token):
+    """``job.update`` that also keeps the lock from expiring while the job reports"""
+    ttl = _lock_ttl()
+    refreshed = [time.monotonic()]
+
+    def progress(**values):
+        job.update(**values)
+        if time.monotonic() - refreshed[0] > ttl / 4:
+            refreshed[0] = time.monotonic()
+            _update_lock(db.session, token, expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+    return progress
+
+
+def run_seeding(job, seed_counts, seed, token):
+    """Background job: write the demo dataset (or a synthetic one of ``seed_counts``), then report the table counts"""
+    try:
+        progress = _progress(job, token)
+        progress(stage='starting')
+        if seed_counts is None:
+            progress(stage='demo_data')
+            written = demo_data.seed(db.session, seed=seed)
+        else:
+            written = synthetic_data.generate(db.session, seed=42 if seed is None else seed, progress=progress,
+                                              **seed_counts)
+        _reload_request_queue()
+        return {'written': written, 'counts': counts(db.session)}
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        release_lock(db.session, token)
+
+
+def enqueue_seeding(session, seed_counts=None, seed=None):
+    """Queue a seeding job (demo dataset unless ``seed_counts`` are given).
+
+    Returns ``(job_id, created)``: the running job's id (None until it is
+    queued) when another seeding or clearing run holds the lock.
+    """
+    token = acquire_lock(session)
+    if token is None:
+        lock = current_lock(session)
+        return (lock.job_id if lock else None), False
+    try:
+        job = job_runner.submit('seed_database', run_seeding,
+                                dict(seed_counts) if seed_counts is not None else None, seed, token)
+    except Exception:
+        release_lock(session, token)
+        raise
+    _update_lock(session, token, job_id=job.id)
+    return job.id, True
+
+
+def cleared_tables():
+    """Data tables, children before parents"""
+    return [table for table in reversed(db.metadata.sorted_tables) if table.name not in KEPT_TABLES]
+
+
+def clear(session):
+    """Empty every data table; returns the table names (raises SeedingInProgress while seeding runs)"""
+    token = acquire_lock(session)
+    if token is None:
+        lock = current_lock(session)
+        raise SeedingInProgress(lock.job_id if lock else None)
+    try:
+        return _clear(session)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        release_lock(session, token)
+
+
+def _clear(session):
+    tables = cleared_tables()
+    dialect = session.get_bind().dialect
+    names = [dialect.identifier_preparer.format_table(table) for table in tables]
+    if dialect.name == 'postgresql':
+        session.execute(text(f'TRUNCATE TABLE {", ".join(names)} RESTART IDENTITY CASCADE'))
+    elif dialect.name == 'mysql':
+        session.execute(text('SET FOREIGN_KEY_CHECKS = 0'))
+        try:
+            for name in names:
+                session.execute(text(f'TRUNCATE TABLE {name}'))
+        finally:
+            session.execute(text('SET FOREIGN_KEY_CHECKS = 1'))
+    else:
+        for table in tables:
+            session.execute(table.delete().execution_options(track_changes=False))
+    cleared = [table.name for table in tables]
+    mark_changed(session, *cleared, unlocated_tables=cleared)
+    session.commit()
+    _reload_request_queue()
+    return cleared
+
+
+def _reload_request_queue():
+    # Bulk rows carry past updated_at values and truncated rows leave no
+    # trace, so the queue's incremental catch-up would miss both
+    request_queue.hydrate(db.session)
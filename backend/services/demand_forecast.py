@@ -0,0 +1,319 @@
+"""
+Blood demand forecasting
+
+One batch run forecasts daily consumption for every bank x blood type.
+Daily rollups (services.inventory_timeseries) for the last
+DEMAND_FORECAST_HISTORY_DAYS become a (series, days) matrix and additive
+Holt-Winters smoothing with a weekly season and a damped trend is run over
+all series at once - the time loop is the only Python loop. Series with
+less than two weeks of history fall back to Holt's linear method.
+
+Each run yields, per series, the forecast for the next
+DEMAND_FORECAST_HORIZON_DAYS, the in-sample RMSE, a trend label, a
+confidence score and a recommended stock (forecast + safety stock). The
+result is cached per process (and in Redis when configured, as an ``.npz``
+archive with JSON metadata - never pickled) and refreshed by a periodic
+job; /api/blood-banks/forecast serves it.
+"""
+import io
+import json
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from extensions import db
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.inventory import InventoryRollup
+from services import shared_store
+from services.inventory_timeseries import floor_day
+from services.scheduler import scheduler
+
+BLOOD_TYPES = tuple(INVENTORY_COLUMNS)
+SEASON = 7
+_SAFETY_Z = 1.65  # ~95% service level
+
+
+def holt_winters(series, horizon, alpha=0.3, beta=0.05, gamma=0.2, phi=0.9, season=SEASON):
+    """Vectorized additive Holt-Winters over the rows of ``series`` (n_series, n_days).
+
+    Returns ``(forecast (n_series, horizon), rmse (n_series,), level, trend)``.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    n, days = series.shape
+    seasonal = days >= 2 * season
+    if seasonal:
+        level = series[:, :season].mean(axis=1)
+        trend = (series[:, season:2 * season].mean(axis=1) - level) / season
+        seasons = series[:, :season] - level[:, None]
+        start = season
+    else:
+        level = series[:, 0].copy() if days else np.zeros(n)
+        trend = (series[:, 1] - series[:, 0]) if days > 1 else np.zeros(n)
+        seasons = np.zeros((n, season))
+        start = 1
+
+    sq_error = np.zeros(n)
+    for t in range(start, days):
+        y = series[:, t]
+        s = seasons[:, t % season]
+        predicted = level + phi * trend + s
+        sq_error += (y - predicted) ** 2
+        previous = level
+        level = alpha * (y - s) + (1 - alpha) * (level + phi * trend)
+        trend = beta * (level - previous) + (1 - beta) * phi * trend
+        if seasonal:
+            seasons[:, t % season] = gamma * (y - level) + (1 - gamma) * s
+
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(phi ** steps)
+    season_index = (days + steps - 1) % season
+    forecast = level[:, None] + trend[:, None] * damping[None, :] + seasons[:, season_index]
+    fitted = max(days - start, 1)
+    rmse = np.sqrt(sq_error / fitted)
+    return np.clip(forecast, 0, None), rmse, level, trend
+
+
+# Array attributes of a ForecastResult that go into its stored form
+_ARRAYS = ('bank_ids', 'latitudes', 'longitudes', 'stock', 'forecast', 'rmse', 'trend', 'confidence',
+           'observed_days')
+
+
+class ForecastResult:
+    """Arrays of one batch run, indexed [bank, blood type(, day)]"""
+
+    def __init__(self, generated_at, horizon, history_days, bank_ids, cities, states, latitudes, longitudes,
+                 stock, forecast, rmse, trend, confidence, observed_days):
+        self.generated_at = generated_at
+        self.horizon = horizon
+        self.history_days = history_days
+        self.bank_ids = bank_ids
+        self.cities = cities
+        self.states = states
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.stock = stock
+        self.forecast = forecast
+        self.rmse = rmse
+        self.trend = trend
+        self.confidence = confidence
+        self.observed_days = observed_days
+        self.total = forecast.sum(axis=2)
+        self.safety = _SAFETY_Z * rmse * math.sqrt(horizon)
+        self.recommended = np.ceil(self.total + self.safety).astype(np.int64)
+        self.shortfall = np.maximum(self.recommended - stock, 0)
+        self._positions = {int(b): i for i, b in enumerate(bank_ids)}
+
+    def position(self, bank_id):
+        return self._positions.get(bank_id)
+
+    def dumps(self):
+        """``.npz`` bytes of the run: the arrays plus its metadata as JSON"""
+        meta = {'generatedAt': self.generated_at.isoformat(), 'horizon': self.horizon,
+                'historyDays': self.history_days, 'cities': list(self.cities), 'states': list(self.states)}
+        buffer = io.BytesIO()
+        np.savez(buffer, meta=np.array(json.dumps(meta)), **{name: getattr(self, name) for name in _ARRAYS})
+        return buffer.getvalue()
+
+    @classmethod
+    def loads(cls, payload):
+        with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+            meta = json.loads(str(archive['meta']))
+            arrays = {name: archive[name] for name in _ARRAYS}
+        return cls(generated_at=datetime.fromisoformat(meta['generatedAt']), horizon=meta['horizon'],
+                   history_days=meta['historyDays'], cities=meta['cities'], states=meta['states'], **arrays)
+
+    def trend_label(self, i, t):
+        daily = self.total[i, t] / max(self.horizon, 1)
+        change = self.trend[i, t] * SEASON
+        if daily < 0.5 and abs(change) < 0.5:
+            return 'stable'
+        if change > 0.1 * max(daily, 1):
+            return 'rising'
+        if change < -0.1 * max(daily, 1):
+            return 'falling'
+        return 'stable'
+
+    def item(self, i, t):
+        daily_mean = float(self.total[i, t]) / max(self.horizon, 1)
+        stock = int(self.stock[i, t])
+        return {
+            'bloodBankId': int(self.bank_ids[i]),
+            'city': self.cities[i],
+            'state': self.states[i],
+            'bloodType': BLOOD_TYPES[t],
+            'currentStock': stock,
+            'dailyForecast': [round(float(v), 2) for v in self.forecast[i, t]],
+            'predictedDemand': round(float(self.total[i, t]), 2),
+            'safetyStock': round(float(self.safety[i, t]), 2),
+            'recommendedStock': int(self.recommended[i, t]),
+            'shortfall': int(self.shortfall[i, t]),
+            'daysOfCover': round(stock / daily_mean, 1) if daily_mean > 0 else None,
+            'trend': self.trend_label(i, t),
+            'confidence': round(float(self.confidence[i, t]), 2)
+        }
+
+    def summary(self, mask=None):
+        """Network (or masked subset) totals per blood type"""
+        selected = slice(None) if mask is None else mask
+        totals = {}
+        for t, blood_type in enumerate(BLOOD_TYPES):
+            totals[blood_type] = {
+                'predictedDemand': round(float(self.total[selected, t].sum()), 2),
+                'currentStock': int(self.stock[selected, t].sum()),
+                'recommendedStock': int(self.recommended[selected, t].sum()),
+                'shortfall': int(self.shortfall[selected, t].sum())
+            }
+        return totals
+
+    def within(self, latitude, longitude, radius_km):
+        """Boolean mask of banks within ``radius_km`` (haversine, vectorized)"""
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(self.latitudes), np.radians(self.longitudes)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 6371.0 * 2 * np.arcsin(np.sqrt(a)) <= radius_km
+
+
+def run_forecast(session, horizon=7, history_days=56, alpha=0.3, beta=0.05, gamma=0.2, phi=0.9, today=None):
+    """Forecast every bank x blood type from the daily rollups (one batch)"""
+    columns = [getattr(BloodBank, c) for c in INVENTORY_COLUMNS.values()]
+    banks = session.execute(
+        select(BloodBank.id, BloodBank.city, BloodBank.state, BloodBank.latitude, BloodBank.longitude, *columns)
+        .order_by(BloodBank.id)
+    ).all()
+    n = len(banks)
+    bank_ids = np.fromiter((b[0] for b in banks), dtype=np.int64, count=n)
+    stock = np.array([[units or 0 for units in b[5:]] for b in banks], dtype=np.int64).reshape(n, len(BLOOD_TYPES))
+    latitudes = np.array([float(b[3]) if b[3] is not None else np.nan for b in banks])
+    longitudes = np.array([float(b[4]) if b[4] is not None else np.nan for b in banks])
+    positions = {int(b): i for i, b in enumerate(bank_ids)}
+    type_index = {t: i for i, t in enumerate(BLOOD_TYPES)}
+
+    end = floor_day(today or datetime.utcnow())
+    start = end - timedelta(days=history_days)
+    consumption = np.zeros((n, len(BLOOD_TYPES), history_days))
+    seen = np.zeros((n, len(BLOOD_TYPES)), dtype=np.int64)
+    first_day = np.full((n, len(BLOOD_TYPES)), history_days, dtype=np.int64)
+    r = InventoryRollup
+    rows = session.execute(
+        select(r.blood_bank_id, r.blood_type, r.bucket_start, r.consumed)
+        .where(r.resolution == 'day', r.bucket_start >= start, r.bucket_start < end)
+    )
+    for bank_id, blood_type, bucket_start, consumed in rows:
+        i = positions.get(bank_id)
+        if i is None:
+            continue
+        t = type_index[blood_type]
+        d = (bucket_start - start).days
+        consumption[i, t, d] = consumed
+        seen[i, t] += 1
+        first_day[i, t] = min(first_day[i, t], d)
+
+    flat = consumption.reshape(n * len(BLOOD_TYPES), history_days)
+    forecast, rmse, level, trend = holt_winters(flat, horizon, alpha, beta, gamma, phi)
+    forecast = forecast.reshape(n, len(BLOOD_TYPES), horizon)
+    rmse = rmse.reshape(n, len(BLOOD_TYPES))
+    trend = trend.reshape(n, len(BLOOD_TYPES))
+
+    # Confidence: how much of the window the series covers, and how well it was fitted
+    observed_days = np.clip(history_days - first_day, 0, history_days)
+    mean_demand = consumption.mean(axis=2)
+    fit = np.clip(1.0 - rmse / (mean_demand + 1.0), 0.0, 1.0)
+    coverage = np.clip(observed_days / 28.0, 0.0, 1.0)
+    confidence = np.clip(0.05 + 0.9 * fit * coverage, 0.05, 0.95)
+
+    return ForecastResult(
+        generated_at=datetime.utcnow(), horizon=horizon, history_days=history_days, bank_ids=bank_ids,
+        cities=[b[1] for b in banks], states=[b[2] for b in banks], latitudes=latitudes, longitudes=longitudes,
+        stock=stock, forecast=forecast, rmse=rmse, trend=trend, confidence=confidence, observed_days=observed_days
+    )
+
+
+class DemandForecaster:
+    """Cached forecast results, refreshed in the background or on demand"""
+
+    def __init__(self):
+        self.result = None
+        self.ttl = 3600
+        self.runs = 0
+        self.last_duration = None
+        self._lock = threading.Lock()
+
+    def _params(self, config):
+        return {
+            'horizon': config.get('DEMAND_FORECAST_HORIZON_DAYS', 7),
+            'history_days': config.get('DEMAND_FORECAST_HISTORY_DAYS', 56),
+            'alpha': config.get('DEMAND_FORECAST_ALPHA', 0.3),
+            'beta': config.get('DEMAND_FORECAST_BETA', 0.05),
+            'gamma': config.get('DEMAND_FORECAST_GAMMA', 0.2),
+            'phi': config.get('DEMAND_FORECAST_PHI', 0.9)
+        }
+
+    def _fresh(self, result):
+        return result is not None and (datetime.utcnow() - result.generated_at).total_seconds() < self.ttl
+
+    def peek(self):
+        """Cached result (possibly stale) without computing"""
+        return self.result
+
+    def refresh(self):
+        """Run the batch forecast now and publish it"""
+        started = time.time()
+        result = run_forecast(db.session, **self._params(current_app.config))
+        self.last_duration = time.time() - started
+        self.runs += 1
+        self.result = result
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                client.setex(shared_store.key('forecast'), self.ttl, result.dumps())
+            except Exception as e:
+                print(f"⚠️  Shared forecast store failed: {e}")
+        return result
+
+    def get(self):
+        """Fresh result from this process, another worker (Redis) or a new run"""
+        if self._fresh(self.result):
+            return self.result
+        with self._lock:
+            if self._fresh(self.result):
+                return self.result
+            client = shared_store.get_client()
+            if client is not None:
+                try:
+                    payload = client.get(shared_store.key('forecast'))
+                    shared = ForecastResult.loads(payload) if payload else None
+                    if self._fresh(shared):
+                        self.result = shared
+                        return shared
+                except Exception:
+                    pass
+            return self.refresh()
+
+    def stats(self):
+        result = self.result
+        return {
+            'runs': self.runs,
+            'lastDurationMs': round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            'generatedAt': result.generated_at.isoformat() if result else None,
+            'series': int(result.stock.size) if result else 0
+        }
+
+
+forecaster = DemandForecaster()
+
+
+def _forecast_job():
+    result = forecaster.refresh()
+    return {'series': int(result.stock.size), 'generatedAt': result.generated_at.isoformat()}
+
+
+def init_demand_forecast(app):
+    """Configure the results cache and register the refresh job"""
+    forecaster.ttl = app.config.get('DEMAND_FORECAST_TTL', 3600)
+    scheduler.register('demand_forecast', app.config.get('DEMAND_FORECAST_INTERVAL', 3600), _forecast_job)
+    return forecaster
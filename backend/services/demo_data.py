@@ -0,0 +1,314 @@
+"""
+Curated demo dataset (seed_database.py and /api/seed-database)
+
+Named government and private hospitals in eight Indian cities, blood banks
+attached to most of them, 150 donors, 30 open and recent blood requests
+(the matched ones with their donor matches) and 20 notifications. Rows go
+through the ORM, so the ledger, queue and counter hooks see them.
+For large datasets use services.synthetic_data instead.
+"""
+import random
+from datetime import datetime, timedelta
+
+from models.blood_bank import BloodBank
+from models.blood_request import BloodRequest, BloodRequestMatch, Notification
+from models.donor import Donor
+from models.hospital import Hospital
+from services.ai_matching_service import BLOOD_COMPATIBILITY
+from services.geo_sampling import distance_km
+
+
+def seed(session, seed=None):
+    """Add the demo dataset to ``session`` (committing per table); returns rows per table"""
+    rnd = random.Random(seed)
+
+    # Indian cities with coordinates
+    cities = {
+        'Mumbai': {'latitude': 19.0760, 'longitude': 72.8777, 'state': 'Maharashtra'},
+        'Delhi': {'latitude': 28.7041, 'longitude': 77.1025, 'state': 'Delhi'},
+        'Bangalore': {'latitude': 12.9716, 'longitude': 77.5946, 'state': 'Karnataka'},
+        'Hyderabad': {'latitude': 17.3850, 'longitude': 78.4867, 'state': 'Telangana'},
+        'Chennai': {'latitude': 13.0827, 'longitude': 80.2707, 'state': 'Tamil Nadu'},
+        'Kolkata': {'latitude': 22.5726, 'longitude': 88.3639, 'state': 'West Bengal'},
+        'Pune': {'latitude': 18.5204, 'longitude': 73.8567, 'state': 'Maharashtra'},
+        'Ahmedabad': {'latitude': 23.0225, 'longitude': 72.5714, 'state': 'Gujarat'}
+    }
+    
+    blood_types = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+    
+    # Create Donors (150 across India)
+    donor_names = [
+        'Rajesh Kumar', 'Priya Sharma', 'Amit Patel', 'Sneha Reddy', 'Vijay Singh',
+        'Anita Gupta', 'Rahul Verma', 'Neha Iyer', 'Suresh Nair', 'Pooja Deshmukh',
+        'Arun Kumar', 'Kavita Rao', 'Manoj Joshi', 'Divya Menon', 'Sanjay Pillai',
+        'Meera Bhat', 'Ravi Krishnan', 'Anjali Malhotra', 'Deepak Agarwal', 'Swati Banerjee'
+    ]
+    
+    donors = []
+    for i in range(150):
+        city = rnd.choice(list(cities.keys()))
+        city_data = cities[city]
+        
+        # Add small random offset to coordinates
+        lat_offset = rnd.uniform(-0.1, 0.1)
+        lon_offset = rnd.uniform(-0.1, 0.1)
+        
+        # Generate realistic donation count
+        total_donations = rnd.randint(0, 50)
+        
+        donor = Donor(
+            name=rnd.choice(donor_names),
+            blood_type=rnd.choice(blood_types),
+            phone=f"+91-{rnd.randint(7000000000, 9999999999)}",
+            email=f"donor{i+1}@example.com",
+            age=rnd.randint(18, 60),
+            city=city,
+            state=city_data['state'],
+            street=f"{rnd.randint(1, 500)}, Sector {rnd.randint(1, 50)}",
+            latitude=city_data['latitude'] + lat_offset,
+            longitude=city_data['longitude'] + lon_offset,
+            available_for_donation=rnd.choice([True, True, True, False]),
+            last_donation_date=datetime.utcnow() - timedelta(days=rnd.randint(0, 365)),
+            total_donations=total_donations,
+            rating=round(rnd.uniform(4.0, 5.0), 1)
+        )
+        donors.append(donor)
+    
+    session.add_all(donors)
+    session.commit()
+    
+    # Create Government Hospitals
+    govt_hospitals = [
+        # Delhi
+        {'name': 'AIIMS Delhi', 'city': 'Delhi', 'type': 'Government', 'capacity': 2500},
+        {'name': 'Safdarjung Hospital', 'city': 'Delhi', 'type': 'Government', 'capacity': 2200},
+        {'name': 'Ram Manohar Lohia Hospital', 'city': 'Delhi', 'type': 'Government', 'capacity': 1800},
+        {'name': 'Lady Hardinge Medical College', 'city': 'Delhi', 'type': 'Government', 'capacity': 1400},
+        {'name': 'GTB Hospital', 'city': 'Delhi', 'type': 'Government', 'capacity': 1500},
+        # Mumbai
+        {'name': 'KEM Hospital', 'city': 'Mumbai', 'type': 'Government', 'capacity': 2000},
+        {'name': 'Sion Hospital', 'city': 'Mumbai', 'type': 'Government', 'capacity': 1600},
+        {'name': 'JJ Hospital', 'city': 'Mumbai', 'type': 'Government', 'capacity': 1800},
+        {'name': 'Nair Hospital', 'city': 'Mumbai', 'type': 'Government', 'capacity': 1400},
+        {'name': 'Rajawadi Hospital', 'city': 'Mumbai', 'type': 'Government', 'capacity': 1200},
+        # Bangalore
+        {'name': 'Victoria Hospital', 'city': 'Bangalore', 'type': 'Government', 'capacity': 1800},
+        {'name': 'Bowring Hospital', 'city': 'Bangalore', 'type': 'Government', 'capacity': 1200},
+        {'name': 'KC General Hospital', 'city': 'Bangalore', 'type': 'Government', 'capacity': 1400},
+        {'name': 'Jayanagar General Hospital', 'city': 'Bangalore', 'type': 'Government', 'capacity': 1000},
+        # Hyderabad
+        {'name': 'Gandhi Hospital', 'city': 'Hyderabad', 'type': 'Government', 'capacity': 1500},
+        {'name': 'Osmania General Hospital', 'city': 'Hyderabad', 'type': 'Government', 'capacity': 2000},
+        {'name': 'Niloufer Hospital', 'city': 'Hyderabad', 'type': 'Government', 'capacity': 1200},
+        # Chennai
+        {'name': 'Government General Hospital', 'city': 'Chennai', 'type': 'Government', 'capacity': 2200},
+        {'name': 'Stanley Medical College', 'city': 'Chennai', 'type': 'Government', 'capacity': 1800},
+        {'name': 'Rajiv Gandhi Hospital', 'city': 'Chennai', 'type': 'Government', 'capacity': 1600},
+        # Kolkata
+        {'name': 'Medical College Kolkata', 'city': 'Kolkata', 'type': 'Government', 'capacity': 1600},
+        {'name': 'SSKM Hospital', 'city': 'Kolkata', 'type': 'Government', 'capacity': 2000},
+        {'name': 'RG Kar Medical College', 'city': 'Kolkata', 'type': 'Government', 'capacity': 1400},
+        # Pune
+        {'name': 'Sassoon Hospital', 'city': 'Pune', 'type': 'Government', 'capacity': 1400},
+        {'name': 'YCM Hospital', 'city': 'Pune', 'type': 'Government', 'capacity': 1200},
+        # Ahmedabad
+        {'name': 'Civil Hospital', 'city': 'Ahmedabad', 'type': 'Government', 'capacity': 1200},
+        {'name': 'LG Hospital', 'city': 'Ahmedabad', 'type': 'Government', 'capacity': 1000},
+    ]
+    
+    private_hospitals = [
+        # Delhi
+        {'name': 'Apollo Hospital', 'city': 'Delhi', 'type': 'Private', 'capacity': 1000},
+        {'name': 'Max Super Speciality Hospital', 'city': 'Delhi', 'type': 'Private', 'capacity': 900},
+        {'name': 'Indraprastha Apollo', 'city': 'Delhi', 'type': 'Private', 'capacity': 850},
+        {'name': 'Fortis Escorts Heart Institute', 'city': 'Delhi', 'type': 'Private', 'capacity': 800},
+        {'name': 'Sir Ganga Ram Hospital', 'city': 'Delhi', 'type': 'Private', 'capacity': 750},
+        # Mumbai
+        {'name': 'Fortis Hospital', 'city': 'Mumbai', 'type': 'Private', 'capacity': 800},
+        {'name': 'Lilavati Hospital', 'city': 'Mumbai', 'type': 'Private', 'capacity': 900},
+        {'name': 'Jaslok Hospital', 'city': 'Mumbai', 'type': 'Private', 'capacity': 750},
+        {'name': 'Breach Candy Hospital', 'city': 'Mumbai', 'type': 'Private', 'capacity': 700},
+        {'name': 'Hinduja Hospital', 'city': 'Mumbai', 'type': 'Private', 'capacity': 850},
+        # Bangalore
+        {'name': 'Manipal Hospital', 'city': 'Bangalore', 'type': 'Private', 'capacity': 900},
+        {'name': 'Apollo BGS Hospital', 'city': 'Bangalore', 'type': 'Private', 'capacity': 800},
+        {'name': 'Fortis Hospital Bannerghatta', 'city': 'Bangalore', 'type': 'Private', 'capacity': 750},
+        {'name': 'Columbia Asia Hospital', 'city': 'Bangalore', 'type': 'Private', 'capacity': 650},
+        {'name': 'Narayana Health City', 'city': 'Bangalore', 'type': 'Private', 'capacity': 950},
+        # Hyderabad
+        {'name': 'KIMS Hospital', 'city': 'Hyderabad', 'type': 'Private', 'capacity': 700},
+        {'name': 'Yashoda Hospital', 'city': 'Hyderabad', 'type': 'Private', 'capacity': 800},
+        {'name': 'Care Hospital', 'city': 'Hyderabad', 'type': 'Private', 'capacity': 750},
+        {'name': 'Apollo Hospital Jubilee Hills', 'city': 'Hyderabad', 'type': 'Private', 'capacity': 850},
+        # Chennai
+        {'name': 'Apollo Chennai', 'city': 'Chennai', 'type': 'Private', 'capacity': 950},
+        {'name': 'Fortis Malar Hospital', 'city': 'Chennai', 'type': 'Private', 'capacity': 700},
+        {'name': 'MIOT International', 'city': 'Chennai', 'type': 'Private', 'capacity': 800},
+        {'name': 'Gleneagles Global Hospital', 'city': 'Chennai', 'type': 'Private', 'capacity': 750},
+        # Kolkata
+        {'name': 'Ruby Hospital', 'city': 'Kolkata', 'type': 'Private', 'capacity': 600},
+        {'name': 'Apollo Gleneagles', 'city': 'Kolkata', 'type': 'Private', 'capacity': 750},
+        {'name': 'Fortis Hospital', 'city': 'Kolkata', 'type': 'Private', 'capacity': 700},
+        {'name': 'AMRI Hospital', 'city': 'Kolkata', 'type': 'Private', 'capacity': 650},
+        # Pune
+        {'name': 'Ruby Hall Clinic', 'city': 'Pune', 'type': 'Private', 'capacity': 700},
+        {'name': 'Sahyadri Hospital', 'city': 'Pune', 'type': 'Private', 'capacity': 650},
+        # Ahmedabad
+        {'name': 'Sterling Hospital', 'city': 'Ahmedabad', 'type': 'Private', 'capacity': 600},
+        {'name': 'Apollo Hospital', 'city': 'Ahmedabad', 'type': 'Private', 'capacity': 700},
+    ]
+    
+    hospitals = []
+    for hosp_data in govt_hospitals + private_hospitals:
+        city_data = cities[hosp_data['city']]
+        lat_offset = rnd.uniform(-0.05, 0.05)
+        lon_offset = rnd.uniform(-0.05, 0.05)
+        
+        hospital = Hospital(
+            name=hosp_data['name'],
+            hospital_type=hosp_data['type'],
+            city=hosp_data['city'],
+            state=city_data['state'],
+            latitude=city_data['latitude'] + lat_offset,
+            longitude=city_data['longitude'] + lon_offset,
+            street=f"{rnd.randint(1, 200)}, {rnd.choice(['MG Road', 'Anna Salai', 'Park Street', 'Linking Road'])}",
+            phone=f"+91-{rnd.randint(1111111111, 9999999999)}",
+            emergency_contact=f"+91-{rnd.randint(1111111111, 9999999999)}",
+            email=f"{hosp_data['name'].lower().replace(' ', '.')}@hospital.gov.in",
+            total_beds=hosp_data['capacity'],
+            icu_beds=int(hosp_data['capacity'] * 0.1),
+            has_blood_bank=rnd.choice([True, True, False]),
+            website=f"http://{hosp_data['name'].lower().replace(' ', '')}.in"
+        )
+        hospitals.append(hospital)
+    
+    session.add_all(hospitals)
+    session.commit()
+    
+    # Create Blood Banks (attached to some hospitals)
+    blood_banks = []
+    licenses = set()
+    for hospital in hospitals:
+        if hospital.has_blood_bank:
+            # License numbers are unique (the import upsert key)
+            license_number = None
+            while license_number is None or license_number in licenses:
+                license_number = f"BB/{hospital.state[:3].upper()}/{rnd.randint(1000, 9999)}/20{rnd.randint(15, 24)}"
+            licenses.add(license_number)
+            blood_bank = BloodBank(
+                name=f"{hospital.name} Blood Bank",
+                hospital_id=hospital.id,
+                city=hospital.city,
+                state=hospital.state,
+                latitude=hospital.latitude,
+                longitude=hospital.longitude,
+                street=hospital.street,
+                phone=hospital.phone,
+                email=hospital.email.replace('@hospital', '@bloodbank') if hospital.email else None,
+                license_number=license_number,
+                # Random inventory for each blood type
+                inventory_a_positive=rnd.randint(10, 100),
+                inventory_a_negative=rnd.randint(5, 50),
+                inventory_b_positive=rnd.randint(10, 100),
+                inventory_b_negative=rnd.randint(5, 50),
+                inventory_ab_positive=rnd.randint(5, 40),
+                inventory_ab_negative=rnd.randint(2, 20),
+                inventory_o_positive=rnd.randint(15, 120),
+                inventory_o_negative=rnd.randint(8, 60)
+            )
+            blood_banks.append(blood_bank)
+    
+    session.add_all(blood_banks)
+    session.commit()
+    
+    # Create Blood Requests
+    patient_names = [
+        'Ramesh Kumar', 'Sunita Devi', 'Anil Sharma', 'Geeta Patel', 'Sunil Reddy',
+        'Lakshmi Iyer', 'Mohan Singh', 'Radha Krishnan', 'Vijay Kumar', 'Sita Gupta'
+    ]
+    
+    blood_requests = []
+    for i in range(30):
+        hospital = rnd.choice(hospitals)
+        urgency = rnd.choice(['Normal', 'Normal', 'Urgent', 'Critical'])
+        
+        req = BloodRequest(
+            patient_name=rnd.choice(patient_names),
+            blood_type=rnd.choice(blood_types),
+            units_required=rnd.randint(1, 5),
+            urgency=urgency,
+            hospital_id=hospital.id,
+            requester_name=f"Dr. {rnd.choice(['Kumar', 'Sharma', 'Patel', 'Reddy'])}",
+            requester_phone=f"+91-{rnd.randint(7000000000, 9999999999)}",
+            requester_email=f"doctor{i+1}@hospital.in",
+            requester_relation='Doctor',
+            latitude=hospital.latitude,
+            longitude=hospital.longitude,
+            reason=rnd.choice(['Surgery', 'Accident', 'Anemia', 'Thalassemia', 'Dengue']),
+            required_by=datetime.utcnow() + timedelta(hours=rnd.randint(2, 72)),
+            status=rnd.choice(['Pending', 'Pending', 'Matched', 'Fulfilled']),
+            notes=f"Patient admitted in {hospital.name}"
+        )
+        blood_requests.append(req)
+    
+    session.add_all(blood_requests)
+    session.commit()
+    
+    # Matched requests get their donors: compatible, available, same city, nearest first
+    matches = []
+    for req in blood_requests:
+        if req.status != 'Matched':
+            continue
+        hospital = next(h for h in hospitals if h.id == req.hospital_id)
+        location = (float(req.latitude), float(req.longitude))
+        candidates = sorted(
+            (distance_km(location, (float(d.latitude), float(d.longitude))), d.id) for d in donors
+            if d.city == hospital.city and d.available_for_donation
+            and d.blood_type in BLOOD_COMPATIBILITY[req.blood_type]
+        )
+        for distance, donor_id in candidates[:3]:
+            matches.append(BloodRequestMatch(
+                blood_request_id=req.id,
+                donor_id=donor_id,
+                match_score=round(rnd.uniform(70, 98), 2),
+                distance_km=round(distance, 2),
+                notified=True
+            ))
+        if not candidates:
+            req.status = 'Pending'
+    
+    session.add_all(matches)
+    session.commit()
+    
+    # Create some notifications
+    notifications = []
+    for i in range(20):
+        donor = rnd.choice(donors)
+        notif = Notification(
+            recipient_id=donor.id,
+            recipient_type='Donor',
+            title=rnd.choice([
+                'Blood Request Near You',
+                'Emergency Blood Needed',
+                'Thank You for Donating',
+                'Donation Reminder'
+            ]),
+            message=f"A patient needs {rnd.choice(blood_types)} blood within 5km from your location.",
+            notification_type=rnd.choice(['BloodRequest', 'DonationReminder', 'ThankYou']),
+            priority=rnd.choice(['Low', 'Medium', 'High']),
+            read=rnd.choice([True, False, False])
+        )
+        notifications.append(notif)
+    
+    session.add_all(notifications)
+    session.commit()
+    
+    return {
+        'donors': len(donors),
+        'hospitals': len(hospitals),
+        'blood_banks': len(blood_banks),
+        'blood_requests': len(blood_requests),
+        'blood_request_matches': len(matches),
+        'notifications': len(notifications)
+    }
+    
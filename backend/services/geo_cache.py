@@ -0,0 +1,386 @@
+"""
+Geographic candidate cache for nearby / map / smart-match queries
+
+A search is a centre, a radius and some filters. The cache keys it on the
+geohash cell containing the centre (GEO_CACHE_KEY_PRECISION) and the radius
+rounded up to a bucket (GEO_CACHE_RADIUS_BUCKETS), plus a digest of the
+filters. An entry holds the candidate superset for that key: every row in
+the cell's bounds widened by the bucket radius, so it contains the answer
+of any search centred in the cell with a radius up to the bucket. Each
+request then measures the candidates from its exact centre and keeps those
+within its exact radius (``GeoCandidateCache.nearby``). Clients whose GPS
+fixes differ slightly share an entry and still get exact rows and
+distances. Radii above the largest bucket bypass the cache.
+
+Entries live in an in-process LRU and, when REDIS_URL is set, in a shared
+tier (JSON) with a TTL. Each entry is tagged with the coarse geohash cells
+its bounds cover. A committed write to a donor/bank/hospital bumps the
+generation of the cells containing its old and new positions; entries whose
+tag generations moved are discarded on lookup. Writes without a position
+(bulk statements) bump a table-wide generation instead.
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+
+from flask import g
+
+from services import shared_store
+from services.change_tracker import change_tracker
+from services.http_cache import LRUCache
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_TABLE_WIDE = '*'
+DEFAULT_RADIUS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+# Distances are rounded to 0.01 km; widen bounds so rows rounded down onto the radius are kept
+_ROUNDING_KM = 0.01
+
+
+def geohash_encode(latitude, longitude, precision):
+    """Standard base32 geohash"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_lo = mid
+            else:
+                bits <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision):
+    """(height, width) of a geohash cell in degrees"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def geohash_bounds(cell):
+    """(min_lat, max_lat, min_lon, max_lon) of a geohash cell"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for char in cell:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (bits >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lon_lo, lon_hi
+
+
+def widen(bounds, radius_km):
+    """``bounds`` grown by ``radius_km`` on every side (a superset of the circles centred inside)"""
+    min_lat, max_lat, min_lon, max_lon = bounds
+    # A degree of latitude is at least 110.57 km; a degree of longitude shrinks towards the poles
+    dlat = radius_km / 110.5
+    widest = min(max(abs(min_lat), abs(max_lat)) + dlat, 89.9)
+    dlon = radius_km / (111.0 * max(math.cos(math.radians(widest)), 0.01))
+    return max(min_lat - dlat, -90.0), min(max_lat + dlat, 90.0), min_lon - dlon, max_lon + dlon
+
+
+def search_box(latitude, longitude, radius_km):
+    """Bounding box of a search circle"""
+    return widen((latitude, latitude, longitude, longitude), radius_km + _ROUNDING_KM)
+
+
+def in_box(model, box):
+    """Filter conditions for the rows of ``model`` inside ``box``"""
+    min_lat, max_lat, min_lon, max_lon = box
+    return model.latitude.between(min_lat, max_lat), model.longitude.between(min_lon, max_lon)
+
+
+def covering_cells(box, precision):
+    """Geohash cells intersecting ``box``"""
+    min_lat, max_lat, min_lon, max_lon = box
+    height, width = cell_size_degrees(precision)
+    lat_start = math.floor((min_lat + 90.0) / height) * height - 90.0
+    lon_start = math.floor((min_lon + 180.0) / width) * width - 180.0
+    cells = set()
+    lat = lat_start
+    while lat <= min(max_lat, 90.0):
+        lon = lon_start
+        while lon <= max_lon:
+            wrapped = ((lon + width / 2 + 180.0) % 360.0) - 180.0
+            cells.add(geohash_encode(min(lat + height / 2, 89.999999), wrapped, precision))
+            lon += width
+        lat += height
+    return cells
+
+
+def _distance(origin, destination):
+    # The views' distance (geodesic, rounded to 0.01 km); maps_service is created by the app factory
+    import services.google_maps_service as gmaps
+    return gmaps.maps_service.calculate_distance(origin, destination)
+
+
+class GeoCandidateCache:
+    """Two-tier cache of candidate rows per (cell, radius bucket) with cell-level invalidation"""
+
+    def __init__(self):
+        self.local = LRUCache(name='geo')
+        self.enabled = True
+        self.key_precision = 6
+        self.radius_buckets = DEFAULT_RADIUS_BUCKETS
+        self.tag_precision = 5
+        self.max_tags = 48
+        self.ttl = 60
+        self._lock = threading.Lock()
+        self._generations = {}
+        self.stores = 0
+        self.invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.shared_hits = 0
+        self._subscribed = False
+
+    def configure(self, config):
+        self.enabled = bool(config.get('GEO_CACHE_ENABLED', True))
+        self.local.max_entries = config.get('GEO_CACHE_MAX_ENTRIES', 2048)
+        self.key_precision = config.get('GEO_CACHE_KEY_PRECISION', 6)
+        self.radius_buckets = tuple(sorted(config.get('GEO_CACHE_RADIUS_BUCKETS', DEFAULT_RADIUS_BUCKETS)))
+        self.tag_precision = config.get('GEO_CACHE_TAG_PRECISION', 5)
+        self.max_tags = config.get('GEO_CACHE_MAX_TAGS', 48)
+        self.ttl = config.get('GEO_CACHE_TTL', 60)
+
+    # -- searches --------------------------------------------------------
+
+    def nearby(self, name, tables, latitude, longitude, radius_km, load, filters=None):
+        """``[(distance_km, item), ...]`` within ``radius_km`` of the exact centre, nearest first.
+
+        ``load(box)`` returns ``[(latitude, longitude, item), ...]`` for the
+        rows of ``tables`` inside ``box`` (see ``in_box``) that match
+        ``filters``; items must be JSON data and are shared, so copy them
+        before changing them. ``filters`` is everything besides the location
+        that changes what ``load`` returns (blood type, ``fields``, ...).
+        """
+        latitude, longitude, radius_km = float(latitude), float(longitude), float(radius_km)
+        bucket = self.radius_bucket(radius_km) if self.enabled else None
+        if bucket is None:
+            candidates = load(search_box(latitude, longitude, radius_km))
+            self._record('BYPASS')
+        else:
+            cell = geohash_encode(latitude, longitude, self.key_precision)
+            key = self.make_key(name, cell, bucket, filters)
+            candidates = self.get(key)
+            if candidates is None:
+                box = widen(geohash_bounds(cell), bucket + _ROUNDING_KM)
+                tags = self.tags_for(tables, box)
+                # Read generations before loading so a concurrent write wins
+                generations = self.current_generations(tags)
+                candidates = [(float(lat), float(lon), item) for lat, lon, item in load(box)]
+                self.set(key, candidates, tags, generations)
+                self._record('MISS')
+            else:
+                self._record('HIT')
+        return within(candidates, latitude, longitude, radius_km)
+
+    def radius_bucket(self, radius_km):
+        for bucket in self.radius_buckets:
+            if radius_km <= bucket:
+                return bucket
+        return None
+
+    def make_key(self, name, cell, bucket, filters):
+        digest = hashlib.blake2b(json.dumps(filters or {}, sort_keys=True, default=str).encode('utf-8'), digest_size=8).hexdigest()
+        return f'{name}:{cell}:{bucket}:{digest}'
+
+    def tags_for(self, tables, box):
+        precision = self.tag_precision
+        cells = covering_cells(box, precision)
+        while len(cells) > self.max_tags and precision > 1:
+            precision -= 1
+            cells = covering_cells(box, precision)
+        tags = []
+        for table in tables:
+            tags.append((table, _TABLE_WIDE))
+            tags.extend((table, cell) for cell in sorted(cells))
+        return tuple(tags)
+
+    def _record(self, status):
+        if status == 'BYPASS':
+            with self._lock:
+                self.bypasses += 1
+        # Per request, for the X-Cache header
+        try:
+            g.setdefault('geo_cache', []).append(status)
+        except RuntimeError:
+            pass
+
+    # -- generations ---------------------------------------------------
+
+    def current_generations(self, tags):
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                values = client.mget([shared_store.key('geogen', t, c) for t, c in tags])
+                return tuple(int(v or 0) for v in values)
+            except Exception:
+                pass
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _bump(self, tags):
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for table, cell in tags:
+                    pipe.incr(shared_store.key('geogen', table, cell))
+                pipe.execute()
+            except Exception as e:
+                print(f"⚠️  Shared geo cache invalidation failed: {e}")
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def invalidate_point(self, table, latitude, longitude):
+        """Invalidate every tag cell (any precision) containing the point"""
+        cell = geohash_encode(float(latitude), float(longitude), self.tag_precision)
+        self._bump([(table, cell[:length]) for length in range(1, len(cell) + 1)])
+
+    def invalidate_table(self, table):
+        self._bump([(table, _TABLE_WIDE)])
+
+    def on_change(self, tables, details):
+        """change_tracker listener"""
+        for table, latitude, longitude in details.get('points', ()):
+            self.invalidate_point(table, latitude, longitude)
+        for table in set(details.get('unlocated_tables', ())):
+            self.invalidate_table(table)
+
+    # -- lookup / store ------------------------------------------------
+
+    def get(self, key):
+        item = self.local.get(key)
+        if item is None:
+            item = self._shared_get(key)
+            if item is not None:
+                self.shared_hits += 1
+                self.local.set(key, item)
+        if item is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        candidates, tags, generations, expires_at = item
+        if time.time() > expires_at or self.current_generations(tags) != generations:
+            self.local.pop(key)
+            with self._lock:
+                self.invalidations += 1
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return candidates
+
+    def set(self, key, candidates, tags, generations):
+        self.local.set(key, (candidates, tags, generations, time.time() + self.ttl))
+        with self._lock:
+            self.stores += 1
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                payload = json.dumps({'candidates': candidates, 'tags': tags, 'generations': generations},
+                                     default=str)
+                client.setex(shared_store.key('geo', key), self.ttl, payload)
+            except Exception as e:
+                print(f"⚠️  Shared geo cache store failed: {e}")
+
+    def _shared_get(self, key):
+        client = shared_store.get_client()
+        if client is None:
+            return None
+        try:
+            payload = client.get(shared_store.key('geo', key))
+            if not payload:
+                return None
+            entry = json.loads(payload)
+            ttl = client.ttl(shared_store.key('geo', key))
+            return ([tuple(candidate) for candidate in entry['candidates']],
+                    tuple(tuple(tag) for tag in entry['tags']), tuple(entry['generations']),
+                    time.time() + max(ttl, 0))
+        except Exception:
+            return None
+
+    def stats(self):
+        stats = self.local.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats.update({
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypasses': self.bypasses,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'sharedTier': shared_store.get_client() is not None,
+                'sharedHits': self.shared_hits,
+                'stores': self.stores,
+                'invalidations': self.invalidations,
+                'keyPrecision': self.key_precision,
+                'radiusBucketsKm': list(self.radius_buckets),
+                'tagPrecision': self.tag_precision,
+                'ttlSeconds': self.ttl
+            })
+        return stats
+
+
+geo_cache = GeoCandidateCache()
+
+
+def within(candidates, latitude, longitude, radius_km):
+    """Candidates within ``radius_km`` of the centre as ``(distance_km, item)``, nearest first"""
+    min_lat, max_lat, min_lon, max_lon = search_box(latitude, longitude, radius_km)
+    found = []
+    for lat, lon, item in candidates:
+        # The box check skips most of the geodesic computations
+        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+            distance = _distance((latitude, longitude), (lat, lon))
+            if distance <= radius_km:
+                found.append((distance, item))
+    found.sort(key=lambda pair: pair[0])
+    return found
+
+
+def _x_cache_header(response):
+    statuses = g.pop('geo_cache', None)
+    if statuses:
+        response.headers['X-Cache'] = ('MISS' if 'MISS' in statuses
+                                       else 'HIT' if 'HIT' in statuses else 'BYPASS')
+    return response
+
+
+def init_geo_cache(app):
+    """Configure the cache, subscribe it to committed writes and add the X-Cache header"""
+    geo_cache.configure(app.config)
+    if not geo_cache._subscribed:
+        change_tracker.subscribe(geo_cache.on_change)
+        geo_cache._subscribed = True
+    app.after_request(_x_cache_header)
+    return geo_cache
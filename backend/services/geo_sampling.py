@@ -0,0 +1,83 @@
+"""
+City centres and location sampling shared by the synthetic data generator,
+the benchmarks, the load test and the maps stub (no app imports, so the
+driver, the stub and generator processes start fast)
+"""
+import math
+
+# name, state, latitude, longitude, metro population (millions), spread (km)
+CITIES = [
+    ('Delhi', 'Delhi', 28.6139, 77.2090, 32.9, 18),
+    ('Mumbai', 'Maharashtra', 19.0760, 72.8777, 21.3, 14),
+    ('Kolkata', 'West Bengal', 22.5726, 88.3639, 15.3, 12),
+    ('Bengaluru', 'Karnataka', 12.9716, 77.5946, 13.6, 14),
+    ('Chennai', 'Tamil Nadu', 13.0827, 80.2707, 11.8, 12),
+    ('Hyderabad', 'Telangana', 17.3850, 78.4867, 10.8, 14),
+    ('Ahmedabad', 'Gujarat', 23.0225, 72.5714, 8.6, 10),
+    ('Pune', 'Maharashtra', 18.5204, 73.8567, 7.2, 10),
+    ('Surat', 'Gujarat', 21.1702, 72.8311, 7.8, 8),
+    ('Jaipur', 'Rajasthan', 26.9124, 75.7873, 4.1, 8),
+    ('Lucknow', 'Uttar Pradesh', 26.8467, 80.9462, 3.9, 8),
+    ('Kanpur', 'Uttar Pradesh', 26.4499, 80.3319, 3.2, 7),
+    ('Nagpur', 'Maharashtra', 21.1458, 79.0882, 3.0, 7),
+    ('Indore', 'Madhya Pradesh', 22.7196, 75.8577, 3.3, 7),
+    ('Bhopal', 'Madhya Pradesh', 23.2599, 77.4126, 2.6, 7),
+    ('Patna', 'Bihar', 25.5941, 85.1376, 2.5, 6),
+    ('Vadodara', 'Gujarat', 22.3072, 73.1812, 2.3, 6),
+    ('Coimbatore', 'Tamil Nadu', 11.0168, 76.9558, 2.8, 7),
+    ('Kochi', 'Kerala', 9.9312, 76.2673, 2.4, 7),
+    ('Visakhapatnam', 'Andhra Pradesh', 17.6868, 83.2185, 2.3, 7),
+    ('Chandigarh', 'Chandigarh', 30.7333, 76.7794, 1.2, 5),
+    ('Guwahati', 'Assam', 26.1445, 91.7362, 1.2, 5),
+    ('Bhubaneswar', 'Odisha', 20.2961, 85.8245, 1.1, 5),
+    ('Madurai', 'Tamil Nadu', 9.9252, 78.1198, 1.7, 5),
+    ('Mysuru', 'Karnataka', 12.2958, 76.6394, 1.2, 5),
+    ('Vijayawada', 'Andhra Pradesh', 16.5062, 80.6480, 1.8, 5),
+]
+
+BLOOD_TYPES = ['B+', 'O+', 'A+', 'AB+', 'O-', 'B-', 'A-', 'AB-']
+BLOOD_TYPE_WEIGHTS = [32.1, 36.5, 22.9, 6.4, 0.7, 0.6, 0.5, 0.3]
+
+_KM_PER_DEGREE = 111.0
+
+
+def cities_by_weight(rnd, n):
+    """``n`` cities drawn in proportion to population"""
+    weights = [city[4] for city in CITIES]
+    return rnd.choices(CITIES, weights=weights, k=n)
+
+
+def point(rnd, city, spread_scale=1.0):
+    """A location around ``city``'s centre, normally spread over its radius"""
+    _, _, lat, lon, _, spread = city
+    sigma = spread * spread_scale / _KM_PER_DEGREE
+    return (round(rnd.gauss(lat, sigma), 6),
+            round(rnd.gauss(lon, sigma / max(math.cos(math.radians(lat)), 0.1)), 6))
+
+
+def random_point(rnd):
+    return point(rnd, cities_by_weight(rnd, 1)[0])
+
+
+def blood_type(rnd):
+    return rnd.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0]
+
+
+def city_named(text):
+    """The first city whose name appears in ``text``, or None"""
+    lowered = text.lower()
+    for city in CITIES:
+        if city[0].lower() in lowered:
+            return city
+    return None
+
+
+def nearest_city(latitude, longitude):
+    return min(CITIES, key=lambda city: (city[2] - latitude) ** 2 + ((city[3] - longitude) * math.cos(math.radians(latitude))) ** 2)
+
+
+def distance_km(a, b):
+    """Great-circle distance between two (latitude, longitude) pairs"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(h))
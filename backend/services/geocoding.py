@@ -0,0 +1,250 @@
+"""
+Batch geocoding for imports
+
+Rows without coordinates are resolved in three stages, cheapest first:
+
+1. the ``geocode_cache`` table, keyed by the normalized address;
+2. the gazetteer - the centroid of already located banks and hospitals
+   with the same pincode (an Indian PIN covers a few km²);
+3. the Google Maps geocoder, for what is left: each distinct address is
+   asked once, on a bounded thread pool, under a shared token-bucket rate
+   limit, with exponential backoff on timeouts, 5xx and OVER_QUERY_LIMIT.
+
+Geocoder answers (including "not found") are written to the cache and
+committed straight away, so a re-run, a later file with the same addresses
+or a batch whose upsert is rolled back costs no API calls. The
+client is ``maps_service.client``; point GOOGLE_MAPS_BASE_URL at
+benchmarks/maps_stub.py to run an import without the real API.
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.blood_bank import BloodBank
+from models.geocode import GeocodeCache
+from models.hospital import Hospital
+
+_RETRY_STATUSES = ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR')
+_SEPARATORS = re.compile(r'[\s,]+')
+_LOOKUP_CHUNK = 500
+
+
+def normalize_address(*parts):
+    """One comparable string per address: lower case, single spaces, no empty parts"""
+    parts = [_SEPARATORS.sub(' ', str(part)).strip() for part in parts if part]
+    return ', '.join(part for part in parts if part).lower()
+
+
+def address_key(address):
+    return hashlib.sha1(address.encode('utf-8')).hexdigest()
+
+
+class RateLimiter:
+    """Token bucket shared by the pool's threads"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeocodeStats:
+    def __init__(self):
+        self.addresses = 0
+        self.cache_hits = 0
+        self.gazetteer_hits = 0
+        self.geocoded = 0
+        self.not_found = 0
+        self.failed = 0
+        self.calls = 0
+        self.retries = 0
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class BatchGeocoder:
+    """Resolve batches of addresses to coordinates: cache, gazetteer, then the maps client"""
+
+    def __init__(self, session, client=None, workers=8, rate_per_second=40, max_attempts=4, backoff=0.5,
+                 use_gazetteer=True):
+        self.session = session
+        self.client = client
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.use_gazetteer = use_gazetteer
+        self.limiter = RateLimiter(rate_per_second)
+        self.stats = GeocodeStats()
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='geocode') if client else None
+
+    @classmethod
+    def from_config(cls, session, config, **options):
+        from services.google_maps_service import maps_service
+        settings = dict(workers=config.get('GEOCODE_WORKERS', 8),
+                        rate_per_second=config.get('GEOCODE_RATE_PER_SECOND', 40),
+                        max_attempts=config.get('GEOCODE_MAX_ATTEMPTS', 4))
+        settings.update(options)
+        if maps_service.client is None:
+            print("⚠️  Google Maps client not configured; geocoding from the cache and gazetteer only")
+        return cls(session, maps_service.client, **settings)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def resolve(self, items):
+        """``items``: ``[(address, pincode), ...]``; returns ``{address: (lat, lon)}`` for those found.
+
+        Addresses should come from ``normalize_address``; duplicates are
+        resolved once. Commits the session when the maps client answered, so
+        call it before writing the rows it locates.
+        """
+        pincodes = {}
+        for address, pincode in items:
+            if address and address not in pincodes:
+                pincodes[address] = pincode
+        self.stats.addresses += len(pincodes)
+        found, misses = self._from_cache(list(pincodes))
+        self.stats.cache_hits += len(found)
+        self.stats.not_found += len(misses)
+
+        if self.use_gazetteer:
+            pending = {address: pin for address, pin in pincodes.items() if address not in found and pin}
+            centroids = self._pincode_centroids(set(pending.values()))
+            for address, pin in pending.items():
+                if pin in centroids:
+                    found[address] = centroids[pin]
+                    misses.discard(address)
+                    self.stats.gazetteer_hits += 1
+
+        remaining = [address for address in pincodes if address not in found and address not in misses]
+        if remaining and self._pool is not None:
+            answers = dict(zip(remaining, self._pool.map(self._geocode, remaining)))
+            self._store(answers)
+            for address, answer in answers.items():
+                if answer and answer['status'] == 'ok':
+                    found[address] = (answer['latitude'], answer['longitude'])
+        return found
+
+    def _from_cache(self, addresses):
+        by_key = {address_key(address): address for address in addresses}
+        found, misses, keys = {}, set(), list(by_key)
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            rows = self.session.execute(
+                select(GeocodeCache.address_key, GeocodeCache.status, GeocodeCache.latitude, GeocodeCache.longitude)
+                .where(GeocodeCache.address_key.in_(keys[start:start + _LOOKUP_CHUNK]))
+            )
+            for key, status, lat, lon in rows:
+                if status == 'ok':
+                    found[by_key[key]] = (float(lat), float(lon))
+                else:
+                    # Known misses skip the geocoder; the gazetteer may still place them
+                    misses.add(by_key[key])
+        return found, misses
+
+    def _pincode_centroids(self, pincodes):
+        centroids = {}
+        pincodes = list(pincodes)
+        for start in range(0, len(pincodes), _LOOKUP_CHUNK):
+            chunk = pincodes[start:start + _LOOKUP_CHUNK]
+            for model in (BloodBank, Hospital):
+                rows = self.session.execute(
+                    select(model.pincode, func.avg(model.latitude), func.avg(model.longitude), func.count())
+                    .where(model.pincode.in_(chunk))
+                    .group_by(model.pincode)
+                )
+                for pincode, lat, lon, count in rows:
+                    if pincode in centroids:
+                        # Weighted merge of the bank and hospital centroids
+                        old_lat, old_lon, old_count = centroids[pincode]
+                        total = old_count + count
+                        lat = (old_lat * old_count + float(lat) * count) / total
+                        lon = (old_lon * old_count + float(lon) * count) / total
+                        count = total
+                    centroids[pincode] = (float(lat), float(lon), count)
+        return {pincode: (lat, lon) for pincode, (lat, lon, _) in centroids.items()}
+
+    def _geocode(self, address):
+        """One address against the maps client (runs on the pool); None when it kept failing"""
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                with self._stats_lock:
+                    self.stats.calls += 1
+                results = self.client.geocode(address, region='in')
+            except Exception as e:
+                retriable = getattr(e, 'status', None) in _RETRY_STATUSES or type(e).__name__ in (
+                    'Timeout', 'TransportError', 'HTTPError', '_RetriableRequest', '_OverQueryLimit')
+                if not retriable or attempt == self.max_attempts:
+                    with self._stats_lock:
+                        self.stats.failed += 1
+                    print(f"⚠️  Geocoding failed for '{address}': {e}")
+                    return None
+                with self._stats_lock:
+                    self.stats.retries += 1
+                # Full jitter, so throttled threads don't retry in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+                continue
+            with self._stats_lock:
+                if results:
+                    self.stats.geocoded += 1
+                else:
+                    self.stats.not_found += 1
+            if not results:
+                return {'status': 'not_found', 'latitude': None, 'longitude': None, 'formatted_address': None}
+            location = results[0]['geometry']['location']
+            return {'status': 'ok', 'latitude': location['lat'], 'longitude': location['lng'],
+                    'formatted_address': (results[0].get('formatted_address') or '')[:300]}
+        return None
+
+    def _store(self, answers):
+        """Cache and commit geocoder answers; failures are not cached, so they are retried next time"""
+        rows = [dict(answer, address_key=address_key(address), address=address[:300])
+                for address, answer in answers.items() if answer]
+        if not rows:
+            return
+        table = GeocodeCache.__table__
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            stmt = (sqlite_insert if dialect == 'sqlite' else pg_insert)(table).on_conflict_do_nothing(
+                index_elements=['address_key'])
+        elif dialect == 'mysql':
+            stmt = mysql_insert(table).prefix_with('IGNORE')
+        else:
+            known = set(self.session.execute(select(table.c.address_key).where(
+                table.c.address_key.in_([row['address_key'] for row in rows]))).scalars())
+            rows = [row for row in rows if row['address_key'] not in known]
+            stmt = table.insert()
+        if rows:
+            self.session.execute(stmt.execution_options(track_changes=False), rows)
+            # Paid answers outlive whatever the caller does with the batch afterwards
+            self.session.commit()
@@ -7,6 +7,8 @@ from datetime import datetime
 from flask import current_app
 from geopy.distance import geodesic
 
+from services.instrumentation import phase
+
 
 class GoogleMapsService:
     """Google Maps API integration"""
@@ -33,8 +35,17 @@ class GoogleMapsService:
             if api_key and api_key != 'YOUR_GOOGLE_MAPS_API_KEY':
                 try:
                     googlemaps = import_module('googlemaps')
-                    self.client = googlemaps.Client(key=api_key)
-                    print("✅ Google Maps API initialized")
+                    config = current_app.config
+                    options = {
+                        'timeout': config.get('GOOGLE_MAPS_TIMEOUT', 10),
+                        'queries_per_second': config.get('GOOGLE_MAPS_QUERIES_PER_SECOND', 50)
+                    }
+                    # A stand-in server (benchmarks/maps_stub.py) for load tests
+                    base_url = config.get('GOOGLE_MAPS_BASE_URL')
+                    if base_url:
+                        options['base_url'] = base_url.rstrip('/')
+                    self.client = googlemaps.Client(key=api_key, **options)
+                    print(f"✅ Google Maps API initialized{f' ({base_url})' if base_url else ''}")
                 except BaseException as e:  # includes ImportError & KeyboardInterrupt
                     print(f"⚠️  Google Maps client unavailable, using fallback: {e}")
                     self.client = None
@@ -65,7 +76,8 @@ class GoogleMapsService:
         """
         if self.client:
             try:
-                geocode_result = self.client.geocode(address)
+                with phase('maps'):
+                    geocode_result = self.client.geocode(address)
                 if geocode_result:
                     location = geocode_result[0]['geometry']['location']
                     return {
@@ -90,7 +102,8 @@ class GoogleMapsService:
         """
         if self.client:
             try:
-                reverse_geocode_result = self.client.reverse_geocode((latitude, longitude))
+                with phase('maps'):
+                    reverse_geocode_result = self.client.reverse_geocode((latitude, longitude))
                 if reverse_geocode_result:
                     return {
                         'formatted_address': reverse_geocode_result[0]['formatted_address'],
@@ -124,12 +137,13 @@ class GoogleMapsService:
         if self.client:
             try:
                 now = datetime.now()
-                directions_result = self.client.directions(
-                    origin,
-                    destination,
-                    mode=mode,
-                    departure_time=now
-                )
+                with phase('maps'):
+                    directions_result = self.client.directions(
+                        origin,
+                        destination,
+                        mode=mode,
+                        departure_time=now
+                    )
 
                 if directions_result:
                     route = directions_result[0]
@@ -207,11 +221,12 @@ class GoogleMapsService:
         """
         if self.client:
             try:
-                places_result = self.client.places_nearby(
-                    location=location,
-                    radius=radius,
-                    type=place_type
-                )
+                with phase('maps'):
+                    places_result = self.client.places_nearby(
+                        location=location,
+                        radius=radius,
+                        type=place_type
+                    )
                 
                 return places_result.get('results', [])
             except Exception as e:
@@ -233,8 +248,10 @@ class GoogleMapsService:
         return 'Unknown'
 
 
-# Singleton instance (initialised explicitly via init_maps_service)
-maps_service = None
+# Singleton instance. It exists from import time so modules that bind it
+# with ``from ... import maps_service`` get a working object; the live
+# client is attached later via init_maps_service.
+maps_service = GoogleMapsService()
 
 
 def init_maps_service(app):
@@ -0,0 +1,206 @@
+"""
+Conditional GET and versioned response caching
+
+``@conditional('blood_banks', ...)`` derives a strong ETag from the request
+(path, query, negotiated format) and the change counters of the listed
+tables. A matching ``If-None-Match`` (or, without one, a fresh
+``If-Modified-Since``) gets a 304 before the view runs; otherwise the
+rendered body is cached under its ETag, so repeated polls are served
+without touching the database until a write bumps one of the tables.
+Cache entries also hold the compressed variants of their body (see
+services.compression), whose ETags carry an encoding suffix; a 304 echoes
+the exact variant ETag the client holds.
+
+HTTP dates have 1-second resolution, so Last-Modified is only sent once
+the second of the last write is over - a later write always moves it on.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from services.change_tracker import change_tracker
+from services.compression import ETAG_SUFFIXES, choose_encoding
+from services.wire_format import negotiate_mimetype
+
+# Headers replayed from cache entries (content headers are rebuilt)
+_CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with hit/miss/eviction counters"""
+
+    def __init__(self, max_entries=512, name='cache'):
+        self.name = name
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._data),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class CachedResponse:
+    """Rendered response body plus the headers needed to replay it.
+
+    ``variants`` maps a content-coding ("gzip", "br") to the compressed
+    body, filled lazily by the compression hook.
+    """
+
+    __slots__ = ('body', 'status', 'mimetype', 'headers', 'variants', 'created_at')
+
+    def __init__(self, body, status, mimetype, headers):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.headers = headers
+        self.variants = {}
+        self.created_at = time.time()
+
+    @classmethod
+    def from_response(cls, response):
+        headers = [(name, response.headers[name]) for name in _CACHED_HEADERS if name in response.headers]
+        return cls(response.get_data(), response.status_code, response.mimetype, headers)
+
+    def to_response(self):
+        response = current_app.response_class(self.body, status=self.status, mimetype=self.mimetype)
+        for name, value in self.headers:
+            response.headers[name] = value
+        response.cache_entry = self
+        return response
+
+
+response_cache = LRUCache(name='conditional')
+
+
+def _compute_etag(tables, versions):
+    args = sorted(request.args.items(multi=True))
+    raw = repr((request.path, args, negotiate_mimetype(), tables, versions))
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def _variant_etags(etag):
+    """ETags of the identity and compressed variants, the negotiated encoding's first"""
+    encoding = choose_encoding() if current_app.config.get('COMPRESSION_ENABLED', True) else None
+    suffixes = ['', *ETAG_SUFFIXES.values()]
+    preferred = ETAG_SUFFIXES.get(encoding, '')
+    suffixes.remove(preferred)
+    return [etag + suffix for suffix in [preferred, *suffixes]]
+
+
+def _not_modified(etag, last_modified):
+    """``(True, etag to send)`` when the client's copy is current, else ``(False, None)``.
+
+    If-None-Match decides whenever it is present. If-Modified-Since alone
+    sends no ETag back: the client has none to update.
+    """
+    if request.if_none_match:
+        for variant in _variant_etags(etag):
+            if request.if_none_match.contains(variant):
+                return True, variant
+        return False, None
+    since = request.if_modified_since
+    return since is not None and int(last_modified) <= since.timestamp(), None
+
+
+def _stamp(response, etag, last_modified):
+    if etag:
+        response.set_etag(etag)
+    # A Last-Modified in the write's own second could not tell a second write apart
+    if int(last_modified) < int(time.time()):
+        response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+    # Clients may store the body but must revalidate on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    return response
+
+
+def conditional(*tables):
+    """Serve GET/HEAD with ETag/Last-Modified derived from ``tables`` counters"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+                return view(*args, **kwargs)
+
+            versions = change_tracker.versions(tables)
+            etag = _compute_etag(tables, versions)
+            last_modified = change_tracker.last_modified(tables)
+
+            not_modified, variant = _not_modified(etag, last_modified)
+            if not_modified:
+                response = _stamp(current_app.response_class(status=304), variant, last_modified)
+                if current_app.config.get('COMPRESSION_ENABLED', True):
+                    response.vary.add('Accept-Encoding')  # as on the 200
+                return response
+
+            entry = response_cache.get(etag)
+            if entry is not None:
+                return entry.to_response()
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            _stamp(response, etag, last_modified)
+            entry = CachedResponse.from_response(response)
+            response_cache.set(etag, entry)
+            response.cache_entry = entry
+            return response
+        return wrapper
+    return decorator
+
+
+def init_http_cache(app):
+    """Size the versioned response cache from config"""
+    response_cache.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 512)
+    return response_cache
@@ -0,0 +1,260 @@
+"""
+Request instrumentation: latency histograms, SQL counts, phase timers
+
+Every request gets a small metrics record (a context variable, so request
+threads and streamed responses each see their own). It collects:
+
+- ``db``        - time inside cursor executes, with the statement count
+                  (services.sql_timing engine events, so ORM, Core and
+                  text SQL);
+- ``serialize`` - JSON/msgpack encoding (the app's JSON provider and
+                  ``respond()``);
+- ``maps``      - Google Maps API calls;
+- ``app``       - the rest of the request (queries' row handling, Python
+                  work, compression).
+
+Other code can time its own phase with ``with phase('geocode'):`` or
+``@phase('geocode')``. The phases and the SQL count are sent back in a
+``Server-Timing`` header, which browser dev tools display. Per route,
+method and status this worker keeps a latency histogram and totals for
+the SQL statements, SQL time and phases, exported by /api/metrics in the
+Prometheus text format. Statements outside requests (jobs, scheduler) are
+counted under ``context="background"``.
+
+The hooks take a few microseconds per request and about one per
+statement. INSTRUMENTATION_ENABLED=False removes them;
+SERVER_TIMING_ENABLED=False keeps the metrics but drops the header.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import request
+
+from services import sql_timing
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_perf = time.perf_counter
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings of the request being served"""
+    __slots__ = ('started', 'sql_count', 'sql_time', 'phases')
+
+    def __init__(self, started):
+        self.started = started
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.phases = {}
+
+
+def current():
+    """Metrics of the current request, or None outside requests"""
+    return _current.get()
+
+
+class phase:
+    """Time a block (``with phase('name'):``) or function (``@phase('name')``) of the current request"""
+    __slots__ = ('name', '_started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._started = _perf()
+        return self
+
+    def __exit__(self, *exc):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.phases[self.name] = metrics.phases.get(self.name, 0.0) + _perf() - self._started
+        return False
+
+    def __call__(self, func):
+        name = self.name
+
+        def timed(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        timed.__name__ = func.__name__
+        timed.__doc__ = func.__doc__
+        return timed
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteStats:
+    __slots__ = ('latency', 'sql_count', 'sql_time', 'phases')
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.phases = {}
+
+
+class MetricsRegistry:
+    """Per-route request metrics and SQL totals of this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = DEFAULT_BUCKETS
+        self.routes = {}  # (method, route, status) -> RouteStats
+        self.sql = {'request': [0, 0.0], 'background': [0, 0.0]}
+        self.started_at = time.time()
+
+    def observe(self, method, route, status, duration, metrics):
+        key = (method, route, status)
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats(self.buckets)
+            stats.latency.observe(duration)
+            stats.sql_count += metrics.sql_count
+            stats.sql_time += metrics.sql_time
+            for name, seconds in metrics.phases.items():
+                stats.phases[name] = stats.phases.get(name, 0.0) + seconds
+            totals = self.sql['request']
+            totals[0] += metrics.sql_count
+            totals[1] += metrics.sql_time
+
+    def observe_background_sql(self, duration):
+        with self._lock:
+            totals = self.sql['background']
+            totals[0] += 1
+            totals[1] += duration
+
+    def render_prometheus(self):
+        """Prometheus text exposition (version 0.0.4)"""
+        with self._lock:
+            routes = [(key, stats.latency.counts[:], stats.latency.sum, stats.latency.count,
+                       stats.sql_count, stats.sql_time, dict(stats.phases)) for key, stats in self.routes.items()]
+            sql = {context: tuple(values) for context, values in self.sql.items()}
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by route.',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        for (method, route, status), counts, total, count, *_ in routes:
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {count}')
+        lines += ['# HELP http_request_sql_statements_total SQL statements executed by requests, by route.',
+                  '# TYPE http_request_sql_statements_total counter']
+        lines += [f'http_request_sql_statements_total{{method="{m}",route="{_escape(r)}",status="{s}"}} {sql_count}'
+                  for (m, r, s), _, _, _, sql_count, _, _ in routes]
+        lines += ['# HELP http_request_sql_seconds_total Time in SQL statements of requests, by route.',
+                  '# TYPE http_request_sql_seconds_total counter']
+        lines += [f'http_request_sql_seconds_total{{method="{m}",route="{_escape(r)}",status="{s}"}} {sql_time:.6f}'
+                  for (m, r, s), _, _, _, _, sql_time, _ in routes]
+        lines += ['# HELP http_request_phase_seconds_total Time in timed phases (serialize, maps, ...) of requests, by route.',
+                  '# TYPE http_request_phase_seconds_total counter']
+        for (m, r, s), *_, phases in routes:
+            for name, seconds in sorted(phases.items()):
+                lines.append(f'http_request_phase_seconds_total{{method="{m}",route="{_escape(r)}",status="{s}",'
+                             f'phase="{_escape(name)}"}} {seconds:.6f}')
+        lines += ['# HELP sql_statements_total SQL statements executed by this worker.',
+                  '# TYPE sql_statements_total counter']
+        lines += [f'sql_statements_total{{context="{context}"}} {count}' for context, (count, _) in sql.items()]
+        lines += ['# HELP sql_seconds_total Time in SQL statements of this worker.',
+                  '# TYPE sql_seconds_total counter']
+        lines += [f'sql_seconds_total{{context="{context}"}} {seconds:.6f}' for context, (_, seconds) in sql.items()]
+        lines += ['# HELP process_start_time_seconds Start time of this worker (unix seconds).',
+                  '# TYPE process_start_time_seconds gauge',
+                  f'process_start_time_seconds {self.started_at:.3f}']
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+# -- SQL statements -------------------------------------------------------------
+
+def _observe_statement(conn, statement, parameters, duration, executemany):
+    metrics = _current.get()
+    if metrics is None:
+        registry.observe_background_sql(duration)
+    else:
+        metrics.sql_count += 1
+        metrics.sql_time += duration
+
+
+# -- Flask hooks ----------------------------------------------------------------
+
+def _before_request():
+    _current.set(RequestMetrics(_perf()))
+
+
+def _server_timing(metrics, total):
+    app_time = max(total - metrics.sql_time - sum(metrics.phases.values()), 0.0)
+    parts = [f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.sql_count} queries"']
+    parts += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in metrics.phases.items()]
+    parts.append(f'app;dur={app_time * 1000:.2f}')
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def _make_after_request(server_timing):
+    def after_request(response):
+        metrics = _current.get()
+        if metrics is None:
+            return response
+        duration = _perf() - metrics.started
+        rule = request.url_rule
+        registry.observe(request.method, rule.rule if rule is not None else '<unmatched>',
+                         response.status_code, duration, metrics)
+        if server_timing:
+            response.headers['Server-Timing'] = _server_timing(metrics, duration)
+        return response
+    return after_request
+
+
+def _teardown_request(exc):
+    _current.set(None)
+
+
+def _time_json_provider(app):
+    provider = app.json
+    dumps = provider.dumps
+
+    def timed_dumps(obj, **kwargs):
+        with phase('serialize'):
+            return dumps(obj, **kwargs)
+    provider.dumps = timed_dumps
+
+
+def init_instrumentation(app):
+    """Install the request hooks and the SQL observer (call before other after_request hooks)"""
+    if not app.config.get('INSTRUMENTATION_ENABLED', True):
+        return registry
+    registry.buckets = tuple(app.config.get('METRICS_LATENCY_BUCKETS', DEFAULT_BUCKETS))
+    sql_timing.observe(_observe_statement)
+    _time_json_provider(app)
+    app.before_request(_before_request)
+    # Registered first, so it runs after the other after_request hooks (compression included)
+    app.after_request(_make_after_request(app.config.get('SERVER_TIMING_ENABLED', True)))
+    app.teardown_request(_teardown_request)
+    return registry
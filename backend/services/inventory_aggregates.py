@@ -0,0 +1,256 @@
+"""
+Incrementally maintained inventory totals
+
+``inventory_aggregates`` holds, per blood type, the units in stock and the
+number of banks with stock - globally and per city and state. The ledger
+(services.inventory_ledger) updates the rows in the same transaction as
+the bank row, with one executemany upsert per write, so totals and
+per-region breakdowns are read from a handful of rows instead of a scan
+of ``blood_banks``.
+
+Writes that bypass the ledger and the ORM (raw SQL, TRUNCATE) are caught
+up by ``rebuild()``; the periodic reconcile job repairs any drift.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.inventory import InventoryAggregate
+from services.scheduler import scheduler
+
+SCOPES = ('global', 'state', 'city')
+_KEY = ('scope', 'region_key', 'blood_type')
+
+
+def region_key(name):
+    return (name or '').strip().lower()
+
+
+def bank_changes(city, state, old_levels, new_levels):
+    """Aggregate row increments for one bank going from ``old_levels`` to ``new_levels``.
+
+    Levels are ``{blood_type: units}``; a missing type counts as 0. A bank
+    that moves region is expressed as removing the old levels from the old
+    region and adding the new ones (see ``bank_moved``).
+    """
+    rows = []
+    regions = [('global', '', None), ('city', region_key(city), city), ('state', region_key(state), state)]
+    for blood_type in INVENTORY_COLUMNS:
+        old = old_levels.get(blood_type) or 0
+        new = new_levels.get(blood_type) or 0
+        units = new - old
+        stocked = (new > 0) - (old > 0)
+        if not units and not stocked:
+            continue
+        for scope, key, name in regions:
+            if scope != 'global' and not key:
+                continue
+            rows.append({
+                'scope': scope,
+                'region_key': key,
+                'region_name': (name or '').strip() or None,
+                'blood_type': blood_type,
+                'units': units,
+                'banks_with_stock': stocked
+            })
+    return rows
+
+
+def bank_moved(old_city, old_state, new_city, new_state, old_levels, new_levels):
+    """Increments for a bank whose city/state (and possibly stock) changed"""
+    empty = dict.fromkeys(INVENTORY_COLUMNS, 0)
+    rows = [r for r in bank_changes(old_city, old_state, old_levels, empty) if r['scope'] != 'global']
+    rows += [r for r in bank_changes(new_city, new_state, empty, new_levels) if r['scope'] != 'global']
+    rows += [r for r in bank_changes(None, None, old_levels, new_levels) if r['scope'] == 'global']
+    return rows
+
+
+def _merge(rows):
+    merged = {}
+    for row in rows:
+        key = tuple(row[k] for k in _KEY)
+        if key in merged:
+            merged[key]['units'] += row['units']
+            merged[key]['banks_with_stock'] += row['banks_with_stock']
+        else:
+            merged[key] = dict(row)
+    # Key order, so concurrent writers lock the shared global/region rows in the same order
+    return [merged[key] for key in sorted(merged) if merged[key]['units'] or merged[key]['banks_with_stock']]
+
+
+def _dialect_name(executor):
+    dialect = getattr(executor, 'dialect', None)
+    if dialect is None:
+        dialect = executor.get_bind().dialect
+    return dialect.name
+
+
+def apply_changes(executor, rows):
+    """Add increments to the aggregate rows (creating them at 0).
+
+    ``executor`` is the session or, from mapper hooks, the flush connection;
+    either way the upsert runs in the caller's transaction.
+    """
+    rows = _merge(rows)
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    for row in rows:
+        row['updated_at'] = now
+    table = InventoryAggregate.__table__
+    dialect = _dialect_name(executor)
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite_insert if dialect == 'sqlite' else pg_insert)(table)
+        stmt = insert.on_conflict_do_update(
+            index_elements=list(_KEY),
+            set_={
+                'units': table.c.units + insert.excluded.units,
+                'banks_with_stock': table.c.banks_with_stock + insert.excluded.banks_with_stock,
+                'updated_at': insert.excluded.updated_at
+            }
+        )
+    elif dialect == 'mysql':
+        insert = mysql_insert(table)
+        stmt = insert.on_duplicate_key_update(
+            units=table.c.units + insert.inserted.units,
+            banks_with_stock=table.c.banks_with_stock + insert.inserted.banks_with_stock,
+            updated_at=insert.inserted.updated_at
+        )
+    else:
+        return _apply_portable(executor, table, rows)
+    executor.execute(stmt.execution_options(track_changes=False), rows)
+    return len(rows)
+
+
+def _apply_portable(executor, table, rows):
+    for row in rows:
+        result = executor.execute(
+            update(table)
+            .where(table.c.scope == row['scope'], table.c.region_key == row['region_key'], table.c.blood_type == row['blood_type'])
+            .values(units=table.c.units + row['units'], banks_with_stock=table.c.banks_with_stock + row['banks_with_stock'], updated_at=row['updated_at'])
+            .execution_options(track_changes=False)
+        )
+        if result.rowcount == 0:
+            executor.execute(table.insert().execution_options(track_changes=False), [row])
+    return len(rows)
+
+
+# -- reads -----------------------------------------------------------------
+
+def totals(session, scope='global', region=None):
+    """``{blood_type: units}`` for the whole network or one region (8 rows)"""
+    agg = InventoryAggregate
+    rows = session.execute(
+        select(agg.blood_type, agg.units).where(agg.scope == scope, agg.region_key == region_key(region))
+    ).all()
+    result = dict.fromkeys(INVENTORY_COLUMNS, 0)
+    result.update({blood_type: units for blood_type, units in rows})
+    return result
+
+
+def breakdown(session, scope='city', blood_type=None, region=None, limit=None):
+    """Per-region totals ``[{'region', 'regionKey', 'bloodInventory', 'banksWithStock', 'totalUnits'}]``, largest first"""
+    agg = InventoryAggregate
+    query = select(agg.region_key, agg.region_name, agg.blood_type, agg.units, agg.banks_with_stock).where(agg.scope == scope)
+    if blood_type:
+        query = query.where(agg.blood_type == blood_type)
+    if region:
+        query = query.where(agg.region_key == region_key(region))
+    regions = {}
+    for key, name, row_type, units, banks in session.execute(query):
+        entry = regions.setdefault(key, {
+            'region': name or key,
+            'regionKey': key,
+            'bloodInventory': dict.fromkeys(INVENTORY_COLUMNS, 0) if not blood_type else {blood_type: 0},
+            'banksWithStock': dict.fromkeys(INVENTORY_COLUMNS, 0) if not blood_type else {blood_type: 0},
+            'totalUnits': 0
+        })
+        entry['bloodInventory'][row_type] = units
+        entry['banksWithStock'][row_type] = banks
+        entry['totalUnits'] += units
+    result = sorted((r for r in regions.values() if r['totalUnits'] > 0), key=lambda r: -r['totalUnits'])
+    return result[:limit] if limit else result
+
+
+# -- rebuild / reconcile -------------------------------------------------
+
+def compute(session):
+    """Aggregate rows recomputed from ``blood_banks`` (a full scan; GROUP BY per scope)"""
+    expected = {}
+    for scope, column in (('global', None), ('city', BloodBank.city), ('state', BloodBank.state)):
+        group = [func.lower(func.trim(column))] if column is not None else []
+        selects = []
+        for blood_type, name in INVENTORY_COLUMNS.items():
+            col = func.coalesce(getattr(BloodBank, name), 0)
+            selects += [func.sum(col), func.sum(case((col > 0, 1), else_=0))]
+        label = [func.min(func.trim(column))] if column is not None else []
+        query = select(*group, *label, *selects)
+        if group:
+            query = query.where(column.isnot(None), func.trim(column) != '').group_by(*group)
+        for row in session.execute(query):
+            key, name = (row[0], row[1]) if group else ('', None)
+            values = row[2:] if group else row
+            for i, blood_type in enumerate(INVENTORY_COLUMNS):
+                units, banks = int(values[2 * i] or 0), int(values[2 * i + 1] or 0)
+                if units or banks:
+                    expected[(scope, key, blood_type)] = {
+                        'scope': scope, 'region_key': key, 'region_name': name, 'blood_type': blood_type,
+                        'units': units, 'banks_with_stock': banks
+                    }
+    return expected
+
+
+def rebuild(session):
+    """Replace every aggregate row with values recomputed from the banks"""
+    expected = compute(session)
+    now = datetime.utcnow()
+    session.execute(delete(InventoryAggregate.__table__).execution_options(track_changes=False))
+    if expected:
+        rows = [dict(row, updated_at=now) for row in expected.values()]
+        session.execute(InventoryAggregate.__table__.insert().execution_options(track_changes=False), rows)
+    return len(expected)
+
+
+def reconcile(session):
+    """Repair rows that drifted from the banks; returns the number fixed.
+
+    Adds the difference rather than overwriting, so increments committed
+    while the scan ran are not lost (they are at worst counted as drift on
+    the next run).
+    """
+    expected = compute(session)
+    agg = InventoryAggregate
+    stored = {
+        (r.scope, r.region_key, r.blood_type): r
+        for r in session.execute(select(agg.scope, agg.region_key, agg.blood_type, agg.units, agg.banks_with_stock))
+    }
+    fixes = []
+    for key in set(expected) | set(stored):
+        want = expected.get(key)
+        have = stored.get(key)
+        units = (want['units'] if want else 0) - (have.units if have else 0)
+        banks = (want['banks_with_stock'] if want else 0) - (have.banks_with_stock if have else 0)
+        if units or banks:
+            fixes.append({
+                'scope': key[0], 'region_key': key[1], 'blood_type': key[2],
+                'region_name': want['region_name'] if want else None,
+                'units': units, 'banks_with_stock': banks
+            })
+    apply_changes(session, fixes)
+    session.commit()
+    return len(fixes)
+
+
+def _reconcile_job():
+    return {'fixed': reconcile(db.session)}
+
+
+def init_inventory_aggregates(app):
+    """Register the periodic drift repair"""
+    scheduler.register('inventory_aggregates_reconcile', app.config.get('INVENTORY_AGGREGATES_RECONCILE_INTERVAL', 3600), _reconcile_job)
+    return scheduler
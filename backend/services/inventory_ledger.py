@@ -0,0 +1,627 @@
+"""
+Blood inventory ledger
+
+Every stock movement is an ``inventory_events`` row (bank, blood type,
+signed delta, reason). The inventory columns on ``blood_banks`` are the
+running total and are changed only by an atomic
+``UPDATE ... SET col = col + :delta`` in the same transaction as the event
+insert. Concurrent terminals therefore never lose units, and an issue that
+would take a column below zero matches no row and is rejected as a whole.
+
+Current stock stays an O(1) read of the bank row, and the global/city/
+state totals in ``inventory_aggregates`` are updated in the same
+transaction (services.inventory_aggregates). Snapshots checkpoint
+the ledger per (bank, blood type) so ``replay()`` only folds events newer
+than the last checkpoint; ``scripts/replay_inventory.py`` rebuilds and
+verifies the columns from the ledger.
+
+Banks created, or edited through the ORM (seed and import scripts), get
+Opening/Adjusted events and aggregate updates from mapper hooks so the
+ledger and the totals stay complete.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, event, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
+
+from flask import current_app
+
+from extensions import db
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.inventory import InventoryEvent, InventorySnapshot
+from services import inventory_aggregates
+from services.change_tracker import mark_changed
+from services.scheduler import scheduler
+
+# Above this many banks per commit, geo caches drop the whole table tier
+MAX_POINT_INVALIDATIONS = 64
+
+# Sign each reason's delta must have (None: either)
+REASON_SIGNS = {
+    'Opening': 1,
+    'Received': 1,
+    'Issued': -1,
+    'Expired': -1,
+    'Discarded': -1,
+    'Adjusted': None,
+    'Transfer': None
+}
+
+
+class InventoryError(ValueError):
+    """Rejected inventory change; ``status`` is the HTTP status to report"""
+
+    status = 400
+
+
+class BloodBankNotFound(InventoryError):
+    status = 404
+
+
+class InsufficientStock(InventoryError):
+    status = 409
+
+
+def normalize_deltas(deltas, reason):
+    """Validate ``{'O+': -2, ...}`` against the reason; drops zero deltas"""
+    if reason not in REASON_SIGNS:
+        raise InventoryError(f'Invalid reason: {reason}')
+    if not isinstance(deltas, dict) or not deltas:
+        raise InventoryError('At least one blood type delta is required')
+    sign = REASON_SIGNS[reason]
+    normalized = {}
+    for blood_type, delta in deltas.items():
+        if blood_type not in INVENTORY_COLUMNS:
+            raise InventoryError(f'Invalid blood type: {blood_type}')
+        if isinstance(delta, bool) or not isinstance(delta, int):
+            raise InventoryError(f'Delta for {blood_type} must be an integer')
+        if sign is not None and delta * sign < 0:
+            raise InventoryError(f'{reason} events must have {"positive" if sign > 0 else "negative"} deltas')
+        if delta:
+            normalized[blood_type] = delta
+    return normalized
+
+
+def _apply_statement(bank_id, deltas, now):
+    """Single-row atomic increment, guarded so no column goes negative"""
+    table = BloodBank.__table__
+    values = {'last_inventory_update': now, 'updated_at': now}
+    stmt = update(table).where(table.c.id == bank_id)
+    for blood_type, delta in deltas.items():
+        column = table.c[INVENTORY_COLUMNS[blood_type]]
+        values[column.name] = func.coalesce(column, 0) + delta
+        if delta < 0:
+            stmt = stmt.where(func.coalesce(column, 0) + delta >= 0)
+    # The ledger reports the bank's position itself (see _mark_banks)
+    return stmt.values(**values).execution_options(track_changes=False)
+
+
+def _mark_banks(session, bank_ids, positions=None):
+    """Report changed banks once; large batches invalidate geo caches table-wide"""
+    bank_ids = list(bank_ids)
+    if len(bank_ids) > MAX_POINT_INVALIDATIONS:
+        mark_changed(session, 'blood_banks', unlocated_tables=['blood_banks'], blood_bank_ids=bank_ids)
+        return
+    if positions is None:
+        positions = session.execute(
+            select(BloodBank.latitude, BloodBank.longitude).where(BloodBank.id.in_(bank_ids))
+        ).all()
+    points = [('blood_banks', float(lat), float(lon)) for lat, lon in positions if lat is not None and lon is not None]
+    mark_changed(session, 'blood_banks', points=points, blood_bank_ids=bank_ids)
+
+
+def current_stock(session, bank_id):
+    """Inventory columns of one bank as ``{'A+': units, ...}`` (O(1) read)"""
+    columns = [getattr(BloodBank, c) for c in INVENTORY_COLUMNS.values()]
+    row = session.execute(select(*columns).where(BloodBank.id == bank_id)).first()
+    if row is None:
+        return None
+    return {blood_type: row[i] or 0 for i, blood_type in enumerate(INVENTORY_COLUMNS)}
+
+
+def record_events(session, bank_id, deltas, reason, terminal_id=None, reference=None, note=None):
+    """Append ledger events and apply them to the bank in the caller's transaction.
+
+    Returns ``(events, duplicate)``. When ``reference`` was already recorded
+    for this bank the stored events are returned with ``duplicate=True`` and
+    nothing is applied. The caller commits (or rolls back).
+    """
+    deltas = normalize_deltas(deltas, reason)
+    if reference:
+        existing = session.execute(
+            select(InventoryEvent).where(InventoryEvent.blood_bank_id == bank_id, InventoryEvent.reference == reference)
+        ).scalars().all()
+        if existing:
+            return existing, True
+    if not deltas:
+        return [], False
+
+    now = datetime.utcnow()
+    result = session.execute(_apply_statement(bank_id, deltas, now))
+    if result.rowcount != 1:
+        if session.get(BloodBank, bank_id) is None:
+            raise BloodBankNotFound('Blood bank not found')
+        raise InsufficientStock('Insufficient stock for ' + ', '.join(t for t, d in deltas.items() if d < 0))
+
+    # Only the first event carries the reference (it is unique per bank)
+    events = [
+        InventoryEvent(
+            blood_bank_id=bank_id,
+            blood_type=blood_type,
+            delta=delta,
+            reason=reason,
+            terminal_id=terminal_id,
+            reference=reference if i == 0 else None,
+            note=note,
+            created_at=now
+        )
+        for i, (blood_type, delta) in enumerate(deltas.items())
+    ]
+    session.add_all(events)
+    session.flush()
+
+    table = BloodBank.__table__
+    columns = [table.c[c] for c in INVENTORY_COLUMNS.values()]
+    row = session.execute(
+        select(table.c.latitude, table.c.longitude, table.c.city, table.c.state, *columns).where(table.c.id == bank_id)
+    ).first()
+    new_levels = {blood_type: row[i + 4] or 0 for i, blood_type in enumerate(INVENTORY_COLUMNS)}
+    old_levels = {blood_type: units - deltas.get(blood_type, 0) for blood_type, units in new_levels.items()}
+    inventory_aggregates.apply_changes(session, inventory_aggregates.bank_changes(row.city, row.state, old_levels, new_levels))
+    _mark_banks(session, [bank_id], [(row.latitude, row.longitude)])
+    return events, False
+
+
+def apply_events(bank_id, deltas, reason, terminal_id=None, reference=None, note=None):
+    """``record_events`` + commit; a concurrent duplicate reference is reported, not raised"""
+    try:
+        events, duplicate = record_events(db.session, bank_id, deltas, reason, terminal_id, reference, note)
+        db.session.commit()
+        return events, duplicate
+    except IntegrityError:
+        db.session.rollback()
+        if not reference:
+            raise
+        # Another terminal committed the same reference first
+        existing = InventoryEvent.query.filter_by(blood_bank_id=bank_id, reference=reference).all()
+        return existing, True
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def set_levels(bank_id, levels, terminal_id=None, note=None):
+    """Set absolute levels (stock count); records the differences as Adjusted events"""
+    for blood_type in levels:
+        if blood_type not in INVENTORY_COLUMNS:
+            raise InventoryError(f'Invalid blood type: {blood_type}')
+    try:
+        # Lock the row so the computed differences stay valid until commit
+        bank = db.session.execute(
+            select(BloodBank).where(BloodBank.id == bank_id).with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if bank is None:
+            raise BloodBankNotFound('Blood bank not found')
+        current = bank.get_inventory()
+        deltas = {}
+        for blood_type, units in levels.items():
+            units = int(units)
+            if units < 0:
+                raise InventoryError(f'Units for {blood_type} cannot be negative')
+            if units != (current[blood_type] or 0):
+                deltas[blood_type] = units - (current[blood_type] or 0)
+        events = []
+        if deltas:
+            events, _ = record_events(db.session, bank_id, deltas, 'Adjusted', terminal_id, note=note)
+        else:
+            # A count that matches (or an empty one) still dates the stock
+            bank.last_inventory_update = datetime.utcnow()
+        db.session.commit()
+        db.session.refresh(bank)
+        return bank, events
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def bank_events(bank_id, limit=50, before_id=None, blood_type=None):
+    """Most recent ledger events of one bank (newest first)"""
+    query = InventoryEvent.query.filter(InventoryEvent.blood_bank_id == bank_id)
+    if before_id:
+        query = query.filter(InventoryEvent.id < before_id)
+    if blood_type:
+        query = query.filter(InventoryEvent.blood_type == blood_type)
+    return query.order_by(InventoryEvent.id.desc()).limit(limit).all()
+
+
+# -- bulk ingestion ------------------------------------------------------
+
+BULK_MODES = ('set', 'delta')
+_LOCK_CHUNK = 500
+
+
+def _bulk_apply_statement():
+    """executemany-able increment of all eight columns, keyed by bind params"""
+    table = BloodBank.__table__
+    values = {'last_inventory_update': bindparam('now'), 'updated_at': bindparam('now')}
+    stmt = update(table).where(table.c.id == bindparam('bank_id'))
+    for blood_type, column_name in INVENTORY_COLUMNS.items():
+        column = table.c[column_name]
+        delta = bindparam(f'd_{column_name}')
+        values[column_name] = func.coalesce(column, 0) + delta
+        stmt = stmt.where(func.coalesce(column, 0) + delta >= 0)
+    return stmt.values(**values).execution_options(track_changes=False)
+
+
+def _validate_item(item, mode, reason):
+    """(bank_id, {blood_type: value}) of one payload item; raises InventoryError"""
+    if not isinstance(item, dict):
+        raise InventoryError('Item must be an object')
+    bank_id = item.get('bloodBankId', item.get('id'))
+    if isinstance(bank_id, bool) or not isinstance(bank_id, int):
+        raise InventoryError('bloodBankId must be an integer')
+    if mode == 'delta':
+        return bank_id, normalize_deltas(item.get('deltas'), reason)
+    levels = item.get('bloodInventory')
+    if not isinstance(levels, dict) or not levels:
+        raise InventoryError('bloodInventory is required')
+    for blood_type, units in levels.items():
+        if blood_type not in INVENTORY_COLUMNS:
+            raise InventoryError(f'Invalid blood type: {blood_type}')
+        if isinstance(units, bool) or not isinstance(units, int) or units < 0:
+            raise InventoryError(f'Units for {blood_type} must be a non-negative integer')
+    return bank_id, levels
+
+
+def apply_bulk(items, mode='set', reason=None, terminal_id=None, reference=None, partial=False):
+    """Validate and apply many banks' inventories in one transaction.
+
+    ``mode='set'`` takes absolute levels (end-of-shift stock counts) and
+    records the differences as Adjusted events; ``mode='delta'`` takes
+    signed movements with a ``reason``. Bank rows are read (and locked where
+    the database supports it) in chunked ``IN`` queries, then applied with
+    one executemany UPDATE and one executemany event INSERT, and the change
+    is reported once. With ``partial=False`` any invalid item rejects the
+    batch; otherwise valid items are applied and the rest reported.
+    A batch ``reference`` already recorded for a bank skips that bank.
+    """
+    if mode not in BULK_MODES:
+        raise InventoryError(f'Invalid mode: {mode}')
+    if mode == 'set':
+        reason = 'Adjusted'
+    elif reason not in REASON_SIGNS:
+        raise InventoryError(f'Invalid reason: {reason}')
+
+    rejected = []
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            bank_id, values = _validate_item(item, mode, reason)
+            if bank_id in parsed:
+                raise InventoryError(f'Blood bank {bank_id} appears more than once')
+            parsed[bank_id] = (index, values)
+        except InventoryError as e:
+            rejected.append({'index': index, 'message': str(e)})
+    if rejected and not partial:
+        return {'applied': 0, 'rejected': rejected, 'duplicates': [], 'events': 0}
+
+    session = db.session
+    try:
+        table = BloodBank.__table__
+        columns = [table.c[c] for c in INVENTORY_COLUMNS.values()]
+        current = {}
+        bank_ids = sorted(parsed)  # one lock order for every writer
+        for start in range(0, len(bank_ids), _LOCK_CHUNK):
+            chunk = bank_ids[start:start + _LOCK_CHUNK]
+            query = select(
+                table.c.id, table.c.latitude, table.c.longitude, table.c.city, table.c.state, *columns
+            ).where(table.c.id.in_(chunk)).with_for_update()
+            for row in session.execute(query):
+                current[row[0]] = row
+
+        duplicates = set()
+        if reference and bank_ids:
+            for start in range(0, len(bank_ids), _LOCK_CHUNK):
+                chunk = bank_ids[start:start + _LOCK_CHUNK]
+                duplicates.update(session.execute(
+                    select(InventoryEvent.blood_bank_id).where(
+                        InventoryEvent.reference == reference, InventoryEvent.blood_bank_id.in_(chunk)
+                    )
+                ).scalars())
+
+        now = datetime.utcnow()
+        updates, events, positions, aggregate_rows = [], [], [], []
+        for bank_id, (index, values) in parsed.items():
+            row = current.get(bank_id)
+            if row is None:
+                rejected.append({'index': index, 'message': f'Blood bank {bank_id} not found'})
+                continue
+            if bank_id in duplicates:
+                continue
+            stock = {blood_type: row[i + 5] or 0 for i, blood_type in enumerate(INVENTORY_COLUMNS)}
+            if mode == 'set':
+                deltas = {t: units - stock[t] for t, units in values.items() if units != stock[t]}
+            else:
+                deltas = values
+            short = [t for t, d in deltas.items() if stock[t] + d < 0]
+            if short:
+                rejected.append({'index': index, 'message': 'Insufficient stock for ' + ', '.join(short)})
+                continue
+            params = {'bank_id': bank_id, 'now': now}
+            params.update({f'd_{c}': deltas.get(t, 0) for t, c in INVENTORY_COLUMNS.items()})
+            updates.append(params)
+            positions.append((row.latitude, row.longitude))
+            new_levels = {t: units + deltas.get(t, 0) for t, units in stock.items()}
+            aggregate_rows += inventory_aggregates.bank_changes(row.city, row.state, stock, new_levels)
+            for i, (blood_type, delta) in enumerate(deltas.items()):
+                events.append({
+                    'blood_bank_id': bank_id,
+                    'blood_type': blood_type,
+                    'delta': delta,
+                    'reason': reason,
+                    'terminal_id': terminal_id,
+                    'reference': reference if i == 0 else None,
+                    'note': None,
+                    'created_at': now
+                })
+        if rejected and not partial:
+            session.rollback()
+            return {'applied': 0, 'rejected': rejected, 'duplicates': sorted(duplicates), 'events': 0}
+
+        if updates:
+            result = session.execute(_bulk_apply_statement(), updates)
+            if session.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(updates):
+                # Rows are locked, so this only happens on databases without row locks
+                raise InsufficientStock('Stock changed concurrently; retry the batch')
+            if events:
+                session.execute(InventoryEvent.__table__.insert(), events)
+            inventory_aggregates.apply_changes(session, aggregate_rows)
+            _mark_banks(session, [u['bank_id'] for u in updates], positions)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return {
+        'applied': len(updates),
+        'rejected': sorted(rejected, key=lambda r: r['index']),
+        'duplicates': sorted(duplicates),
+        'events': len(events)
+    }
+
+
+# -- ORM writes ------------------------------------------------------------
+
+def _ledger_rows(target, reason, changed):
+    now = datetime.utcnow()
+    return [
+        {'blood_bank_id': target.id, 'blood_type': blood_type, 'delta': delta, 'reason': reason,
+         'note': 'Recorded from a direct write', 'created_at': now}
+        for blood_type, delta in changed
+        if delta
+    ]
+
+
+def _levels(target):
+    return {blood_type: getattr(target, column) or 0 for blood_type, column in INVENTORY_COLUMNS.items()}
+
+
+def _after_bank_insert(mapper, connection, target):
+    levels = _levels(target)
+    rows = _ledger_rows(target, 'Opening', levels.items())
+    if rows:
+        connection.execute(InventoryEvent.__table__.insert(), rows)
+        mark_changed(object_session(target), 'blood_banks', blood_bank_ids=[target.id])
+    inventory_aggregates.apply_changes(connection, inventory_aggregates.bank_changes(target.city, target.state, {}, levels))
+
+
+def _previous(history, current):
+    return history.deleted[0] if history.deleted else current
+
+
+def _after_bank_update(mapper, connection, target):
+    state = inspect(target)
+    new_levels = _levels(target)
+    old_levels = {}
+    changed = []
+    for blood_type, column in INVENTORY_COLUMNS.items():
+        history = state.attrs[column].history
+        old_levels[blood_type] = _previous(history, new_levels[blood_type]) or 0
+        if old_levels[blood_type] != new_levels[blood_type]:
+            changed.append((blood_type, new_levels[blood_type] - old_levels[blood_type]))
+    rows = _ledger_rows(target, 'Adjusted', changed)
+    if rows:
+        connection.execute(InventoryEvent.__table__.insert(), rows)
+        mark_changed(object_session(target), 'blood_banks', blood_bank_ids=[target.id])
+
+    old_city = _previous(state.attrs.city.history, target.city)
+    old_state = _previous(state.attrs.state.history, target.state)
+    if inventory_aggregates.region_key(old_city) != inventory_aggregates.region_key(target.city) or \
+            inventory_aggregates.region_key(old_state) != inventory_aggregates.region_key(target.state):
+        aggregate_rows = inventory_aggregates.bank_moved(old_city, old_state, target.city, target.state, old_levels, new_levels)
+    else:
+        aggregate_rows = inventory_aggregates.bank_changes(target.city, target.state, old_levels, new_levels)
+    inventory_aggregates.apply_changes(connection, aggregate_rows)
+
+
+def _after_bank_delete(mapper, connection, target):
+    inventory_aggregates.apply_changes(connection, inventory_aggregates.bank_changes(target.city, target.state, _levels(target), {}))
+
+
+# -- opening balances, snapshots, replay --------------------------------
+
+def record_opening_balances(session):
+    """Opening events for banks whose stock predates the ledger (no events yet)"""
+    has_events = select(InventoryEvent.id).where(InventoryEvent.blood_bank_id == BloodBank.id).exists()
+    columns = [getattr(BloodBank, c) for c in INVENTORY_COLUMNS.values()]
+    rows = session.execute(select(BloodBank.id, *columns).where(~has_events)).all()
+    now = datetime.utcnow()
+    events = [
+        {'blood_bank_id': row[0], 'blood_type': blood_type, 'delta': row[i + 1], 'reason': 'Opening', 'created_at': now}
+        for row in rows
+        for i, blood_type in enumerate(INVENTORY_COLUMNS)
+        if row[i + 1]
+    ]
+    if events:
+        session.execute(InventoryEvent.__table__.insert(), events)
+    return len(events)
+
+
+def _pending_sums(session, upto_id, bank_ids=None):
+    """Sum of events after each (bank, type) checkpoint, up to ``upto_id``"""
+    event, snap = InventoryEvent, InventorySnapshot
+    stmt = (
+        select(event.blood_bank_id, event.blood_type, func.sum(event.delta), snap.units, snap.last_event_id)
+        .outerjoin(snap, (snap.blood_bank_id == event.blood_bank_id) & (snap.blood_type == event.blood_type))
+        .where(event.id > func.coalesce(snap.last_event_id, 0))
+        .group_by(event.blood_bank_id, event.blood_type, snap.units, snap.last_event_id)
+    )
+    if upto_id is not None:
+        stmt = stmt.where(event.id <= upto_id)
+    if bank_ids:
+        stmt = stmt.where(event.blood_bank_id.in_(bank_ids))
+    return session.execute(stmt).all()
+
+
+# Start of each event id gap -> when take_snapshots first saw it (monotonic)
+_gaps = {}
+
+
+def committed_high_water_mark(session, floor, gap_seconds=300, now=None):
+    """Highest event id such that every id in ``(floor, mark]`` is visible.
+
+    Ids are allocated at insert but only become visible at commit, so a
+    missing id may still arrive from a slower transaction and the mark stops
+    before it. A gap still open after ``gap_seconds`` is taken for a
+    rolled-back insert (sequences do not reuse ids) and passed.
+    """
+    now = time.monotonic() if now is None else now
+    mark = floor
+    ids = session.execute(
+        select(InventoryEvent.id).where(InventoryEvent.id > floor).order_by(InventoryEvent.id)
+    ).scalars()
+    for event_id in ids:
+        if event_id > mark + 1 and now - _gaps.setdefault(mark + 1, now) < gap_seconds:
+            break
+        mark = event_id
+    for start in [start for start in _gaps if start <= mark]:
+        del _gaps[start]
+    return mark
+
+
+def take_snapshots(session, gap_seconds=300):
+    """Fold new events into the per-(bank, type) checkpoints.
+
+    Events are folded up to the committed high-water mark: folding past an
+    id whose transaction has not committed yet would skip that event for
+    good, whatever its ``created_at``. Checkpoints advance with a
+    compare-and-set on ``last_event_id``, so concurrent workers running the
+    job never fold an event twice.
+    """
+    floor = session.execute(select(func.max(InventorySnapshot.last_event_id))).scalar() or 0
+    upto_id = committed_high_water_mark(session, floor, gap_seconds)
+    if upto_id == floor:
+        session.commit()
+        return {'snapshots': 0, 'uptoEventId': floor or None}
+
+    now = datetime.utcnow()
+    snap = InventorySnapshot.__table__
+    updated = 0
+    for bank_id, blood_type, total, units, last_event_id in _pending_sums(session, upto_id):
+        if last_event_id is None:
+            session.execute(snap.insert().values(
+                blood_bank_id=bank_id, blood_type=blood_type, units=total, last_event_id=upto_id, taken_at=now
+            ))
+            updated += 1
+        else:
+            result = session.execute(
+                update(snap)
+                .where(snap.c.blood_bank_id == bank_id, snap.c.blood_type == blood_type, snap.c.last_event_id == last_event_id)
+                .values(units=snap.c.units + total, last_event_id=upto_id, taken_at=now)
+            )
+            updated += result.rowcount
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another worker created the same checkpoints; it will have folded these events
+        session.rollback()
+        return {'snapshots': 0, 'uptoEventId': upto_id}
+    return {'snapshots': updated, 'uptoEventId': upto_id}
+
+
+def replay(session, bank_ids=None, use_snapshots=True):
+    """Rebuild ``{bank_id: {'A+': units, ...}}`` from checkpoints plus newer events"""
+    state = {}
+    if use_snapshots:
+        query = select(InventorySnapshot.blood_bank_id, InventorySnapshot.blood_type, InventorySnapshot.units)
+        if bank_ids:
+            query = query.where(InventorySnapshot.blood_bank_id.in_(bank_ids))
+        for bank_id, blood_type, units in session.execute(query):
+            state.setdefault(bank_id, dict.fromkeys(INVENTORY_COLUMNS, 0))[blood_type] = units
+        pending = [(b, t, total) for b, t, total, _, _ in _pending_sums(session, None, bank_ids)]
+    else:
+        query = select(InventoryEvent.blood_bank_id, InventoryEvent.blood_type, func.sum(InventoryEvent.delta)).group_by(
+            InventoryEvent.blood_bank_id, InventoryEvent.blood_type
+        )
+        if bank_ids:
+            query = query.where(InventoryEvent.blood_bank_id.in_(bank_ids))
+        pending = session.execute(query).all()
+    for bank_id, blood_type, total in pending:
+        levels = state.setdefault(bank_id, dict.fromkeys(INVENTORY_COLUMNS, 0))
+        levels[blood_type] += int(total or 0)
+    return state
+
+
+def verify(session, bank_ids=None, use_snapshots=True):
+    """Banks whose inventory columns disagree with the ledger: ``{bank_id: {type: (stored, replayed)}}``"""
+    replayed = replay(session, bank_ids, use_snapshots)
+    columns = [getattr(BloodBank, c) for c in INVENTORY_COLUMNS.values()]
+    query = select(BloodBank.id, *columns)
+    if bank_ids:
+        query = query.where(BloodBank.id.in_(bank_ids))
+    drift = {}
+    for row in session.execute(query):
+        levels = replayed.get(row[0], dict.fromkeys(INVENTORY_COLUMNS, 0))
+        diff = {
+            blood_type: (row[i + 1] or 0, levels[blood_type])
+            for i, blood_type in enumerate(INVENTORY_COLUMNS)
+            if (row[i + 1] or 0) != levels[blood_type]
+        }
+        if diff:
+            drift[row[0]] = diff
+    return drift
+
+
+def repair(session, drift):
+    """Overwrite drifted inventory columns with the replayed values (run with writes paused)"""
+    table = BloodBank.__table__
+    for bank_id, diff in drift.items():
+        values = {INVENTORY_COLUMNS[t]: replayed for t, (_, replayed) in diff.items()}
+        session.execute(update(table).where(table.c.id == bank_id).values(**values))
+    if drift:
+        inventory_aggregates.rebuild(session)
+        _mark_banks(session, list(drift))
+    session.commit()
+    return len(drift)
+
+
+def _snapshot_job():
+    return take_snapshots(db.session, current_app.config.get('INVENTORY_SNAPSHOT_GAP_SECONDS', 300))
+
+
+_installed = False
+
+
+def init_inventory_ledger(app):
+    """Install the ORM hooks and register the periodic snapshot job"""
+    global _installed
+    if not _installed:
+        event.listen(BloodBank, 'after_insert', _after_bank_insert)
+        event.listen(BloodBank, 'after_update', _after_bank_update)
+        event.listen(BloodBank, 'after_delete', _after_bank_delete)
+        _installed = True
+    scheduler.register('inventory_snapshots', app.config.get('INVENTORY_SNAPSHOT_INTERVAL', 300), _snapshot_job)
+    return scheduler
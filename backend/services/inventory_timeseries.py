@@ -0,0 +1,273 @@
+"""
+Inventory time series (hourly and daily rollups of the ledger)
+
+The rollup job folds settled ``inventory_events`` into ``inventory_rollups``
+rows - closing/min/max level plus units received, consumed (Issued) and
+wasted (Expired/Discarded) - one row per bank, blood type and bucket that
+saw movement. Hourly buckets are computed from the events with numpy (one
+query per window, no per-row Python arithmetic); daily buckets are folded
+from the hourly rows. Hourly rows are pruned after
+INVENTORY_ROLLUP_HOURLY_RETENTION_DAYS, daily rows are kept.
+
+Levels are anchored on the current stock: the level at the start of a
+window is the bank's inventory column minus every delta recorded since.
+Buckets are only written once complete (and settled), and a window is
+written in one transaction, so concurrent workers running the job at
+worst collide on the primary key and roll back.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.inventory import InventoryEvent, InventoryRollup
+from services.scheduler import scheduler
+
+BLOOD_TYPES = tuple(INVENTORY_COLUMNS)
+_TYPE_INDEX = {t: i for i, t in enumerate(BLOOD_TYPES)}
+_REASON_CODES = {'Received': 1, 'Transfer': 1, 'Issued': 2, 'Expired': 3, 'Discarded': 3}
+_HOUR = np.timedelta64(1, 'h')
+_WINDOW_HOURS = 24 * 7
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _last_bucket(session, resolution):
+    return session.execute(
+        select(func.max(InventoryRollup.bucket_start)).where(InventoryRollup.resolution == resolution)
+    ).scalar()
+
+
+def _stock_at(session, keys, start):
+    """Level of each (bank, type) key at ``start``: current stock minus later deltas"""
+    bank_ids = sorted({int(k) // 8 for k in keys})
+    columns = [getattr(BloodBank, c) for c in INVENTORY_COLUMNS.values()]
+    current = np.zeros((len(keys),), dtype=np.int64)
+    position = {int(k): i for i, k in enumerate(keys)}
+    for chunk_start in range(0, len(bank_ids), 500):
+        chunk = bank_ids[chunk_start:chunk_start + 500]
+        for row in session.execute(select(BloodBank.id, *columns).where(BloodBank.id.in_(chunk))):
+            for t, units in enumerate(row[1:]):
+                i = position.get(row[0] * 8 + t)
+                if i is not None:
+                    current[i] = units or 0
+        later = session.execute(
+            select(InventoryEvent.blood_bank_id, InventoryEvent.blood_type, func.sum(InventoryEvent.delta))
+            .where(InventoryEvent.created_at >= start, InventoryEvent.blood_bank_id.in_(chunk))
+            .group_by(InventoryEvent.blood_bank_id, InventoryEvent.blood_type)
+        )
+        for bank_id, blood_type, total in later:
+            i = position.get(bank_id * 8 + _TYPE_INDEX[blood_type])
+            if i is not None:
+                current[i] -= int(total or 0)
+    return current
+
+
+def hourly_rollup_rows(session, start, end):
+    """Hourly rollup rows for ``[start, end)`` computed from the ledger"""
+    events = session.execute(
+        select(InventoryEvent.blood_bank_id, InventoryEvent.blood_type, InventoryEvent.delta,
+               InventoryEvent.reason, InventoryEvent.created_at, InventoryEvent.id)
+        .where(InventoryEvent.created_at >= start, InventoryEvent.created_at < end)
+    ).all()
+    if not events:
+        return []
+
+    bank = np.fromiter((e[0] for e in events), dtype=np.int64, count=len(events))
+    kind = np.fromiter((_TYPE_INDEX[e[1]] for e in events), dtype=np.int64, count=len(events))
+    delta = np.fromiter((e[2] for e in events), dtype=np.int64, count=len(events))
+    reason = np.fromiter((_REASON_CODES.get(e[3], 0) for e in events), dtype=np.int8, count=len(events))
+    stamps = np.array([e[4] for e in events], dtype='datetime64[us]')
+    event_ids = np.fromiter((e[5] for e in events), dtype=np.int64, count=len(events))
+
+    keys, series = np.unique(bank * 8 + kind, return_inverse=True)
+    hours = int((end - start) / timedelta(hours=1))
+    bucket = ((stamps - np.datetime64(start, 'us')) // _HOUR).astype(np.int64)
+
+    # Level after each event: order by (series, time, id), cumulative sum per series
+    order = np.lexsort((event_ids, stamps, series))
+    s_series, s_bucket, s_delta = series[order], bucket[order], delta[order]
+    running = np.cumsum(s_delta)
+    first = np.r_[0, np.flatnonzero(np.diff(s_series)) + 1]
+    offsets = np.repeat(running[first] - s_delta[first], np.diff(np.r_[first, len(s_delta)]))
+    opening = _stock_at(session, keys, start)
+    level = opening[s_series] + running - offsets
+
+    shape = (len(keys), hours)
+    net = np.zeros(shape, dtype=np.int64)
+    np.add.at(net, (series, bucket), delta)
+    received = np.zeros(shape, dtype=np.int64)
+    np.add.at(received, (series, bucket), np.where((reason == 1) & (delta > 0), delta, 0))
+    consumed = np.zeros(shape, dtype=np.int64)
+    np.add.at(consumed, (series, bucket), np.where(reason == 2, -delta, 0))
+    wasted = np.zeros(shape, dtype=np.int64)
+    np.add.at(wasted, (series, bucket), np.where(reason == 3, -delta, 0))
+    counts = np.zeros(shape, dtype=np.int64)
+    np.add.at(counts, (series, bucket), 1)
+
+    closing = opening[:, None] + np.cumsum(net, axis=1)
+    bucket_open = np.concatenate([opening[:, None], closing[:, :-1]], axis=1)
+    low = bucket_open.copy()
+    high = bucket_open.copy()
+    np.minimum.at(low, (s_series, s_bucket), level)
+    np.maximum.at(high, (s_series, s_bucket), level)
+
+    rows = []
+    for i, h in zip(*np.nonzero(counts)):
+        key = int(keys[i])
+        rows.append({
+            'blood_bank_id': key // 8,
+            'blood_type': BLOOD_TYPES[key % 8],
+            'resolution': 'hour',
+            'bucket_start': start + timedelta(hours=int(h)),
+            'closing_units': int(closing[i, h]),
+            'min_units': int(low[i, h]),
+            'max_units': int(high[i, h]),
+            'received': int(received[i, h]),
+            'consumed': int(consumed[i, h]),
+            'wasted': int(wasted[i, h]),
+            'events': int(counts[i, h])
+        })
+    return rows
+
+
+def daily_rollup_rows(session, start, end):
+    """Daily rows for ``[start, end)`` folded from the hourly rows"""
+    r = InventoryRollup
+    hourly = session.execute(
+        select(r.blood_bank_id, r.blood_type, r.bucket_start, r.closing_units, r.min_units, r.max_units,
+               r.received, r.consumed, r.wasted, r.events)
+        .where(r.resolution == 'hour', r.bucket_start >= start, r.bucket_start < end)
+        .order_by(r.blood_bank_id, r.blood_type, r.bucket_start)
+    ).all()
+    days = {}
+    for bank_id, blood_type, bucket_start, closing, low, high, received, consumed, wasted, count in hourly:
+        key = (bank_id, blood_type, floor_day(bucket_start))
+        row = days.get(key)
+        if row is None:
+            days[key] = {
+                'blood_bank_id': bank_id, 'blood_type': blood_type, 'resolution': 'day', 'bucket_start': key[2],
+                'closing_units': closing, 'min_units': low, 'max_units': high,
+                'received': received, 'consumed': consumed, 'wasted': wasted, 'events': count
+            }
+        else:
+            # Rows arrive in time order, so the last hour's closing is the day's
+            row['closing_units'] = closing
+            row['min_units'] = min(row['min_units'], low)
+            row['max_units'] = max(row['max_units'], high)
+            row['received'] += received
+            row['consumed'] += consumed
+            row['wasted'] += wasted
+            row['events'] += count
+    return list(days.values())
+
+
+def _write(session, resolution, start, end, rows):
+    table = InventoryRollup.__table__
+    session.execute(
+        delete(table).where(table.c.resolution == resolution, table.c.bucket_start >= start, table.c.bucket_start < end)
+        .execution_options(track_changes=False)
+    )
+    if rows:
+        session.execute(table.insert().execution_options(track_changes=False), rows)
+
+
+def roll_up(session, now=None, settle_seconds=5, backfill_days=90, retention_days=30):
+    """Write every complete hour and day not rolled up yet; returns counts"""
+    now = now or datetime.utcnow()
+    end_hour = floor_hour(now - timedelta(seconds=settle_seconds))
+    last = _last_bucket(session, 'hour')
+    if last is not None:
+        start = last + timedelta(hours=1)
+    else:
+        first_event = session.execute(select(func.min(InventoryEvent.created_at))).scalar()
+        if first_event is None:
+            return {'hourly': 0, 'daily': 0}
+        start = max(floor_hour(first_event), floor_hour(now - timedelta(days=backfill_days)))
+
+    written = {'hourly': 0, 'daily': 0}
+    try:
+        while start < end_hour:
+            window_end = min(start + timedelta(hours=_WINDOW_HOURS), end_hour)
+            rows = hourly_rollup_rows(session, start, window_end)
+            _write(session, 'hour', start, window_end, rows)
+            session.commit()
+            written['hourly'] += len(rows)
+            start = window_end
+
+        last_day = _last_bucket(session, 'day')
+        day_start = last_day + timedelta(days=1) if last_day is not None else None
+        hourly_first = session.execute(
+            select(func.min(InventoryRollup.bucket_start)).where(InventoryRollup.resolution == 'hour')
+        ).scalar()
+        if day_start is None and hourly_first is not None:
+            day_start = floor_day(hourly_first)
+        day_end = floor_day(end_hour)
+        if day_start is not None and day_start < day_end:
+            rows = daily_rollup_rows(session, day_start, day_end)
+            _write(session, 'day', day_start, day_end, rows)
+            written['daily'] = len(rows)
+
+        cutoff = floor_day(now - timedelta(days=retention_days))
+        table = InventoryRollup.__table__
+        session.execute(
+            delete(table).where(table.c.resolution == 'hour', table.c.bucket_start < cutoff).execution_options(track_changes=False)
+        )
+        session.commit()
+    except IntegrityError:
+        # Another worker wrote the same buckets
+        session.rollback()
+    return written
+
+
+def history(session, bank_ids=None, blood_types=None, resolution='day', since=None, until=None):
+    """Rollup rows as ``[{'bloodBankId', 'bloodType', 'bucketStart', ...}]``"""
+    r = InventoryRollup
+    query = select(r).where(r.resolution == resolution)
+    if bank_ids:
+        query = query.where(r.blood_bank_id.in_(bank_ids))
+    if blood_types:
+        query = query.where(r.blood_type.in_(blood_types))
+    if since:
+        query = query.where(r.bucket_start >= since)
+    if until:
+        query = query.where(r.bucket_start < until)
+    rows = session.execute(query.order_by(r.blood_bank_id, r.blood_type, r.bucket_start)).scalars()
+    return [{
+        'bloodBankId': row.blood_bank_id,
+        'bloodType': row.blood_type,
+        'bucketStart': row.bucket_start.isoformat(),
+        'closingUnits': row.closing_units,
+        'minUnits': row.min_units,
+        'maxUnits': row.max_units,
+        'received': row.received,
+        'consumed': row.consumed,
+        'wasted': row.wasted,
+        'events': row.events
+    } for row in rows]
+
+
+def _rollup_job():
+    config = current_app.config
+    return roll_up(
+        db.session,
+        settle_seconds=config.get('INVENTORY_SNAPSHOT_SETTLE_SECONDS', 5),
+        backfill_days=config.get('INVENTORY_ROLLUP_BACKFILL_DAYS', 90),
+        retention_days=config.get('INVENTORY_ROLLUP_HOURLY_RETENTION_DAYS', 30)
+    )
+
+
+def init_inventory_timeseries(app):
+    """Register the rollup job"""
+    scheduler.register('inventory_rollups', app.config.get('INVENTORY_ROLLUP_INTERVAL', 900), _rollup_job)
+    return scheduler
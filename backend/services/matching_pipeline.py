@@ -0,0 +1,181 @@
+"""
+Donor matching pipeline for new blood requests
+
+Creating a blood request queues a ``match_request`` background job and the
+HTTP request returns at once. The job:
+
+1. loads compatible, available donors inside a bounding box of
+   MATCHING_MAX_DISTANCE_KM around the request (columns only, no ORM
+   objects) and drops those outside the radius (vectorized haversine);
+2. scores them with the matching engine - in chunks on the process pool
+   once there are MATCHING_PARALLEL_MIN_CANDIDATES or more, so throughput
+   scales with cores, inline below that;
+3. bulk-inserts the top MATCHING_TOP_N ``blood_request_matches`` rows with
+   ``match_score``/``distance_km``;
+4. notifies the matched donors (one bulk notifications insert, rendered
+   with the services.notification_fanout template).
+
+Jobs are dispatched in blood request priority order (services.request_queue).
+Re-running a request only adds donors it has not matched before, so no
+donor is notified twice.
+"""
+import heapq
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, update
+
+from extensions import db
+from models.blood_request import BloodRequest, BloodRequestMatch
+from models.donor import Donor
+from models.hospital import Hospital
+from services.ai_matching_service import BLOOD_COMPATIBILITY, score_candidates
+from services.background_jobs import job_runner
+from services.notification_counters import insert_notifications
+from services.notification_fanout import Template
+from services.request_queue import request_queue
+
+_PRIORITY = {'Critical': 'High', 'Urgent': 'High', 'Normal': 'Medium'}
+
+
+def _candidates(session, blood_type, latitude, longitude, max_distance_km):
+    """Compatible available donors within the radius: ``(payloads, distances)``"""
+    pad_lat = max_distance_km / 111.0
+    pad_lon = max_distance_km / (111.0 * max(np.cos(np.radians(abs(latitude) + pad_lat)), 0.01))
+    rows = session.execute(
+        select(Donor.id, Donor.blood_type, Donor.latitude, Donor.longitude, Donor.last_donation_date,
+               Donor.available_for_donation, Donor.rating, Donor.response_time_minutes)
+        .where(
+            Donor.blood_type.in_(BLOOD_COMPATIBILITY.get(blood_type, [blood_type])),
+            Donor.available_for_donation == True,  # noqa: E712
+            Donor.latitude.between(latitude - pad_lat, latitude + pad_lat),
+            Donor.longitude.between(longitude - pad_lon, longitude + pad_lon)
+        )
+    ).all()
+    if not rows:
+        return [], np.zeros(0)
+    lat = np.radians(np.array([float(r.latitude) for r in rows]))
+    lon = np.radians(np.array([float(r.longitude) for r in rows]))
+    lat0, lon0 = np.radians(latitude), np.radians(longitude)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    distances = 6371.0 * 2 * np.arcsin(np.sqrt(a))
+    keep = np.flatnonzero(distances <= max_distance_km)
+    payloads = [{
+        'id': rows[i].id,
+        'bloodType': rows[i].blood_type,
+        'location': {'latitude': float(rows[i].latitude), 'longitude': float(rows[i].longitude)},
+        'availableForDonation': bool(rows[i].available_for_donation),
+        'lastDonationDate': rows[i].last_donation_date.isoformat() if rows[i].last_donation_date else None,
+        'rating': float(rows[i].rating) if rows[i].rating else 5.0,
+        'responseTime': rows[i].response_time_minutes or 60
+    } for i in keep]
+    return payloads, distances[keep]
+
+
+def _score(job, donors, request_location, urgency, blood_type, config):
+    parallel_min = config.get('MATCHING_PARALLEL_MIN_CANDIDATES', 2000)
+    if len(donors) < parallel_min:
+        return score_candidates(donors, request_location, urgency, blood_type)
+    chunk = config.get('MATCHING_CHUNK_SIZE', 1000)
+    chunks = [donors[i:i + chunk] for i in range(0, len(donors), chunk)]
+    pool = job_runner.process_pool()
+    futures = [pool.submit(score_candidates, c, request_location, urgency, blood_type) for c in chunks]
+    scored = []
+    for done, future in enumerate(futures, 1):
+        scored += future.result()
+        job.update(scoredChunks=done, chunks=len(chunks))
+    return scored
+
+
+def run_matching(job, request_id, top_n=None, max_distance_km=None):
+    """Match one blood request (runs as a background job)"""
+    config = current_app.config
+    top_n = top_n or config.get('MATCHING_TOP_N', 20)
+    max_distance_km = max_distance_km or config.get('MATCHING_MAX_DISTANCE_KM', 50)
+    timings = {}
+    started = time.perf_counter()
+
+    blood_request = db.session.get(BloodRequest, request_id)
+    if blood_request is None:
+        raise ValueError(f'Blood request {request_id} not found')
+    hospital = db.session.get(Hospital, blood_request.hospital_id)
+    latitude = blood_request.latitude if blood_request.latitude is not None else getattr(hospital, 'latitude', None)
+    longitude = blood_request.longitude if blood_request.longitude is not None else getattr(hospital, 'longitude', None)
+    if latitude is None or longitude is None:
+        raise ValueError(f'Blood request {request_id} has no location')
+    latitude, longitude = float(latitude), float(longitude)
+
+    job.update(stage='candidates', bloodRequestId=request_id)
+    donors, distances = _candidates(db.session, blood_request.blood_type, latitude, longitude, max_distance_km)
+    distance_by_id = {d['id']: float(km) for d, km in zip(donors, distances)}
+    timings['candidates'] = time.perf_counter() - started
+
+    job.update(stage='scoring', candidates=len(donors))
+    mark = time.perf_counter()
+    scored = _score(job, donors, {'latitude': latitude, 'longitude': longitude},
+                    blood_request.urgency, blood_request.blood_type, config)
+    timings['scoring'] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    job.update(stage='saving', scored=len(scored))
+    already = set(db.session.execute(
+        select(BloodRequestMatch.donor_id).where(BloodRequestMatch.blood_request_id == request_id)
+    ).scalars())
+    best = heapq.nlargest(
+        top_n,
+        ((score, -distance_by_id[donor_id], donor_id) for donor_id, score in scored if donor_id not in already)
+    )
+    now = datetime.utcnow()
+    matches = [{
+        'blood_request_id': request_id,
+        'donor_id': donor_id,
+        'match_score': score,
+        'distance_km': round(-negative_distance, 2),
+        'notified': True,
+        'responded': False,
+        'created_at': now
+    } for score, negative_distance, donor_id in best]
+
+    notifications = []
+    if matches:
+        template = Template(
+            title=f'{blood_request.urgency} request: {blood_request.blood_type} blood needed',
+            message='{place} needs {units} unit(s) of {bloodType} blood by {requiredBy}. You are {distanceKm:.1f} km away.',
+            notification_type='BloodRequest',
+            priority=_PRIORITY.get(blood_request.urgency, 'Medium'),
+            data={'bloodRequestId': request_id},
+            values={'place': hospital.name if hospital else 'A hospital near you', 'units': blood_request.units_required,
+                    'bloodType': blood_request.blood_type, 'requiredBy': f'{blood_request.required_by:%d %b %H:%M}'}
+        )
+        notifications = [template.render('Donor', match['donor_id'], {
+            'matchScore': match['match_score'], 'distanceKm': match['distance_km']
+        }, now) for match in matches]
+        db.session.execute(BloodRequestMatch.__table__.insert(), matches)
+        insert_notifications(db.session, notifications)
+        if blood_request.status == 'Pending':
+            db.session.execute(
+                update(BloodRequest).where(BloodRequest.id == request_id, BloodRequest.status == 'Pending')
+                .values(status='Matched')
+            )
+    db.session.commit()
+    timings['saving'] = time.perf_counter() - mark
+
+    return {
+        'bloodRequestId': request_id,
+        'candidates': len(donors),
+        'scored': len(scored),
+        'matched': len(matches),
+        'notified': len(notifications),
+        'timingsMs': {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+    }
+
+
+def enqueue_matching(request_id, **options):
+    """Queue matching for a blood request; returns the background Job.
+
+    Jobs are dispatched in the request's queue order (urgency, deadline).
+    """
+    return job_runner.submit('match_request', run_matching, request_id,
+                             priority=request_queue.priority(request_id), **options)
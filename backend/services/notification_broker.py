@@ -0,0 +1,225 @@
+"""
+Notification pub/sub for streaming clients
+
+Clients hold ``/api/notifications/stream`` (Server-Sent Events) open
+instead of polling ``/api/notifications/``. Each stream subscribes to one
+recipient in this broker; notifications are published once their
+transaction commits:
+
+- ORM creates (``create_notification``, seed scripts) through an
+  ``after_insert`` mapper hook;
+- bulk inserts (matching, fan-out, alerts) through
+  ``notification_counters.insert_notifications``.
+
+Without REDIS_URL, events are delivered to the streams of this process
+only. With it, every commit publishes one message on a Redis channel and
+a listener thread in each worker delivers it to that worker's streams,
+so a notification created on any worker reaches every client.
+
+Subscriber queues are bounded (NOTIFICATION_STREAM_QUEUE_SIZE); a client
+that falls behind loses events rather than holding memory, and can
+re-read the list endpoint. Each stream holds a request thread, so a
+worker accepts at most NOTIFICATION_STREAM_MAX_CLIENTS of them and leaves
+the rest of its threads to the other routes.
+"""
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.blood_request import Notification
+from services import shared_store
+
+_PENDING_KEY = 'notification_events'
+
+
+def event_payload(row):
+    """Stream payload of a notification (model or insert row dict)"""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name, None)
+    created_at = get('created_at')
+    data = get('data')
+    return {
+        'id': get('id'),
+        'recipientId': get('recipient_id'),
+        'recipientType': get('recipient_type'),
+        'title': get('title'),
+        'message': get('message'),
+        'type': get('notification_type'),
+        'priority': get('priority') or 'Medium',
+        'data': json.loads(data) if isinstance(data, str) and data.startswith('{') else data,
+        'createdAt': created_at.isoformat() if isinstance(created_at, datetime) else created_at
+    }
+
+
+class Subscription:
+    """Events for one recipient, read by one stream"""
+
+    def __init__(self, broker, recipient_type, recipient_id, size):
+        self.broker = broker
+        self.key = (recipient_type, int(recipient_id))
+        self.events = queue.Queue(maxsize=size)
+        self.dropped = 0
+
+    def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class NotificationBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # (recipient_type, recipient_id) -> set of Subscription
+        self.queue_size = 100
+        self.max_streams = 0  # 0: no cap
+        self._streams = 0
+        self.rejected = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._listener = None
+
+    def subscribe(self, recipient_type, recipient_id):
+        """A new Subscription, or None when this worker already holds ``max_streams``"""
+        subscription = Subscription(self, recipient_type, recipient_id, self.queue_size)
+        with self._lock:
+            if self.max_streams and self._streams >= self.max_streams:
+                self.rejected += 1
+                return None
+            self._subscribers.setdefault(subscription.key, set()).add(subscription)
+            self._streams += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._streams -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+
+    def publish(self, events):
+        """Deliver committed notification events (via Redis when configured)"""
+        if not events:
+            return
+        self.published += len(events)
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                # Recipients are not known to have streams on other workers, so send everything
+                client.publish(shared_store.key('notifications'), json.dumps(events, default=str))
+                return
+            except Exception as e:
+                print(f"⚠️  Shared notification publish failed, delivering locally: {e}")
+        self._deliver(events)
+
+    def _deliver(self, events):
+        with self._lock:
+            if not self._subscribers:
+                return
+            targets = [(payload, list(self._subscribers.get((payload['recipientType'], payload['recipientId']), ())))
+                       for payload in events]
+        for payload, subscriptions in targets:
+            for subscription in subscriptions:
+                try:
+                    subscription.events.put_nowait(payload)
+                    self.delivered += 1
+                except queue.Full:
+                    subscription.dropped += 1
+                    self.dropped += 1
+
+    def start_listener(self):
+        """Deliver events published by every worker (once per process, with Redis)"""
+        if self._listener is not None or shared_store.get_client() is None:
+            return
+        # Process pool workers re-import the app; they never serve streams
+        if multiprocessing.parent_process() is not None:
+            return
+        self._listener = threading.Thread(target=self._listen, name='notification-broker', daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        channel = shared_store.key('notifications')
+        while True:
+            client = shared_store.get_client()
+            if client is None:
+                return
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._deliver(json.loads(message['data']))
+            except Exception as e:
+                print(f"⚠️  Notification broker listener reconnecting: {e}")
+                time.sleep(1)
+
+    def stats(self):
+        with self._lock:
+            streams = self._streams
+            recipients = len(self._subscribers)
+        return {
+            'streams': streams,
+            'maxStreams': self.max_streams or None,
+            'rejected': self.rejected,
+            'recipients': recipients,
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'shared': shared_store.get_client() is not None
+        }
+
+
+notification_broker = NotificationBroker()
+
+
+# -- staging: publish on commit ------------------------------------------------
+
+def stage(session, rows):
+    """Queue notification rows (models or insert dicts) for publishing when ``session`` commits"""
+    if session is None or not rows:
+        return
+    session.info.setdefault(_PENDING_KEY, []).extend(event_payload(row) for row in rows)
+
+
+def _after_insert(mapper, connection, target):
+    stage(object_session(target), [target])
+
+
+def _after_commit(session):
+    events = session.info.pop(_PENDING_KEY, None)
+    if events:
+        notification_broker.publish(events)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+_installed = False
+
+
+def init_notification_broker(app):
+    """Install the publish hooks and, with Redis, the cross-worker listener"""
+    global _installed
+    notification_broker.queue_size = app.config.get('NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+    notification_broker.max_streams = app.config.get('NOTIFICATION_STREAM_MAX_CLIENTS', 0)
+    if not _installed:
+        event.listen(Notification, 'after_insert', _after_insert)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+        _installed = True
+    notification_broker.start_listener()
+    return notification_broker
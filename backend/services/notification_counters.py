@@ -0,0 +1,177 @@
+"""
+Per-recipient unread notification counters
+
+``notification_unread_counts`` holds one row per recipient with its number
+of unread notifications, so unread badges are a primary-key lookup instead
+of a ``COUNT(*)`` over ``notifications``. The counters change in the same
+transaction as the notifications:
+
+- ORM writes (create, mark as read, delete, seed scripts) through mapper
+  hooks on ``Notification``;
+- bulk inserts (matching, fan-out, alerts) through ``insert_notifications``;
+- mark-all-as-read through ``reset``.
+
+Writes that bypass these (raw SQL) are repaired by the periodic reconcile
+job.
+"""
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.blood_request import Notification, NotificationUnreadCount
+from services import notification_broker
+from services.change_tracker import mark_changed
+from services.scheduler import scheduler
+
+_KEY = ('recipient_type', 'recipient_id')
+
+
+def _dialect_name(executor):
+    dialect = getattr(executor, 'dialect', None)
+    if dialect is None:
+        dialect = executor.get_bind().dialect
+    return dialect.name
+
+
+def apply_changes(executor, deltas):
+    """Add ``{(recipient_type, recipient_id): delta}`` to the counters (creating them at 0).
+
+    ``executor`` is the session or, from mapper hooks, the flush connection.
+    """
+    rows = [{'recipient_type': t, 'recipient_id': i, 'unread': d, 'updated_at': datetime.utcnow()}
+            for (t, i), d in deltas.items() if d]
+    if not rows:
+        return 0
+    table = NotificationUnreadCount.__table__
+    dialect = _dialect_name(executor)
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite_insert if dialect == 'sqlite' else pg_insert)(table)
+        stmt = insert.on_conflict_do_update(
+            index_elements=list(_KEY),
+            set_={'unread': table.c.unread + insert.excluded.unread, 'updated_at': insert.excluded.updated_at}
+        )
+    elif dialect == 'mysql':
+        insert = mysql_insert(table)
+        stmt = insert.on_duplicate_key_update(
+            unread=table.c.unread + insert.inserted.unread,
+            updated_at=insert.inserted.updated_at
+        )
+    else:
+        for row in rows:
+            result = executor.execute(
+                update(table)
+                .where(table.c.recipient_type == row['recipient_type'], table.c.recipient_id == row['recipient_id'])
+                .values(unread=table.c.unread + row['unread'], updated_at=row['updated_at'])
+                .execution_options(track_changes=False)
+            )
+            if result.rowcount == 0:
+                executor.execute(table.insert().execution_options(track_changes=False), [row])
+        return len(rows)
+    executor.execute(stmt.execution_options(track_changes=False), rows)
+    return len(rows)
+
+
+def insert_notifications(session, rows):
+    """Bulk-insert notification rows and count the unread ones, in the caller's transaction.
+
+    The rows are published to notification streams when the transaction commits.
+    """
+    if not rows:
+        return 0
+    session.execute(Notification.__table__.insert().execution_options(track_changes=False), rows)
+    apply_changes(session, Counter((row['recipient_type'], row['recipient_id']) for row in rows if not row.get('read')))
+    mark_changed(session, 'notifications')
+    notification_broker.stage(session, rows)
+    return len(rows)
+
+
+def reset(session, recipient_id, recipient_type=None):
+    """Zero the counters of a recipient (after marking all its notifications read)"""
+    table = NotificationUnreadCount.__table__
+    query = update(table).where(table.c.recipient_id == recipient_id)
+    if recipient_type:
+        query = query.where(table.c.recipient_type == recipient_type)
+    session.execute(query.values(unread=0, updated_at=datetime.utcnow()).execution_options(track_changes=False))
+
+
+def unread(session, recipient_id, recipient_type=None):
+    """Unread notifications of a recipient (all recipient types unless one is given)"""
+    counts = NotificationUnreadCount
+    query = select(func.coalesce(func.sum(counts.unread), 0)).where(counts.recipient_id == recipient_id)
+    if recipient_type:
+        query = query.where(counts.recipient_type == recipient_type)
+    return max(int(session.execute(query).scalar()), 0)
+
+
+# -- ORM hooks (single notifications) -----------------------------------------
+
+def _after_insert(mapper, connection, target):
+    if not target.read:
+        apply_changes(connection, {(target.recipient_type, target.recipient_id): 1})
+
+
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.read.history
+    if not history.has_changes():
+        return
+    was_read = bool(history.deleted[0]) if history.deleted else False
+    if was_read != bool(target.read):
+        apply_changes(connection, {(target.recipient_type, target.recipient_id): -1 if target.read else 1})
+
+
+def _after_delete(mapper, connection, target):
+    if not target.read:
+        apply_changes(connection, {(target.recipient_type, target.recipient_id): -1})
+
+
+# -- reconcile ----------------------------------------------------------------
+
+def reconcile(session):
+    """Repair counters that drifted from ``notifications``; returns the number fixed.
+
+    Adds the difference rather than overwriting, so increments committed
+    while the count ran are not lost.
+    """
+    expected = {
+        (t, i): n for t, i, n in session.execute(
+            select(Notification.recipient_type, Notification.recipient_id, func.count())
+            .where(Notification.read == False)  # noqa: E712
+            .group_by(Notification.recipient_type, Notification.recipient_id)
+        )
+    }
+    stored = {
+        (t, i): n for t, i, n in session.execute(
+            select(NotificationUnreadCount.recipient_type, NotificationUnreadCount.recipient_id, NotificationUnreadCount.unread)
+        )
+    }
+    fixes = {key: expected.get(key, 0) - stored.get(key, 0) for key in set(expected) | set(stored)}
+    fixed = apply_changes(session, fixes)
+    session.commit()
+    return fixed
+
+
+def _reconcile_job():
+    return {'fixed': reconcile(db.session)}
+
+
+_installed = False
+
+
+def init_notification_counters(app):
+    """Install the hooks and register the periodic drift repair"""
+    global _installed
+    if not _installed:
+        event.listen(Notification, 'after_insert', _after_insert)
+        event.listen(Notification, 'after_update', _after_update)
+        event.listen(Notification, 'after_delete', _after_delete)
+        _installed = True
+    scheduler.register('notification_counters_reconcile',
+                       app.config.get('NOTIFICATION_COUNTERS_RECONCILE_INTERVAL', 3600), _reconcile_job,
+                       initial_delay=60)
+    return scheduler
@@ -0,0 +1,270 @@
+"""
+Notification fan-out
+
+Sends one notification template to a set of recipients with bulk INSERTs
+instead of one ORM add and commit per notification. A fan-out runs as a
+``notification_fanout`` background job (services.background_jobs): the
+HTTP request validates the template and audience and returns a job link.
+The job:
+
+1. resolves the audience to distinct ``(recipient_type, recipient_id)``
+   pairs, with per-recipient values such as ``distanceKm``:
+   - ``{"bloodRequestId": 7}`` - the donors matched to a blood request
+   - ``{"latitude": .., "longitude": .., "radiusKm": 10,
+     "recipientType": "Donor", "bloodTypes": ["O-"]}`` - donors (available
+     ones) or hospitals within a radius (bounding box, then haversine)
+   - ``{"recipients": [{"id": 3, "type": "Donor"}, ..]}`` - explicit ids
+2. renders the template per recipient - ``title`` and ``message`` are
+   ``str.format`` templates over the template ``values`` and the
+   recipient's values, e.g. ``"You are {distanceKm:.1f} km away"``; a
+   ``None`` value (a match without a distance) renders as empty text;
+3. inserts NOTIFICATION_FANOUT_CHUNK_SIZE rows per statement and commits
+   per chunk, reporting delivered counts as progress.
+
+The request renders the template once against a sample recipient of the
+audience, so a template that cannot render is a 400 rather than a job
+failing after its first chunks were committed.
+
+The result carries delivered/chunk counts and resolve/insert timings.
+"""
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from extensions import db
+from models.blood_request import BloodRequestMatch, Notification
+from models.donor import Donor
+from models.hospital import Hospital
+from services.background_jobs import DEFAULT_PRIORITY, job_runner
+from services.notification_counters import insert_notifications
+
+RECIPIENT_TYPES = Notification.__table__.c.recipient_type.type.enums
+NOTIFICATION_TYPES = Notification.__table__.c.notification_type.type.enums
+PRIORITIES = Notification.__table__.c.priority.type.enums
+# High-priority fan-outs are dispatched before other jobs of the same kind
+_JOB_PRIORITY = {'High': (1,), 'Medium': DEFAULT_PRIORITY, 'Low': (8,)}
+
+
+# Values per recipient of each audience kind, for the sample render
+_SAMPLE_VALUES = {
+    'bloodRequestId': {'bloodRequestId': 0, 'distanceKm': 0.0, 'matchScore': 0.0},
+    'radiusKm': {'distanceKm': 0.0}
+}
+
+
+class _Blank:
+    """Renders as empty text whatever the format spec"""
+
+    def __format__(self, spec):
+        return ''
+
+    def __str__(self):
+        return ''
+
+    __repr__ = __str__
+
+
+_BLANK = _Blank()
+
+
+class _Values(dict):
+    """Format values that leave unknown placeholders as they are and render None as empty text"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        return _BLANK if value is None else value
+
+
+class Template:
+    """A notification with ``str.format`` placeholders in title and message"""
+
+    def __init__(self, title, message, notification_type, priority='Medium', data=None, values=None):
+        if not title or not message:
+            raise ValueError('title and message are required')
+        if notification_type not in NOTIFICATION_TYPES:
+            raise ValueError(f"type must be one of {', '.join(NOTIFICATION_TYPES)}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        self.title = title
+        self.message = message
+        self.notification_type = notification_type
+        self.priority = priority
+        self.data = data or {}
+        self.values = values or {}
+
+    @classmethod
+    def from_dict(cls, payload):
+        return cls(payload.get('title'), payload.get('message'), payload.get('type'),
+                   payload.get('priority', 'Medium'), payload.get('data'), payload.get('values'))
+
+    def to_dict(self):
+        return {'title': self.title, 'message': self.message, 'type': self.notification_type,
+                'priority': self.priority, 'data': self.data, 'values': self.values}
+
+    def check(self, audience):
+        """Raise ValueError unless the template renders for a sample recipient of ``audience``"""
+        if 'recipients' in audience:
+            samples = [item.get('values') or {} for item in audience['recipients']] or [{}]
+        else:
+            samples = [next((v for k, v in _SAMPLE_VALUES.items() if k in audience), {})]
+        for values in samples:
+            try:
+                self.render('Donor', 0, values)
+            except (KeyError, IndexError, AttributeError, TypeError, ValueError) as e:
+                raise ValueError(f'template does not render: {e!r}') from None
+
+    def render(self, recipient_type, recipient_id, values=None, now=None):
+        """Insert row for one recipient"""
+        merged = _Values(self.values, **(values or {}))
+        data = dict(self.data, **(values or {}))
+        return {
+            'recipient_id': recipient_id,
+            'recipient_type': recipient_type,
+            'title': self.title.format_map(merged)[:200],
+            'message': self.message.format_map(merged),
+            'notification_type': self.notification_type,
+            'priority': self.priority,
+            'data': json.dumps(data) if data else None,
+            'read': False,
+            'created_at': now or datetime.utcnow()
+        }
+
+
+# -- audiences ----------------------------------------------------------------
+
+def _haversine_km(lat, lon, lat0, lon0):
+    lat, lon, lat0, lon0 = np.radians(lat), np.radians(lon), np.radians(lat0), np.radians(lon0)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(a))
+
+
+def match_recipients(session, blood_request_id):
+    rows = session.execute(
+        select(BloodRequestMatch.donor_id, BloodRequestMatch.distance_km, BloodRequestMatch.match_score)
+        .where(BloodRequestMatch.blood_request_id == blood_request_id)
+    ).all()
+    return [('Donor', row.donor_id, {
+        'bloodRequestId': blood_request_id,
+        'distanceKm': float(row.distance_km) if row.distance_km is not None else None,
+        'matchScore': float(row.match_score) if row.match_score is not None else None
+    }) for row in rows]
+
+
+def radius_recipients(session, latitude, longitude, radius_km, recipient_type='Donor', blood_types=None):
+    model = Donor if recipient_type == 'Donor' else Hospital
+    pad_lat = radius_km / 111.0
+    pad_lon = radius_km / (111.0 * max(np.cos(np.radians(abs(latitude) + pad_lat)), 0.01))
+    query = select(model.id, model.latitude, model.longitude).where(
+        model.latitude.between(latitude - pad_lat, latitude + pad_lat),
+        model.longitude.between(longitude - pad_lon, longitude + pad_lon)
+    )
+    if model is Donor:
+        query = query.where(Donor.available_for_donation == True)  # noqa: E712
+        if blood_types:
+            query = query.where(Donor.blood_type.in_(blood_types))
+    rows = session.execute(query).all()
+    if not rows:
+        return []
+    distances = _haversine_km(np.array([float(r.latitude) for r in rows]),
+                              np.array([float(r.longitude) for r in rows]), latitude, longitude)
+    return [(recipient_type, rows[i].id, {'distanceKm': round(float(distances[i]), 2)})
+            for i in np.flatnonzero(distances <= radius_km)]
+
+
+def validate_audience(audience):
+    """Raise ValueError for an audience the job could not resolve"""
+    if not isinstance(audience, dict):
+        raise ValueError('audience is required')
+    if 'bloodRequestId' in audience:
+        int(audience['bloodRequestId'])
+    elif 'recipients' in audience:
+        for item in audience['recipients']:
+            if item.get('type') not in RECIPIENT_TYPES:
+                raise ValueError(f"recipient type must be one of {', '.join(RECIPIENT_TYPES)}")
+            int(item['id'])
+    elif {'latitude', 'longitude', 'radiusKm'} <= audience.keys():
+        if audience.get('recipientType', 'Donor') not in ('Donor', 'Hospital'):
+            raise ValueError('recipientType must be Donor or Hospital')
+        if not 0 < float(audience['radiusKm']) <= current_app.config.get('NOTIFICATION_FANOUT_MAX_RADIUS_KM', 200):
+            raise ValueError('radiusKm is out of range')
+        float(audience['latitude']), float(audience['longitude'])
+    else:
+        raise ValueError('audience needs bloodRequestId, recipients, or latitude/longitude/radiusKm')
+
+
+def resolve_audience(session, audience):
+    """Distinct ``(recipient_type, recipient_id, values)`` of an audience"""
+    validate_audience(audience)
+    if 'bloodRequestId' in audience:
+        recipients = match_recipients(session, int(audience['bloodRequestId']))
+    elif 'recipients' in audience:
+        recipients = [(item['type'], int(item['id']), item.get('values') or {}) for item in audience['recipients']]
+    else:
+        recipients = radius_recipients(session, float(audience['latitude']), float(audience['longitude']),
+                                       float(audience['radiusKm']), audience.get('recipientType', 'Donor'),
+                                       audience.get('bloodTypes'))
+    seen, distinct = set(), []
+    for recipient in recipients:
+        if recipient[:2] not in seen:
+            seen.add(recipient[:2])
+            distinct.append(recipient)
+    return distinct
+
+
+# -- delivery -----------------------------------------------------------------
+
+def deliver(session, template, recipients, chunk_size=1000, job=None):
+    """Insert the rendered rows ``chunk_size`` at a time, one commit per chunk"""
+    now = datetime.utcnow()
+    delivered = chunks = 0
+    for start in range(0, len(recipients), chunk_size):
+        rows = [template.render(recipient_type, recipient_id, values, now)
+                for recipient_type, recipient_id, values in recipients[start:start + chunk_size]]
+        insert_notifications(session, rows)
+        session.commit()
+        delivered += len(rows)
+        chunks += 1
+        if job is not None:
+            job.update(stage='inserting', delivered=delivered, recipients=len(recipients), chunks=chunks)
+    return delivered, chunks
+
+
+def run_fanout(job, template, audience, chunk_size=None):
+    """Fan a template out to an audience (runs as a background job)"""
+    chunk_size = chunk_size or current_app.config.get('NOTIFICATION_FANOUT_CHUNK_SIZE', 1000)
+    template = Template.from_dict(template)
+    started = time.perf_counter()
+
+    job.update(stage='resolving')
+    recipients = resolve_audience(db.session, audience)
+    db.session.rollback()  # end the read transaction before the write chunks
+    resolved = time.perf_counter()
+
+    delivered, chunks = deliver(db.session, template, recipients, chunk_size, job)
+    finished = time.perf_counter()
+    return {
+        'recipients': len(recipients),
+        'delivered': delivered,
+        'chunks': chunks,
+        'timingsMs': {
+            'resolve': round((resolved - started) * 1000, 2),
+            'insert': round((finished - resolved) * 1000, 2),
+            'total': round((finished - started) * 1000, 2)
+        },
+        'rowsPerSecond': round(delivered / (finished - resolved)) if delivered and finished > resolved else None
+    }
+
+
+def enqueue_fanout(template, audience, chunk_size=None):
+    """Validate and queue a fan-out; returns the background Job"""
+    validate_audience(audience)
+    template.check(audience)
+    return job_runner.submit('notification_fanout', run_fanout, template.to_dict(), audience, chunk_size,
+                             priority=_JOB_PRIORITY.get(template.priority, DEFAULT_PRIORITY))
@@ -0,0 +1,278 @@
+"""
+Notification retention, archival and partitioning
+
+``notifications`` keeps only the live window. The ``notification_retention``
+job moves out, in batches of NOTIFICATION_RETENTION_BATCH:
+
+- read notifications older than NOTIFICATION_RETENTION_DAYS;
+- any notification older than NOTIFICATION_MAX_AGE_DAYS (unread ones are
+  taken off the unread counters).
+
+Moved rows become ``notification_archives`` rows - one per recipient and
+month per batch, the serialized notifications as zlib-compressed JSON -
+readable at /api/notifications/archive. Recipient lists filter on
+``created_at >= now - NOTIFICATION_MAX_AGE_DAYS``, which every live row
+satisfies, so they touch only the recent part of the
+``(recipient_id, created_at)`` index.
+
+On PostgreSQL the table can be range-partitioned by month of
+``created_at`` (``python -m scripts.partition_notifications``). The job
+then also creates the partitions NOTIFICATION_PARTITION_MONTHS_AHEAD in
+advance and drops empty partitions that ended before the max age, and the
+same ``created_at`` predicate lets the planner prune old partitions. On
+SQLite and MySQL archival alone bounds the table.
+"""
+import json
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, or_, select, text
+
+from extensions import db
+from models.blood_request import Notification, NotificationArchive
+from services import notification_counters
+from services.change_tracker import mark_changed
+from services.scheduler import scheduler
+
+_ARCHIVE_FIELDS = ('id', 'recipient_id', 'recipient_type', 'title', 'message', 'notification_type', 'priority',
+                   'data', 'read', 'read_at', 'created_at')
+
+
+def live_since(now=None, config=None):
+    """Oldest ``created_at`` still in ``notifications``"""
+    config = config or current_app.config
+    return (now or datetime.utcnow()) - timedelta(days=config.get('NOTIFICATION_MAX_AGE_DAYS', 180))
+
+
+def _month_start(moment, months=0):
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+# -- archival -----------------------------------------------------------------
+
+def _archive_rows(rows, now):
+    serialize = Notification.serializer()
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row.recipient_type, row.recipient_id, f'{row.created_at:%Y-%m}')].append(row)
+    archives, raw_bytes = [], 0
+    for (recipient_type, recipient_id, month), members in groups.items():
+        body = json.dumps([dict(serialize(row), data=row.data) for row in members], separators=(',', ':')).encode()
+        raw_bytes += len(body)
+        archives.append({
+            'recipient_type': recipient_type,
+            'recipient_id': recipient_id,
+            'month': month,
+            'count': len(members),
+            'payload': zlib.compress(body, 6),
+            'first_created_at': min(r.created_at for r in members),
+            'last_created_at': max(r.created_at for r in members),
+            'archived_at': now
+        })
+    return archives, raw_bytes
+
+
+def archive(session, now=None, batch_size=None, max_rows=None):
+    """Move notifications past the retention cutoffs into archives; returns counts and timings"""
+    config = current_app.config
+    now = now or datetime.utcnow()
+    batch_size = batch_size or config.get('NOTIFICATION_RETENTION_BATCH', 5000)
+    max_rows = max_rows or config.get('NOTIFICATION_RETENTION_MAX_PER_RUN', 200000)
+    read_cutoff = now - timedelta(days=config.get('NOTIFICATION_RETENTION_DAYS', 30))
+    max_cutoff = live_since(now, config)
+    started = time.perf_counter()
+    moved = archives = batches = raw_bytes = stored_bytes = unread = 0
+    columns = [getattr(Notification, name) for name in _ARCHIVE_FIELDS]
+
+    while moved < max_rows:
+        rows = session.execute(
+            select(*columns)
+            .where(Notification.created_at < read_cutoff,
+                   or_(Notification.read == True, Notification.created_at < max_cutoff))  # noqa: E712
+            .order_by(Notification.created_at)
+            .limit(min(batch_size, max_rows - moved))
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            session.rollback()
+            break
+        batch, batch_raw = _archive_rows(rows, now)
+        session.execute(NotificationArchive.__table__.insert().execution_options(track_changes=False), batch)
+        session.execute(
+            delete(Notification.__table__)
+            .where(Notification.__table__.c.id.in_([row.id for row in rows]))
+            .execution_options(track_changes=False)
+        )
+        still_unread = Counter((row.recipient_type, row.recipient_id) for row in rows if not row.read)
+        notification_counters.apply_changes(session, {key: -n for key, n in still_unread.items()})
+        mark_changed(session, 'notifications')
+        session.commit()
+
+        moved += len(rows)
+        archives += len(batch)
+        batches += 1
+        unread += sum(still_unread.values())
+        raw_bytes += batch_raw
+        stored_bytes += sum(len(a['payload']) for a in batch)
+        if len(rows) < batch_size:
+            break
+
+    return {
+        'archived': moved,
+        'unreadArchived': unread,
+        'archives': archives,
+        'batches': batches,
+        'compressionRatio': round(raw_bytes / stored_bytes, 2) if stored_bytes else None,
+        'durationMs': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def archived(session, recipient_id, recipient_type=None, month=None, limit=None):
+    """Archived notifications of a recipient, newest first"""
+    query = select(NotificationArchive.payload, NotificationArchive.last_created_at).where(
+        NotificationArchive.recipient_id == recipient_id
+    )
+    if recipient_type:
+        query = query.where(NotificationArchive.recipient_type == recipient_type)
+    if month:
+        query = query.where(NotificationArchive.month == month)
+    items = []
+    for payload, last_created_at in session.execute(query.order_by(NotificationArchive.last_created_at.desc())):
+        # Archives come newest first; stop once one cannot contain any of the newest ``limit``
+        if limit and len(items) >= limit and last_created_at.isoformat() < items[limit - 1]['createdAt']:
+            break
+        items += json.loads(zlib.decompress(payload))
+        items.sort(key=lambda item: item.get('createdAt') or '', reverse=True)
+    return items[:limit] if limit else items
+
+
+# -- PostgreSQL partitions ----------------------------------------------------
+
+def _is_postgres(session):
+    return session.get_bind().dialect.name == 'postgresql'
+
+
+def is_partitioned(session):
+    if not _is_postgres(session):
+        return False
+    return session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'notifications' AND c.relnamespace = current_schema()::regnamespace"
+    )).first() is not None
+
+
+def _partition_name(month_start):
+    return f'notifications_p{month_start:%Y%m}'
+
+
+def _create_partition(session, month_start):
+    session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(month_start)} PARTITION OF notifications "
+        f"FOR VALUES FROM ('{month_start:%Y-%m-%d}') TO ('{_month_start(month_start, 1):%Y-%m-%d}')"
+    ))
+
+
+def ensure_partitions(session, now=None, months_ahead=2):
+    """Create the monthly partitions up to ``months_ahead`` months from now"""
+    now = now or datetime.utcnow()
+    created = 0
+    for offset in range(months_ahead + 1):
+        month = _month_start(now, offset)
+        try:
+            _create_partition(session, month)
+            session.commit()
+            created += 1
+        except Exception as e:
+            # Rows for that month already sit in the default partition
+            session.rollback()
+            print(f"⚠️  Notification partition {_partition_name(month)} not created: {e}")
+    return created
+
+
+def drop_expired_partitions(session, before):
+    """Drop empty monthly partitions that ended before ``before``"""
+    names = session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'notifications'"
+    )).scalars().all()
+    dropped = 0
+    for name in names:
+        if not (name.startswith('notifications_p') and name[15:].isdigit()):
+            continue
+        month = datetime.strptime(name[15:], '%Y%m')
+        if _month_start(month, 1) > before:
+            continue
+        if session.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).first() is None:
+            session.execute(text(f'DROP TABLE {name}'))
+            dropped += 1
+    session.commit()
+    return dropped
+
+
+def partition_postgres(session, now=None, months_ahead=2):
+    """Convert ``notifications`` into a table range-partitioned by month (PostgreSQL, one transaction).
+
+    Copies every row, so run it in a maintenance window; returns the number
+    of partitions created.
+    """
+    if not _is_postgres(session):
+        raise RuntimeError('Native partitioning needs PostgreSQL; archival bounds the table elsewhere')
+    if is_partitioned(session):
+        return 0
+    now = now or datetime.utcnow()
+    oldest = session.execute(text('SELECT MIN(created_at) FROM notifications')).scalar() or now
+    sequence = session.execute(text("SELECT pg_get_serial_sequence('notifications', 'id')")).scalar()
+    indexes = session.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'notifications' AND indexname <> 'notifications_pkey'"
+    )).scalars().all()
+
+    session.execute(text('ALTER TABLE notifications RENAME TO notifications_unpartitioned'))
+    session.execute(text('ALTER TABLE notifications_unpartitioned RENAME CONSTRAINT notifications_pkey TO notifications_unpartitioned_pkey'))
+    for name in indexes:
+        session.execute(text(f'ALTER INDEX {name} RENAME TO {name}_unpartitioned'))
+    session.execute(text('UPDATE notifications_unpartitioned SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+    session.execute(text(
+        'CREATE TABLE notifications (LIKE notifications_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+    ))
+    session.execute(text('ALTER TABLE notifications ALTER COLUMN created_at SET NOT NULL'))
+    # The partition key must be part of the primary key
+    session.execute(text('ALTER TABLE notifications ADD CONSTRAINT notifications_pkey PRIMARY KEY (id, created_at)'))
+    session.execute(text('CREATE TABLE notifications_pdefault PARTITION OF notifications DEFAULT'))
+    month, last, created = _month_start(oldest), _month_start(now, months_ahead), 0
+    while month <= last:
+        _create_partition(session, month)
+        month, created = _month_start(month, 1), created + 1
+    session.execute(text('CREATE INDEX ix_notifications_recipient_created ON notifications (recipient_id, created_at)'))
+    session.execute(text('CREATE INDEX ix_notifications_created_at ON notifications (created_at)'))
+    session.execute(text('INSERT INTO notifications SELECT * FROM notifications_unpartitioned'))
+    if sequence:
+        session.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY notifications.id'))
+    session.execute(text('DROP TABLE notifications_unpartitioned'))
+    session.commit()
+    return created
+
+
+# -- job ----------------------------------------------------------------------
+
+def run(session):
+    """Archive, then maintain partitions where the table is partitioned"""
+    config = current_app.config
+    result = archive(session)
+    if is_partitioned(session):
+        result['partitionsEnsured'] = ensure_partitions(session, months_ahead=config.get('NOTIFICATION_PARTITION_MONTHS_AHEAD', 2))
+        result['partitionsDropped'] = drop_expired_partitions(session, live_since(config=config))
+    return result
+
+
+def _retention_job():
+    return run(db.session)
+
+
+def init_notification_retention(app):
+    """Register the retention job"""
+    scheduler.register('notification_retention', app.config.get('NOTIFICATION_RETENTION_INTERVAL', 3600), _retention_job)
+    return scheduler
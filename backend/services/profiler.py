@@ -0,0 +1,265 @@
+"""
+Sampling profiler
+
+A statistical profiler over ``sys._current_frames()``: every interval it
+records the Python stack of each thread of this worker, so the cost is
+one stack walk per thread and sample, independent of how much code runs
+in between. Stacks are aggregated and exported either as collapsed stacks
+(``frame;frame;frame count``, the input of flamegraph.pl and most flame
+graph viewers) or in the speedscope JSON format (https://speedscope.app).
+
+- On demand: ``/api/profile?seconds=10`` samples the whole worker, or with
+  ``route=/api/smart-match/find`` only the threads serving that route,
+  for the given number of seconds and returns the profile. The request
+  thread does the sampling, so no thread is left behind. Guarded by
+  PROFILER_TOKEN (``X-Profiler-Token`` header); unset disables it.
+- Always on: with PROFILER_CONTINUOUS a low-rate sampler thread per
+  worker writes one collapsed profile every PROFILER_CONTINUOUS_WINDOW
+  seconds to ``instance/profiles/`` and prunes files older than
+  PROFILER_CONTINUOUS_RETENTION_HOURS.
+
+Threads waiting on a lock, queue, socket or selector are skipped unless
+idle samples are asked for, so a busy worker's profile shows CPU time.
+Work done in the process pool (ML matching) runs in other processes and
+is not sampled.
+"""
+import hmac
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+_IDLE_LEAVES = {
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'), ('queue.py', 'get'),
+    ('selectors.py', 'select'), ('socket.py', 'accept'), ('socket.py', 'readinto'),
+    ('socketserver.py', 'serve_forever'), ('ssl.py', 'read'), ('ssl.py', 'recv_into')
+}
+_MAX_DEPTH = 128
+
+
+class Profile:
+    """Aggregated stacks (root first) with their sample counts"""
+
+    def __init__(self, interval, name='profile'):
+        self.interval = interval
+        self.name = name
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self.duration = 0.0
+
+    def collapsed(self):
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self):
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    name, _, location = label.partition(' (')
+                    file, _, line = location.rstrip(')').rpartition(':')
+                    frames.append({'name': name, 'file': file, 'line': int(line) if line.isdigit() else None})
+                sample.append(index[label])
+            samples.append(sample)
+            weights.append(round(count * self.interval, 6))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': self.name,
+            'exporter': 'blood-availability-system profiler',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': self.name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 6),
+                'samples': samples,
+                'weights': weights
+            }]
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._labels = {}
+        self._watched = {}  # route -> number of sessions sampling it
+        self._route_threads = {}  # thread ident -> route, while serving a watched route
+        self.root_path = None
+        self._continuous = None
+
+    # -- stacks ---------------------------------------------------------------
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if self.root_path and filename.startswith(self.root_path):
+                filename = os.path.relpath(filename, self.root_path)
+            elif 'site-packages' in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[1]
+            else:
+                filename = os.path.basename(filename)
+            label = self._labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+        return label
+
+    def sample(self, profile, threads=None, include_idle=False, skip=()):
+        """Add the current stack of every thread (or of ``threads``) to ``profile``"""
+        for ident, frame in sys._current_frames().items():
+            if ident in skip or (threads is not None and ident not in threads):
+                continue
+            code = frame.f_code
+            if not include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < _MAX_DEPTH:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            profile.stacks[tuple(stack)] += 1
+        profile.samples += 1
+
+    # -- route targeting -------------------------------------------------------
+
+    def thread_started(self, route, path):
+        if not self._watched:
+            return
+        for watched in (route, path):
+            if watched in self._watched:
+                self._route_threads[threading.get_ident()] = watched
+                return
+
+    def thread_finished(self):
+        if self._route_threads:
+            self._route_threads.pop(threading.get_ident(), None)
+
+    def _threads_of(self, route):
+        return {ident for ident, watched in list(self._route_threads.items()) if watched == route}
+
+    # -- on demand ------------------------------------------------------------
+
+    def run(self, seconds, interval, route=None, include_idle=False):
+        """Sample for ``seconds`` from the calling thread; None when a profile is already running"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            if route:
+                with self._lock:
+                    self._watched[route] = self._watched.get(route, 0) + 1
+            profile = Profile(interval, name=f'{route or "worker"} pid {os.getpid()}')
+            skip = {threading.get_ident()}
+            if self._continuous is not None:
+                skip.add(self._continuous.ident)
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_sample = started
+            while True:
+                self.sample(profile, self._threads_of(route) if route else None, include_idle, skip)
+                next_sample += interval
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if next_sample > now:
+                    time.sleep(min(next_sample, deadline) - now)
+                else:
+                    next_sample = now
+            profile.duration = time.perf_counter() - started
+            return profile
+        finally:
+            if route:
+                with self._lock:
+                    remaining = self._watched.get(route, 1) - 1
+                    if remaining:
+                        self._watched[route] = remaining
+                    else:
+                        self._watched.pop(route, None)
+            self._busy.release()
+
+    # -- always on -------------------------------------------------------------
+
+    def start_continuous(self, directory, interval, window, retention_hours):
+        """Write a profile of this worker every ``window`` seconds (once per process)"""
+        if self._continuous is not None:
+            return
+        # Process pool workers re-import the app; they serve no requests
+        if multiprocessing.parent_process() is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._continuous = threading.Thread(
+            target=self._continuous_loop, args=(directory, interval, window, retention_hours),
+            name='profiler', daemon=True
+        )
+        self._continuous.start()
+
+    def _continuous_loop(self, directory, interval, window, retention_hours):
+        skip = {threading.get_ident()}
+        while True:
+            profile = Profile(interval)
+            started = time.perf_counter()
+            while time.perf_counter() - started < window:
+                self.sample(profile, skip=skip)
+                time.sleep(interval)
+            profile.duration = time.perf_counter() - started
+            try:
+                if profile.stacks:
+                    name = f'{datetime.utcnow():%Y%m%d-%H%M%S}-{os.getpid()}.collapsed'
+                    with open(os.path.join(directory, name), 'w', encoding='utf-8') as out:
+                        out.write(profile.collapsed())
+                _prune(directory, retention_hours)
+            except OSError as e:
+                logger.warning('Could not write the continuous profile: %s', e)
+
+
+def _prune(directory, retention_hours):
+    cutoff = time.time() - retention_hours * 3600
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.collapsed') and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+profiler = Profiler()
+
+
+def authorized(config, token):
+    """Whether ``token`` opens the profiling endpoint (never when PROFILER_TOKEN is unset)"""
+    expected = config.get('PROFILER_TOKEN')
+    return bool(expected) and bool(token) and hmac.compare_digest(str(expected), str(token))
+
+
+# -- Flask hooks ----------------------------------------------------------------
+
+def _before_request():
+    rule = request.url_rule
+    profiler.thread_started(rule.rule if rule is not None else None, request.path)
+
+
+def _teardown_request(exc):
+    profiler.thread_finished()
+
+
+def init_profiler(app):
+    """Install the route-targeting hooks and start the always-on sampler when configured"""
+    profiler.root_path = os.path.abspath(app.root_path)
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    if app.config.get('PROFILER_CONTINUOUS'):
+        profiler.start_continuous(
+            os.path.join(app.instance_path, 'profiles'),
+            app.config.get('PROFILER_CONTINUOUS_INTERVAL_MS', 100) / 1000,
+            app.config.get('PROFILER_CONTINUOUS_WINDOW', 300),
+            app.config.get('PROFILER_CONTINUOUS_RETENTION_HOURS', 24)
+        )
+    return profiler
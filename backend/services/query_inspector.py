@@ -0,0 +1,302 @@
+"""
+Slow-query log and N+1 detector
+
+Every statement timed by services.sql_timing is fingerprinted: literals,
+numbers and expanded ``IN (...)`` lists are replaced by ``?``, so the
+queries of a loop share one fingerprint whatever their parameters.
+
+- N+1: within a request, a fingerprint executed QUERY_N_PLUS_ONE_THRESHOLD
+  times is flagged with the application frame that issued it (the loop).
+  Each flagged route/fingerprint is logged once per worker and kept in
+  the report at /api/queries/report. With QUERY_STRICT_MODE (on in the
+  testing config) the statement raises ``NPlusOneError`` instead, so a
+  test of the route fails. Code that repeats a query on purpose wraps it
+  in ``with allow_repeats():``.
+- Slow queries: a statement taking QUERY_SLOW_MS or longer is logged with
+  its ``EXPLAIN`` plan (``EXPLAIN QUERY PLAN`` on SQLite), to the report
+  and, as JSON lines, to QUERY_SLOW_LOG under the instance folder. Plans
+  are fetched by a background thread on a separate connection, once per
+  fingerprint every QUERY_EXPLAIN_INTERVAL seconds, so the request that
+  ran the query does not wait for them and its transaction is untouched.
+
+Statements outside requests (jobs, scheduler) are only checked for
+slowness; batch jobs repeat queries by design.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import sysconfig
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import has_request_context, request
+
+from services import sql_timing
+
+logger = logging.getLogger(__name__)
+_current = ContextVar('request_queries', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+_SPACE = re.compile(r'\s+')
+_FINGERPRINT_CACHE_SIZE = 4096
+_EXPLAINABLE = ('select', 'with')
+_LIBRARY_PATHS = tuple({os.path.abspath(path) for name, path in sysconfig.get_paths().items()
+                        if name in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+_OWN_FILES = {os.path.abspath(__file__), os.path.abspath(sql_timing.__file__)}
+
+
+class NPlusOneError(RuntimeError):
+    """A request repeated one statement QUERY_N_PLUS_ONE_THRESHOLD times (strict mode)"""
+
+
+def fingerprint(statement):
+    """Statement with its literals and parameter lists collapsed"""
+    text = _STRING.sub('?', statement)
+    text = _NUMBER.sub('?', text)
+    text = _IN_LIST.sub('(?+)', text)
+    return _SPACE.sub(' ', text).strip()
+
+
+class RequestQueries:
+    """Fingerprint counts of the request being served"""
+    __slots__ = ('counts', 'flagged', 'allowed')
+
+    def __init__(self):
+        self.counts = {}
+        self.flagged = {}  # fingerprint -> location
+        self.allowed = 0
+
+
+@contextmanager
+def allow_repeats():
+    """Do not flag the statements of this block as N+1 (intentional per-item queries)"""
+    state = _current.get()
+    if state is not None:
+        state.allowed += 1
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.allowed -= 1
+
+
+class QueryInspector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.threshold = 10
+        self.slow_seconds = 0.25
+        self.strict = False
+        self.explain = True
+        self.explain_interval = 600
+        self.log_path = None
+        self.root_path = None
+        self._fingerprints = {}
+        self._findings = {}  # (route, fingerprint) -> finding
+        self._slow = deque(maxlen=100)
+        self._explained = {}  # fingerprint -> time of the last EXPLAIN
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explainer = None
+        self._explainer_pid = None
+
+    def fingerprint(self, statement):
+        cached = self._fingerprints.get(statement)
+        if cached is None:
+            if len(self._fingerprints) >= _FINGERPRINT_CACHE_SIZE:
+                self._fingerprints.clear()
+            cached = self._fingerprints[statement] = fingerprint(statement)
+        return cached
+
+    def location(self):
+        """Innermost application frame of the current stack"""
+        fallback = None
+        for frame in reversed(traceback.extract_stack()):
+            filename = os.path.abspath(frame.filename)
+            if filename in _OWN_FILES or filename.startswith(_LIBRARY_PATHS) or 'site-packages' in filename:
+                continue
+            if self.root_path and filename.startswith(self.root_path):
+                return f'{os.path.relpath(filename, self.root_path)}:{frame.lineno} in {frame.name}'
+            fallback = fallback or f'{filename}:{frame.lineno} in {frame.name}'
+        return fallback
+
+    # -- N+1 ------------------------------------------------------------------
+
+    def count(self, state, statement):
+        fp = self.fingerprint(statement)
+        count = state.counts.get(fp, 0) + 1
+        state.counts[fp] = count
+        if count == self.threshold and not state.allowed:
+            location = self.location()
+            state.flagged[fp] = location
+            if self.strict:
+                raise NPlusOneError(f'N+1 query: {count} executions of "{fp}" at {location}')
+
+    def finish(self, state, route):
+        for fp, location in state.flagged.items():
+            count = state.counts[fp]
+            with self._lock:
+                finding = self._findings.get((route, fp))
+                first = finding is None
+                if first:
+                    finding = self._findings[(route, fp)] = {
+                        'route': route, 'fingerprint': fp, 'location': location,
+                        'requests': 0, 'maxCount': 0
+                    }
+                finding['requests'] += 1
+                finding['maxCount'] = max(finding['maxCount'], count)
+                finding['lastSeen'] = datetime.utcnow().isoformat()
+            if first:
+                logger.warning('N+1 query on %s: %d x %s (%s)', route, count, fp[:200], location)
+
+    # -- slow queries ---------------------------------------------------------
+
+    def slow(self, conn, statement, parameters, duration, executemany):
+        fp = self.fingerprint(statement)
+        entry = {
+            'at': datetime.utcnow().isoformat(),
+            'route': f'{request.method} {_route()}' if has_request_context() else 'background',
+            'durationMs': round(duration * 1000, 2),
+            'fingerprint': fp,
+            'statement': statement if len(statement) <= 4000 else statement[:4000] + '...',
+            'parameters': _short_repr(parameters),
+            'location': self.location(),
+            'plan': None
+        }
+        now = time.monotonic()
+        if (self.explain and not executemany and statement.lstrip().lower().startswith(_EXPLAINABLE)
+                and now - self._explained.get(fp, -self.explain_interval) >= self.explain_interval
+                and _separate_connections(conn.engine)):
+            self._explained[fp] = now
+            try:
+                self._ensure_explainer()
+                self._explain_queue.put_nowait((conn.engine, statement, parameters, entry))
+                return
+            except queue.Full:
+                pass
+        self._record(entry)
+
+    def _ensure_explainer(self):
+        # Threads do not survive a fork; start one per worker process
+        if self._explainer is not None and self._explainer_pid == os.getpid():
+            return
+        self._explainer_pid = os.getpid()
+        self._explainer = threading.Thread(target=self._explain_loop, name='query-explain', daemon=True)
+        self._explainer.start()
+
+    def _explain_loop(self):
+        while True:
+            engine, statement, parameters, entry = self._explain_queue.get()
+            try:
+                entry['plan'] = explain(engine, statement, parameters)
+            except Exception as e:
+                entry['plan'] = [f'EXPLAIN failed: {e}']
+            self._record(entry)
+
+    def _record(self, entry):
+        with self._lock:
+            self._slow.append(entry)
+        logger.warning('Slow query (%s ms, %s): %s%s', entry['durationMs'], entry['route'],
+                       entry['fingerprint'][:200], ''.join(f'\n    {line}' for line in entry['plan'] or ()))
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as log:
+                    log.write(json.dumps(entry, default=str) + '\n')
+            except OSError as e:
+                logger.warning('Could not write the slow-query log: %s', e)
+
+    def report(self):
+        with self._lock:
+            findings = sorted(self._findings.values(), key=lambda f: -f['maxCount'])
+            slow = list(self._slow)[::-1]
+        return {
+            'nPlusOneThreshold': self.threshold,
+            'slowQueryMs': round(self.slow_seconds * 1000, 2),
+            'strict': self.strict,
+            'nPlusOne': [dict(f) for f in findings],
+            'slowQueries': slow
+        }
+
+    def reset(self):
+        with self._lock:
+            self._findings.clear()
+            self._slow.clear()
+            self._explained.clear()
+
+
+query_inspector = QueryInspector()
+
+
+def explain(engine, statement, parameters):
+    """Plan of ``statement`` (DBAPI-level SQL and parameters) as text lines"""
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters or ()).all()
+        conn.rollback()
+    return [' | '.join('' if value is None else str(value) for value in row) for row in rows]
+
+
+def _separate_connections(engine):
+    # An in-memory SQLite database lives on one connection; another would not see it
+    return not (engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:'))
+
+
+def _short_repr(parameters, limit=500):
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else '<unmatched>'
+
+
+# -- SQL statements -------------------------------------------------------------
+
+def _observe_statement(conn, statement, parameters, duration, executemany):
+    if duration >= query_inspector.slow_seconds and threading.current_thread() is not query_inspector._explainer:
+        query_inspector.slow(conn, statement, parameters, duration, executemany)
+    state = _current.get()
+    if state is not None:
+        query_inspector.count(state, statement)
+
+
+# -- Flask hooks ----------------------------------------------------------------
+
+def _before_request():
+    _current.set(RequestQueries())
+
+
+def _teardown_request(exc):
+    state = _current.get()
+    if state is not None:
+        _current.set(None)
+        if state.flagged:
+            query_inspector.finish(state, f'{request.method} {_route()}')
+
+
+def init_query_inspector(app):
+    """Configure the detector and install the SQL observer and request hooks"""
+    if not app.config.get('QUERY_INSPECTOR_ENABLED', True):
+        return query_inspector
+    query_inspector.threshold = app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', 10)
+    query_inspector.slow_seconds = app.config.get('QUERY_SLOW_MS', 250) / 1000
+    query_inspector.strict = bool(app.config.get('QUERY_STRICT_MODE', False))
+    query_inspector.explain = bool(app.config.get('QUERY_EXPLAIN_SLOW', True))
+    query_inspector.explain_interval = app.config.get('QUERY_EXPLAIN_INTERVAL', 600)
+    query_inspector.root_path = os.path.abspath(app.root_path)
+    log_name = app.config.get('QUERY_SLOW_LOG')
+    if log_name:
+        os.makedirs(app.instance_path, exist_ok=True)
+        query_inspector.log_path = os.path.join(app.instance_path, log_name)
+    sql_timing.observe(_observe_statement)
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    return query_inspector
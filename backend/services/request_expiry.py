@@ -0,0 +1,155 @@
+"""
+Blood request expiry sweeper
+
+Open requests (Pending/Matched) whose ``required_by`` has passed are moved
+to ``Expired`` by the ``request_expiry`` job, so status filters see them
+as closed (the urgent feed already skips them on read, so it stays
+correct between sweeps and with the scheduler off). Each batch:
+
+1. selects up to REQUEST_EXPIRY_BATCH overdue ids on the
+   ``(status, required_by)`` index, locking them with SKIP LOCKED where the
+   database supports it, so concurrent workers sweep disjoint batches;
+2. expires them in one status-guarded UPDATE;
+3. notifies the hospital of every expired Critical request (one bulk
+   notifications insert);
+4. commits, and drops the ids from the request queue.
+
+Sweep counters and durations are kept per worker for
+/api/request-expiry/stats.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from extensions import db
+from models.blood_request import BloodRequest
+from services.change_tracker import mark_changed
+from services.notification_counters import insert_notifications
+from services.request_queue import OPEN_STATUSES, request_queue
+from services.scheduler import scheduler
+
+
+class SweepMetrics:
+    """Counters and durations of this worker's sweeps"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.expired = 0
+        self.notified = 0
+        self.batches = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last = None
+
+    def record(self, result, duration):
+        with self._lock:
+            self.runs += 1
+            self.expired += result['expired']
+            self.notified += result['notified']
+            self.batches += result['batches']
+            self.total_duration += duration
+            self.max_duration = max(self.max_duration, duration)
+            self.last = dict(result, at=datetime.utcnow().isoformat())
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'expired': self.expired,
+                'notified': self.notified,
+                'batches': self.batches,
+                'avgDurationMs': round(self.total_duration / self.runs * 1000, 2) if self.runs else None,
+                'maxDurationMs': round(self.max_duration * 1000, 2),
+                'last': self.last
+            }
+
+
+sweep_metrics = SweepMetrics()
+
+
+def _notifications(rows, now):
+    return [{
+        'recipient_id': row.hospital_id,
+        'recipient_type': 'Hospital',
+        'title': f'Critical request expired: {row.blood_type} for {row.patient_name}',
+        'message': f'The critical request for {row.units_required} unit(s) of {row.blood_type} blood '
+                   f'for {row.patient_name} passed its deadline ({row.required_by:%d %b %H:%M}) '
+                   f'without being fulfilled.',
+        'notification_type': 'Alert',
+        'priority': 'High',
+        'data': json.dumps({'bloodRequestId': row.id, 'requiredBy': row.required_by.isoformat()}),
+        'read': False,
+        'created_at': now
+    } for row in rows if row.urgency == 'Critical']
+
+
+def sweep(session, now=None, batch_size=None, max_requests=None):
+    """Expire overdue open requests in batches; returns counts and timings"""
+    config = current_app.config
+    batch_size = batch_size or config.get('REQUEST_EXPIRY_BATCH', 500)
+    max_requests = max_requests or config.get('REQUEST_EXPIRY_MAX_PER_RUN', 50000)
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    expired = notified = batches = 0
+    batch_timings = []
+
+    while expired < max_requests:
+        mark = time.perf_counter()
+        rows = session.execute(
+            select(BloodRequest.id, BloodRequest.hospital_id, BloodRequest.urgency, BloodRequest.blood_type,
+                   BloodRequest.units_required, BloodRequest.patient_name, BloodRequest.required_by)
+            .where(BloodRequest.status.in_(OPEN_STATUSES), BloodRequest.required_by < now)
+            .order_by(BloodRequest.required_by)
+            .limit(min(batch_size, max_requests - expired))
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            session.rollback()
+            break
+        ids = [row.id for row in rows]
+        session.execute(
+            update(BloodRequest)
+            .where(BloodRequest.id.in_(ids), BloodRequest.status.in_(OPEN_STATUSES))
+            .values(status='Expired', updated_at=now)
+            .execution_options(track_changes=False, synchronize_session=False)
+        )
+        notifications = _notifications(rows, now)
+        insert_notifications(session, notifications)
+        mark_changed(session, 'blood_requests')
+        session.commit()
+        for request_id in ids:
+            request_queue.remove(request_id)
+
+        expired += len(ids)
+        notified += len(notifications)
+        batches += 1
+        batch_timings.append(time.perf_counter() - mark)
+        if len(ids) < batch_size:
+            break
+
+    duration = time.perf_counter() - started
+    result = {
+        'expired': expired,
+        'notified': notified,
+        'batches': batches,
+        'durationMs': round(duration * 1000, 2),
+        'maxBatchMs': round(max(batch_timings) * 1000, 2) if batch_timings else None
+    }
+    sweep_metrics.record(result, duration)
+    return result
+
+
+def _expiry_job():
+    return sweep(db.session)
+
+
+def init_request_expiry(app):
+    """Register the sweep job (first run shortly after start-up)"""
+    interval = app.config.get('REQUEST_EXPIRY_INTERVAL', 60)
+    scheduler.register('request_expiry', interval, _expiry_job, initial_delay=min(interval, 10))
+    return sweep_metrics
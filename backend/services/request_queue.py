@@ -0,0 +1,289 @@
+"""
+In-memory priority queue of open blood requests
+
+Open requests (Pending/Matched) are kept sorted on
+``(urgency rank, required_by, created_at, id)`` - Critical before Urgent
+before Normal, then earliest deadline - with a snapshot of their columns,
+so the urgent feed reads the first k entries without a query and matching
+jobs are dispatched in the same order (services.background_jobs).
+Reads skip requests past their deadline (a bisect per urgency, so they
+cost nothing); the expiry sweep (services.request_expiry) then marks them
+Expired and removes them, which is cleanup only - the feed does not
+depend on the sweep having run.
+
+The queue is hydrated from the database at start-up (or on first use if
+the tables did not exist yet) and kept current by
+mapper hooks applied on commit (O(log n) per change with sortedcontainers,
+a bisect-maintained list otherwise). Changes committed by other workers
+or by bulk statements are caught up on read with one query on
+``updated_at`` - at most every REQUEST_QUEUE_SYNC_SECONDS, or as soon as
+the shared change counter moves when REDIS_URL is configured. Deleted rows
+of other workers disappear at the periodic full resync.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models.blood_request import BloodRequest
+from services import shared_store
+from services.change_tracker import change_tracker
+from services.scheduler import scheduler
+
+try:
+    from sortedcontainers import SortedList  # type: ignore
+except ImportError:
+    SortedList = None
+
+URGENCY_RANK = {'Critical': 0, 'Urgent': 1, 'Normal': 2}
+OPEN_STATUSES = ('Pending', 'Matched')
+_PENDING_KEY = 'request_queue'
+_COLUMNS = tuple(c.key for c in BloodRequest.__table__.columns)
+
+
+class _BisectList:
+    """Minimal SortedList stand-in (O(n) insert/remove, O(log n) search)"""
+
+    def __init__(self):
+        self._items = []
+
+    def add(self, item):
+        bisect.insort(self._items, item)
+
+    def remove(self, item):
+        i = bisect.bisect_left(self._items, item)
+        if i < len(self._items) and self._items[i] == item:
+            del self._items[i]
+
+    def clear(self):
+        self._items = []
+
+    def irange(self, minimum):
+        return iter(self._items[bisect.bisect_left(self._items, minimum):])
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def sort_key(urgency, required_by, created_at, request_id):
+    return (URGENCY_RANK.get(urgency, len(URGENCY_RANK)), required_by or datetime.max, created_at or datetime.max, request_id)
+
+
+def snapshot(blood_request):
+    """Detached copy of the columns; the model serializers run on it unchanged"""
+    return SimpleNamespace(**{name: getattr(blood_request, name) for name in _COLUMNS})
+
+
+class RequestQueue:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._order = SortedList() if SortedList is not None else _BisectList()
+        self._entries = {}  # id -> (key, snapshot)
+        self.hydrated = False
+        self.sync_seconds = 5
+        self._synced_at = None  # DB time of the last catch-up query
+        self._checked_at = 0.0
+        self._shared_version = None
+        self._stale = False
+
+    # -- maintenance --------------------------------------------------------
+
+    def upsert(self, row):
+        """Insert, move or drop one request (``row``: model or snapshot)"""
+        with self._lock:
+            self._discard(row.id)
+            if row.status in OPEN_STATUSES:
+                key = sort_key(row.urgency, row.required_by, row.created_at, row.id)
+                self._order.add(key)
+                self._entries[row.id] = (key, row if isinstance(row, SimpleNamespace) else snapshot(row))
+
+    def remove(self, request_id):
+        with self._lock:
+            self._discard(request_id)
+
+    def _discard(self, request_id):
+        entry = self._entries.pop(request_id, None)
+        if entry is not None:
+            self._order.remove(entry[0])
+
+    def hydrate(self, session):
+        """Load every open request (boot and periodic resync)"""
+        started = datetime.utcnow()
+        rows = session.execute(select(BloodRequest).where(BloodRequest.status.in_(OPEN_STATUSES))).scalars().all()
+        with self._lock:
+            self._order.clear()
+            self._entries.clear()
+            for row in rows:
+                self.upsert(row)
+            self.hydrated = True
+            self._synced_at = started
+            self._checked_at = time.time()
+            self._stale = False
+        return len(rows)
+
+    def catch_up(self, session):
+        """Apply requests changed since the last sync (other workers, bulk statements)"""
+        if not self.hydrated:
+            return self.hydrate(session)
+        started = datetime.utcnow()
+        # Margin for clock skew between workers and commit delays
+        since = self._synced_at - timedelta(seconds=max(self.sync_seconds, 1))
+        rows = session.execute(select(BloodRequest).where(BloodRequest.updated_at >= since)).scalars().all()
+        with self._lock:
+            for row in rows:
+                self.upsert(row)
+            self._synced_at = started
+            self._checked_at = time.time()
+            self._stale = False
+        return len(rows)
+
+    def _needs_catch_up(self):
+        if not self.hydrated or self._stale:
+            return True
+        if shared_store.get_client() is not None:
+            version = change_tracker.versions(('blood_requests',))
+            if version != self._shared_version:
+                self._shared_version = version
+                return True
+            return False
+        return time.time() - self._checked_at >= self.sync_seconds
+
+    def ensure_current(self, session):
+        if self._needs_catch_up():
+            self.catch_up(session)
+
+    # -- reads --------------------------------------------------------------
+
+    def top(self, k, urgencies=None, now=None, session=None):
+        """First ``k`` open requests not past their deadline, in priority order (snapshots)"""
+        self.ensure_current(session or db.session)
+        now = now or datetime.utcnow()
+        ranks = sorted({URGENCY_RANK[u] for u in urgencies}) if urgencies else range(len(URGENCY_RANK) + 1)
+        result = []
+        with self._lock:
+            for rank in ranks:
+                # Keys sort by deadline within a rank: start at the first one not yet due
+                for key in self._order.irange(minimum=(rank, now)):
+                    if key[0] != rank or len(result) >= k:
+                        break
+                    result.append(self._entries[key[3]][1])
+        return result
+
+    def priority(self, request_id):
+        """Dispatch priority of a request (lower first); None when it is not open"""
+        with self._lock:
+            entry = self._entries.get(request_id)
+        if entry is None:
+            return None
+        rank, required_by, created_at, _ = entry[0]
+        return (rank, required_by.timestamp() if required_by != datetime.max else float('inf'),
+                created_at.timestamp() if created_at != datetime.max else float('inf'))
+
+    def position(self, request_id):
+        """0-based rank of a request in the queue (O(log n) with sortedcontainers)"""
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None:
+                return None
+            if hasattr(self._order, 'index'):
+                return self._order.index(entry[0])
+            return list(self._order).index(entry[0])
+
+    def stats(self):
+        with self._lock:
+            by_urgency = {u: 0 for u in URGENCY_RANK}
+            for key, _ in self._entries.values():
+                for urgency, rank in URGENCY_RANK.items():
+                    if key[0] == rank:
+                        by_urgency[urgency] += 1
+            return {
+                'hydrated': self.hydrated,
+                'size': len(self._entries),
+                'byUrgency': by_urgency,
+                'backend': 'sortedcontainers' if SortedList is not None else 'bisect',
+                'syncedAt': self._synced_at.isoformat() if self._synced_at else None
+            }
+
+
+request_queue = RequestQueue()
+
+
+# -- ORM hooks: stage on flush, apply on commit ------------------------------
+
+def _stage(session, row, deleted=False):
+    if session is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    pending[row.id] = None if deleted else snapshot(row)
+
+
+def _after_insert(mapper, connection, target):
+    _stage(object_session(target), target)
+
+
+def _after_update(mapper, connection, target):
+    _stage(object_session(target), target)
+
+
+def _after_delete(mapper, connection, target):
+    _stage(object_session(target), target, deleted=True)
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not request_queue.hydrated:
+        return
+    for request_id, row in pending.items():
+        if row is None:
+            request_queue.remove(request_id)
+        else:
+            request_queue.upsert(row)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _on_change(tables, details):
+    # Bulk statements do not go through the mapper hooks
+    if 'blood_requests' in tables and 'blood_requests' in (details.get('unlocated_tables') or []):
+        request_queue._stale = True
+
+
+def _resync_job():
+    return {'open': request_queue.hydrate(db.session)}
+
+
+_installed = False
+
+
+def init_request_queue(app):
+    """Install the hooks and register the periodic full resync"""
+    global _installed
+    request_queue.sync_seconds = app.config.get('REQUEST_QUEUE_SYNC_SECONDS', 5)
+    if not _installed:
+        event.listen(BloodRequest, 'after_insert', _after_insert)
+        event.listen(BloodRequest, 'after_update', _after_update)
+        event.listen(BloodRequest, 'after_delete', _after_delete)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+        change_tracker.subscribe(_on_change)
+        _installed = True
+    scheduler.register('request_queue_resync', app.config.get('REQUEST_QUEUE_RESYNC_INTERVAL', 600), _resync_job)
+    with app.app_context():
+        try:
+            request_queue.hydrate(db.session)
+        except Exception as e:
+            # Tables not created yet (first run, before migrations); hydrated on first read
+            db.session.rollback()
+            request_queue.hydrated = False
+            print(f"⚠️  Request queue not hydrated: {e}")
+    return request_queue
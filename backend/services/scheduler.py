@@ -0,0 +1,149 @@
+"""
+In-process periodic jobs
+
+Jobs run on one daemon thread each, inside an application context, and
+keep their last run time, duration and error for /api/scheduler/jobs.
+Every worker process runs its own scheduler, so jobs must be safe to run
+concurrently (they guard their writes with compare-and-set updates or
+short-lived locks). Disabled with SCHEDULER_ENABLED=False, as in testing.
+"""
+import multiprocessing
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+
+class Job:
+    """A function called every ``interval`` seconds"""
+
+    def __init__(self, name, interval, func, initial_delay=None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.initial_delay = interval if initial_delay is None else initial_delay
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_duration = None
+        self.last_error = None
+        self.last_result = None
+        self._wake = threading.Event()
+
+    def run_once(self, app):
+        started = time.time()
+        try:
+            with app.app_context():
+                self.last_result = self.func()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"⚠️  Scheduled job {self.name} failed: {e}")
+        finally:
+            self.runs += 1
+            self.last_run_at = started
+            self.last_duration = time.time() - started
+
+    def trigger(self):
+        """Run on the next loop iteration instead of waiting for the interval"""
+        self._wake.set()
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'intervalSeconds': self.interval,
+            'runs': self.runs,
+            'failures': self.failures,
+            'lastRunAt': self.last_run_at,
+            'lastDurationMs': round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            'lastError': self.last_error,
+            'lastResult': self.last_result if isinstance(self.last_result, (dict, int, float, str)) else None
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.app = None
+        self.jobs = {}
+        self.enabled = False
+        self._threads = []
+        self._spawned = set()
+        self._stop = threading.Event()
+
+    def register(self, name, interval, func, initial_delay=None):
+        """Add a periodic job, or replace an existing one in place; started with the scheduler.
+
+        Every ``create_app`` registers the same jobs: a running job's thread
+        picks up the new function and interval, and no thread is added.
+        """
+        job = self.jobs.get(name)
+        if job is None:
+            job = self.jobs[name] = Job(name, interval, func, initial_delay)
+        else:
+            job.interval = interval
+            job.func = func
+        return job
+
+    def run_now(self, name):
+        """Run a job synchronously in the caller's thread"""
+        job = self.jobs[name]
+        job.run_once(current_app._get_current_object() if has_app_context() else self.app)
+        return job.last_result
+
+    def start(self):
+        """Spawn a thread for every job that has none yet"""
+        if not self.enabled:
+            return
+        for job in self.jobs.values():
+            if job.name not in self._spawned:
+                self._spawn(job)
+
+    def stop(self):
+        self._stop.set()
+        for job in self.jobs.values():
+            job.trigger()
+
+    def _spawn(self, job):
+        self._spawned.add(job.name)
+        thread = threading.Thread(target=self._loop, args=(job,), name=f'scheduler-{job.name}', daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _loop(self, job):
+        delay = job.initial_delay
+        while not self._stop.is_set():
+            job._wake.wait(delay)
+            job._wake.clear()
+            if self._stop.is_set():
+                break
+            job.run_once(self.app)
+            delay = job.interval
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'running': bool(self._threads),
+            'jobs': [job.to_dict() for job in self.jobs.values()]
+        }
+
+
+scheduler = Scheduler()
+
+
+def init_scheduler(app):
+    """Bind the scheduler to the latest app created before it started"""
+    if not scheduler._threads:
+        scheduler.app = app
+        scheduler.enabled = bool(app.config.get('SCHEDULER_ENABLED', True))
+    return scheduler
+
+
+def start_scheduler(app):
+    """Start job threads once all services have registered their jobs"""
+    # Process pool workers re-import the main module (and create an app); they never run jobs
+    if multiprocessing.parent_process() is not None:
+        return scheduler
+    if scheduler.app is app:
+        scheduler.start()
+    return scheduler
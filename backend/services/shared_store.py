@@ -0,0 +1,43 @@
+"""
+Optional shared store (Redis) for state that must agree across workers
+
+Everything that uses it (change counters, response cache tier, pub/sub)
+keeps working per-process when REDIS_URL is not configured or the redis
+package is not installed.
+"""
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+_client = None
+_key_prefix = 'bas:'
+
+
+def init_shared_store(app):
+    """Create the Redis client from ``REDIS_URL`` if one is configured"""
+    global _client, _key_prefix
+    url = app.config.get('REDIS_URL')
+    _key_prefix = app.config.get('REDIS_KEY_PREFIX', 'bas:')
+    if not url or redis is None:
+        _client = None
+        return None
+    try:
+        _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        _client.ping()
+        print("✅ Shared store connected")
+    except Exception as e:
+        print(f"⚠️  Shared store unavailable, using per-process state: {e}")
+        _client = None
+    return _client
+
+
+def get_client():
+    """Return the Redis client, or None when running per-process"""
+    return _client
+
+
+def key(*parts):
+    """Namespaced key for the shared store"""
+    return _key_prefix + ':'.join(str(p) for p in parts)
@@ -0,0 +1,373 @@
+"""
+Inventory shortage alerts
+
+Every inventory write reports the banks it touched (``blood_bank_ids`` in
+the change tracker details). Those ids go into a dirty set - a Redis set
+when REDIS_URL is configured, so each bank is picked up by one worker -
+and the ``shortage_alerts`` job evaluates only the dirty banks, in chunks.
+A full evaluation runs once at start-up and after writes whose banks are
+unknown (raw bulk statements).
+
+A bank/blood type is
+  Out        - no units left while a minimum is configured
+  Low        - below its minimum (``inventory_thresholds`` row, else
+               SHORTAGE_MIN_UNITS for the type)
+  Depleting  - fewer than SHORTAGE_DEPLETION_DAYS of cover at the expected
+               consumption rate (demand forecast, else the last 7 days)
+
+The state lives in ``inventory_alerts``. Hospitals within
+SHORTAGE_ALERT_RADIUS_KM get one ``Alert`` notification when an episode
+opens and one per escalation. An episode that resolves and reopens within
+SHORTAGE_ALERT_COOLDOWN_HOURS does not notify again at the same level.
+State changes are compare-and-set updates, so two workers evaluating the
+same bank notify once.
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.hospital import Hospital
+from models.inventory import InventoryAlert, InventoryEvent, InventoryThreshold
+from services import shared_store
+from services.change_tracker import change_tracker
+from services.notification_counters import insert_notifications
+from services.scheduler import scheduler
+
+BLOOD_TYPES = tuple(INVENTORY_COLUMNS)
+LEVELS = ('Depleting', 'Low', 'Out')
+_RANK = {None: 0, 'Depleting': 1, 'Low': 2, 'Out': 3}
+_PRIORITY = {'Depleting': 'Medium', 'Low': 'High', 'Out': 'High'}
+
+
+class DirtyBanks:
+    """Banks whose stock changed since they were last evaluated"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = set()
+        self._full = False
+
+    def add(self, bank_ids):
+        bank_ids = [int(b) for b in bank_ids]
+        if not bank_ids:
+            return
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                client.sadd(shared_store.key('shortage', 'dirty'), *bank_ids)
+                return
+            except Exception as e:
+                print(f"⚠️  Shared dirty set failed, using per-process set: {e}")
+        with self._lock:
+            self._ids.update(bank_ids)
+
+    def request_full(self):
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                client.set(shared_store.key('shortage', 'full'), 1)
+                return
+            except Exception:
+                pass
+        with self._lock:
+            self._full = True
+
+    def drain(self, limit):
+        """``(bank_ids, full)``: up to ``limit`` dirty ids, and whether a full pass was requested"""
+        ids, full = [], False
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.spop(shared_store.key('shortage', 'dirty'), limit)
+                pipe.get(shared_store.key('shortage', 'full'))
+                pipe.delete(shared_store.key('shortage', 'full'))
+                popped, flag, _ = pipe.execute()
+                ids = [int(b) for b in popped or []]
+                full = bool(flag)
+            except Exception as e:
+                print(f"⚠️  Shared dirty set unavailable: {e}")
+        with self._lock:
+            local = list(self._ids)[:max(limit - len(ids), 0)]
+            self._ids.difference_update(local)
+            full = full or self._full
+            self._full = False
+        return ids + local, full
+
+    def pending(self):
+        client = shared_store.get_client()
+        if client is not None:
+            try:
+                return int(client.scard(shared_store.key('shortage', 'dirty')))
+            except Exception:
+                pass
+        with self._lock:
+            return len(self._ids)
+
+
+dirty_banks = DirtyBanks()
+
+
+def _on_change(tables, details):
+    if 'blood_banks' not in tables:
+        return
+    bank_ids = details.get('blood_bank_ids')
+    if bank_ids:
+        dirty_banks.add(bank_ids)
+    elif 'blood_banks' in (details.get('unlocated_tables') or []):
+        # A statement changed banks we cannot name
+        dirty_banks.request_full()
+
+
+def classify(units, min_units, daily_rate, depletion_days):
+    """Alert level of one bank/blood type (None when stock is fine)"""
+    if min_units > 0 and units <= 0:
+        return 'Out'
+    if units < min_units:
+        return 'Low'
+    if daily_rate > 0 and units / daily_rate < depletion_days:
+        return 'Depleting'
+    return None
+
+
+def _consumption_rates(session, bank_ids, now):
+    """Expected units issued per day, ``{(bank_id, blood_type): rate}``"""
+    from services.demand_forecast import forecaster
+    rates = {}
+    result = forecaster.peek()
+    if result is not None:
+        for bank_id in bank_ids:
+            i = result.position(bank_id)
+            if i is not None:
+                for t, blood_type in enumerate(BLOOD_TYPES):
+                    rates[(bank_id, blood_type)] = float(result.total[i, t]) / max(result.horizon, 1)
+    recent = session.execute(
+        select(InventoryEvent.blood_bank_id, InventoryEvent.blood_type, func.sum(InventoryEvent.delta))
+        .where(InventoryEvent.blood_bank_id.in_(bank_ids), InventoryEvent.reason == 'Issued',
+               InventoryEvent.created_at >= now - timedelta(days=7))
+        .group_by(InventoryEvent.blood_bank_id, InventoryEvent.blood_type)
+    )
+    for bank_id, blood_type, total in recent:
+        # The forecast lags by up to a refresh interval; a recent surge wins
+        rates[(bank_id, blood_type)] = max(rates.get((bank_id, blood_type), 0.0), -float(total or 0) / 7)
+    return rates
+
+
+def _nearby_hospitals(session, banks, radius_km, limit):
+    """``{bank_id: [hospital_id, ...]}`` nearest first; one bounding-box query per 1-degree cell of banks"""
+    cells = {}
+    for bank in banks:
+        if bank.latitude is not None and bank.longitude is not None:
+            cells.setdefault((int(float(bank.latitude) // 1), int(float(bank.longitude) // 1)), {})[bank.id] = bank
+    result = {}
+    for located in cells.values():
+        located = list(located.values())
+        lats = np.array([float(b.latitude) for b in located])
+        lons = np.array([float(b.longitude) for b in located])
+        pad_lat = radius_km / 111.0
+        pad_lon = radius_km / (111.0 * max(np.cos(np.radians(np.abs(lats).max() + pad_lat)), 0.01))
+        hospitals = session.execute(
+            select(Hospital.id, Hospital.latitude, Hospital.longitude).where(
+                Hospital.latitude.between(float(lats.min() - pad_lat), float(lats.max() + pad_lat)),
+                Hospital.longitude.between(float(lons.min() - pad_lon), float(lons.max() + pad_lon))
+            )
+        ).all()
+        if not hospitals:
+            continue
+        h_ids = np.array([h[0] for h in hospitals])
+        h_lat = np.radians(np.array([float(h[1]) for h in hospitals]))
+        h_lon = np.radians(np.array([float(h[2]) for h in hospitals]))
+        b_lat, b_lon = np.radians(lats)[:, None], np.radians(lons)[:, None]
+        a = np.sin((h_lat - b_lat) / 2) ** 2 + np.cos(b_lat) * np.cos(h_lat) * np.sin((h_lon - b_lon) / 2) ** 2
+        distances = 6371.0 * 2 * np.arcsin(np.sqrt(a))
+        for row, bank in enumerate(located):
+            order = np.argsort(distances[row])[:limit]
+            result[bank.id] = [int(h_ids[j]) for j in order if distances[row, j] <= radius_km]
+    return result
+
+
+def _message(bank, blood_type, level, units, min_units, cover):
+    name = bank.name + (f' ({bank.city})' if bank.city else '')
+    if level == 'Out':
+        return f'Blood shortage: {blood_type} out of stock', f'{name} has no {blood_type} units left.'
+    if level == 'Low':
+        return (f'Blood shortage: {blood_type} running low',
+                f'{name} has {units} {blood_type} units left (minimum {min_units}).')
+    return (f'Blood shortage: {blood_type} depleting',
+            f'{name} will run out of {blood_type} in about {cover:.1f} days at the current rate ({units} units left).')
+
+
+def evaluate(session, bank_ids, now=None, config=None):
+    """Update the alert state of ``bank_ids`` and notify nearby hospitals; returns counts"""
+    config = config or current_app.config
+    now = now or datetime.utcnow()
+    bank_ids = sorted(set(bank_ids))
+    counts = {'evaluated': 0, 'raised': 0, 'escalated': 0, 'resolved': 0, 'notifications': 0}
+    if not bank_ids:
+        return counts
+    defaults = config.get('SHORTAGE_MIN_UNITS', {})
+    depletion_days = config.get('SHORTAGE_DEPLETION_DAYS', 2)
+    cooldown = timedelta(hours=config.get('SHORTAGE_ALERT_COOLDOWN_HOURS', 12))
+
+    columns = [getattr(BloodBank, c) for c in INVENTORY_COLUMNS.values()]
+    banks = session.execute(
+        select(BloodBank.id, BloodBank.name, BloodBank.city, BloodBank.latitude, BloodBank.longitude, *columns)
+        .where(BloodBank.id.in_(bank_ids))
+    ).all()
+    thresholds = {
+        (t.blood_bank_id, t.blood_type): t.min_units
+        for t in session.execute(select(InventoryThreshold).where(InventoryThreshold.blood_bank_id.in_(bank_ids))).scalars()
+    }
+    alerts = {
+        (a.blood_bank_id, a.blood_type): a
+        for a in session.execute(select(InventoryAlert).where(InventoryAlert.blood_bank_id.in_(bank_ids))).scalars()
+    }
+    rates = _consumption_rates(session, bank_ids, now)
+
+    table = InventoryAlert.__table__
+    to_notify = []
+    for bank in banks:
+        counts['evaluated'] += 1
+        for t, blood_type in enumerate(BLOOD_TYPES):
+            units = bank[5 + t] or 0
+            min_units = thresholds.get((bank.id, blood_type), defaults.get(blood_type, 0))
+            rate = rates.get((bank.id, blood_type), 0.0)
+            cover = round(units / rate, 2) if rate > 0 else None
+            level = classify(units, min_units, rate, depletion_days)
+            alert = alerts.get((bank.id, blood_type))
+            key = (table.c.blood_bank_id == bank.id) & (table.c.blood_type == blood_type)
+
+            if level is None:
+                if alert is not None and alert.level is not None:
+                    session.execute(
+                        update(table).where(key, table.c.level == alert.level)
+                        .values(level=None, units=units, days_of_cover=cover, resolved_at=now, updated_at=now)
+                        .execution_options(track_changes=False)
+                    )
+                    counts['resolved'] += 1
+                continue
+
+            if alert is None:
+                # A concurrent insert fails the batch's commit; run() retries the banks
+                session.execute(table.insert().execution_options(track_changes=False), [{
+                    'blood_bank_id': bank.id, 'blood_type': blood_type, 'level': level, 'notified_level': level,
+                    'units': units, 'min_units': min_units, 'days_of_cover': cover, 'notifications': 0,
+                    'raised_at': now, 'updated_at': now
+                }])
+                counts['raised'] += 1
+                to_notify.append((bank, blood_type, level, units, min_units, cover))
+                continue
+
+            new_episode = alert.level is None and (alert.resolved_at is None or now - alert.resolved_at >= cooldown)
+            notified = None if new_episode else alert.notified_level
+            notify = _RANK[level] > _RANK[notified]
+            values = {'level': level, 'units': units, 'min_units': min_units, 'days_of_cover': cover, 'updated_at': now}
+            if alert.level is None:
+                values.update(resolved_at=None)
+                if new_episode:
+                    values.update(raised_at=now)
+            if notify:
+                values.update(notified_level=level)
+            result = session.execute(
+                update(table).where(key, table.c.updated_at == alert.updated_at).values(**values)
+                .execution_options(track_changes=False)
+            )
+            if result.rowcount and notify:
+                counts['raised' if _RANK[notified] == 0 else 'escalated'] += 1
+                to_notify.append((bank, blood_type, level, units, min_units, cover))
+
+    if to_notify:
+        recipients = _nearby_hospitals(
+            session, [entry[0] for entry in to_notify],
+            config.get('SHORTAGE_ALERT_RADIUS_KM', 25), config.get('SHORTAGE_ALERT_MAX_HOSPITALS', 20)
+        )
+        rows = []
+        for bank, blood_type, level, units, min_units, cover in to_notify:
+            title, message = _message(bank, blood_type, level, units, min_units, cover)
+            data = json.dumps({'bloodBankId': bank.id, 'bloodType': blood_type, 'level': level,
+                               'units': units, 'minUnits': min_units, 'daysOfCover': cover})
+            hospital_ids = recipients.get(bank.id, [])
+            rows += [{
+                'recipient_id': hospital_id, 'recipient_type': 'Hospital', 'title': title, 'message': message,
+                'notification_type': 'Alert', 'priority': _PRIORITY[level], 'data': data, 'read': False,
+                'created_at': now
+            } for hospital_id in hospital_ids]
+            session.execute(
+                update(table).where((table.c.blood_bank_id == bank.id) & (table.c.blood_type == blood_type))
+                .values(notifications=table.c.notifications + len(hospital_ids))
+                .execution_options(track_changes=False)
+            )
+        insert_notifications(session, rows)
+        counts['notifications'] = len(rows)
+    session.commit()
+    return counts
+
+
+def run(session, config=None):
+    """Evaluate the dirty banks (all banks after a full-pass request)"""
+    config = config or current_app.config
+    batch = config.get('SHORTAGE_EVAL_BATCH', 500)
+    bank_ids, full = dirty_banks.drain(config.get('SHORTAGE_EVAL_MAX_BANKS', 20000))
+    if full:
+        bank_ids = session.execute(select(BloodBank.id)).scalars().all()
+    totals = {'evaluated': 0, 'raised': 0, 'escalated': 0, 'resolved': 0, 'notifications': 0, 'full': full}
+    bank_ids = sorted(set(bank_ids))
+    for start in range(0, len(bank_ids), batch):
+        chunk = bank_ids[start:start + batch]
+        try:
+            counts = evaluate(session, chunk, config=config)
+        except IntegrityError:
+            # Another worker opened one of the alerts first; re-evaluate next run
+            session.rollback()
+            dirty_banks.add(chunk)
+            continue
+        except Exception:
+            session.rollback()
+            dirty_banks.add(bank_ids[start:])
+            raise
+        for name, value in counts.items():
+            totals[name] += value
+    totals['pending'] = dirty_banks.pending()
+    return totals
+
+
+def open_alerts(session, level=None, blood_type=None, city=None, limit=None):
+    """Unresolved alerts, most severe first"""
+    query = select(InventoryAlert).where(InventoryAlert.level.isnot(None))
+    if level:
+        query = query.where(InventoryAlert.level == level)
+    if blood_type:
+        query = query.where(InventoryAlert.blood_type == blood_type)
+    if city:
+        query = query.join(BloodBank, BloodBank.id == InventoryAlert.blood_bank_id).where(
+            func.lower(func.trim(BloodBank.city)) == city.strip().lower()
+        )
+    alerts = session.execute(query).scalars().all()
+    alerts.sort(key=lambda a: (-_RANK[a.level], a.days_of_cover if a.days_of_cover is not None else -1, a.blood_bank_id))
+    return alerts[:limit] if limit else alerts
+
+
+def _shortage_job():
+    return run(db.session)
+
+
+_subscribed = False
+
+
+def init_shortage_alerts(app):
+    """Watch inventory changes and register the evaluation job"""
+    global _subscribed
+    if not _subscribed:
+        change_tracker.subscribe(_on_change)
+        # Banks already short when the process starts
+        dirty_banks.request_full()
+        _subscribed = True
+    scheduler.register('shortage_alerts', app.config.get('SHORTAGE_ALERT_INTERVAL', 60), _shortage_job)
+    return dirty_banks
@@ -0,0 +1,59 @@
+"""
+Statement timing shared by the SQL observers
+
+One pair of SQLAlchemy engine events times every cursor execute and hands
+``(conn, statement, parameters, duration, executemany)`` to the observers
+registered with ``observe()`` (services.instrumentation,
+services.query_inspector), so a statement is timed once however many
+observers there are.
+
+Start times sit on a stack in ``conn.info`` (listeners may run statements
+of their own). A statement that fails never reaches
+``after_cursor_execute``; the ``handle_error`` event drops its entry, so a
+pooled connection does not carry stale start times into its next checkout.
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_perf = time.perf_counter
+_STARTED = 'sql_timing_started'
+
+_observers = []
+_installed = False
+
+
+def observe(callback):
+    """Call ``callback(conn, statement, parameters, duration, executemany)`` after each statement"""
+    global _installed
+    if callback not in _observers:
+        _observers.append(callback)
+    if not _installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _installed = True
+    return callback
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_STARTED, []).append((context, _perf()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get(_STARTED)
+    if not stack:
+        return
+    duration = _perf() - stack.pop()[1]
+    for callback in _observers:
+        callback(conn, statement, parameters, duration, executemany)
+
+
+def _handle_error(exception_context):
+    # Only the failed statement's own entry: errors raised by an observer
+    # arrive here too, after after_cursor_execute already popped it
+    conn = exception_context.connection
+    stack = conn.info.get(_STARTED) if conn is not None else None
+    if stack and stack[-1][0] is exception_context.execution_context:
+        stack.pop()
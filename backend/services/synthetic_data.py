@@ -0,0 +1,420 @@
+"""
+Synthetic data at production scale
+
+Generates hospitals, blood banks, donors, blood requests and notifications:
+
+- located rows cluster around Indian city centres in proportion to the
+  cities' populations, normally spread over a few km (services.geo_sampling);
+  blood types follow the Indian distribution;
+- ids are assigned up front (after the current maximum), so foreign keys
+  are valid without reading anything back: banks belong to a hospital of
+  their own city, requests sit at their hospital, notifications go to
+  generated donors and point at generated requests;
+- donor phones and bank license numbers derive from the id, so they are
+  unique at any size, as are bank names (the import upsert keys);
+- open (Pending/Matched) requests are recent and due after the time of the
+  run, whatever ``as_of`` is, so they show in the urgent feed instead of
+  being expired by the first sweep; Matched requests get donor matches
+  from compatible available donors of their hospital's city.
+
+Rows are built in partitions of ``chunk`` rows. Each partition has its own
+generator seeded with ``(seed, table, partition)``, so a seed produces the
+same rows whatever the number of processes; partitions are built on
+``job_runner.process_pool()`` and written in order as they arrive - with
+COPY on PostgreSQL and Core executemany elsewhere - committing per
+partition. Timestamps are relative to ``as_of`` (default: today).
+
+The writes bypass the ORM hooks, so opening ledger balances, inventory
+aggregates and unread counters are rebuilt at the end.
+"""
+import csv
+import io
+import json
+import os
+import random
+import time
+from collections import deque
+from datetime import date, datetime, time as day_time, timedelta
+
+from sqlalchemy import func, select, text, update
+
+from models.blood_bank import BloodBank, INVENTORY_COLUMNS
+from models.blood_request import BloodRequest, BloodRequestMatch, Notification
+from models.donor import Donor
+from models.hospital import Hospital
+from services.geo_sampling import BLOOD_TYPE_WEIGHTS, BLOOD_TYPES, cities_by_weight, distance_km, point
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Rohan', 'Karthik', 'Rahul', 'Vikram', 'Imran',
+               'Ananya', 'Diya', 'Priya', 'Kavya', 'Meera', 'Fatima', 'Lakshmi', 'Sneha', 'Pooja', 'Neha']
+LAST_NAMES = ['Sharma', 'Verma', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Gupta', 'Khan', 'Singh', 'Das',
+              'Banerjee', 'Mehta', 'Joshi', 'Rao', 'Kulkarni', 'Menon', 'Chatterjee', 'Pillai', 'Yadav', 'Shah']
+HOSPITAL_KINDS = ['General', 'City', 'Civil', 'Care', 'Apollo', 'Lifeline', 'District', 'Medical College']
+REASONS = ['Surgery', 'Accident', 'Anemia', 'Thalassemia', 'Dengue', 'Childbirth', 'Cancer treatment']
+NOTIFICATION_TEMPLATES = [
+    ('BloodRequest', 'Blood Request Near You', 'A patient needs {blood_type} blood at {hospital}.'),
+    ('Emergency', 'Emergency Blood Needed', 'Critical: {blood_type} donors needed at {hospital}.'),
+    ('Match', 'You are a match', 'You match a {blood_type} request at {hospital}.'),
+    ('Reminder', 'Donation Reminder', 'You are eligible to donate again.'),
+    ('Info', 'Thank You for Donating', 'Your donation helped a patient at {hospital}.')
+]
+
+# Order of generation (and of the foreign keys between them)
+TABLES = ('hospitals', 'blood_banks', 'donors', 'blood_requests', 'notifications')
+# Nothing references these ids and background jobs insert alerts
+# concurrently, so the database assigns them
+DATABASE_IDS = {'notifications'}
+MODELS = {'hospitals': Hospital, 'blood_banks': BloodBank, 'donors': Donor,
+          'blood_requests': BloodRequest, 'notifications': Notification}
+DEFAULT_CHUNK = 20000
+OPEN_STATUSES = ('Pending', 'Matched')
+MATCHES_PER_REQUEST = (1, 5)
+MATCH_POOL_SIZE = 50  # donors per city and blood type that matches are drawn from
+
+
+def _pincode(rnd, city):
+    # First digits follow the city's postal region, so pincodes cluster like real ones
+    return f'{(sum(map(ord, city[0])) % 80) + 11}{rnd.randint(0, 9999):04d}'
+
+
+def _state_code(city):
+    # 'Tamil Nadu' -> 'TN', 'Kerala' -> 'KE'
+    words = city[1].split()
+    return (words[0][0] + words[1][0] if len(words) > 1 else words[0][:2]).upper()
+
+
+def hospital_rows(rnd, ids, as_of, refs):
+    rows = []
+    for hospital_id, city in zip(ids, cities_by_weight(rnd, len(ids))):
+        lat, lon = point(rnd, city, 0.8)
+        rows.append({
+            'id': hospital_id,
+            'name': f'{city[0]} {rnd.choice(HOSPITAL_KINDS)} Hospital {hospital_id}',
+            'hospital_type': rnd.choices(['Government', 'Private', 'Trust', 'Military'], [35, 50, 12, 3])[0],
+            'latitude': lat, 'longitude': lon,
+            'street': f'{rnd.randint(1, 400)}, {rnd.choice(["MG Road", "Station Road", "Ring Road", "Main Road"])}',
+            'city': city[0], 'state': city[1], 'pincode': _pincode(rnd, city), 'country': 'India',
+            'phone': f'0{8000000000 + hospital_id}', 'emergency_contact': f'0{8100000000 + hospital_id}',
+            'email': f'contact{hospital_id}@hospital.example.in',
+            'has_blood_bank': rnd.random() < 0.4,
+            'total_beds': rnd.randint(50, 1500),
+            'verified': True, 'created_at': as_of, 'updated_at': as_of
+        })
+    return rows
+
+
+def blood_bank_rows(rnd, ids, as_of, refs):
+    hospitals_by_city = refs['hospitals_by_city']
+    rows = []
+    for bank_id, city in zip(ids, cities_by_weight(rnd, len(ids))):
+        lat, lon = point(rnd, city, 0.9)
+        local = hospitals_by_city.get(city[0])
+        row = {
+            'id': bank_id,
+            'name': f'{city[0]} Blood Centre {bank_id}',
+            'latitude': lat, 'longitude': lon,
+            'street': f'{rnd.randint(1, 400)}, {rnd.choice(["Hospital Road", "Main Road", "Market Street"])}',
+            'city': city[0], 'state': city[1], 'pincode': _pincode(rnd, city), 'country': 'India',
+            'phone': f'0{7000000000 + bank_id}',
+            'email': f'bank{bank_id}@bloodbank.example.in',
+            'hospital_id': rnd.choice(local) if local and rnd.random() < 0.5 else None,
+            'license_number': f'BB/{_state_code(city)}/{bank_id:07d}',
+            'verified': True, 'last_inventory_update': as_of, 'created_at': as_of, 'updated_at': as_of
+        }
+        for blood_type, weight in zip(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS):
+            mean = max(weight * 1.2, 1.0)
+            row[INVENTORY_COLUMNS[blood_type]] = max(int(rnd.gauss(mean, mean / 2)), 0)
+        rows.append(row)
+    return rows
+
+
+def donor_rows(rnd, ids, as_of, refs):
+    today = as_of.date()
+    rows = []
+    for donor_id, city in zip(ids, cities_by_weight(rnd, len(ids))):
+        lat, lon = point(rnd, city)
+        donated = rnd.random() < 0.6
+        rows.append({
+            'id': donor_id,
+            'name': f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}',
+            'blood_type': rnd.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0],
+            # From the id, so phones stay unique at any size
+            'phone': f'+91{6000000000 + donor_id - 1}',
+            'email': f'donor{donor_id}@example.com',
+            'age': rnd.randint(18, 60),
+            'gender': rnd.choice(['Male', 'Female']),
+            'latitude': lat, 'longitude': lon,
+            'city': city[0], 'state': city[1], 'pincode': _pincode(rnd, city), 'country': 'India',
+            'last_donation_date': today - timedelta(days=rnd.randint(30, 720)) if donated else None,
+            'available_for_donation': rnd.random() < 0.75,
+            'total_donations': rnd.randint(1, 20) if donated else 0,
+            'has_chronic_diseases': rnd.random() < 0.05,
+            'verified': True,
+            'rating': round(rnd.uniform(3.5, 5.0), 1),
+            'response_time_minutes': rnd.randint(10, 90),
+            'created_at': as_of, 'updated_at': as_of
+        })
+    return rows
+
+
+def blood_request_rows(rnd, ids, as_of, refs):
+    hospitals, now = refs['hospitals'], refs['now']
+    rows = []
+    for request_id in ids:
+        hospital_id, lat, lon, hospital_name = rnd.choice(hospitals)
+        status = rnd.choices(['Pending', 'Matched', 'Fulfilled', 'Cancelled', 'Expired'], [25, 15, 45, 5, 10])[0]
+        if status in OPEN_STATUSES:
+            # Still open: raised recently and due after now
+            created = now - timedelta(minutes=rnd.randint(0, 60 * 24 * 2))
+            required_by = now + timedelta(hours=rnd.randint(2, 72))
+        else:
+            created = as_of - timedelta(minutes=rnd.randint(0, 60 * 24 * 90))
+            required_by = created + timedelta(hours=rnd.randint(2, 72))
+        rows.append({
+            'id': request_id,
+            'patient_name': f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}',
+            'blood_type': rnd.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0],
+            'units_required': rnd.randint(1, 5),
+            'urgency': rnd.choices(['Normal', 'Urgent', 'Critical'], [60, 30, 10])[0],
+            'hospital_id': hospital_id,
+            'requester_name': f'Dr. {rnd.choice(LAST_NAMES)}',
+            'requester_phone': f'0{8200000000 + request_id}',
+            'requester_relation': 'Doctor',
+            'latitude': lat, 'longitude': lon,
+            'reason': rnd.choice(REASONS),
+            'status': status,
+            'required_by': required_by,
+            'fulfilled_at': required_by - timedelta(hours=rnd.randint(0, 2)) if status == 'Fulfilled' else None,
+            'notes': f'Patient admitted in {hospital_name}',
+            'created_at': created, 'updated_at': created
+        })
+    return rows
+
+
+def notification_rows(rnd, ids, as_of, refs):
+    donors, requests, hospitals = refs['donors'], refs['requests'], refs['hospitals']
+    rows = []
+    for _ in ids:
+        kind, title, message = rnd.choices(NOTIFICATION_TEMPLATES, [35, 10, 20, 20, 15])[0]
+        hospital = rnd.choice(hospitals)[3] if hospitals else 'a hospital near you'
+        created = as_of - timedelta(minutes=rnd.randint(0, 60 * 24 * 120))
+        read = rnd.random() < 0.6
+        data = {'bloodRequestId': rnd.choice(requests)} if requests and kind in ('BloodRequest', 'Emergency', 'Match') else None
+        rows.append({
+            'recipient_id': rnd.choice(donors),
+            'recipient_type': 'Donor',
+            'title': title,
+            'message': message.format(blood_type=rnd.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0], hospital=hospital),
+            'notification_type': kind,
+            'priority': 'High' if kind == 'Emergency' else rnd.choice(['Medium', 'Low']),
+            'data': json.dumps(data) if data else None,
+            'read': read,
+            'read_at': created + timedelta(minutes=rnd.randint(1, 600)) if read else None,
+            'created_at': created
+        })
+    return rows
+
+
+GENERATORS = {
+    'hospitals': hospital_rows,
+    'blood_banks': blood_bank_rows,
+    'donors': donor_rows,
+    'blood_requests': blood_request_rows,
+    'notifications': notification_rows
+}
+
+
+def build_partition(table, seed, part, first_id, count, as_of, refs, copy_columns=None):
+    """Rows ``first_id .. first_id + count - 1`` of ``table`` (runs in a worker process).
+
+    Returns dicts for executemany, or CSV text in ``copy_columns`` order for COPY.
+    """
+    rnd = random.Random(f'{seed}:{table}:{part}')
+    rows = GENERATORS[table](rnd, range(first_id, first_id + count), as_of, refs)
+    if copy_columns is None:
+        return rows
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in rows:
+        writer.writerow(['' if row.get(column) is None else row[column] for column in copy_columns])
+    return out.getvalue()
+
+
+class SyntheticDataGenerator:
+    """Writes synthetic rows after the existing ones; ``run()`` returns rows written per table"""
+
+    def __init__(self, session, seed=42, chunk=DEFAULT_CHUNK, processes=True, as_of=None, progress=None):
+        self.session = session
+        self.seed = seed
+        self.chunk = chunk
+        self.processes = processes
+        self.as_of = as_of or datetime.combine(date.today(), day_time())
+        self.progress = progress or (lambda **_: None)
+        self.dialect = session.get_bind().dialect.name
+        self.written = {}
+
+    def run(self, hospitals=0, blood_banks=0, donors=0, blood_requests=0, notifications=0):
+        counts = {'hospitals': hospitals, 'blood_banks': blood_banks, 'donors': donors,
+                  'blood_requests': blood_requests, 'notifications': notifications}
+        started = time.perf_counter()
+        first_ids = {table: (self.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+                     for table, model in MODELS.items()}
+        ranges = {table: range(first_ids[table], first_ids[table] + counts[table]) for table in TABLES}
+
+        for table in TABLES:
+            if not counts[table]:
+                continue
+            refs = self._refs(table, ranges)
+            self._write(table, MODELS[table].__table__, first_ids[table], counts[table], refs, started)
+        if counts['blood_requests']:
+            self._write_matches(ranges['blood_requests'], started)
+
+        self.progress(stage='finishing', seconds=round(time.perf_counter() - started, 1))
+        self._finish(counts)
+        self.progress(stage='done', written=dict(self.written), seconds=round(time.perf_counter() - started, 1))
+        return dict(self.written)
+
+    def _refs(self, table, ranges):
+        """What a table's generator needs to produce valid foreign keys"""
+        if table == 'blood_banks':
+            by_city = {}
+            for hospital_id, city in self.session.execute(select(Hospital.id, Hospital.city)):
+                by_city.setdefault(city, []).append(hospital_id)
+            return {'hospitals_by_city': by_city}
+        if table in ('blood_requests', 'notifications'):
+            hospitals = [(i, float(lat), float(lon), name) for i, lat, lon, name in self.session.execute(
+                select(Hospital.id, Hospital.latitude, Hospital.longitude, Hospital.name))]
+            if table == 'blood_requests':
+                if not hospitals:
+                    raise ValueError('Blood requests need hospitals; generate some first')
+                # Open requests are due after the run, not after as_of (midnight by default)
+                return {'hospitals': hospitals, 'now': max(datetime.utcnow(), self.as_of)}
+            donors = ranges['donors'] or self._id_range(Donor)
+            if not donors:
+                raise ValueError('Notifications need donors; generate some first')
+            return {'hospitals': hospitals, 'donors': donors,
+                    'requests': ranges['blood_requests'] or self._id_range(BloodRequest)}
+        return {}
+
+    def _id_range(self, model):
+        ids = self.session.execute(select(model.id).order_by(model.id)).scalars().all()
+        # Contiguous ids pickle as a range; gaps need the explicit list
+        return range(ids[0], ids[-1] + 1) if ids and len(ids) == ids[-1] - ids[0] + 1 else ids
+
+    def _write(self, table, sa_table, first_id, count, refs, started):
+        copy_columns = None
+        if self.dialect == 'postgresql':
+            copy_columns = [c.name for c in sa_table.columns if not (c.name == 'id' and table in DATABASE_IDS)]
+        parts = [(part, first_id + offset, min(self.chunk, count - offset))
+                 for part, offset in enumerate(range(0, count, self.chunk))]
+        pool, window = None, 1
+        if self.processes and len(parts) > 1:
+            from services.background_jobs import job_runner
+            pool = job_runner.process_pool()
+            # Bounded number of partitions in flight, so memory stays flat
+            window = 2 * (job_runner.processes or os.cpu_count() or 1)
+        pending = deque()
+        done = 0
+        for part, part_first, part_count in parts:
+            args = (table, self.seed, part, part_first, part_count, self.as_of, refs, copy_columns)
+            pending.append((part_count, pool.submit(build_partition, *args) if pool else args))
+            while len(pending) >= window or (pending and part == parts[-1][0]):
+                part_count, item = pending.popleft()
+                self._flush(item.result() if pool else build_partition(*item), sa_table, copy_columns)
+                done += part_count
+                self._report(table, done, count, started)
+        self.written[table] = count
+
+    def _write_matches(self, requests, started):
+        """Donor matches for the generated Matched requests; those with no compatible donor become Pending"""
+        from services.ai_matching_service import BLOOD_COMPATIBILITY
+        ranked = select(
+            Donor.id, Donor.city, Donor.blood_type, Donor.latitude, Donor.longitude,
+            func.row_number().over(partition_by=(Donor.city, Donor.blood_type), order_by=Donor.id).label('n')
+        ).where(Donor.available_for_donation == True).subquery()  # noqa: E712
+        pool = {}
+        for donor_id, city, blood_type, lat, lon, _ in self.session.execute(
+                select(ranked).where(ranked.c.n <= MATCH_POOL_SIZE).order_by(ranked.c.id)):
+            pool.setdefault((city, blood_type), []).append((donor_id, float(lat), float(lon)))
+
+        rnd = random.Random(f'{self.seed}:blood_request_matches')
+        sa_table = BloodRequestMatch.__table__
+        written, unmatched = 0, []
+        for start in range(requests.start, requests.stop, self.chunk):
+            stop = min(start + self.chunk, requests.stop)
+            matched = self.session.execute(
+                select(BloodRequest.id, BloodRequest.blood_type, BloodRequest.latitude, BloodRequest.longitude,
+                       BloodRequest.created_at, Hospital.city)
+                .join(Hospital, Hospital.id == BloodRequest.hospital_id)
+                .where(BloodRequest.id >= start, BloodRequest.id < stop, BloodRequest.status == 'Matched')
+                .order_by(BloodRequest.id)
+            ).all()
+            rows = []
+            for request_id, blood_type, lat, lon, created, city in matched:
+                candidates = [d for t in BLOOD_COMPATIBILITY[blood_type] for d in pool.get((city, t), ())]
+                if not candidates:
+                    unmatched.append(request_id)
+                    continue
+                for donor_id, donor_lat, donor_lon in rnd.sample(candidates, min(len(candidates), rnd.randint(*MATCHES_PER_REQUEST))):
+                    responded = rnd.random() < 0.4
+                    rows.append({
+                        'blood_request_id': request_id,
+                        'donor_id': donor_id,
+                        'match_score': round(rnd.uniform(55, 98), 2),
+                        'distance_km': round(distance_km((float(lat), float(lon)), (donor_lat, donor_lon)), 2),
+                        'notified': True,
+                        'responded': responded,
+                        'response_time': created + timedelta(minutes=rnd.randint(10, 240)) if responded else None,
+                        'created_at': created + timedelta(minutes=rnd.randint(1, 10))
+                    })
+            if rows:
+                self.session.execute(sa_table.insert().execution_options(track_changes=False), rows)
+                written += len(rows)
+            self.session.commit()
+            self._report('blood_request_matches', stop - requests.start, len(requests), started)
+        for offset in range(0, len(unmatched), self.chunk):
+            self.session.execute(
+                update(BloodRequest).where(BloodRequest.id.in_(unmatched[offset:offset + self.chunk]))
+                .values(status='Pending').execution_options(track_changes=False, synchronize_session=False))
+            self.session.commit()
+        self.written['blood_request_matches'] = written
+
+    def _flush(self, rows, sa_table, copy_columns):
+        if copy_columns is not None:
+            cursor = self.session.connection().connection.dbapi_connection.cursor()
+            cursor.copy_expert(f'COPY {sa_table.name} ({", ".join(copy_columns)}) FROM STDIN WITH (FORMAT csv)',
+                               io.StringIO(rows))
+        else:
+            self.session.execute(sa_table.insert().execution_options(track_changes=False), rows)
+        self.session.commit()
+
+    def _report(self, table, done, count, started):
+        seconds = time.perf_counter() - started
+        self.progress(stage=table, table=table, rows=done, total=count, seconds=round(seconds, 1))
+
+    def _finish(self, counts):
+        from services import inventory_aggregates, inventory_ledger, notification_counters
+        from services.change_tracker import mark_changed
+        if self.dialect == 'postgresql':
+            # Explicit ids leave the serial sequences behind
+            for table in TABLES:
+                if counts[table] and table not in DATABASE_IDS:
+                    self.session.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"))
+        if counts['blood_banks']:
+            inventory_ledger.record_opening_balances(self.session)
+            inventory_aggregates.rebuild(self.session)
+        touched = [table for table in TABLES if counts[table]]
+        if self.written.get('blood_request_matches'):
+            touched.append('blood_request_matches')
+        if touched:
+            mark_changed(self.session, *touched, 'inventory_events', 'inventory_aggregates',
+                         unlocated_tables=[t for t in touched if t != 'notifications'])
+        self.session.commit()
+        if counts['notifications']:
+            notification_counters.reconcile(self.session)
+
+
+def generate(session, seed=42, chunk=DEFAULT_CHUNK, processes=True, as_of=None, progress=None, **counts):
+    """Generate ``hospitals=``, ``blood_banks=``, ``donors=``, ``blood_requests=``, ``notifications=`` rows"""
+    return SyntheticDataGenerator(session, seed, chunk, processes, as_of, progress).run(**counts)
@@ -0,0 +1,104 @@
+"""
+Response wire formats negotiated from the Accept header
+
+JSON stays the default. When orjson is installed it backs Flask's JSON
+provider; clients that send ``Accept: application/msgpack`` get a msgpack
+body instead (if msgpack is installed). Both libraries are optional.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+from services.instrumentation import phase
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # type: ignore
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (same output rules as the default)"""
+
+    @staticmethod
+    def _orjson_default(o):
+        # orjson rejects subclasses of builtins (e.g. numpy.float64) that
+        # the stdlib encoder accepts
+        if isinstance(o, float):
+            return float(o)
+        if isinstance(o, int):
+            return int(o)
+        if isinstance(o, str):
+            return str(o)
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self._orjson_default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not msgpack serializable')
+
+
+def negotiate_mimetype():
+    """Pick the response mimetype for the current request"""
+    if msgpack is None:
+        return JSON_MIMETYPE
+    return request.accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES, default=JSON_MIMETYPE)
+
+
+def requested_fields():
+    """Sparse fieldset from ``?fields=`` or a ``fields`` key in the JSON body"""
+    fields = request.args.get('fields')
+    if fields:
+        return fields
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            return body.get('fields')
+    return None
+
+
+def respond(payload, status=200):
+    """``jsonify`` replacement that honours ``Accept: application/msgpack``"""
+    mimetype = negotiate_mimetype()
+    if mimetype in MSGPACK_MIMETYPES:
+        with phase('serialize'):
+            body = msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+        response = current_app.response_class(body, status=status, mimetype=mimetype)
+    else:
+        response = jsonify(payload)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response
+
+
+def init_wire_format(app):
+    """Install the orjson provider when available and enabled"""
+    if orjson is not None and app.config.get('USE_ORJSON', True):
+        app.json = OrjsonProvider(app)
+    return app
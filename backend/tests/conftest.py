@@ -0,0 +1,29 @@
+"""
+Shared fixtures: an app on an in-memory SQLite database (TestingConfig -
+no scheduler, strict N+1 mode) and a test client. Row factories live in
+tests/factories.py.
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('USE_CHATBOT', 'false')
+os.environ.setdefault('USE_ML_MATCHING', 'false')
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
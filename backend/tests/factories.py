@@ -0,0 +1,66 @@
+"""
+Row factories for tests (commit each row, inside the app fixture's context)
+"""
+import itertools
+from datetime import datetime, timedelta
+
+from extensions import db
+from models.blood_bank import BloodBank
+from models.blood_request import BloodRequest
+from models.donor import Donor
+from models.hospital import Hospital
+
+MUMBAI = (19.0760, 72.8777)
+
+_sequence = itertools.count(1)
+
+
+def offset(point, north_km=0.0, east_km=0.0):
+    """A point ``north_km``/``east_km`` away from ``point`` (small distances)"""
+    from math import cos, radians
+    lat, lon = point
+    return lat + north_km / 111.0, lon + east_km / (111.0 * cos(radians(lat)))
+
+
+def make_hospital(location=MUMBAI, **fields):
+    n = next(_sequence)
+    values = dict(name=f'Hospital {n}', latitude=location[0], longitude=location[1], phone=f'022{n:07d}',
+                  emergency_contact=f'023{n:07d}', city='Mumbai', state='Maharashtra', pincode='400001')
+    values.update(fields)
+    hospital = Hospital(**values)
+    db.session.add(hospital)
+    db.session.commit()
+    return hospital
+
+
+def make_bank(location=MUMBAI, **fields):
+    n = next(_sequence)
+    values = dict(name=f'Blood Bank {n}', latitude=location[0], longitude=location[1], phone=f'024{n:07d}',
+                  city='Mumbai', state='Maharashtra', pincode='400001')
+    values.update(fields)
+    bank = BloodBank(**values)
+    db.session.add(bank)
+    db.session.commit()
+    return bank
+
+
+def make_donor(location=MUMBAI, blood_type='O+', **fields):
+    n = next(_sequence)
+    values = dict(name=f'Donor {n}', blood_type=blood_type, phone=f'+91{9000000000 + n}', age=30,
+                  latitude=location[0], longitude=location[1], city='Mumbai', available_for_donation=True)
+    values.update(fields)
+    donor = Donor(**values)
+    db.session.add(donor)
+    db.session.commit()
+    return donor
+
+
+def make_request(hospital, blood_type='O+', urgency='Normal', required_in=timedelta(hours=12), **fields):
+    values = dict(patient_name='Patient', blood_type=blood_type, units_required=2, urgency=urgency,
+                  hospital_id=hospital.id, latitude=hospital.latitude, longitude=hospital.longitude,
+                  reason='Surgery', required_by=datetime.utcnow() + required_in)
+    values.update(fields)
+    blood_request = BloodRequest(**values)
+    db.session.add(blood_request)
+    db.session.commit()
+    return blood_request
@@ -0,0 +1,109 @@
+import importlib
+import io
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from extensions import db
+from models.blood_bank import BloodBank
+from services.blood_bank_import import import_csv
+from tests.factories import make_bank
+
+HEADER = 'name,latitude,longitude,phone,city,state,pincode,license_number,o_pos\n'
+
+
+def _import(session, *rows, **options):
+    return import_csv(session, io.StringIO(HEADER + ''.join(row + '\n' for row in rows)), **options)
+
+
+def test_reimport_updates_directory_fields_but_not_stock(app):
+    stats = _import(db.session,
+                    'City Bank,19.07,72.87,0221111111,Mumbai,Maharashtra,400001,LIC-1,12',
+                    'Ward Bank,19.08,72.88,0222222222,Mumbai,Maharashtra,400002,,7')
+    assert (stats.inserted, stats.updated, stats.rejected) == (2, 0, 0)
+
+    stats = _import(db.session,
+                    'City Bank,19.07,72.87,0229999999,Mumbai,Maharashtra,400001,lic-1,50',
+                    'Ward Bank,19.08,72.88,0228888888,Mumbai,Maharashtra,400002,,50')
+    assert (stats.inserted, stats.updated) == (0, 2)
+    banks = {bank.name: bank for bank in BloodBank.query.all()}
+    assert len(banks) == 2
+    assert banks['City Bank'].phone == '0229999999'
+    assert banks['Ward Bank'].phone == '0228888888'
+    assert banks['City Bank'].inventory_o_positive == 12
+    assert banks['Ward Bank'].inventory_o_positive == 7
+
+
+def test_banks_may_share_a_name_within_a_pincode(app):
+    make_bank(name='Red Cross Blood Bank', pincode='400001')
+    make_bank(name='Red Cross Blood Bank', pincode='400001')
+
+    stats = _import(db.session,
+                    'Red Cross Blood Bank,19.07,72.87,0221111111,Mumbai,Maharashtra,400001,,5',
+                    'Red Cross Blood Bank,19.09,72.89,0223333333,Mumbai,Maharashtra,400001,LIC-9,5')
+
+    assert (stats.inserted, stats.updated, stats.rejected) == (1, 0, 1)
+    assert BloodBank.query.filter_by(name='Red Cross Blood Bank').count() == 3
+
+
+def test_invalid_rows_go_to_the_rejects_report(app, tmp_path):
+    report = tmp_path / 'rejects.csv'
+    stats = _import(db.session,
+                    'Good Bank,19.07,72.87,0221111111,Mumbai,Maharashtra,400001,LIC-1,1',
+                    'Bad Pin,19.07,72.87,0221111111,Mumbai,Maharashtra,12,LIC-2,1',
+                    'Nowhere,,,0221111111,Mumbai,Maharashtra,400001,LIC-3,1',
+                    rejects_path=str(report))
+
+    assert (stats.inserted, stats.rejected) == (1, 2)
+    lines = report.read_text().splitlines()
+    assert lines[0].startswith('line,reason,name')
+    assert "invalid pincode '12'" in lines[1]
+    assert 'missing coordinates' in lines[2]
+
+
+def _run_key_migration(engine):
+    migration = importlib.import_module('migrations.versions.f3a8d1c6b592_blood_bank_import_keys')
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+
+def _bank_table(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(sa.text('CREATE TABLE blood_banks (id INTEGER PRIMARY KEY, name VARCHAR(200), '
+                                   'city VARCHAR(100), pincode VARCHAR(10), license_number VARCHAR(50))'))
+        connection.execute(sa.text('INSERT INTO blood_banks VALUES (:id, :name, :city, :pincode, :license_number)'),
+                           rows)
+
+
+def test_key_migration_stops_on_duplicate_license_numbers():
+    engine = sa.create_engine('sqlite://')
+    _bank_table(engine, [
+        {'id': 1, 'name': 'A', 'city': 'Pune', 'pincode': '411001', 'license_number': 'LIC-1'},
+        {'id': 2, 'name': 'B', 'city': 'Pune', 'pincode': '411002', 'license_number': 'LIC-1'},
+        {'id': 3, 'name': 'C', 'city': 'Pune', 'pincode': '411003', 'license_number': 'LIC-2'},
+    ])
+
+    with pytest.raises(RuntimeError) as error:
+        _run_key_migration(engine)
+
+    assert 'LIC-1: blood bank 1' in str(error.value)
+    assert 'LIC-1: blood bank 2' in str(error.value)
+    assert 'LIC-2' not in str(error.value)
+    with engine.connect() as connection:
+        assert connection.execute(sa.text('SELECT COUNT(license_number) FROM blood_banks')).scalar() == 3
+
+
+def test_key_migration_allows_shared_names_and_blank_licenses():
+    engine = sa.create_engine('sqlite://')
+    _bank_table(engine, [
+        {'id': 1, 'name': 'A', 'city': 'Pune', 'pincode': '411001', 'license_number': ''},
+        {'id': 2, 'name': 'A', 'city': 'Pune', 'pincode': '411001', 'license_number': ' '},
+    ])
+
+    _run_key_migration(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(sa.text('SELECT COUNT(*) FROM blood_banks WHERE name = \'A\'')).scalar() == 2
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models.maintenance import MaintenanceLock
+from services import database_seeding
+from services.background_jobs import job_runner
+from tests.factories import make_donor
+
+
+def test_lock_is_held_once_until_released(app):
+    token = database_seeding.acquire_lock(db.session)
+
+    assert token is not None
+    assert database_seeding.acquire_lock(db.session) is None
+    database_seeding.release_lock(db.session, token)
+    assert database_seeding.acquire_lock(db.session) is not None
+
+
+def test_expired_lock_is_taken_over(app):
+    db.session.add(MaintenanceLock(name=database_seeding.LOCK_NAME, holder='dead', job_id='gone',
+                                   expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    assert database_seeding.current_lock(db.session) is None
+    assert database_seeding.acquire_lock(db.session) is not None
+
+
+def test_seed_and_clear_wait_for_a_lock_held_elsewhere(app, client):
+    # Another worker is seeding
+    token = database_seeding.acquire_lock(db.session)
+    database_seeding._update_lock(db.session, token, job_id='other-worker-job')
+
+    seeding = client.post('/api/seed-database')
+    clearing = client.post('/api/clear-database')
+
+    assert seeding.status_code == 202
+    assert seeding.get_json()['status'] == 'in_progress'
+    assert seeding.get_json()['job']['id'] == 'other-worker-job'
+    assert clearing.status_code == 409
+    assert clearing.get_json()['job']['id'] == 'other-worker-job'
+
+
+def test_seeding_job_releases_the_lock_and_clear_empties_the_tables(app, client):
+    response = client.post('/api/seed-database?seed=1')
+    status = job_runner.wait(response.get_json()['job']['id'], timeout=60)
+    assert status['state'] == 'succeeded', status
+    assert database_seeding.current_lock(db.session) is None
+
+    response = client.post('/api/clear-database')
+
+    assert response.status_code == 200
+    assert 'maintenance_locks' not in response.get_json()['tables']
+    assert set(database_seeding.counts(db.session).values()) == {0}
+
+
+def test_seed_endpoint_reports_an_already_seeded_database(app, client):
+    make_donor()
+
+    response = client.post('/api/seed-database')
+
+    assert response.get_json()['status'] == 'already_seeded'
+    assert database_seeding.current_lock(db.session) is None
@@ -0,0 +1,20 @@
+import numpy as np
+
+from extensions import db
+from services.demand_forecast import ForecastResult, run_forecast
+from tests.factories import make_bank, offset, MUMBAI
+
+
+def test_stored_results_round_trip_without_pickle(app):
+    make_bank(inventory_o_negative=4)
+    make_bank(offset(MUMBAI, north_km=5), city=None)
+    result = run_forecast(db.session)
+
+    payload = result.dumps()
+    loaded = ForecastResult.loads(payload)
+
+    assert loaded.generated_at == result.generated_at
+    assert (loaded.cities, loaded.states) == (['Mumbai', None], ['Maharashtra', 'Maharashtra'])
+    for name in ('bank_ids', 'stock', 'forecast', 'recommended', 'shortfall', 'confidence'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(result, name))
+    assert loaded.item(0, 7) == result.item(0, 7)
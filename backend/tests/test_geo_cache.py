@@ -0,0 +1,75 @@
+from geopy.distance import geodesic
+
+from services.geo_cache import geo_cache, geohash_bounds, geohash_encode
+from tests.factories import MUMBAI, make_bank, offset
+
+
+def _nearby(client, point, max_distance, **body):
+    response = client.post('/api/blood-banks/nearby', json={
+        'latitude': point[0], 'longitude': point[1], 'maxDistance': max_distance, **body
+    })
+    assert response.status_code == 200
+    return response.headers['X-Cache'], [row['id'] for row in response.get_json()['data']]
+
+
+def _cell_edges(point):
+    """Two centres at the south and north edges of ``point``'s key cell"""
+    min_lat, max_lat, min_lon, max_lon = geohash_bounds(geohash_encode(*point, geo_cache.key_precision))
+    margin = (max_lat - min_lat) / 20
+    middle = (min_lon + max_lon) / 2
+    return (min_lat + margin, middle), (max_lat - margin, middle)
+
+
+def test_radii_in_one_bucket_share_an_entry(app, client):
+    near = make_bank(offset(MUMBAI, north_km=10))
+    far = make_bank(offset(MUMBAI, north_km=28))
+
+    assert _nearby(client, MUMBAI, 26) == ('MISS', [near.id])
+    assert _nearby(client, MUMBAI, 30) == ('HIT', [near.id, far.id])
+    assert _nearby(client, MUMBAI, 26) == ('HIT', [near.id])
+
+
+def test_centres_in_one_cell_share_an_entry_with_exact_results(app, client):
+    south, north = _cell_edges(MUMBAI)
+    edge = make_bank(offset(north, north_km=-10.1))  # ~10.07 km geodesic
+
+    assert _nearby(client, south, 10) == ('MISS', [edge.id])
+    assert _nearby(client, north, 10) == ('HIT', [])
+
+
+def test_distances_are_measured_from_the_exact_centre(app, client):
+    south, north = _cell_edges(MUMBAI)
+    bank = make_bank(offset(MUMBAI, north_km=4))
+    client.post('/api/blood-banks/nearby', json={'latitude': south[0], 'longitude': south[1]})
+
+    response = client.post('/api/blood-banks/nearby', json={'latitude': north[0], 'longitude': north[1]})
+
+    assert response.headers['X-Cache'] == 'HIT'
+    expected = round(geodesic(north, (bank.latitude, bank.longitude)).kilometers, 2)
+    assert response.get_json()['data'][0]['distance'] == expected
+
+
+def test_query_arguments_are_part_of_the_key(app, client):
+    make_bank(offset(MUMBAI, north_km=1))
+    body = {'latitude': MUMBAI[0], 'longitude': MUMBAI[1]}
+    full = client.post('/api/blood-banks/nearby', json=body).get_json()['data'][0]
+    response = client.post('/api/blood-banks/nearby?fields=id,name', json=body)
+
+    assert response.headers['X-Cache'] == 'MISS'
+    assert set(response.get_json()['data'][0]) < set(full)
+
+
+def test_radii_beyond_the_largest_bucket_are_not_cached(app, client):
+    bank = make_bank(offset(MUMBAI, north_km=250))
+
+    assert _nearby(client, MUMBAI, 300) == ('BYPASS', [bank.id])
+    assert _nearby(client, MUMBAI, 300) == ('BYPASS', [bank.id])
+
+
+def test_writes_nearby_invalidate_cached_results(app, client):
+    first = make_bank(offset(MUMBAI, north_km=2))
+    assert _nearby(client, MUMBAI, 10) == ('MISS', [first.id])
+    assert _nearby(client, MUMBAI, 10)[0] == 'HIT'
+
+    second = make_bank(offset(MUMBAI, east_km=3))
+    assert _nearby(client, MUMBAI, 10) == ('MISS', [first.id, second.id])
@@ -0,0 +1,72 @@
+from extensions import db
+from models.blood_bank import BloodBank
+from services.geocoding import BatchGeocoder, normalize_address
+from tests.factories import MUMBAI, make_bank, offset
+
+
+class MapsClient:
+    """Answers like googlemaps.Client.geocode; ``answers`` maps address -> (lat, lon) or None"""
+
+    def __init__(self, answers, failures=0):
+        self.answers = answers
+        self.failures = failures
+        self.calls = []
+
+    def geocode(self, address, region=None):
+        self.calls.append(address)
+        if self.failures:
+            self.failures -= 1
+            raise type('Timeout', (Exception,), {})('timed out')
+        point = self.answers.get(address)
+        if point is None:
+            return []
+        return [{'geometry': {'location': {'lat': point[0], 'lng': point[1]}}, 'formatted_address': address}]
+
+
+def _resolve(client, items, **options):
+    with BatchGeocoder(db.session, client, workers=2, rate_per_second=1000, backoff=0, **options) as geocoder:
+        return geocoder.resolve(items), geocoder.stats
+
+
+def test_answers_are_cached_and_survive_a_rollback(app):
+    found_at = normalize_address('1 Marine Drive', 'Mumbai', '400020')
+    missing = normalize_address('Nowhere', 'Mumbai', '400021')
+    client = MapsClient({found_at: MUMBAI})
+
+    found, stats = _resolve(client, [(found_at, '400020'), (missing, '400021'), (found_at, '400020')])
+    db.session.add(BloodBank(name='Not committed', latitude=0, longitude=0, phone='0', city='Mumbai',
+                             state='Maharashtra', pincode='400020'))
+    db.session.rollback()
+
+    assert found == {found_at: MUMBAI}
+    assert (stats.geocoded, stats.not_found, stats.calls) == (1, 1, 2)
+    again, stats = _resolve(MapsClient({}), [(found_at, '400020'), (missing, '400021')])
+    assert again == {found_at: MUMBAI}
+    assert (stats.cache_hits, stats.not_found, stats.calls) == (1, 1, 0)
+
+
+def test_gazetteer_places_known_pincodes_without_calls(app):
+    make_bank(MUMBAI, pincode='400001')
+    make_bank(offset(MUMBAI, north_km=2), pincode='400001')
+    address = normalize_address('Fort', 'Mumbai', '400001')
+    client = MapsClient({})
+
+    found, stats = _resolve(client, [(address, '400001')])
+
+    assert client.calls == []
+    assert stats.gazetteer_hits == 1
+    assert abs(found[address][0] - offset(MUMBAI, north_km=1)[0]) < 1e-6
+
+
+def test_timeouts_are_retried_and_failures_not_cached(app):
+    address = normalize_address('Colaba', 'Mumbai', '400005')
+
+    found, stats = _resolve(MapsClient({address: MUMBAI}, failures=1), [(address, None)])
+    assert found == {address: MUMBAI}
+    assert stats.retries == 1
+
+    other = normalize_address('Worli', 'Mumbai', '400018')
+    found, stats = _resolve(MapsClient({other: MUMBAI}, failures=5), [(other, None)], max_attempts=2)
+    assert (found, stats.failed) == ({}, 1)
+    found, _ = _resolve(MapsClient({other: MUMBAI}), [(other, None)])
+    assert found == {other: MUMBAI}
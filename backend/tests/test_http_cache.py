@@ -0,0 +1,99 @@
+import os
+import runpy
+from types import SimpleNamespace
+
+import pytest
+
+import services.http_cache as http_cache
+from services.change_tracker import change_tracker
+from tests.factories import make_bank
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_unchanged_tables_answer_304(app, client):
+    make_bank()
+    first = client.get('/api/blood-banks/')
+    etag = first.headers['ETag']
+
+    again = client.get('/api/blood-banks/', headers={'If-None-Match': etag})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+def test_writes_change_the_etag(app, client):
+    make_bank()
+    etag = client.get('/api/blood-banks/').headers['ETag']
+    bank = make_bank()
+
+    response = client.get('/api/blood-banks/', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert bank.id in [row['id'] for row in response.get_json()['data']]
+
+
+def test_304_echoes_the_etag_of_the_compressed_variant(app, client):
+    for _ in range(10):
+        make_bank()
+    gzip = {'Accept-Encoding': 'gzip'}
+    first = client.get('/api/blood-banks/', headers=gzip)
+    etag = first.headers['ETag']
+
+    again = client.get('/api/blood-banks/', headers={**gzip, 'If-None-Match': etag})
+
+    assert (first.headers['Content-Encoding'], etag.endswith('-gz"')) == ('gzip', True)
+    assert (again.status_code, again.headers['ETag']) == (304, etag)
+    assert 'Accept-Encoding' in again.headers['Vary']
+
+
+def test_if_none_match_decides_over_if_modified_since(app, client):
+    make_bank()
+    etag = client.get('/api/blood-banks/').headers['ETag']
+    make_bank()
+
+    response = client.get('/api/blood-banks/', headers={
+        'If-None-Match': etag, 'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+
+    assert response.status_code == 200
+
+
+def test_last_modified_waits_for_the_second_of_the_last_write(app, client, monkeypatch):
+    make_bank()
+    written = change_tracker.last_modified(('blood_banks',))
+    monkeypatch.setattr(http_cache, 'time', SimpleNamespace(time=lambda: written))
+    assert 'Last-Modified' not in client.get('/api/blood-banks/').headers
+
+    monkeypatch.setattr(http_cache, 'time', SimpleNamespace(time=lambda: int(written) + 1))
+    response = client.get('/api/blood-banks/?page=1')
+    since = response.headers['Last-Modified']
+
+    assert client.get('/api/blood-banks/?page=1', headers={'If-Modified-Since': since}).status_code == 304
+
+
+def _start_gunicorn(monkeypatch, workers, redis_url):
+    if redis_url:
+        monkeypatch.setenv('REDIS_URL', redis_url)
+    else:
+        monkeypatch.delenv('REDIS_URL', raising=False)
+    settings = runpy.run_path(os.path.join(BACKEND, 'gunicorn.conf.py'))
+    errors = []
+    server = SimpleNamespace(cfg=SimpleNamespace(workers=workers), log=SimpleNamespace(error=errors.append))
+    settings['on_starting'](server)
+    return settings, errors
+
+
+def test_gunicorn_runs_one_threaded_worker_by_default(monkeypatch):
+    monkeypatch.delenv('GUNICORN_WORKERS', raising=False)
+    settings, errors = _start_gunicorn(monkeypatch, 1, None)
+
+    assert (settings['workers'], settings['worker_class'], settings['threads']) == (1, 'gthread', 16)
+    assert errors == []
+
+
+def test_gunicorn_refuses_several_workers_without_redis(monkeypatch):
+    with pytest.raises(SystemExit):
+        _start_gunicorn(monkeypatch, 4, None)
+    assert _start_gunicorn(monkeypatch, 4, 'redis://localhost:6379/0')[1] == []
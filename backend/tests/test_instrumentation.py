@@ -0,0 +1,46 @@
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from tests.factories import make_bank
+
+
+def _sample(client, name, **labels):
+    body = client.get('/api/metrics').get_data(as_text=True)
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{name}{{{re.escape(wanted)}}} (\S+)$', body, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_requests_are_counted_per_route_with_their_sql(app, client):
+    make_bank()
+    route = dict(method='GET', route='/api/blood-banks/', status='200')
+    before = _sample(client, 'http_request_duration_seconds_count', **route)
+    statements = _sample(client, 'http_request_sql_statements_total', **route)
+
+    response = client.get('/api/blood-banks/')
+    client.get('/api/blood-banks/')
+
+    assert re.match(r'db;dur=[\d.]+;desc="[1-9]\d* queries"', response.headers['Server-Timing'])
+    assert _sample(client, 'http_request_duration_seconds_count', **route) == before + 2
+    assert _sample(client, 'http_request_sql_statements_total', **route) > statements
+
+
+def test_statements_outside_requests_count_as_background(app, client):
+    before = _sample(client, 'sql_statements_total', context='background')
+    db.session.execute(text('SELECT 1'))
+
+    assert _sample(client, 'sql_statements_total', context='background') == before + 1
+
+
+def test_failed_statements_leave_no_start_times_behind(app):
+    with db.engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM no_such_table'))
+        connection.rollback()
+        connection.execute(text('SELECT 1'))
+
+        assert connection.info.get('sql_timing_started') == []
@@ -0,0 +1,30 @@
+from extensions import db
+from services.inventory_aggregates import apply_changes, bank_changes
+
+
+class RecordingExecutor:
+    """Passes statements to the session and keeps the upsert's rows"""
+
+    def __init__(self, session):
+        self.session = session
+        self.rows = None
+
+    def get_bind(self):
+        return self.session.get_bind()
+
+    def execute(self, statement, rows=None):
+        self.rows = rows
+        return self.session.execute(statement, rows)
+
+
+def test_upserts_touch_aggregate_rows_in_key_order(app):
+    rows = (bank_changes('Pune', 'Maharashtra', {}, {'O+': 3, 'A-': 1})
+            + bank_changes('Delhi', 'Delhi', {}, {'B+': 2, 'O+': 1}))
+    executor = RecordingExecutor(db.session)
+
+    apply_changes(executor, rows)
+    db.session.commit()
+
+    keys = [(r['scope'], r['region_key'], r['blood_type']) for r in executor.rows]
+    assert keys == sorted(keys)
+    assert ('global', '', 'O+') in keys
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models.blood_bank import BloodBank
+from models.inventory import InventoryEvent, InventorySnapshot
+from services import inventory_ledger
+from tests.factories import make_bank
+
+
+@pytest.fixture(autouse=True)
+def _fresh_gaps():
+    inventory_ledger._gaps.clear()
+
+
+def _events(bank):
+    return InventoryEvent.query.filter_by(blood_bank_id=bank.id).order_by(InventoryEvent.id).all()
+
+
+def test_put_inventory_records_the_differences(app, client):
+    bank = make_bank(inventory_o_positive=10)
+
+    response = client.put(f'/api/blood-banks/{bank.id}/inventory', json={'bloodInventory': {'O+': 4, 'A-': 2}})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['bloodInventory']['O+'] == 4
+    assert {(e.reason, e.blood_type, e.delta) for e in _events(bank)} == {
+        ('Opening', 'O+', 10), ('Adjusted', 'O+', -6), ('Adjusted', 'A-', 2)}
+
+
+@pytest.mark.parametrize('levels', [{}, {'O+': 10}])
+def test_put_inventory_without_changes_still_dates_the_count(app, client, levels):
+    bank = make_bank(inventory_o_positive=10, last_inventory_update=datetime(2020, 1, 1))
+
+    response = client.put(f'/api/blood-banks/{bank.id}/inventory', json={'bloodInventory': levels})
+
+    assert response.status_code == 200
+    assert response.get_json()['eventIds'] == []
+    assert db.session.get(BloodBank, bank.id).last_inventory_update > datetime.utcnow() - timedelta(minutes=1)
+    assert len(_events(bank)) == 1
+
+
+def test_events_endpoint_rejects_overdraws_and_dedupes_references(app, client):
+    bank = make_bank(inventory_o_negative=3)
+    url = f'/api/blood-banks/{bank.id}/inventory/events'
+
+    assert client.post(url, json={'reason': 'Issued', 'deltas': {'O-': -5}}).status_code == 409
+    assert client.post(url, json={'reason': 'Issued', 'deltas': {'O-': -2}, 'reference': 'T1'}).status_code == 201
+    again = client.post(url, json={'reason': 'Issued', 'deltas': {'O-': -2}, 'reference': 'T1'})
+
+    assert again.status_code == 200 and again.get_json()['duplicate'] is True
+    assert again.get_json()['data']['bloodInventory']['O-'] == 1
+
+
+def test_bulk_set_applies_valid_items_when_partial(app, client):
+    first, second = make_bank(), make_bank()
+
+    response = client.post('/api/blood-banks/inventory/bulk', json={'partial': True, 'items': [
+        {'bloodBankId': first.id, 'bloodInventory': {'B+': 7}},
+        {'bloodBankId': second.id, 'bloodInventory': {'B+': -1}},
+        {'bloodBankId': 999, 'bloodInventory': {'B+': 1}},
+    ]})
+
+    result = response.get_json()['data']
+    assert response.status_code == 200
+    assert result['applied'] == 1
+    assert [r['index'] for r in result['rejected']] == [1, 2]
+    assert db.session.get(BloodBank, first.id).inventory_b_positive == 7
+
+
+def _insert_event(bank, event_id, delta):
+    db.session.execute(InventoryEvent.__table__.insert(), [{
+        'id': event_id, 'blood_bank_id': bank.id, 'blood_type': 'A+', 'delta': delta, 'reason': 'Received',
+        'created_at': datetime(2020, 1, 1)}])
+    db.session.commit()
+
+
+def test_snapshots_stop_at_an_uncommitted_event_id(app):
+    bank = make_bank()
+    _insert_event(bank, 1, 5)
+    _insert_event(bank, 2, 5)
+    _insert_event(bank, 4, 5)  # id 3 is still in flight
+
+    assert inventory_ledger.take_snapshots(db.session)['uptoEventId'] == 2
+    _insert_event(bank, 3, 1)
+    assert inventory_ledger.take_snapshots(db.session)['uptoEventId'] == 4
+
+    snapshot = db.session.get(InventorySnapshot, (bank.id, 'A+'))
+    assert (snapshot.units, snapshot.last_event_id) == (16, 4)
+    assert inventory_ledger.replay(db.session, [bank.id])[bank.id]['A+'] == 16
+
+
+def test_snapshots_pass_a_gap_once_it_is_old(app):
+    bank = make_bank()
+    _insert_event(bank, 1, 5)
+    _insert_event(bank, 3, 5)  # id 2 was rolled back
+
+    assert inventory_ledger.take_snapshots(db.session, gap_seconds=60)['uptoEventId'] == 1
+    assert inventory_ledger.take_snapshots(db.session, gap_seconds=0)['uptoEventId'] == 3
+    assert db.session.get(InventorySnapshot, (bank.id, 'A+')).units == 10
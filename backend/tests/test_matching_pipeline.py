@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from models.blood_request import BloodRequest, BloodRequestMatch, Notification
+from services.background_jobs import job_runner
+from tests.factories import MUMBAI, make_donor, make_hospital, offset
+
+
+def _create_request(client, hospital, blood_type='O+', urgency='Urgent'):
+    response = client.post('/api/blood-requests/', json={
+        'patientName': 'Patient', 'bloodType': blood_type, 'unitsRequired': 2, 'urgency': urgency,
+        'hospitalId': hospital.id, 'reason': 'Surgery',
+        'location': {'latitude': float(hospital.latitude), 'longitude': float(hospital.longitude)},
+        'requiredBy': (datetime.utcnow() + timedelta(hours=6)).isoformat()
+    })
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def _wait(link):
+    status = job_runner.wait(link['id'], timeout=30)
+    assert status['state'] == 'succeeded', status
+    return status['result']
+
+
+def test_create_request_matches_nearby_compatible_donors(app, client):
+    hospital = make_hospital()
+    near = make_donor(offset(MUMBAI, north_km=2), 'O+')
+    universal = make_donor(offset(MUMBAI, east_km=5), 'O-')
+    make_donor(offset(MUMBAI, north_km=2), 'A+')  # incompatible
+    make_donor(offset(MUMBAI, north_km=200), 'O+')  # outside the radius
+    make_donor(offset(MUMBAI, north_km=1), 'O+', available_for_donation=False)
+
+    created = _create_request(client, hospital)
+    result = _wait(created['matchingJob'])
+
+    assert result['matched'] == 2
+    request_id = created['data']['id']
+    matches = BloodRequestMatch.query.filter_by(blood_request_id=request_id).all()
+    assert {m.donor_id for m in matches} == {near.id, universal.id}
+    assert all(m.distance_km < 6 for m in matches)
+    assert Notification.query.filter_by(recipient_type='Donor').count() == 2
+    assert BloodRequest.query.get(request_id).status == 'Matched'
+
+
+def test_rematching_only_adds_new_donors(app, client):
+    hospital = make_hospital()
+    make_donor(offset(MUMBAI, north_km=1))
+    created = _create_request(client, hospital)
+    _wait(created['matchingJob'])
+
+    late = make_donor(offset(MUMBAI, east_km=1))
+    response = client.post(f"/api/blood-requests/{created['data']['id']}/match")
+    assert response.status_code == 202
+    result = _wait(response.get_json()['matchingJob'])
+
+    assert result['matched'] == 1
+    assert Notification.query.filter_by(recipient_id=late.id).count() == 1
+    assert Notification.query.count() == 2
+
+
+def test_matches_endpoint_lists_best_first(app, client):
+    hospital = make_hospital()
+    for km in (1, 3, 8):
+        make_donor(offset(MUMBAI, north_km=km))
+    created = _create_request(client, hospital)
+    _wait(created['matchingJob'])
+
+    response = client.get(f"/api/blood-requests/{created['data']['id']}/matches")
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert len(data) == 3
+    scores = [m['matchScore'] for m in data]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from extensions import db
+from services.notification_counters import insert_notifications, reconcile
+
+
+def _unread(client, recipient_id, recipient_type=None):
+    query = f'?recipientType={recipient_type}' if recipient_type else ''
+    return client.get(f'/api/notifications/count/unread/{recipient_id}{query}').get_json()['unreadCount']
+
+
+def _create(client, recipient_id, recipient_type='Donor'):
+    response = client.post('/api/notifications/', json={
+        'recipientId': recipient_id, 'recipientType': recipient_type, 'title': 'Hello', 'message': 'Hi',
+        'type': 'Info'
+    })
+    assert response.status_code == 201
+    return response.get_json()['data']['id']
+
+
+def _bulk_row(recipient_id, recipient_type='Donor', read=False):
+    return {'recipient_id': recipient_id, 'recipient_type': recipient_type, 'title': 'Bulk', 'message': 'Hi',
+            'notification_type': 'Info', 'priority': 'Medium', 'data': None, 'read': read,
+            'created_at': datetime.utcnow()}
+
+
+def test_orm_writes_keep_the_counter_in_step(app, client):
+    first = _create(client, 7)
+    second = _create(client, 7)
+    _create(client, 7, 'Hospital')
+    assert (_unread(client, 7), _unread(client, 7, 'Donor'), _unread(client, 7, 'Hospital')) == (3, 2, 1)
+
+    client.put(f'/api/notifications/{first}/read')
+    client.put(f'/api/notifications/{first}/read')
+    assert _unread(client, 7, 'Donor') == 1
+
+    client.delete(f'/api/notifications/{second}')
+    assert _unread(client, 7, 'Donor') == 0
+    assert client.get('/api/notifications/?recipientId=7').get_json()['unreadCount'] == 1
+
+
+def test_bulk_inserts_and_read_all(app, client):
+    insert_notifications(db.session, [_bulk_row(9), _bulk_row(9), _bulk_row(9, read=True), _bulk_row(10)])
+    db.session.commit()
+    assert (_unread(client, 9), _unread(client, 10)) == (2, 1)
+
+    assert client.put('/api/notifications/read-all/9').get_json()['modifiedCount'] == 2
+    assert (_unread(client, 9), _unread(client, 10)) == (0, 1)
+
+
+def test_rolled_back_inserts_are_not_counted(app, client):
+    insert_notifications(db.session, [_bulk_row(11)])
+    db.session.rollback()
+
+    assert _unread(client, 11) == 0
+
+
+def test_reconcile_repairs_drift_from_raw_sql(app, client):
+    _create(client, 12)
+    _create(client, 13)
+    db.session.execute(text("UPDATE notifications SET read = 1 WHERE recipient_id = 12"))
+    db.session.execute(text("UPDATE notification_unread_counts SET unread = 5 WHERE recipient_id = 13"))
+    db.session.commit()
+
+    assert reconcile(db.session) == 2
+    assert (_unread(client, 12), _unread(client, 13)) == (0, 1)
+    assert reconcile(db.session) == 0
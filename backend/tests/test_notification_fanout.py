@@ -0,0 +1,71 @@
+from models.blood_request import Notification
+from services.background_jobs import job_runner
+from tests.factories import MUMBAI, make_donor, make_hospital, offset
+
+TEMPLATE = {'title': 'O- needed', 'message': '{hospital} is {distanceKm:.1f} km away', 'type': 'Emergency',
+            'priority': 'High', 'values': {'hospital': 'KEM'}}
+
+
+def _fanout(client, audience, **body):
+    response = client.post('/api/notifications/fanout', json={**TEMPLATE, 'audience': audience, **body})
+    assert response.status_code == 202
+    job = job_runner.wait(response.get_json()['job']['id'], timeout=10)
+    assert job['state'] == 'succeeded', job
+    return job['result']
+
+
+def test_radius_audience_reaches_available_donors_in_range(app, client):
+    near = make_donor(offset(MUMBAI, north_km=3), blood_type='O-')
+    also_near = make_donor(offset(MUMBAI, east_km=-4), blood_type='O-')
+    make_donor(offset(MUMBAI, north_km=3), blood_type='A+')
+    make_donor(offset(MUMBAI, north_km=2), blood_type='O-', available_for_donation=False)
+    make_donor(offset(MUMBAI, north_km=30), blood_type='O-')
+
+    result = _fanout(client, {'latitude': MUMBAI[0], 'longitude': MUMBAI[1], 'radiusKm': 10,
+                              'bloodTypes': ['O-']}, chunkSize=1)
+
+    assert (result['recipients'], result['delivered'], result['chunks']) == (2, 2, 2)
+    rows = {n.recipient_id: n for n in Notification.query.all()}
+    assert set(rows) == {near.id, also_near.id}
+    assert rows[near.id].message == 'KEM is 3.0 km away'
+    assert (rows[near.id].recipient_type, rows[near.id].priority) == ('Donor', 'High')
+
+
+def test_explicit_recipients_are_notified_once(app, client):
+    hospital = make_hospital()
+    donor = make_donor()
+    recipients = [{'id': donor.id, 'type': 'Donor', 'values': {'distanceKm': 1}},
+                  {'id': donor.id, 'type': 'Donor', 'values': {'distanceKm': 2}},
+                  {'id': hospital.id, 'type': 'Hospital', 'values': {'distanceKm': 0}}]
+
+    assert _fanout(client, {'recipients': recipients})['delivered'] == 2
+    assert sorted((n.recipient_type, n.message) for n in Notification.query.all()) == [
+        ('Donor', 'KEM is 1.0 km away'), ('Hospital', 'KEM is 0.0 km away')]
+
+
+def test_invalid_fanouts_are_rejected_before_queueing(app, client):
+    for body in ({**TEMPLATE, 'audience': None},
+                 {**TEMPLATE, 'type': 'Gossip', 'audience': {'recipients': []}},
+                 {**TEMPLATE, 'audience': {'latitude': 19, 'longitude': 72, 'radiusKm': 5000}},
+                 {**TEMPLATE, 'audience': {'recipients': [{'id': 1, 'type': 'Robot'}]}}):
+        assert client.post('/api/notifications/fanout', json=body).status_code == 400
+
+
+def test_templates_that_cannot_render_are_rejected(app, client):
+    radius = {'latitude': MUMBAI[0], 'longitude': MUMBAI[1], 'radiusKm': 5}
+    for message, audience in (('{hospital', radius),
+                              ('{distanceKm:d} km', radius),
+                              ('{distanceKm:.1f} km', {'recipients': [{'id': 1, 'type': 'Donor',
+                                                                       'values': {'distanceKm': 'near'}}]})):
+        response = client.post('/api/notifications/fanout', json={**TEMPLATE, 'message': message,
+                                                                   'audience': audience})
+        assert response.status_code == 400, message
+        assert 'does not render' in response.get_json()['message']
+
+
+def test_missing_values_render_as_empty_text(app, client):
+    donor = make_donor()
+
+    _fanout(client, {'recipients': [{'id': donor.id, 'type': 'Donor', 'values': {'distanceKm': None}}]})
+
+    assert Notification.query.one().message == 'KEM is  km away'
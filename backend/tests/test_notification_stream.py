@@ -0,0 +1,87 @@
+import json
+
+from services.notification_broker import notification_broker
+
+
+def _events(response):
+    """Parsed SSE messages of a streamed response, as they arrive"""
+    buffer = ''
+    for chunk in response.response:
+        buffer += chunk if isinstance(chunk, str) else chunk.decode('utf-8')
+        while '\n\n' in buffer:
+            message, buffer = buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+            yield fields.get('event', 'comment'), json.loads(fields['data']) if 'data' in fields else None
+
+
+def _notify(client, recipient_id, recipient_type='Donor', title='Matched'):
+    assert client.post('/api/notifications/', json={
+        'recipientId': recipient_id, 'recipientType': recipient_type, 'title': title, 'message': 'Hi',
+        'type': 'Match'
+    }).status_code == 201
+
+
+def test_stream_sends_the_unread_count_then_committed_notifications(app, client):
+    app.config['NOTIFICATION_STREAM_HEARTBEAT_SECONDS'] = 0.05
+    _notify(client, 5)
+    response = client.get('/api/notifications/stream?recipientId=5', buffered=False)
+    events = _events(response)
+
+    assert response.mimetype == 'text/event-stream'
+    assert next(events) == ('unread', {'unreadCount': 1})
+    _notify(client, 5, 'Hospital')
+    _notify(client, 6)
+    _notify(client, 5, title='Second match')
+    event, payload = next(event for event in events if event[0] != 'comment')
+    response.close()
+
+    assert event == 'notification'
+    assert (payload['recipientId'], payload['recipientType'], payload['title']) == (5, 'Donor', 'Second match')
+    assert notification_broker.stats()['streams'] == 0
+
+
+def test_stream_ends_after_its_lifetime_with_keep_alives(app, client):
+    app.config.update(NOTIFICATION_STREAM_HEARTBEAT_SECONDS=0.01, NOTIFICATION_STREAM_MAX_SECONDS=0.05)
+
+    events = [event for event, _ in _events(client.get('/api/notifications/stream?recipientId=8', buffered=False))]
+
+    assert events[0] == 'unread'
+    assert set(events[1:]) == {'comment'}
+
+
+def test_stream_needs_a_valid_recipient(app, client):
+    assert client.get('/api/notifications/stream').status_code == 400
+    assert client.get('/api/notifications/stream?recipientId=1&recipientType=Robot').status_code == 400
+
+
+def test_reconnect_replays_notifications_after_the_last_event_id(app, client):
+    app.config.update(NOTIFICATION_STREAM_HEARTBEAT_SECONDS=0.01, NOTIFICATION_STREAM_MAX_SECONDS=0.05)
+    _notify(client, 5, title='Seen')
+    seen = client.get('/api/notifications/?recipientId=5').get_json()['data'][0]['id']
+    _notify(client, 5, title='Missed 1')
+    _notify(client, 6, title='Someone else')
+    _notify(client, 5, title='Missed 2')
+
+    response = client.get('/api/notifications/stream?recipientId=5', headers={'Last-Event-ID': str(seen)},
+                          buffered=False)
+    titles = [payload['title'] for event, payload in _events(response) if event == 'notification']
+
+    assert titles == ['Missed 1', 'Missed 2']
+
+
+def test_streams_beyond_the_cap_are_refused(app, client):
+    app.config['NOTIFICATION_STREAM_HEARTBEAT_SECONDS'] = 0.05
+    notification_broker.max_streams = 1
+    try:
+        first = client.get('/api/notifications/stream?recipientId=5', buffered=False)
+        next(_events(first))
+        refused = client.get('/api/notifications/stream?recipientId=6')
+        first.close()
+        after_close = client.get('/api/notifications/stream?recipientId=6', buffered=False)
+        after_close.close()
+    finally:
+        notification_broker.max_streams = app.config['NOTIFICATION_STREAM_MAX_CLIENTS']
+
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '30'
+    assert after_close.status_code == 200
@@ -0,0 +1,94 @@
+import logging
+
+import pytest
+
+from extensions import db
+from models.blood_bank import BloodBank
+from services.query_inspector import NPlusOneError, allow_repeats, fingerprint, query_inspector
+from tests.factories import make_bank
+
+
+TOKEN = {'X-Profiler-Token': 'ops-secret'}
+
+
+@pytest.fixture
+def inspector(app):
+    app.config['PROFILER_TOKEN'] = TOKEN['X-Profiler-Token']
+    query_inspector.reset()
+    yield query_inspector
+    query_inspector.reset()
+
+
+def _report(client):
+    return client.get('/api/queries/report', headers=TOKEN).get_json()['data']
+
+
+def _add_loop_route(app, repeats=None):
+    def bank_names():
+        ids = [bank.id for bank in BloodBank.query.all()]
+        if repeats is not None:
+            with repeats():
+                return {'names': [db.session.get(BloodBank, bank_id).name for bank_id in ids]}
+        return {'names': [db.session.get(BloodBank, bank_id).name for bank_id in ids]}
+    app.add_url_rule('/test/bank-names', 'bank_names', bank_names)
+
+
+def test_fingerprints_collapse_literals_and_in_lists():
+    assert (fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x''y' AND n > -4.5")
+            == 'SELECT * FROM t WHERE id IN (?+) AND name = ? AND n > ?')
+
+
+def test_strict_mode_fails_the_request(app, client, inspector):
+    for _ in range(inspector.threshold):
+        make_bank()
+    _add_loop_route(app)
+
+    with pytest.raises(NPlusOneError, match='tests/test_query_inspector.py'):
+        client.get('/test/bank-names')
+
+
+def test_report_lists_n_plus_one_once_per_route(app, client, inspector, monkeypatch, caplog):
+    monkeypatch.setattr(inspector, 'strict', False)
+    for _ in range(inspector.threshold):
+        make_bank()
+    _add_loop_route(app)
+
+    with caplog.at_level(logging.WARNING, logger='services.query_inspector'):
+        client.get('/test/bank-names')
+        client.get('/test/bank-names')
+    report = _report(client)
+
+    [finding] = report['nPlusOne']
+    assert finding['route'] == 'GET /test/bank-names'
+    assert (finding['requests'], finding['maxCount']) == (2, inspector.threshold)
+    assert finding['location'].startswith('tests/test_query_inspector.py')
+    assert len([r for r in caplog.records if r.getMessage().startswith('N+1 query')]) == 1
+
+
+def test_allowed_repeats_are_not_flagged(app, client, inspector):
+    for _ in range(inspector.threshold):
+        make_bank()
+    _add_loop_route(app, repeats=allow_repeats)
+
+    assert client.get('/test/bank-names').status_code == 200
+    assert _report(client)['nPlusOne'] == []
+
+
+def test_slow_queries_are_reported_and_logged(app, client, inspector, monkeypatch, caplog):
+    monkeypatch.setattr(inspector, 'slow_seconds', 0)
+    monkeypatch.setattr(inspector, 'log_path', None)
+
+    with caplog.at_level(logging.WARNING, logger='services.query_inspector'):
+        BloodBank.query.filter_by(pincode='400001').all()
+    monkeypatch.setattr(inspector, 'slow_seconds', 60)
+    slow = _report(client)['slowQueries']
+
+    assert any(entry['route'] == 'background' and 'FROM blood_banks' in entry['fingerprint'] for entry in slow)
+    assert any(r.getMessage().startswith('Slow query') for r in caplog.records)
+
+
+def test_report_needs_the_ops_token(app, client, inspector):
+    assert client.get('/api/queries/report').status_code == 403
+    assert client.get('/api/queries/report', headers={'X-Profiler-Token': 'wrong'}).status_code == 403
+    app.config['PROFILER_TOKEN'] = None
+    assert client.get('/api/queries/report', headers=TOKEN).status_code == 403
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models.blood_request import BloodRequest, Notification
+from services.request_expiry import sweep
+from services.request_queue import request_queue
+from tests.factories import make_hospital, make_request
+
+
+def _urgent_ids(client, limit=200):
+    response = client.get(f'/api/blood-requests/urgent?limit={limit}')
+    assert response.status_code == 200
+    return [row['id'] for row in response.get_json()['data']]
+
+
+def test_urgent_feed_orders_by_urgency_then_deadline(app, client):
+    hospital = make_hospital()
+    urgent_late = make_request(hospital, urgency='Urgent', required_in=timedelta(hours=20))
+    urgent_soon = make_request(hospital, urgency='Urgent', required_in=timedelta(hours=2))
+    critical = make_request(hospital, urgency='Critical', required_in=timedelta(days=3))
+    make_request(hospital, urgency='Normal', required_in=timedelta(hours=1))
+
+    assert _urgent_ids(client) == [critical.id, urgent_soon.id, urgent_late.id]
+
+
+def test_urgent_feed_skips_overdue_requests_without_a_sweep(app, client):
+    # TestingConfig runs no scheduler, so nothing has expired these
+    hospital = make_hospital()
+    for hours in range(1, 34):
+        make_request(hospital, urgency='Critical', required_in=timedelta(hours=-hours))
+    fresh = make_request(hospital, urgency='Critical', required_by=datetime(2030, 1, 1))
+
+    assert _urgent_ids(client, limit=8) == [fresh.id]
+    assert _urgent_ids(client) == [fresh.id]
+
+
+def test_top_skips_requests_that_fall_due_after_queueing(app):
+    hospital = make_hospital()
+    due = make_request(hospital, urgency='Urgent', required_in=timedelta(minutes=30))
+    later = make_request(hospital, urgency='Urgent', required_in=timedelta(hours=5))
+
+    now = datetime.utcnow()
+    assert [r.id for r in request_queue.top(5, now=now)] == [due.id, later.id]
+    assert [r.id for r in request_queue.top(5, now=now + timedelta(hours=1))] == [later.id]
+
+
+def test_status_changes_move_requests_out_of_the_queue(app, client):
+    hospital = make_hospital()
+    blood_request = make_request(hospital, urgency='Critical')
+    assert _urgent_ids(client) == [blood_request.id]
+
+    client.put(f'/api/blood-requests/{blood_request.id}/status', json={'status': 'Fulfilled'})
+    assert _urgent_ids(client) == []
+
+
+def test_sweep_expires_overdue_requests_and_alerts_for_critical_ones(app):
+    hospital = make_hospital()
+    overdue_critical = make_request(hospital, urgency='Critical', required_in=timedelta(hours=-1))
+    overdue_normal = make_request(hospital, urgency='Normal', required_in=timedelta(hours=-2))
+    open_request = make_request(hospital, urgency='Critical', required_in=timedelta(hours=4))
+
+    result = sweep(db.session, batch_size=1)
+
+    assert result['expired'] == 2
+    assert result['batches'] == 2
+    statuses = dict(db.session.query(BloodRequest.id, BloodRequest.status))
+    assert statuses == {overdue_critical.id: 'Expired', overdue_normal.id: 'Expired', open_request.id: 'Pending'}
+    alerts = Notification.query.filter_by(recipient_type='Hospital', recipient_id=hospital.id).all()
+    assert len(alerts) == 1
+    assert request_queue.position(overdue_critical.id) is None
+    assert sweep(db.session)['expired'] == 0
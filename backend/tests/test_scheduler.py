@@ -0,0 +1,41 @@
+import sys
+import threading
+
+from services.scheduler import Scheduler
+
+
+def test_registering_a_job_again_replaces_it_without_a_thread(app):
+    scheduler = Scheduler()
+    scheduler.app, scheduler.enabled = app, True
+    first = scheduler.register('tick', 3600, lambda: 'first')
+    scheduler.start()
+    threads = threading.active_count()
+
+    again = scheduler.register('tick', 60, lambda: 'second')
+    scheduler.start()
+    scheduler.stop()
+
+    assert again is first
+    assert threading.active_count() == threads
+    assert len(scheduler._threads) == 1
+    assert (first.interval, scheduler.run_now('tick')) == (60, 'second')
+
+
+def test_importing_the_factory_builds_no_app():
+    # tests/conftest.py imported create_app; the production app is only built for gunicorn/flask
+    assert 'app' not in vars(sys.modules['app'])
+
+
+def test_running_a_job_over_http_needs_the_ops_token(app, client):
+    from services.scheduler import scheduler
+    app.config['PROFILER_TOKEN'] = 'ops-secret'
+    runs = []
+    scheduler.register('ops_test', 3600, lambda: runs.append('ran') or 'ran')
+    try:
+        refused = client.post('/api/scheduler/jobs/ops_test/run')
+        ran = client.post('/api/scheduler/jobs/ops_test/run', headers={'X-Profiler-Token': 'ops-secret'})
+    finally:
+        scheduler.jobs.pop('ops_test')
+
+    assert refused.status_code == 403
+    assert (ran.status_code, ran.get_json()['result'], runs) == (200, 'ran', ['ran'])
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from extensions import db
+from models.blood_request import BloodRequest, BloodRequestMatch
+from models.donor import Donor
+from models.hospital import Hospital
+from services import demo_data, synthetic_data
+from services.ai_matching_service import BLOOD_COMPATIBILITY
+from services.background_jobs import job_runner
+
+COUNTS = {'hospitals': 40, 'blood_banks': 20, 'donors': 600, 'blood_requests': 300, 'notifications': 50}
+
+
+def _assert_open_requests_are_due_later_and_matched():
+    now = datetime.utcnow()
+    requests = BloodRequest.query.all()
+    open_requests = [r for r in requests if r.status in ('Pending', 'Matched')]
+    assert open_requests
+    assert all(r.required_by > now and r.created_at <= now for r in open_requests)
+
+    matched = [r for r in requests if r.status == 'Matched']
+    assert matched
+    donors = {d.id: d for d in Donor.query.all()}
+    cities = dict(db.session.query(Hospital.id, Hospital.city))
+    for blood_request in matched:
+        matches = BloodRequestMatch.query.filter_by(blood_request_id=blood_request.id).all()
+        assert matches, blood_request.id
+        for match in matches:
+            donor = donors[match.donor_id]
+            assert donor.blood_type in BLOOD_COMPATIBILITY[blood_request.blood_type]
+            assert donor.city == cities[blood_request.hospital_id]
+            assert donor.available_for_donation
+    matched_ids = {r.id for r in matched}
+    assert {m.blood_request_id for m in BloodRequestMatch.query.all()} == matched_ids
+
+
+def test_synthetic_open_requests_are_due_after_the_run(app):
+    written = synthetic_data.generate(db.session, seed=7, processes=False, as_of=datetime(2024, 1, 1), **COUNTS)
+
+    assert written['blood_requests'] == 300
+    assert written['blood_request_matches'] == BloodRequestMatch.query.count()
+    _assert_open_requests_are_due_later_and_matched()
+    closed = BloodRequest.query.filter(BloodRequest.status.in_(['Fulfilled', 'Expired'])).all()
+    assert all(r.created_at < datetime(2024, 1, 1) for r in closed)
+
+
+def test_demo_dataset_has_the_named_hospitals(app):
+    written = demo_data.seed(db.session, seed=3)
+
+    assert written['hospitals'] == 58
+    assert Hospital.query.filter_by(name='AIIMS Delhi').count() == 1
+    assert written['blood_banks'] > 0 and written['donors'] == 150
+    _assert_open_requests_are_due_later_and_matched()
+
+
+def test_seed_endpoint_writes_the_demo_dataset_by_default(app, client):
+    response = client.post('/api/seed-database?seed=3')
+    assert response.status_code == 202
+    assert response.get_json()['dataset'] == 'demo'
+
+    status = job_runner.wait(response.get_json()['job']['id'], timeout=60)
+    assert status['state'] == 'succeeded', status
+    assert status['result']['counts']['hospitals'] == 58
+
+
+def test_seed_endpoint_generates_synthetic_data_on_request(app, client):
+    response = client.post('/api/seed-database?synthetic=true&hospitals=5&blood_banks=3&donors=40'
+                           '&blood_requests=10&notifications=5')
+    assert response.get_json()['dataset'] == 'synthetic'
+
+    status = job_runner.wait(response.get_json()['job']['id'], timeout=60)
+    assert status['state'] == 'succeeded', status
+    assert status['result']['counts'] == {'donors': 40, 'blood_banks': 3, 'hospitals': 5,
+                                          'blood_requests': 10, 'notifications': 5}